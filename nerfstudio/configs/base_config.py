@@ -119,6 +119,13 @@ class LoggingConfig(PrintableConfig):
         "basic" - prints speed of all decorated functions at the end of a program.
         "pytorch" - same as basic, but it also traces few training steps.
     """
+    step_trace: bool = False
+    """Whether to write the wall time of every training step, split into data loading, forward, backward, optimizer,
+    callbacks, eval and checkpointing, to step_trace.nstrace in the log directory. Summarize it with
+    ns-profile-report."""
+    step_trace_cuda_sync: bool = True
+    """Whether to synchronize CUDA at the boundaries of traced phases, so that GPU work is attributed to the phase
+    that launched it. Adds a small overhead to every step."""
 
 
 # Viewer related configs
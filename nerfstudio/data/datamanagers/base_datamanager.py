@@ -109,6 +109,9 @@ class DataManagerConfig(InstantiateConfig):
     """Process masks on GPU for speed at the expense of memory, if True."""
     images_on_gpu: bool = False
     """Process images on GPU for speed at the expense of memory, if True."""
+    image_cache_dir: Optional[Path] = None
+    """If set, decoded and downscaled images and masks are stored in memory-mapped files in this directory,
+    so that later runs and worker processes read them without decoding again."""
 
 
 class DataManager(nn.Module):
@@ -405,6 +408,9 @@ class VanillaDataManager(DataManager, Generic[TDataset]):
 
         self.train_dataset = self.create_train_dataset()
         self.eval_dataset = self.create_eval_dataset()
+        if self.config.image_cache_dir is not None and test_mode != "inference":
+            self.train_dataset.setup_image_cache(self.config.image_cache_dir)
+            self.eval_dataset.setup_image_cache(self.config.image_cache_dir)
         self.exclude_batch_keys_from_device = self.train_dataset.exclude_batch_keys_from_device
         if self.config.masks_on_gpu is True and "mask" in self.exclude_batch_keys_from_device:
             self.exclude_batch_keys_from_device.remove("mask")
@@ -29,7 +29,6 @@ from functools import cached_property
 from pathlib import Path
 from typing import Dict, ForwardRef, Generic, List, Literal, Optional, Tuple, Type, Union, cast, get_args, get_origin
 
-import cv2
 import fpsample
 import numpy as np
 import torch
@@ -37,13 +36,14 @@ from rich.progress import track
 from torch.nn import Parameter
 from typing_extensions import assert_never
 
-from nerfstudio.cameras.camera_utils import fisheye624_project, fisheye624_unproject_helper
 from nerfstudio.cameras.cameras import Cameras, CameraType
 from nerfstudio.configs.dataparser_configs import AnnotatedDataParserUnion
 from nerfstudio.data.datamanagers.base_datamanager import DataManager, DataManagerConfig, TDataset
 from nerfstudio.data.dataparsers.base_dataparser import DataparserOutputs
 from nerfstudio.data.dataparsers.nerfstudio_dataparser import NerfstudioDataParserConfig
 from nerfstudio.data.datasets.base_dataset import InputDataset
+from nerfstudio.data.utils.image_cache import PrefetchingLRUCache
+from nerfstudio.data.utils.undistortion import UndistortionMapCache, compute_undistortion_map
 from nerfstudio.utils.misc import get_orig_class
 from nerfstudio.utils.rich_utils import CONSOLE
 
@@ -79,6 +79,11 @@ class FullImageDatamanagerConfig(DataManagerConfig):
     fps_reset_every: int = 100
     """The number of iterations before one resets fps sampler repeatly, which is essentially drawing fps_reset_every
     samples from the pool of all training cameras without replacement before a new round of sampling starts."""
+    train_cache_budget_gb: Optional[float] = None
+    """If set, training images are streamed instead of all being loaded up front. Decoded and undistorted frames are
+    kept in an in-memory LRU cache of at most this many gigabytes, for datasets that don't fit in memory."""
+    prefetch_images: int = 16
+    """When streaming, the number of upcoming training images to load in the background."""
 
 
 class FullImageDatamanager(DataManager, Generic[TDataset]):
@@ -121,6 +126,9 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         self.train_dataparser_outputs: DataparserOutputs = self.dataparser.get_dataparser_outputs(split="train")
         self.train_dataset = self.create_train_dataset()
         self.eval_dataset = self.create_eval_dataset()
+        if self.config.image_cache_dir is not None and test_mode != "inference":
+            self.train_dataset.setup_image_cache(self.config.image_cache_dir, self.config.max_thread_workers)
+            self.eval_dataset.setup_image_cache(self.config.image_cache_dir, self.config.max_thread_workers)
         if len(self.train_dataset) > 500 and self.config.cache_images == "gpu":
             CONSOLE.print(
                 "Train dataset has over 500 images, overriding cache_images to cpu",
@@ -138,6 +146,11 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         self.eval_unseen_cameras = [i for i in range(len(self.eval_dataset))]
         assert len(self.train_unseen_cameras) > 0, "No data found in dataset"
 
+        self.undistortion_maps = UndistortionMapCache(self.config.image_cache_dir)
+        self.train_stream: Optional[PrefetchingLRUCache] = None
+        if self.config.train_cache_budget_gb is not None and test_mode != "inference":
+            self._setup_train_stream()
+
         super().__init__()
 
     def sample_train_cameras(self):
@@ -176,6 +189,29 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         else:
             raise ValueError(f"Unknown train camera sampling strategy: {self.config.train_cameras_sampling_strategy}")
 
+    def _setup_train_stream(self) -> None:
+        """Sets up the bounded, prefetching cache that training images are streamed through."""
+        # Undistortion updates the intrinsics of the dataset cameras, and evicted frames are undistorted again,
+        # so frames are always undistorted with the original cameras.
+        distorted_cameras = deepcopy(self.train_dataset.cameras)
+
+        def load_idx(idx: int) -> Dict[str, torch.Tensor]:
+            data = self._undistort_idx(self.train_dataset, idx, distorted_cameras)
+            if torch.cuda.is_available():
+                data["image"] = data["image"].pin_memory()
+                if "mask" in data:
+                    data["mask"] = data["mask"].pin_memory()
+            return data
+
+        assert self.config.train_cache_budget_gb is not None
+        self.train_stream = PrefetchingLRUCache(
+            load_idx,
+            max_bytes=int(self.config.train_cache_budget_gb * 1e9),
+            num_workers=self.config.max_thread_workers or 2,
+        )
+        self.train_cameras = self.train_dataset.cameras
+        self.train_stream.prefetch(self.train_unseen_cameras[: self.config.prefetch_images])
+
     @cached_property
     def cached_train(self) -> List[Dict[str, torch.Tensor]]:
         """Get the training images. Will load and undistort the images the
@@ -188,6 +224,43 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         first time this (cached) property is accessed."""
         return self._load_images("eval", cache_images_device=self.config.cache_images)
 
+    def _undistort_idx(
+        self, dataset: InputDataset, idx: int, cameras: Optional[Cameras] = None
+    ) -> Dict[str, torch.Tensor]:
+        """Loads an image and undistorts it, updating the intrinsics of the dataset camera to match.
+
+        Args:
+            dataset: Dataset to load the image from.
+            idx: Index of the image.
+            cameras: Distorted cameras to undistort with. Defaults to the dataset cameras.
+        """
+        if cameras is None:
+            cameras = dataset.cameras
+        data = dataset.get_data(idx, image_type=self.config.cache_images_type)
+        camera = cameras[idx].reshape(())
+        assert data["image"].shape[1] == camera.width.item() and data["image"].shape[0] == camera.height.item(), (
+            f'The size of image ({data["image"].shape[1]}, {data["image"].shape[0]}) loaded '
+            f'does not match the camera parameters ({camera.width.item(), camera.height.item()})'
+        )
+        if camera.distortion_params is None or torch.all(camera.distortion_params == 0):
+            return data
+        K = camera.get_intrinsics_matrices().numpy()
+        distortion_params = camera.distortion_params.numpy()
+        image = data["image"].numpy()
+
+        K, image, mask = _undistort_image(camera, distortion_params, data, image, K, self.undistortion_maps)
+        data["image"] = torch.from_numpy(image)
+        if mask is not None:
+            data["mask"] = mask
+
+        dataset.cameras.fx[idx] = float(K[0, 0])
+        dataset.cameras.fy[idx] = float(K[1, 1])
+        dataset.cameras.cx[idx] = float(K[0, 2])
+        dataset.cameras.cy[idx] = float(K[1, 2])
+        dataset.cameras.width[idx] = image.shape[1]
+        dataset.cameras.height[idx] = image.shape[0]
+        return data
+
     def _load_images(
         self, split: Literal["train", "eval"], cache_images_device: Literal["cpu", "gpu"]
     ) -> List[Dict[str, torch.Tensor]]:
@@ -201,38 +274,12 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         else:
             assert_never(split)
 
-        def undistort_idx(idx: int) -> Dict[str, torch.Tensor]:
-            data = dataset.get_data(idx, image_type=self.config.cache_images_type)
-            camera = dataset.cameras[idx].reshape(())
-            assert data["image"].shape[1] == camera.width.item() and data["image"].shape[0] == camera.height.item(), (
-                f'The size of image ({data["image"].shape[1]}, {data["image"].shape[0]}) loaded '
-                f'does not match the camera parameters ({camera.width.item(), camera.height.item()})'
-            )
-            if camera.distortion_params is None or torch.all(camera.distortion_params == 0):
-                return data
-            K = camera.get_intrinsics_matrices().numpy()
-            distortion_params = camera.distortion_params.numpy()
-            image = data["image"].numpy()
-
-            K, image, mask = _undistort_image(camera, distortion_params, data, image, K)
-            data["image"] = torch.from_numpy(image)
-            if mask is not None:
-                data["mask"] = mask
-
-            dataset.cameras.fx[idx] = float(K[0, 0])
-            dataset.cameras.fy[idx] = float(K[1, 1])
-            dataset.cameras.cx[idx] = float(K[0, 2])
-            dataset.cameras.cy[idx] = float(K[1, 2])
-            dataset.cameras.width[idx] = image.shape[1]
-            dataset.cameras.height[idx] = image.shape[0]
-            return data
-
         CONSOLE.log(f"Caching / undistorting {split} images")
-        with ThreadPoolExecutor(max_workers=2) as executor:
+        with ThreadPoolExecutor(max_workers=self.config.max_thread_workers) as executor:
             undistorted_images = list(
                 track(
                     executor.map(
-                        undistort_idx,
+                        lambda idx: self._undistort_idx(dataset, idx),
                         range(len(dataset)),
                     ),
                     description=f"Caching / undistorting {split} images",
@@ -344,16 +391,29 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         if len(self.train_unseen_cameras) == 0:
             self.train_unseen_cameras = self.sample_train_cameras()
 
-        data = self.cached_train[image_idx]
+        if self.train_stream is not None:
+            # Load the frame before reading its camera, since undistortion updates the intrinsics.
+            data = dict(self.train_stream[image_idx])
+            self.train_stream.prefetch(self.train_unseen_cameras[: self.config.prefetch_images])
+        else:
+            data = self.cached_train[image_idx]
         data["image"] = data["image"].to(self.device)
 
-        assert len(self.train_cameras.shape) == 1, "Assumes single batch dimension"
-        camera = self.train_cameras[image_idx : image_idx + 1].to(self.device)
+        # Streamed frames update the intrinsics of the dataset cameras as they are undistorted, so read them from
+        # there rather than from a copy made before the frame was loaded.
+        cameras = self.train_dataset.cameras if self.train_stream is not None else self.train_cameras
+        assert len(cameras.shape) == 1, "Assumes single batch dimension"
+        camera = cameras[image_idx : image_idx + 1].to(self.device)
         if camera.metadata is None:
             camera.metadata = {}
         camera.metadata["cam_idx"] = image_idx
         return camera, data
 
+    def __del__(self):
+        """Stop the threads that prefetch streamed training images."""
+        if getattr(self, "train_stream", None) is not None:
+            self.train_stream.shutdown()
+
     def next_eval(self, step: int) -> Tuple[Cameras, Dict]:
         """Returns the next evaluation batch
 
@@ -378,174 +438,30 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
 
 
 def _undistort_image(
-    camera: Cameras, distortion_params: np.ndarray, data: dict, image: np.ndarray, K: np.ndarray
+    camera: Cameras,
+    distortion_params: np.ndarray,
+    data: dict,
+    image: np.ndarray,
+    K: np.ndarray,
+    undistortion_maps: Optional[UndistortionMapCache] = None,
 ) -> Tuple[np.ndarray, np.ndarray, Optional[torch.Tensor]]:
+    if undistortion_maps is not None:
+        undistortion_map = undistortion_maps.get(camera, distortion_params, K)
+    else:
+        undistortion_map = compute_undistortion_map(camera, distortion_params, K)
+    if camera.camera_type.item() == CameraType.FISHEYE624.value:
+        assert "mask" not in data
+
+    image = undistortion_map.remap(image)
+    x, y, w, h = undistortion_map.roi
+    if "depth_image" in data:
+        data["depth_image"] = data["depth_image"][y : y + h, x : x + w]
     mask = None
-    if camera.camera_type.item() == CameraType.PERSPECTIVE.value:
-        assert distortion_params[3] == 0, (
-            "We doesn't support the 4th Brown parameter for image undistortion, "
-            "Only k1, k2, k3, p1, p2 can be non-zero."
-        )
-        distortion_params = np.array(
-            [
-                distortion_params[0],
-                distortion_params[1],
-                distortion_params[4],
-                distortion_params[5],
-                distortion_params[2],
-                distortion_params[3],
-                0,
-                0,
-            ]
-        )
-        # because OpenCV expects the pixel coord to be top-left, we need to shift the principal point by 0.5
-        # see https://github.com/nerfstudio-project/nerfstudio/issues/3048
-        K[0, 2] = K[0, 2] - 0.5
-        K[1, 2] = K[1, 2] - 0.5
-        if np.any(distortion_params):
-            newK, roi = cv2.getOptimalNewCameraMatrix(K, distortion_params, (image.shape[1], image.shape[0]), 0)
-            image = cv2.undistort(image, K, distortion_params, None, newK)  # type: ignore
-        else:
-            newK = K
-            roi = 0, 0, image.shape[1], image.shape[0]
-        # crop the image and update the intrinsics accordingly
-        x, y, w, h = roi
-        image = image[y : y + h, x : x + w]
-        if "depth_image" in data:
-            data["depth_image"] = data["depth_image"][y : y + h, x : x + w]
-        if "mask" in data:
-            mask = data["mask"].numpy()
-            mask = mask.astype(np.uint8) * 255
-            if np.any(distortion_params):
-                mask = cv2.undistort(mask, K, distortion_params, None, newK)  # type: ignore
-            mask = mask[y : y + h, x : x + w]
-            mask = torch.from_numpy(mask).bool()
-            if len(mask.shape) == 2:
-                mask = mask[:, :, None]
-        newK[0, 2] = newK[0, 2] + 0.5
-        newK[1, 2] = newK[1, 2] + 0.5
-        K = newK
-
-    elif camera.camera_type.item() == CameraType.FISHEYE.value:
-        K[0, 2] = K[0, 2] - 0.5
-        K[1, 2] = K[1, 2] - 0.5
-        distortion_params = np.array(
-            [distortion_params[0], distortion_params[1], distortion_params[2], distortion_params[3]]
-        )
-        newK = cv2.fisheye.estimateNewCameraMatrixForUndistortRectify(
-            K, distortion_params, (image.shape[1], image.shape[0]), np.eye(3), balance=0
-        )
-        map1, map2 = cv2.fisheye.initUndistortRectifyMap(
-            K, distortion_params, np.eye(3), newK, (image.shape[1], image.shape[0]), cv2.CV_32FC1
-        )
-        # and then remap:
-        image = cv2.remap(image, map1, map2, interpolation=cv2.INTER_LINEAR)
-        if "mask" in data:
-            mask = data["mask"].numpy()
-            mask = mask.astype(np.uint8) * 255
-            mask = cv2.fisheye.undistortImage(mask, K, distortion_params, None, newK)
-            mask = torch.from_numpy(mask).bool()
-            if len(mask.shape) == 2:
-                mask = mask[:, :, None]
-        newK[0, 2] = newK[0, 2] + 0.5
-        newK[1, 2] = newK[1, 2] + 0.5
-        K = newK
-    elif camera.camera_type.item() == CameraType.FISHEYE624.value:
-        fisheye624_params = torch.cat(
-            [camera.fx, camera.fy, camera.cx, camera.cy, torch.from_numpy(distortion_params)], dim=0
-        )
-        assert fisheye624_params.shape == (16,)
-        assert (
-            "mask" not in data
-            and camera.metadata is not None
-            and "fisheye_crop_radius" in camera.metadata
-            and isinstance(camera.metadata["fisheye_crop_radius"], float)
-        )
-        fisheye_crop_radius = camera.metadata["fisheye_crop_radius"]
-
-        # Approximate the FOV of the unmasked region of the camera.
-        upper, lower, left, right = fisheye624_unproject_helper(
-            torch.tensor(
-                [
-                    [camera.cx, camera.cy - fisheye_crop_radius],
-                    [camera.cx, camera.cy + fisheye_crop_radius],
-                    [camera.cx - fisheye_crop_radius, camera.cy],
-                    [camera.cx + fisheye_crop_radius, camera.cy],
-                ],
-                dtype=torch.float32,
-            )[None],
-            params=fisheye624_params[None],
-        ).squeeze(dim=0)
-        fov_radians = torch.max(
-            torch.acos(torch.sum(upper * lower / torch.linalg.norm(upper) / torch.linalg.norm(lower))),
-            torch.acos(torch.sum(left * right / torch.linalg.norm(left) / torch.linalg.norm(right))),
-        )
-
-        # Heuristics to determine parameters of an undistorted image.
-        undist_h = int(fisheye_crop_radius * 2)
-        undist_w = int(fisheye_crop_radius * 2)
-        undistort_focal = undist_h / (2 * torch.tan(fov_radians / 2.0))
-        undist_K = torch.eye(3)
-        undist_K[0, 0] = undistort_focal  # fx
-        undist_K[1, 1] = undistort_focal  # fy
-        undist_K[0, 2] = (undist_w - 1) / 2.0  # cx; for a 1x1 image, center should be at (0, 0).
-        undist_K[1, 2] = (undist_h - 1) / 2.0  # cy
-
-        # Undistorted 2D coordinates -> rays -> reproject to distorted UV coordinates.
-        undist_uv_homog = torch.stack(
-            [
-                *torch.meshgrid(
-                    torch.arange(undist_w, dtype=torch.float32),
-                    torch.arange(undist_h, dtype=torch.float32),
-                ),
-                torch.ones((undist_w, undist_h), dtype=torch.float32),
-            ],
-            dim=-1,
-        )
-        assert undist_uv_homog.shape == (undist_w, undist_h, 3)
-        dist_uv = (
-            fisheye624_project(
-                xyz=(
-                    torch.einsum(
-                        "ij,bj->bi",
-                        torch.linalg.inv(undist_K),
-                        undist_uv_homog.reshape((undist_w * undist_h, 3)),
-                    )[None]
-                ),
-                params=fisheye624_params[None, :],
-            )
-            .reshape((undist_w, undist_h, 2))
-            .numpy()
-        )
-        map1 = dist_uv[..., 1]
-        map2 = dist_uv[..., 0]
-
-        # Use correspondence to undistort image.
-        image = cv2.remap(image, map1, map2, interpolation=cv2.INTER_LINEAR)
-
-        # Compute undistorted mask as well.
-        dist_h = camera.height.item()
-        dist_w = camera.width.item()
-        mask = np.mgrid[:dist_h, :dist_w]
-        mask[0, ...] -= dist_h // 2
-        mask[1, ...] -= dist_w // 2
-        mask = np.linalg.norm(mask, axis=0) < fisheye_crop_radius
-        mask = torch.from_numpy(
-            cv2.remap(
-                mask.astype(np.uint8) * 255,
-                map1,
-                map2,
-                interpolation=cv2.INTER_LINEAR,
-                borderMode=cv2.BORDER_CONSTANT,
-                borderValue=0,
-            )
-            / 255.0
-        ).bool()[..., None]
+    if undistortion_map.mask is not None:
+        mask = torch.from_numpy(undistortion_map.mask)
+    elif "mask" in data:
+        mask = undistortion_map.remap(data["mask"].numpy().astype(np.uint8) * 255)
+        mask = torch.from_numpy(mask).bool()
         if len(mask.shape) == 2:
             mask = mask[:, :, None]
-        assert mask.shape == (undist_h, undist_w, 1)
-        K = undist_K.numpy()
-    else:
-        raise NotImplementedError("Only perspective and fisheye cameras are supported")
-
-    return K, image, mask
+    return undistortion_map.K.copy(), image, mask
@@ -43,8 +43,15 @@ from nerfstudio.data.dataparsers.base_dataparser import DataparserOutputs
 from nerfstudio.data.datasets.base_dataset import InputDataset
 from nerfstudio.data.pixel_samplers import PatchPixelSamplerConfig, PixelSampler, PixelSamplerConfig
 from nerfstudio.data.utils.dataloaders import CacheDataloader, FixedIndicesEvalDataloader, RandIndicesEvalDataloader
+from nerfstudio.data.utils.shared_memory import (
+    SharedBatchRing,
+    SharedTensorDict,
+    shared_memory_free_bytes,
+    tensor_dict_nbytes,
+)
 from nerfstudio.model_components.ray_generators import RayGenerator
-from nerfstudio.utils.misc import get_orig_class
+from nerfstudio.utils import writer
+from nerfstudio.utils.misc import get_orig_class, step_check
 from nerfstudio.utils.rich_utils import CONSOLE
 
 
@@ -61,6 +68,13 @@ class ParallelDataManagerConfig(VanillaDataManagerConfig):
     If queue_size <= 0, the queue size is infinite."""
     max_thread_workers: Optional[int] = None
     """Maximum number of threads to use in thread pool executor. If None, use ThreadPool default."""
+    share_images: bool = True
+    """Load the training images once into shared memory that every data process attaches to. If they don't fit in
+    the free shared memory (/dev/shm, which is only 64 MB in a default Docker container), each data process loads
+    its own copy instead, as it does when this is False."""
+    use_shared_slots: bool = True
+    """Pass batches through a ring of preallocated shared-memory slots instead of pickling them through the queue.
+    The ring holds queue_size + num_processes slots. Ignored if queue_size <= 0."""
 
 
 class DataProcessor(mp.Process):  # type: ignore
@@ -75,6 +89,8 @@ class DataProcessor(mp.Process):  # type: ignore
         dataparser_outputs: outputs from the dataparser
         dataset: input dataset
         pixel_sampler: The pixel sampler for sampling rays
+        img_data: collated images already loaded into shared memory. If None, each process loads its own copy.
+        batch_ring: shared-memory slots to write batches into. If None, batches are pickled through out_queue.
     """
 
     def __init__(
@@ -84,6 +100,8 @@ class DataProcessor(mp.Process):  # type: ignore
         dataparser_outputs: DataparserOutputs,
         dataset: TDataset,
         pixel_sampler: PixelSampler,
+        img_data: Optional[SharedTensorDict] = None,
+        batch_ring: Optional[SharedBatchRing] = None,
     ):
         super().__init__()
         self.daemon = True
@@ -94,14 +112,23 @@ class DataProcessor(mp.Process):  # type: ignore
         self.exclude_batch_keys_from_device = self.dataset.exclude_batch_keys_from_device
         self.pixel_sampler = pixel_sampler
         self.ray_generator = RayGenerator(self.dataset.cameras)
+        self.shared_img_data = img_data
+        self.batch_ring = batch_ring
 
     def run(self):
         """Append out queue in parallel with ray bundles and batches."""
-        self.cache_images()
+        if self.shared_img_data is not None:
+            self.img_data = self.shared_img_data.as_dict()
+        else:
+            self.cache_images()
         while True:
             batch = self.pixel_sampler.sample(self.img_data)
             ray_indices = batch["indices"]
             ray_bundle: RayBundle = self.ray_generator(ray_indices)
+            if self.batch_ring is not None:
+                # Blocks until a slot is free and only passes the slot index through the queue.
+                self.batch_ring.put(ray_bundle, batch)
+                continue
             # check that GPUs are available
             if torch.cuda.is_available():
                 ray_bundle = ray_bundle.pin_memory()
@@ -117,16 +144,25 @@ class DataProcessor(mp.Process):  # type: ignore
 
     def cache_images(self):
         """Caches all input images into a NxHxWx3 tensor."""
-        indices = range(len(self.dataset))
-        batch_list = []
-        results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.max_thread_workers) as executor:
-            for idx in indices:
-                res = executor.submit(self.dataset.__getitem__, idx)
-                results.append(res)
-            for res in track(results, description="Loading data batch", transient=False):
-                batch_list.append(res.result())
-        self.img_data = self.config.collate_fn(batch_list)
+        self.img_data = load_image_batch(self.dataset, self.config)
+
+
+def load_image_batch(dataset: InputDataset, config: ParallelDataManagerConfig) -> Dict:
+    """Loads and collates every image of a dataset into a single batch.
+
+    Args:
+        dataset: input dataset
+        config: configuration object for the parallel data manager
+    """
+    batch_list = []
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=config.max_thread_workers) as executor:
+        for idx in range(len(dataset)):
+            res = executor.submit(dataset.__getitem__, idx)
+            results.append(res)
+        for res in track(results, description="Loading data batch", transient=False):
+            batch_list.append(res.result())
+    return config.collate_fn(batch_list)
 
 
 class ParallelDataManager(DataManager, Generic[TDataset]):
@@ -171,6 +207,9 @@ class ParallelDataManager(DataManager, Generic[TDataset]):
                     break
         self.train_dataset = self.create_train_dataset()
         self.eval_dataset = self.create_eval_dataset()
+        if self.config.image_cache_dir is not None and test_mode != "inference":
+            self.train_dataset.setup_image_cache(self.config.image_cache_dir, self.config.max_thread_workers)
+            self.eval_dataset.setup_image_cache(self.config.image_cache_dir, self.config.max_thread_workers)
         self.exclude_batch_keys_from_device = self.train_dataset.exclude_batch_keys_from_device
         # Spawn is critical for not freezing the program (PyTorch compatability issue)
         # check if spawn is already set
@@ -242,6 +281,41 @@ class ParallelDataManager(DataManager, Generic[TDataset]):
         assert self.train_dataset is not None
         self.train_pixel_sampler = self._get_pixel_sampler(self.train_dataset, self.config.train_num_rays_per_batch)  # type: ignore
         self.data_queue = mp.Queue(maxsize=self.config.queue_size)  # type: ignore
+        use_batch_ring = self.config.use_shared_slots and self.config.queue_size > 0
+        img_data: Optional[Dict] = None
+        if self.config.share_images or use_batch_ring:
+            img_data = load_image_batch(self.train_dataset, self.config)
+        self.shared_img_data: Optional[SharedTensorDict] = None
+        if img_data is not None and self.config.share_images:
+            nbytes = tensor_dict_nbytes(img_data)
+            free_bytes = shared_memory_free_bytes()
+            if nbytes < free_bytes:
+                # Let every data process attach to the images instead of keeping its own copy.
+                self.shared_img_data = SharedTensorDict(img_data)
+                img_data = self.shared_img_data.as_dict()
+                CONSOLE.print(
+                    f"Shared {nbytes / 1e9:.2f} GB of training images with {self.config.num_processes} data processes"
+                )
+            else:
+                CONSOLE.print(
+                    f"[bold yellow]Warning: the training images take {nbytes / 1e9:.2f} GB but only "
+                    f"{free_bytes / 1e9:.2f} GB of shared memory is free, so every data process loads its own copy."
+                )
+        self.batch_ring: Optional[SharedBatchRing] = None
+        # Time spent waiting for batches since the last log, averaged over the logging interval.
+        self.batch_wait_time = 0.0
+        self.num_batch_waits = 0
+        if use_batch_ring:
+            assert img_data is not None
+            # Sample one batch here to size the slots.
+            template_batch = self.train_pixel_sampler.sample(img_data)
+            template_bundle = RayGenerator(self.train_dataset.cameras)(template_batch["indices"])
+            self.batch_ring = SharedBatchRing(
+                template_bundle,
+                template_batch,
+                num_slots=self.config.queue_size + self.config.num_processes,
+                queue_factory=mp.Queue,  # type: ignore
+            )
         self.data_procs = [
             DataProcessor(
                 out_queue=self.data_queue,  # type: ignore
@@ -249,9 +323,13 @@ class ParallelDataManager(DataManager, Generic[TDataset]):
                 dataparser_outputs=self.train_dataparser_outputs,
                 dataset=self.train_dataset,
                 pixel_sampler=self.train_pixel_sampler,
+                img_data=self.shared_img_data,
+                batch_ring=self.batch_ring,
             )
             for i in range(self.config.num_processes)
         ]
+        # Data processes that don't attach to shared images load their own copy.
+        del img_data
         for proc in self.data_procs:
             proc.start()
         print("Started threads")
@@ -288,9 +366,23 @@ class ParallelDataManager(DataManager, Generic[TDataset]):
     def next_train(self, step: int) -> Tuple[RayBundle, Dict]:
         """Returns the next batch of data from the parallel training processes."""
         self.train_count += 1
-        bundle, batch = self.data_queue.get()
-        ray_bundle = bundle.to(self.device)
-        return ray_bundle, batch
+        if self.batch_ring is None:
+            bundle, batch = self.data_queue.get()
+            ray_bundle = bundle.to(self.device)
+            return ray_bundle, batch
+
+        ray_bundle, batch, wait_time = self.batch_ring.get(self.device)
+        self.batch_wait_time += wait_time
+        self.num_batch_waits += 1
+        if writer.is_initialized() and step_check(step, writer.GLOBAL_BUFFER["steps_per_log"], run_at_zero=True):
+            metrics = {"wait_time": self.batch_wait_time / self.num_batch_waits}
+            occupancy = self.batch_ring.occupancy()
+            if occupancy is not None:
+                metrics["slot_occupancy"] = occupancy
+            writer.put_dict(name="Data Queue", scalar_dict=metrics, step=step)
+            self.batch_wait_time = 0.0
+            self.num_batch_waits = 0
+        return ray_bundle, batch  # type: ignore
 
     def next_eval(self, step: int) -> Tuple[RayBundle, Dict]:
         """Returns the next batch of data from the eval dataloader."""
@@ -339,3 +431,7 @@ class ParallelDataManager(DataManager, Generic[TDataset]):
             for proc in self.data_procs:
                 proc.terminate()
                 proc.join()
+        if getattr(self, "shared_img_data", None) is not None:
+            self.shared_img_data.unlink()
+        if getattr(self, "batch_ring", None) is not None:
+            self.batch_ring.unlink()
@@ -16,11 +16,13 @@
 
 from __future__ import annotations
 
+import hashlib
+import importlib.metadata
 import json
 from abc import abstractmethod
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Type
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type
 
 import torch
 from jaxtyping import Float
@@ -30,6 +32,17 @@ import nerfstudio.configs.base_config as cfg
 from nerfstudio.cameras.cameras import Cameras
 from nerfstudio.configs.config_utils import to_immutable_dict
 from nerfstudio.data.scene_box import SceneBox
+from nerfstudio.utils.rich_utils import CONSOLE
+
+DATAPARSER_CACHE_VERSION = 1
+"""Bump when the layout of cached dataparser outputs changes."""
+
+
+def _nerfstudio_version() -> str:
+    try:
+        return importlib.metadata.version("nerfstudio")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
 
 
 @dataclass
@@ -152,6 +165,16 @@ class DataParser:
             DataparserOutputs containing data for the specified dataset and split
         """
 
+    def _get_cache_key(self, split: str) -> Optional[Tuple[Path, str]]:
+        """Returns where to cache the dataparser outputs of a split and the key they are valid for, or None to not
+        cache them. The key must change whenever anything the outputs depend on changes, e.g. by hashing the dataset
+        files and the config. The cache format and nerfstudio version are added to the key by the caller.
+
+        Args:
+            split: Which dataset split to generate (train/test).
+        """
+        return None
+
     def get_dataparser_outputs(self, split: str = "train", **kwargs: Optional[Dict]) -> DataparserOutputs:
         """Returns the dataparser outputs for the given split.
 
@@ -162,7 +185,40 @@ class DataParser:
         Returns:
             DataparserOutputs containing data for the specified dataset and split
         """
+        cache_key = self._get_cache_key(split) if not kwargs else None
+        cache_file = None
+        if cache_key is not None:
+            cache_path, key = cache_key
+            # The key is part of the file name, so outputs are only unpickled when they are valid for this dataset,
+            # config and version of nerfstudio.
+            key = f"{key}-{DATAPARSER_CACHE_VERSION}-{_nerfstudio_version()}"
+            cache_file = cache_path.with_name(
+                f"{cache_path.stem}-{hashlib.sha1(key.encode()).hexdigest()[:16]}{cache_path.suffix}"
+            )
+        if cache_file is not None and cache_file.exists():
+            try:
+                cached = torch.load(cache_file, weights_only=False)
+                if not isinstance(cached["outputs"], DataparserOutputs):
+                    raise TypeError(f"expected DataparserOutputs, got {type(cached['outputs'])}")
+                # Restores what the parser learned while generating the outputs, e.g. the downscale factor.
+                vars(self).update(cached["state"])
+                return cached["outputs"]
+            except Exception as e:
+                CONSOLE.print(f"[bold yellow]Warning: could not load the cached dataparser outputs, regenerating: {e}")
+
         dataparser_outputs = self._generate_dataparser_outputs(split, **kwargs)
+        if cache_key is not None and cache_file is not None:
+            cache_path = cache_key[0]
+            state = {name: value for name, value in vars(self).items() if name != "config"}
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                for stale_file in cache_path.parent.glob(f"{cache_path.stem}-*{cache_path.suffix}"):
+                    stale_file.unlink(missing_ok=True)
+                tmp_path = cache_file.with_suffix(".tmp")
+                torch.save({"outputs": dataparser_outputs, "state": state}, tmp_path)
+                tmp_path.replace(cache_file)
+            except OSError as e:
+                CONSOLE.print(f"[bold yellow]Warning: could not cache the dataparser outputs: {e}")
         return dataparser_outputs
 
 
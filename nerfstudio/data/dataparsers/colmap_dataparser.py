@@ -393,12 +393,14 @@ class ColmapDataParser(DataParser):
 
     def _load_3D_points(self, colmap_path: Path, transform_matrix: torch.Tensor, scale_factor: float):
         if (colmap_path / "points3D.bin").exists():
-            colmap_points = colmap_utils.read_points3D_binary(colmap_path / "points3D.bin")
+            points = colmap_utils.read_points3D_binary_arrays(colmap_path / "points3D.bin")
         elif (colmap_path / "points3D.txt").exists():
-            colmap_points = colmap_utils.read_points3D_text(colmap_path / "points3D.txt")
+            points = colmap_utils.ColmapPoints3D.from_dict(
+                colmap_utils.read_points3D_text(colmap_path / "points3D.txt")
+            )
         else:
             raise ValueError(f"Could not find points3D.txt or points3D.bin in {colmap_path}")
-        points3D = torch.from_numpy(np.array([p.xyz for p in colmap_points.values()], dtype=np.float32))
+        points3D = torch.from_numpy(points.xyz.astype(np.float32))
         points3D = (
             torch.cat(
                 (
@@ -412,12 +414,12 @@ class ColmapDataParser(DataParser):
         points3D *= scale_factor
 
         # Load point colours
-        points3D_rgb = torch.from_numpy(np.array([p.rgb for p in colmap_points.values()], dtype=np.uint8))
-        points3D_num_points = torch.tensor([len(p.image_ids) for p in colmap_points.values()], dtype=torch.int64)
+        points3D_rgb = torch.from_numpy(points.rgb)
+        points3D_num_points = torch.from_numpy(points.track_lengths)
         out = {
             "points3D_xyz": points3D,
             "points3D_rgb": points3D_rgb,
-            "points3D_error": torch.from_numpy(np.array([p.error for p in colmap_points.values()], dtype=np.float32)),
+            "points3D_error": torch.from_numpy(points.errors.astype(np.float32)),
             "points3D_num_points2D": points3D_num_points,
         }
         if self.config.max_2D_matches_per_3D_point != 0:
@@ -433,7 +435,7 @@ class ColmapDataParser(DataParser):
                 max_num_points = min(max_num_points, self.config.max_2D_matches_per_3D_point)
             points3D_image_ids = []
             points3D_image_xy = []
-            for p in colmap_points.values():
+            for p in points.to_dict().values():
                 nids = np.array(p.image_ids, dtype=np.int64)
                 nxy_ids = np.array(p.point2D_idxs, dtype=np.int32)
                 if self.config.max_2D_matches_per_3D_point != -1:
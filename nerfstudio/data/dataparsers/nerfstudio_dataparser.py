@@ -15,6 +15,8 @@
 
 from __future__ import annotations
 
+import hashlib
+import os
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Literal, Optional, Tuple, Type
@@ -77,6 +79,13 @@ class NerfstudioDataParserConfig(DataParserConfig):
     """Replace the unknown pixels with this color. Relevant if you have a mask but still sample everywhere."""
     load_3D_points: bool = False
     """Whether to load the 3D points from the colmap reconstruction."""
+    cache_outputs: bool = False
+    """Whether to cache the dataparser outputs next to the data. The cache is keyed by the contents of the
+    transforms file, the config, the entries of the data directory and the nerfstudio version, so it is regenerated
+    when any of them change. The cache is a pickle, so only enable this for data you trust."""
+
+
+CACHE_DIRNAME = ".dataparser_cache"
 
 
 @dataclass
@@ -86,6 +95,24 @@ class Nerfstudio(DataParser):
     config: NerfstudioDataParserConfig
     downscale_factor: Optional[int] = None
 
+    def _get_cache_key(self, split: str) -> Optional[Tuple[Path, str]]:
+        if not self.config.cache_outputs:
+            return None
+        if self.config.data.suffix == ".json":
+            transforms_path = self.config.data
+            data_dir = self.config.data.parent
+        else:
+            transforms_path = self.config.data / "transforms.json"
+            data_dir = self.config.data
+        if not transforms_path.exists():
+            return None
+
+        key = hashlib.sha1(transforms_path.read_bytes())
+        # Downscaled image folders and point clouds appearing next to the transforms change the outputs.
+        entries = sorted((e.name, e.stat().st_mtime_ns) for e in os.scandir(data_dir) if e.name != CACHE_DIRNAME)
+        key.update(repr((self.config, split, self.downscale_factor, entries)).encode())
+        return data_dir / CACHE_DIRNAME / f"{transforms_path.stem}_{split}.pt", key.hexdigest()
+
     def _generate_dataparser_outputs(self, split="train"):
         assert self.config.data.exists(), f"Data directory {self.config.data} does not exist."
 
@@ -476,7 +503,7 @@ class Nerfstudio(DataParser):
                 while True:
                     if (max_res / 2 ** (df)) <= MAX_AUTO_RESOLUTION:
                         break
-                    if not (data_dir / f"{downsample_folder_prefix}{2**(df+1)}" / filepath.name).exists():
+                    if not (data_dir / f"{downsample_folder_prefix}{2 ** (df + 1)}" / filepath.name).exists():
                         break
                     df += 1
 
@@ -20,12 +20,12 @@ from __future__ import annotations
 
 from copy import deepcopy
 from pathlib import Path
-from typing import Dict, List, Literal
+from typing import Dict, List, Literal, Optional
 
 import numpy as np
 import numpy.typing as npt
 import torch
-from jaxtyping import Float, UInt8
+from jaxtyping import Bool, Float, UInt8
 from PIL import Image
 from torch import Tensor
 from torch.utils.data import Dataset
@@ -33,6 +33,7 @@ from torch.utils.data import Dataset
 from nerfstudio.cameras.cameras import Cameras
 from nerfstudio.data.dataparsers.base_dataparser import DataparserOutputs
 from nerfstudio.data.utils.data_utils import get_image_mask_tensor_from_path
+from nerfstudio.data.utils.image_cache import DecodedImageCache
 
 
 class InputDataset(Dataset):
@@ -55,16 +56,42 @@ class InputDataset(Dataset):
         self.cameras = deepcopy(dataparser_outputs.cameras)
         self.cameras.rescale_output_resolution(scaling_factor=scale_factor)
         self.mask_color = dataparser_outputs.metadata.get("mask_color", None)
+        self._image_cache: Optional[DecodedImageCache] = None
+        self._mask_cache: Optional[DecodedImageCache] = None
 
     def __len__(self):
         return len(self._dataparser_outputs.image_filenames)
 
+    def setup_image_cache(self, cache_dir: Path, max_workers: Optional[int] = None) -> None:
+        """Enables the on-disk cache of decoded and downscaled images and masks.
+
+        Frames that are missing from the cache, or whose source file changed, are decoded once and
+        stored in a memory-mapped file in cache_dir. Afterwards images are read as zero-copy views.
+
+        Args:
+            cache_dir: Directory holding the cache files, shared by all datasets and scale factors.
+            max_workers: Number of decoding threads. If None, uses the ThreadPool default.
+        """
+        self._image_cache = DecodedImageCache(cache_dir, self.image_filenames, self.scale_factor, kind="image")
+        self._image_cache.build(self._decode_numpy_image, max_workers=max_workers)
+        if self._dataparser_outputs.mask_filenames is not None:
+            self._mask_cache = DecodedImageCache(
+                cache_dir, self._dataparser_outputs.mask_filenames, self.scale_factor, kind="mask"
+            )
+            self._mask_cache.build(self._decode_numpy_mask, max_workers=max_workers)
+
     def get_numpy_image(self, image_idx: int) -> npt.NDArray[np.uint8]:
         """Returns the image of shape (H, W, 3 or 4).
 
         Args:
             image_idx: The image index in the dataset.
         """
+        if self._image_cache is not None:
+            return self._image_cache[image_idx]
+        return self._decode_numpy_image(image_idx)
+
+    def _decode_numpy_image(self, image_idx: int) -> npt.NDArray[np.uint8]:
+        """Decodes and resizes the image of shape (H, W, 3 or 4) from its source file."""
         image_filename = self._dataparser_outputs.image_filenames[image_idx]
         pil_image = Image.open(image_filename)
         if self.scale_factor != 1.0:
@@ -126,8 +153,7 @@ class InputDataset(Dataset):
 
         data = {"image_idx": image_idx, "image": image}
         if self._dataparser_outputs.mask_filenames is not None:
-            mask_filepath = self._dataparser_outputs.mask_filenames[image_idx]
-            data["mask"] = get_image_mask_tensor_from_path(filepath=mask_filepath, scale_factor=self.scale_factor)
+            data["mask"] = self.get_mask(image_idx)
             assert (
                 data["mask"].shape[:2] == data["image"].shape[:2]
             ), f"Mask and image have different shapes. Got {data['mask'].shape[:2]} and {data['image'].shape[:2]}"
@@ -139,6 +165,25 @@ class InputDataset(Dataset):
         data.update(metadata)
         return data
 
+    def get_mask(self, image_idx: int) -> Bool[Tensor, "image_height image_width 1"]:
+        """Returns the boolean mask of an image. Only valid if the dataparser outputs have mask filenames.
+
+        Args:
+            image_idx: The image index in the dataset.
+        """
+        if self._mask_cache is not None:
+            return torch.from_numpy(self._mask_cache[image_idx].view(np.bool_))
+        assert self._dataparser_outputs.mask_filenames is not None
+        mask_filepath = self._dataparser_outputs.mask_filenames[image_idx]
+        return get_image_mask_tensor_from_path(filepath=mask_filepath, scale_factor=self.scale_factor)
+
+    def _decode_numpy_mask(self, image_idx: int) -> npt.NDArray[np.uint8]:
+        """Decodes and resizes the mask of an image as uint8 values of shape (H, W, 1)."""
+        assert self._dataparser_outputs.mask_filenames is not None
+        mask_filepath = self._dataparser_outputs.mask_filenames[image_idx]
+        mask = get_image_mask_tensor_from_path(filepath=mask_filepath, scale_factor=self.scale_factor)
+        return mask.numpy().astype(np.uint8)
+
     def get_metadata(self, data: Dict) -> Dict:
         """Method that can be used to process any additional metadata that may be part of the model inputs.
 
@@ -16,19 +16,25 @@
 Code for sampling pixels.
 """
 
-import random
-import warnings
 from dataclasses import dataclass, field
-from typing import Dict, Optional, Type, Union
+from typing import Dict, Optional, Set, Tuple, Type, Union
 
 import torch
-from jaxtyping import Int
+from jaxtyping import Float, Int
 from torch import Tensor
 
 from nerfstudio.configs.base_config import InstantiateConfig
 from nerfstudio.data.utils.pixel_sampling_utils import divide_rays_per_image, erode_mask
 
 
+def unravel_pixel_indices(flat_indices: Tensor, image_height: int, image_width: int) -> Int[Tensor, "batch_size 3"]:
+    """Converts indices into flattened (num_images, height, width) images to (image, y, x) indices."""
+    image_size = image_height * image_width
+    return torch.stack(
+        (flat_indices // image_size, (flat_indices % image_size) // image_width, flat_indices % image_width), dim=-1
+    )
+
+
 @dataclass
 class PixelSamplerConfig(InstantiateConfig):
     """Configuration for pixel sampler instantiation."""
@@ -46,9 +52,9 @@ class PixelSamplerConfig(InstantiateConfig):
     fisheye_crop_radius: Optional[float] = None
     """Set to the radius (in pixels) for fisheye cameras."""
     rejection_sample_mask: bool = True
-    """Whether or not to use rejection sampling when sampling images with masks"""
+    """Unused. Masked pixels are drawn from an index of valid pixels that is computed once per mask."""
     max_num_iterations: int = 100
-    """If rejection sampling masks, the maximum number of times to sample"""
+    """Unused. Kept so that existing configs still load."""
 
 
 class PixelSampler:
@@ -69,6 +75,8 @@ class PixelSampler:
         self.config.is_equirectangular = self.kwargs.get("is_equirectangular", self.config.is_equirectangular)
         self.config.fisheye_crop_radius = self.kwargs.get("fisheye_crop_radius", self.config.fisheye_crop_radius)
         self.set_num_rays_per_batch(self.config.num_rays_per_batch)
+        self._valid_pixel_indices: Dict[Tuple, Tuple[Tensor, Tensor]] = {}
+        self._used_mask_keys: Set[Tuple] = set()
 
     def set_num_rays_per_batch(self, num_rays_per_batch: int):
         """Set the number of rays to sample per batch.
@@ -78,6 +86,55 @@ class PixelSampler:
         """
         self.num_rays_per_batch = num_rays_per_batch
 
+    def valid_pixel_indices(self, mask: Tensor, device: Union[torch.device, str], erode_radius: int = 0) -> Tensor:
+        """Returns the flattened indices of the valid pixels of a mask.
+
+        The indices are computed once per mask and reused for as long as the same, unmodified mask is sampled.
+
+        Args:
+            mask: mask of shape (num_images, height, width, 1).
+            device: device to put the indices on.
+            erode_radius: if larger than 0, erodes the mask by this many pixels first.
+        """
+        key = (mask.data_ptr(), tuple(mask.shape), mask.stride(), mask._version, str(device), erode_radius)
+        self._used_mask_keys.add(key)
+        cached = self._valid_pixel_indices.get(key)
+        if cached is not None:
+            return cached[1]
+        valid = mask[..., 0]
+        if erode_radius > 0:
+            valid = erode_mask(mask.permute(0, 3, 1, 2).float(), pixel_radius=erode_radius)[:, 0]
+        indices = torch.nonzero(valid.reshape(-1), as_tuple=False).squeeze(-1)
+        if valid.numel() < 2**31:
+            indices = indices.int()
+        # The mask is referenced so that its memory, and thus the key, can't be reused by another tensor.
+        self._valid_pixel_indices[key] = (mask, indices.to(device))
+        return self._valid_pixel_indices[key][1]
+
+    def sample_valid_pixels(
+        self, batch_size: int, mask: Tensor, device: Union[torch.device, str], erode_radius: int = 0
+    ) -> Int[Tensor, "batch_size 3"]:
+        """Draws pixels uniformly, with replacement, from the valid pixels of a mask.
+
+        Args:
+            batch_size: number of pixels to draw.
+            mask: mask of shape (num_images, height, width, 1).
+            device: device to sample on.
+            erode_radius: if larger than 0, only draws pixels at least this far from an invalid pixel.
+        """
+        valid = self.valid_pixel_indices(mask, device, erode_radius=erode_radius)
+        if len(valid) == 0:
+            raise ValueError("Cannot sample pixels, the mask is empty.")
+        flat = valid[torch.randint(len(valid), (batch_size,), device=device)].long()
+        return unravel_pixel_indices(flat, mask.shape[1], mask.shape[2])
+
+    def _prune_valid_pixel_indices(self) -> None:
+        """Drops the indices of masks that were not sampled since the last call."""
+        for key in list(self._valid_pixel_indices):
+            if key not in self._used_mask_keys:
+                del self._valid_pixel_indices[key]
+        self._used_mask_keys = set()
+
     def sample_method(
         self,
         batch_size: int,
@@ -95,45 +152,13 @@ class PixelSampler:
             num_images: number of images to sample over
             mask: mask of possible pixels in an image to sample from.
         """
+        if isinstance(mask, torch.Tensor) and not self.config.ignore_mask:
+            return self.sample_valid_pixels(batch_size, mask, device)
+
         indices = (
             torch.rand((batch_size, 3), device=device)
             * torch.tensor([num_images, image_height, image_width], device=device)
         ).long()
-
-        if isinstance(mask, torch.Tensor) and not self.config.ignore_mask:
-            if self.config.rejection_sample_mask:
-                num_valid = 0
-                for _ in range(self.config.max_num_iterations):
-                    c, y, x = (i.flatten() for i in torch.split(indices, 1, dim=-1))
-                    chosen_indices_validity = mask[..., 0][c, y, x].bool()
-                    num_valid = int(torch.sum(chosen_indices_validity).item())
-                    if num_valid == batch_size:
-                        break
-                    else:
-                        replacement_indices = (
-                            torch.rand((batch_size - num_valid, 3), device=device)
-                            * torch.tensor([num_images, image_height, image_width], device=device)
-                        ).long()
-                        indices[~chosen_indices_validity] = replacement_indices
-
-                if num_valid != batch_size:
-                    warnings.warn(
-                        """
-                        Masked sampling failed, mask is either empty or mostly empty.
-                        Reverting behavior to non-rejection sampling. Consider setting
-                        pipeline.datamanager.pixel-sampler.rejection-sample-mask to False
-                        or increasing pipeline.datamanager.pixel-sampler.max-num-iterations
-                        """
-                    )
-                    self.config.rejection_sample_mask = False
-                    nonzero_indices = torch.nonzero(mask[..., 0], as_tuple=False)
-                    chosen_indices = random.sample(range(len(nonzero_indices)), k=batch_size)
-                    indices = nonzero_indices[chosen_indices]
-            else:
-                nonzero_indices = torch.nonzero(mask[..., 0], as_tuple=False)
-                chosen_indices = random.sample(range(len(nonzero_indices)), k=batch_size)
-                indices = nonzero_indices[chosen_indices]
-
         return indices
 
     def sample_method_equirectangular(
@@ -361,6 +386,7 @@ class PixelSampler:
         Args:
             image_batch: batch of images to sample from
         """
+        self._prune_valid_pixel_indices()
         if isinstance(image_batch["image"], list):
             image_batch = dict(image_batch.items())  # copy the dictionary so we don't modify the original
             pixel_batch = self.collate_image_dataset_batch_list(
@@ -421,10 +447,7 @@ class PatchPixelSampler(PixelSampler):
         if isinstance(mask, Tensor) and not self.config.ignore_mask:
             sub_bs = batch_size // (self.config.patch_size**2)
             half_patch_size = int(self.config.patch_size / 2)
-            m = erode_mask(mask.permute(0, 3, 1, 2).float(), pixel_radius=half_patch_size)
-            nonzero_indices = torch.nonzero(m[:, 0], as_tuple=False).to(device)
-            chosen_indices = random.sample(range(len(nonzero_indices)), k=sub_bs)
-            indices = nonzero_indices[chosen_indices]
+            indices = self.sample_valid_pixels(sub_bs, mask, device, erode_radius=half_patch_size)
 
             indices = (
                 indices.view(sub_bs, 1, 1, 3)
@@ -507,10 +530,7 @@ class PairPixelSampler(PixelSampler):  # pylint: disable=too-few-public-methods
             rays_to_sample = batch_size // 2
 
         if isinstance(mask, Tensor) and not self.config.ignore_mask:
-            m = erode_mask(mask.permute(0, 3, 1, 2).float(), pixel_radius=self.radius)
-            nonzero_indices = torch.nonzero(m[:, 0], as_tuple=False).to(device)
-            chosen_indices = random.sample(range(len(nonzero_indices)), k=rays_to_sample)
-            indices = nonzero_indices[chosen_indices]
+            indices = self.sample_valid_pixels(rays_to_sample, mask, device, erode_radius=self.radius)
         else:
             s = (rays_to_sample, 1)
             ns = torch.randint(0, num_images, s, dtype=torch.long, device=device)
@@ -527,3 +547,123 @@ class PairPixelSampler(PixelSampler):  # pylint: disable=too-few-public-methods
         pair_indices += indices
         indices = torch.hstack((indices, pair_indices)).view(rays_to_sample * 2, 3)
         return indices
+
+
+@dataclass
+class ErrorMapPixelSamplerConfig(PixelSamplerConfig):
+    """Config dataclass for ErrorMapPixelSampler."""
+
+    _target: Type = field(default_factory=lambda: ErrorMapPixelSampler)
+    """Target class to instantiate."""
+    uniform_fraction: float = 0.25
+    """Fraction of each batch that is sampled uniformly, so that pixels with a low error are still revisited."""
+    error_decay: float = 0.9
+    """Weight of the previous error of a pixel when it is updated with a new error."""
+    cdf_update_interval: int = 16
+    """Number of batches between recomputations of the sampling distribution from the error map."""
+
+
+class ErrorMapPixelSampler(PixelSampler):
+    """Samples pixels with a probability proportional to their most recent training error.
+
+    The error of every pixel of the image batch is stored in an error map, which starts out uniform and is updated
+    with :meth:`update_error_map`. Pixels are drawn on device by inverting the cumulative distribution of the map.
+    Only batches of equally sized images are importance sampled; lists of images are sampled uniformly. The error
+    map is only updated by the pipeline when pixels are sampled in the training process, as in VanillaDataManager.
+
+    Args:
+        config: the ErrorMapPixelSamplerConfig used to instantiate class
+    """
+
+    config: ErrorMapPixelSamplerConfig
+
+    def __init__(self, config: ErrorMapPixelSamplerConfig, **kwargs) -> None:
+        super().__init__(config, **kwargs)
+        self.error_map: Optional[Float[Tensor, "num_images height width"]] = None
+        self._image_idx: Optional[Tensor] = None
+        self._image_idx_to_position: Optional[Tensor] = None
+        self._cdf: Optional[Tensor] = None
+        self._cdf_mask_key: Optional[Tuple] = None
+        self._num_batches_since_update = 0
+
+    def _reset_error_map(self, batch: Dict) -> None:
+        """Starts a new, uniform error map when the images of the batch change."""
+        image_idx = batch["image_idx"]
+        num_images, image_height, image_width, _ = batch["image"].shape
+        if (
+            self.error_map is not None
+            and self._image_idx is not None
+            and self.error_map.shape == (num_images, image_height, image_width)
+            and torch.equal(self._image_idx, image_idx)
+        ):
+            return
+        device = batch["image"].device
+        self.error_map = torch.ones((num_images, image_height, image_width), device=device)
+        self._image_idx = image_idx.clone()
+        self._image_idx_to_position = torch.full((int(image_idx.max()) + 1,), -1, dtype=torch.long, device=device)
+        self._image_idx_to_position[image_idx.to(device)] = torch.arange(num_images, device=device)
+        self._cdf = None
+
+    def update_error_map(self, indices: Int[Tensor, "num_rays 3"], errors: Float[Tensor, "num_rays"]) -> None:
+        """Updates the error map with the errors of sampled rays.
+
+        Args:
+            indices: (camera index, y, x) indices of the rays, as returned in the batch.
+            errors: error of every ray.
+        """
+        if self.error_map is None or self._image_idx_to_position is None:
+            return
+        indices = indices.to(self.error_map.device)
+        errors = errors.detach().to(self.error_map)
+        known = indices[:, 0] < len(self._image_idx_to_position)
+        indices, errors = indices[known], errors[known]
+        position = self._image_idx_to_position[indices[:, 0]]
+        in_batch = position >= 0
+        position, y, x, errors = position[in_batch], indices[in_batch, 1], indices[in_batch, 2], errors[in_batch]
+        decay = self.config.error_decay
+        self.error_map[position, y, x] = decay * self.error_map[position, y, x] + (1 - decay) * errors
+
+    def _get_cdf(self, mask: Optional[Tensor]) -> Tensor:
+        assert self.error_map is not None
+        mask_key = (mask.data_ptr(), tuple(mask.shape), mask._version) if mask is not None else None
+        if (
+            self._cdf is None
+            or self._cdf_mask_key != mask_key
+            or self._num_batches_since_update >= self.config.cdf_update_interval
+        ):
+            weights = self.error_map.clamp_min(1e-6)
+            if mask is not None:
+                weights = weights * mask[..., 0].to(weights)
+            self._cdf = torch.cumsum(weights.reshape(-1).double(), dim=0)
+            self._cdf_mask_key = mask_key
+            self._num_batches_since_update = 0
+        self._num_batches_since_update += 1
+        return self._cdf
+
+    def sample_method(
+        self,
+        batch_size: int,
+        num_images: int,
+        image_height: int,
+        image_width: int,
+        mask: Optional[Tensor] = None,
+        device: Union[torch.device, str] = "cpu",
+    ) -> Int[Tensor, "batch_size 3"]:
+        if self.error_map is None or self.error_map.shape != (num_images, image_height, image_width):
+            return super().sample_method(batch_size, num_images, image_height, image_width, mask=mask, device=device)
+
+        if self.config.ignore_mask:
+            mask = None
+        num_uniform = int(batch_size * self.config.uniform_fraction)
+        uniform_indices = super().sample_method(
+            num_uniform, num_images, image_height, image_width, mask=mask, device=device
+        )
+        cdf = self._get_cdf(mask)
+        samples = torch.rand(batch_size - num_uniform, dtype=cdf.dtype, device=cdf.device) * cdf[-1]
+        flat = torch.searchsorted(cdf, samples, right=True).clamp_max(len(cdf) - 1).to(device)
+        indices = unravel_pixel_indices(flat, image_height, image_width)
+        return torch.cat((uniform_indices, indices), dim=0)
+
+    def collate_image_dataset_batch(self, batch: Dict, num_rays_per_batch: int, keep_full_image: bool = False):
+        self._reset_error_map(batch)
+        return super().collate_image_dataset_batch(batch, num_rays_per_batch, keep_full_image=keep_full_image)
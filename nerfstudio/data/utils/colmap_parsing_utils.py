@@ -41,6 +41,9 @@ TODO(1480) Delete this file when moving to pycolmap.
 import collections
 import os
 import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Union
 
 import numpy as np
 
@@ -226,35 +229,7 @@ def read_images_binary(path_to_model_file):
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
     """
-    images = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_reg_images = read_next_bytes(fid, 8, "Q")[0]
-        for _ in range(num_reg_images):
-            binary_image_properties = read_next_bytes(fid, num_bytes=64, format_char_sequence="idddddddi")
-            image_id = binary_image_properties[0]
-            qvec = np.array(binary_image_properties[1:5])
-            tvec = np.array(binary_image_properties[5:8])
-            camera_id = binary_image_properties[8]
-            image_name = b""
-            current_char = read_next_bytes(fid, 1, "c")[0]
-            while current_char != b"\x00":  # look for the ASCII 0 entry
-                image_name += current_char
-                current_char = read_next_bytes(fid, 1, "c")[0]
-            image_name = image_name.decode("utf-8")
-            num_points2D = read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[0]
-            x_y_id_s = read_next_bytes(fid, num_bytes=24 * num_points2D, format_char_sequence="ddq" * num_points2D)
-            xys = np.column_stack([tuple(map(float, x_y_id_s[0::3])), tuple(map(float, x_y_id_s[1::3]))])
-            point3D_ids = np.array(tuple(map(int, x_y_id_s[2::3])))
-            images[image_id] = Image(
-                id=image_id,
-                qvec=qvec,
-                tvec=tvec,
-                camera_id=camera_id,
-                name=image_name,
-                xys=xys,
-                point3D_ids=point3D_ids,
-            )
-    return images
+    return read_images_binary_arrays(path_to_model_file).to_dict()
 
 
 def write_images_text(images, path):
@@ -341,23 +316,7 @@ def read_points3D_binary(path_to_model_file):
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
-    points3D = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_points = read_next_bytes(fid, 8, "Q")[0]
-        for _ in range(num_points):
-            binary_point_line_properties = read_next_bytes(fid, num_bytes=43, format_char_sequence="QdddBBBd")
-            point3D_id = binary_point_line_properties[0]
-            xyz = np.array(binary_point_line_properties[1:4])
-            rgb = np.array(binary_point_line_properties[4:7])
-            error = np.array(binary_point_line_properties[7])
-            track_length = read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[0]
-            track_elems = read_next_bytes(fid, num_bytes=8 * track_length, format_char_sequence="ii" * track_length)
-            image_ids = np.array(tuple(map(int, track_elems[0::2])))
-            point2D_idxs = np.array(tuple(map(int, track_elems[1::2])))
-            points3D[point3D_id] = Point3D(
-                id=point3D_id, xyz=xyz, rgb=rgb, error=error, image_ids=image_ids, point2D_idxs=point2D_idxs
-            )
-    return points3D
+    return read_points3D_binary_arrays(path_to_model_file).to_dict()
 
 
 def write_points3D_text(points3D, path):
@@ -406,6 +365,247 @@ def write_points3D_binary(points3D, path_to_model_file):
                 write_next_bytes(fid, [image_id, point2D_id], "ii")
 
 
+# The readers above unpack a few values per call, which dominates the loading time of large reconstructions.
+# The readers below walk the record offsets once and then parse every field with bulk numpy passes into
+# columnar arrays, with CSR-style offsets for the variable-length parts of each record.
+
+_IMAGE_PROPERTIES_DTYPE = np.dtype([("id", "<i4"), ("qvec", "<f8", (4,)), ("tvec", "<f8", (3,)), ("camera_id", "<i4")])
+_POINT2D_DTYPE = np.dtype([("xy", "<f8", (2,)), ("point3D_id", "<i8")])
+_POINT3D_PROPERTIES_DTYPE = np.dtype(
+    [("id", "<u8"), ("xyz", "<f8", (3,)), ("rgb", "u1", (3,)), ("error", "<f8"), ("track_length", "<u8")]
+)
+_TRACK_ELEMENT_DTYPE = np.dtype([("image_id", "<i4"), ("point2D_idx", "<i4")])
+_UINT64 = struct.Struct("<Q")
+
+
+@dataclass
+class ColmapImages:
+    """Images of a COLMAP reconstruction as arrays. The 2D points of the i-th image are
+    ``xys[points2D_offsets[i]:points2D_offsets[i + 1]]``."""
+
+    ids: np.ndarray
+    """Image ids, shape (N,)."""
+    qvecs: np.ndarray
+    """World-to-camera rotations as quaternions (w, x, y, z), shape (N, 4)."""
+    tvecs: np.ndarray
+    """World-to-camera translations, shape (N, 3)."""
+    camera_ids: np.ndarray
+    """Camera ids, shape (N,)."""
+    names: np.ndarray
+    """Image file names, shape (N,)."""
+    points2D_offsets: np.ndarray
+    """Start of the 2D points of each image, shape (N + 1,)."""
+    xys: np.ndarray
+    """Pixel coordinates of the 2D points of all images, shape (M, 2)."""
+    point3D_ids: np.ndarray
+    """Id of the 3D point of each 2D point, -1 if not triangulated, shape (M,)."""
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def to_dict(self) -> Dict[int, Image]:
+        """Returns the images in the format of :func:`read_images_text`, keyed by image id."""
+        offsets = self.points2D_offsets.tolist()
+        images = {}
+        for i, image_id in enumerate(self.ids.tolist()):
+            start, end = offsets[i], offsets[i + 1]
+            images[image_id] = Image(
+                id=image_id,
+                qvec=self.qvecs[i],
+                tvec=self.tvecs[i],
+                camera_id=int(self.camera_ids[i]),
+                name=str(self.names[i]),
+                xys=self.xys[start:end],
+                point3D_ids=self.point3D_ids[start:end],
+            )
+        return images
+
+
+@dataclass
+class ColmapPoints3D:
+    """3D points of a COLMAP reconstruction as arrays. The track of the i-th point is
+    ``track_image_ids[track_offsets[i]:track_offsets[i + 1]]`` and the matching ``track_point2D_idxs``."""
+
+    ids: np.ndarray
+    """Point ids, shape (P,)."""
+    xyz: np.ndarray
+    """Point positions, shape (P, 3)."""
+    rgb: np.ndarray
+    """Point colors as uint8, shape (P, 3)."""
+    errors: np.ndarray
+    """Mean reprojection errors, shape (P,)."""
+    track_offsets: np.ndarray
+    """Start of the track of each point, shape (P + 1,)."""
+    track_image_ids: np.ndarray
+    """Image id of each track element, shape (T,)."""
+    track_point2D_idxs: np.ndarray
+    """Index of the 2D point of each track element within its image, shape (T,)."""
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def track_lengths(self) -> np.ndarray:
+        """Number of images each point is observed in, shape (P,)."""
+        return np.diff(self.track_offsets)
+
+    def to_dict(self) -> Dict[int, Point3D]:
+        """Returns the points in the format of :func:`read_points3D_text`, keyed by point id."""
+        offsets = self.track_offsets.tolist()
+        rgb = self.rgb.astype(np.int64)
+        image_ids = self.track_image_ids.astype(np.int64)
+        point2D_idxs = self.track_point2D_idxs.astype(np.int64)
+        points3D = {}
+        for i, point3D_id in enumerate(self.ids.tolist()):
+            start, end = offsets[i], offsets[i + 1]
+            points3D[point3D_id] = Point3D(
+                id=point3D_id,
+                xyz=self.xyz[i],
+                rgb=rgb[i],
+                error=np.array(self.errors[i]),
+                image_ids=image_ids[start:end],
+                point2D_idxs=point2D_idxs[start:end],
+            )
+        return points3D
+
+    @classmethod
+    def from_dict(cls, points3D: Dict[int, Point3D]) -> "ColmapPoints3D":
+        """Converts points in the format of :func:`read_points3D_text`."""
+        points = list(points3D.values())
+        track_lengths = [len(p.image_ids) for p in points]
+        return cls(
+            ids=np.array([p.id for p in points], dtype=np.int64),
+            xyz=np.array([p.xyz for p in points], dtype=np.float64).reshape(-1, 3),
+            rgb=np.array([p.rgb for p in points], dtype=np.uint8).reshape(-1, 3),
+            errors=np.array([p.error for p in points], dtype=np.float64),
+            track_offsets=np.concatenate([[0], np.cumsum(track_lengths, dtype=np.int64)]),
+            track_image_ids=np.concatenate(
+                [np.zeros(0, np.int32)] + [np.asarray(p.image_ids, np.int32) for p in points]
+            ),
+            track_point2D_idxs=np.concatenate(
+                [np.zeros(0, np.int32)] + [np.asarray(p.point2D_idxs, np.int32) for p in points]
+            ),
+        )
+
+
+def _gather_bytes(buffer: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenates the byte ranges ``[starts, starts + lengths)`` of a buffer, in order, in a single pass."""
+    nonempty = lengths > 0
+    starts = starts[nonempty]
+    edges = np.zeros(len(buffer) + 1, dtype=np.int8)
+    edges[starts] += 1
+    edges[starts + lengths[nonempty]] -= 1
+    return buffer[np.cumsum(edges[:-1], dtype=np.int8).view(bool)]
+
+
+def _read_cached(path: Path, cache_dir: Optional[Union[str, Path]], parse, cls):
+    """Parses a file, or loads the arrays of a previous parse from ``cache_dir`` if the file has not changed."""
+    if cache_dir is None:
+        return parse(path)
+    cache_dir = Path(cache_dir)
+    stat = path.stat()
+    source_key = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    cache_path = cache_dir / f"{path.name}.npz"
+    if cache_path.exists():
+        with np.load(cache_path) as cached:
+            if np.array_equal(cached["source_key"], source_key):
+                return cls(**{name: cached[name] for name in cls.__dataclass_fields__})
+    arrays = parse(path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".npz.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, source_key=source_key, **{name: getattr(arrays, name) for name in cls.__dataclass_fields__})
+    os.replace(tmp_path, cache_path)
+    return arrays
+
+
+def _parse_images_binary(path: Path) -> ColmapImages:
+    data = path.read_bytes()
+    num_images = _UINT64.unpack_from(data, 0)[0]
+    starts = np.empty(num_images, dtype=np.int64)
+    points2D_starts = np.empty(num_images, dtype=np.int64)
+    num_points2D = np.empty(num_images, dtype=np.int64)
+    names = []
+    pos = 8
+    for i in range(num_images):
+        name_end = data.index(b"\x00", pos + _IMAGE_PROPERTIES_DTYPE.itemsize)
+        starts[i] = pos
+        names.append(data[pos + _IMAGE_PROPERTIES_DTYPE.itemsize : name_end].decode("utf-8"))
+        num_points2D[i] = _UINT64.unpack_from(data, name_end + 1)[0]
+        points2D_starts[i] = name_end + 9
+        pos = name_end + 9 + _POINT2D_DTYPE.itemsize * int(num_points2D[i])
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    properties = _gather_bytes(buffer, starts, np.full_like(starts, _IMAGE_PROPERTIES_DTYPE.itemsize))
+    properties = properties.view(_IMAGE_PROPERTIES_DTYPE)
+    points2D = _gather_bytes(buffer, points2D_starts, _POINT2D_DTYPE.itemsize * num_points2D).view(_POINT2D_DTYPE)
+    return ColmapImages(
+        ids=properties["id"].astype(np.int64),
+        qvecs=np.ascontiguousarray(properties["qvec"]),
+        tvecs=np.ascontiguousarray(properties["tvec"]),
+        camera_ids=properties["camera_id"].astype(np.int64),
+        names=np.array(names, dtype=str),
+        points2D_offsets=np.concatenate([[0], np.cumsum(num_points2D)]),
+        xys=np.ascontiguousarray(points2D["xy"]),
+        point3D_ids=np.ascontiguousarray(points2D["point3D_id"]),
+    )
+
+
+def _parse_points3D_binary(path: Path) -> ColmapPoints3D:
+    data = path.read_bytes()
+    num_points = _UINT64.unpack_from(data, 0)[0]
+    # Only the track lengths are needed to find where each record starts; everything else is parsed in bulk.
+    starts = np.empty(num_points, dtype=np.int64)
+    track_element_size = _TRACK_ELEMENT_DTYPE.itemsize
+    length_offset = _POINT3D_PROPERTIES_DTYPE.itemsize - 8
+    unpack_from = _UINT64.unpack_from
+    pos = 8
+    for i in range(num_points):
+        starts[i] = pos
+        pos += _POINT3D_PROPERTIES_DTYPE.itemsize + track_element_size * unpack_from(data, pos + length_offset)[0]
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    properties = _gather_bytes(buffer, starts, np.full_like(starts, _POINT3D_PROPERTIES_DTYPE.itemsize))
+    properties = properties.view(_POINT3D_PROPERTIES_DTYPE)
+    track_lengths = properties["track_length"].astype(np.int64)
+    tracks = _gather_bytes(
+        buffer, starts + _POINT3D_PROPERTIES_DTYPE.itemsize, track_element_size * track_lengths
+    ).view(_TRACK_ELEMENT_DTYPE)
+    return ColmapPoints3D(
+        ids=properties["id"].astype(np.int64),
+        xyz=np.ascontiguousarray(properties["xyz"]),
+        rgb=np.ascontiguousarray(properties["rgb"]),
+        errors=properties["error"].copy(),
+        track_offsets=np.concatenate([[0], np.cumsum(track_lengths)]),
+        track_image_ids=np.ascontiguousarray(tracks["image_id"]),
+        track_point2D_idxs=np.ascontiguousarray(tracks["point2D_idx"]),
+    )
+
+
+def read_images_binary_arrays(
+    path_to_model_file: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None
+) -> ColmapImages:
+    """Reads an images.bin file into arrays.
+
+    Args:
+        path_to_model_file: Path to the images.bin file.
+        cache_dir: If set, the parsed arrays are cached in this directory and reused while the file is unchanged.
+    """
+    return _read_cached(Path(path_to_model_file), cache_dir, _parse_images_binary, ColmapImages)
+
+
+def read_points3D_binary_arrays(
+    path_to_model_file: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None
+) -> ColmapPoints3D:
+    """Reads a points3D.bin file into arrays.
+
+    Args:
+        path_to_model_file: Path to the points3D.bin file.
+        cache_dir: If set, the parsed arrays are cached in this directory and reused while the file is unchanged.
+    """
+    return _read_cached(Path(path_to_model_file), cache_dir, _parse_points3D_binary, ColmapPoints3D)
+
+
 def detect_model_format(path, ext):
     if (
         os.path.isfile(os.path.join(path, "cameras" + ext))
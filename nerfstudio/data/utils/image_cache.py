@@ -0,0 +1,267 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Image caches: an on-disk cache of decoded, downscaled uint8 frames stored in a single memory-mapped file,
+and a bounded in-memory LRU cache that prefetches frames in the background.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+import torch
+from rich.progress import track
+
+from nerfstudio.utils.rich_utils import CONSOLE
+
+CACHE_VERSION = 1
+"""Bump when the on-disk layout or the decoding of images changes."""
+
+
+COMPACT_THRESHOLD = 0.5
+"""Fraction of the data file taken by replaced frames above which it is compacted."""
+
+
+def _entry_nbytes(entry: Dict[str, Any]) -> int:
+    return int(np.prod(entry["shape"]))
+
+
+def _file_key(filename: Path) -> List[int]:
+    """Returns the (mtime, size) pair used to detect modified source files."""
+    stat = os.stat(filename)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class DecodedImageCache:
+    """Cache of decoded uint8 frames for a fixed list of files at a given scale factor.
+
+    All frames are stored back-to-back in one ``.bin`` file, with a ``.json`` index holding the offset,
+    shape and source file key (mtime and size) of every frame. Frames are read as zero-copy views of a
+    copy-on-write memory map, so repeated runs and worker processes never decode the sources again.
+
+    Args:
+        cache_dir: Directory where the cache files are stored.
+        filenames: Source files, in dataset order.
+        scale_factor: The scale factor the frames were resized with.
+        kind: What is being cached. Images and masks use separate files.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        filenames: Sequence[Path],
+        scale_factor: float,
+        kind: Literal["image", "mask"] = "image",
+    ):
+        self.filenames = [Path(f) for f in filenames]
+        digest = hashlib.sha1(
+            json.dumps([CACHE_VERSION, kind, scale_factor, [str(f.absolute()) for f in self.filenames]]).encode()
+        ).hexdigest()[:16]
+        self.data_path = Path(cache_dir) / f"{kind}s_{digest}.bin"
+        self.index_path = Path(cache_dir) / f"{kind}s_{digest}.json"
+        self.entries: List[Dict[str, Any]] = []
+        self._data: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def _load_index(self) -> List[Optional[Dict[str, Any]]]:
+        if not self.index_path.exists() or not self.data_path.exists():
+            return [None] * len(self.filenames)
+        with open(self.index_path, encoding="UTF-8") as f:
+            entries = json.load(f)
+        if len(entries) != len(self.filenames):
+            return [None] * len(self.filenames)
+        return entries
+
+    def build(self, decode_fn: Callable[[int], npt.NDArray[np.uint8]], max_workers: Optional[int] = None) -> None:
+        """Decodes every frame that is missing or whose source changed, and writes it to the cache.
+
+        Frames that keep their size are rewritten in place and others are appended. Once the replaced frames take
+        more than `COMPACT_THRESHOLD` of the data file, the file is compacted.
+
+        Args:
+            decode_fn: Function that returns the decoded uint8 frame for a dataset index.
+            max_workers: Number of decoding threads. If None, uses the ThreadPool default.
+        """
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        entries = self._load_index()
+        stale = [
+            idx
+            for idx, (entry, filename) in enumerate(zip(entries, self.filenames))
+            if entry is None or entry["key"] != _file_key(filename)
+        ]
+        if stale:
+            CONSOLE.log(f"Decoding {len(stale)}/{len(self.filenames)} {self.data_path.stem} into {self.data_path}")
+            self._data = None
+            end = self.data_path.stat().st_size if len(stale) < len(entries) and self.data_path.exists() else 0
+            with open(self.data_path, "r+b" if end > 0 else "wb") as data_file:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    frames = executor.map(decode_fn, stale)
+                    for idx, frame in track(
+                        zip(stale, frames), total=len(stale), description="Caching decoded images", transient=True
+                    ):
+                        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+                        # A frame of the same size is rewritten in place, others are appended.
+                        entry = entries[idx] if end > 0 else None
+                        if entry is not None and _entry_nbytes(entry) == frame.nbytes:
+                            offset = entry["offset"]
+                        else:
+                            offset = end
+                            end += frame.nbytes
+                        data_file.seek(offset)
+                        data_file.write(frame.tobytes())
+                        entries[idx] = {
+                            "key": _file_key(self.filenames[idx]),
+                            "offset": offset,
+                            "shape": list(frame.shape),
+                        }
+            if end - sum(_entry_nbytes(entry) for entry in entries) > COMPACT_THRESHOLD * end:  # type: ignore
+                self._compact(entries)  # type: ignore
+            # Write the index last and atomically, so an interrupted build is never picked up as valid.
+            tmp_index_path = self.index_path.with_suffix(".json.tmp")
+            with open(tmp_index_path, "w", encoding="UTF-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_index_path, self.index_path)
+        self.entries = entries  # type: ignore
+
+    def _compact(self, entries: List[Dict[str, Any]]) -> None:
+        """Copies the frames of `entries` back-to-back into a new data file, dropping the bytes of replaced frames."""
+        data = np.memmap(self.data_path, dtype=np.uint8, mode="r")
+        tmp_data_path = self.data_path.with_suffix(".bin.tmp")
+        offset = 0
+        with open(tmp_data_path, "wb") as data_file:
+            for entry in entries:
+                size = _entry_nbytes(entry)
+                data_file.write(data[entry["offset"] : entry["offset"] + size].tobytes())
+                entry["offset"] = offset
+                offset += size
+        del data
+        # The old index does not match the compacted file, so it must not survive an interruption.
+        if self.index_path.exists():
+            os.remove(self.index_path)
+        os.replace(tmp_data_path, self.data_path)
+
+    def _get_data(self) -> np.memmap:
+        if self._data is None:
+            if not self.entries:
+                with open(self.index_path, encoding="UTF-8") as f:
+                    self.entries = json.load(f)
+            self._data = np.memmap(self.data_path, dtype=np.uint8, mode="c")
+        return self._data
+
+    def __getitem__(self, idx: int) -> npt.NDArray[np.uint8]:
+        """Returns a zero-copy view of the cached frame at a dataset index."""
+        data = self._get_data()
+        entry = self.entries[idx]
+        size = _entry_nbytes(entry)
+        return data[entry["offset"] : entry["offset"] + size].reshape(entry["shape"])
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Memory maps would be pickled by value; worker processes re-open the file instead.
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+
+def _nbytes(data: Dict[str, Any]) -> int:
+    return sum(v.numel() * v.element_size() for v in data.values() if isinstance(v, torch.Tensor))
+
+
+class PrefetchingLRUCache:
+    """Bounded in-memory cache of loaded frames that loads upcoming frames in background threads.
+
+    Frames are evicted in least recently used order once the total size of their tensors exceeds the byte budget.
+    Frames that are currently being prefetched are not counted until they are loaded.
+
+    Args:
+        load_fn: Function that loads the data dictionary of a dataset index.
+        max_bytes: Byte budget for the cached frames.
+        num_workers: Number of loading threads.
+    """
+
+    def __init__(self, load_fn: Callable[[int], Dict[str, Any]], max_bytes: int, num_workers: int = 2):
+        self.load_fn = load_fn
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.num_hits = 0
+        self.num_misses = 0
+        self._frames: OrderedDict[int, Dict[str, Any]] = OrderedDict()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=num_workers)
+
+    def _insert(self, idx: int, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.pop(idx, None)
+            if idx not in self._frames:
+                self._frames[idx] = data
+                self.num_bytes += _nbytes(data)
+            self._frames.move_to_end(idx)
+            # Always keep the most recent frame, even if it alone exceeds the budget.
+            while self.num_bytes > self.max_bytes and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                self.num_bytes -= _nbytes(evicted)
+
+    def _load(self, idx: int) -> Dict[str, Any]:
+        data = self.load_fn(idx)
+        self._insert(idx, data)
+        return data
+
+    def prefetch(self, indices: Sequence[int]) -> None:
+        """Starts loading the given indices, in order, unless they are cached or already being loaded."""
+        with self._lock:
+            for idx in indices:
+                if idx not in self._frames and idx not in self._pending:
+                    self._pending[idx] = self._executor.submit(self._load, idx)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        """Returns the frame at a dataset index, waiting for or starting its load if needed."""
+        with self._lock:
+            data = self._frames.get(idx)
+            if data is not None:
+                self._frames.move_to_end(idx)
+                self.num_hits += 1
+                return data
+            self.num_misses += 1
+            future = self._pending.get(idx)
+        if future is not None:
+            return future.result()
+        return self._load(idx)
+
+    def __contains__(self, idx: int) -> bool:
+        return idx in self._frames
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def shutdown(self) -> None:
+        """Stops the loading threads, dropping frames that were not started yet."""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        # Executor.shutdown only takes cancel_futures from Python 3.9 on.
+        for future in pending:
+            future.cancel()
+        self._executor.shutdown(wait=False)
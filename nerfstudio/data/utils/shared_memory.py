@@ -0,0 +1,318 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tensors backed by named shared-memory files, so that data processes attach to them instead of copying,
+and a ring buffer of shared slots for passing batches between processes without pickling.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import tempfile
+import time
+import uuid
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import torch
+
+from nerfstudio.utils.tensor_dataclass import TensorDataclass
+
+SHARED_MEMORY_DIR = Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+"""Where shared tensors are stored. /dev/shm is RAM-backed; elsewhere the OS page cache is shared instead."""
+
+
+def shared_memory_free_bytes() -> int:
+    """Returns the free space, in bytes, of the directory that shared tensors are stored in."""
+    stats = os.statvfs(SHARED_MEMORY_DIR)
+    return stats.f_bavail * stats.f_frsize
+
+
+def tensor_dict_nbytes(data: Dict[str, Any]) -> int:
+    """Returns the total size in bytes of the tensors, or lists of tensors, in a batch dictionary."""
+    nbytes = 0
+    for value in data.values():
+        tensors = value if isinstance(value, list) else [value]
+        nbytes += sum(t.numel() * t.element_size() for t in tensors if isinstance(t, torch.Tensor))
+    return nbytes
+
+
+def _remove_file(path: Path) -> None:
+    if path.exists():
+        os.remove(path)
+
+
+class SharedTensor:
+    """A tensor stored in a named, memory-mapped shared file.
+
+    The process that creates it owns the file, which is removed by :meth:`unlink`, when the owning object is
+    garbage collected, or at interpreter exit.
+    Pickling only transfers the file name, shape and dtype; unpickling maps the same memory. Each mapping
+    is owned by the tensor storage, so views stay valid for as long as they are referenced.
+
+    Args:
+        tensor: The tensor to copy into shared memory.
+    """
+
+    def __init__(self, tensor: torch.Tensor):
+        tensor = tensor.detach().cpu().contiguous()
+        self.shape: Tuple[int, ...] = tuple(tensor.shape)
+        self.dtype: torch.dtype = tensor.dtype
+        self.path = SHARED_MEMORY_DIR / f"nerfstudio_{uuid.uuid4().hex}"
+        self._owner = True
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+        self._tensor: Optional[torch.Tensor] = None
+        self.tensor.copy_(tensor)
+
+    @property
+    def tensor(self) -> torch.Tensor:
+        """A zero-copy view of the shared memory."""
+        if self._tensor is None:
+            numel = 1
+            for dim in self.shape:
+                numel *= dim
+            storage = torch.from_file(str(self.path), shared=True, size=max(numel, 1), dtype=self.dtype)
+            self._tensor = storage[:numel].view(self.shape)
+        return self._tensor
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"path": self.path, "shape": self.shape, "dtype": self.dtype}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._owner = False
+        self._tensor = None
+
+    def close(self) -> None:
+        """Drops this object's view. The mapping is released once no other views reference it."""
+        self._tensor = None
+
+    def unlink(self) -> None:
+        """Removes the shared file. Processes that already attached keep their mapping."""
+        assert self._owner, "Only the process that created the shared tensor can unlink it"
+        self._finalizer()
+
+
+class SharedTensorDict:
+    """A batch dictionary whose tensors, or lists of tensors, live in shared memory.
+
+    Used to load a collated image batch once and give every data process a zero-copy, read-only view.
+    Values that are not tensors are pickled as usual.
+
+    Args:
+        data: The dictionary to move to shared memory.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self._items: Dict[str, Any] = {}
+        for key, value in data.items():
+            if isinstance(value, torch.Tensor):
+                self._items[key] = SharedTensor(value)
+            elif isinstance(value, list) and value and all(isinstance(v, torch.Tensor) for v in value):
+                self._items[key] = [SharedTensor(v) for v in value]
+            else:
+                self._items[key] = value
+
+    def _shared_tensors(self) -> List[SharedTensor]:
+        tensors = []
+        for value in self._items.values():
+            if isinstance(value, SharedTensor):
+                tensors.append(value)
+            elif isinstance(value, list):
+                tensors.extend(v for v in value if isinstance(v, SharedTensor))
+        return tensors
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Returns the dictionary with every shared tensor replaced by a view of its memory."""
+        data = {}
+        for key, value in self._items.items():
+            if isinstance(value, SharedTensor):
+                data[key] = value.tensor
+            elif isinstance(value, list) and value and isinstance(value[0], SharedTensor):
+                data[key] = [v.tensor for v in value]
+            else:
+                data[key] = value
+        return data
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the shared tensors in bytes."""
+        return tensor_dict_nbytes(self.as_dict())
+
+    def close(self) -> None:
+        """Drops this object's views."""
+        for tensor in self._shared_tensors():
+            tensor.close()
+
+    def unlink(self) -> None:
+        """Removes all shared files. Only valid in the owning process."""
+        for tensor in self._shared_tensors():
+            tensor.unlink()
+
+
+def _flatten_batch(ray_bundle: TensorDataclass, batch: Dict[str, Any]) -> Optional[Dict[str, torch.Tensor]]:
+    """Flattens a ray bundle and batch into named tensors, or returns None if the batch holds other values."""
+    flat: Dict[str, torch.Tensor] = {}
+    for field in dataclasses.fields(ray_bundle):
+        value = getattr(ray_bundle, field.name)
+        if isinstance(value, torch.Tensor):
+            flat[f"ray_bundle/{field.name}"] = value
+        elif isinstance(value, dict):
+            for key, tensor in value.items():
+                if not isinstance(tensor, torch.Tensor):
+                    return None
+                flat[f"ray_bundle/{field.name}/{key}"] = tensor
+        elif value is not None:
+            return None
+    for key, value in batch.items():
+        if not isinstance(value, torch.Tensor):
+            return None
+        flat[f"batch/{key}"] = value
+    return flat
+
+
+class SharedBatchRing:
+    """Ring buffer of preallocated shared-memory slots for passing ray bundles and batches between processes.
+
+    Producers take a free slot, fill it in place and publish only its index, so batches are never pickled.
+    Slots are sized from a template batch; a batch whose layout differs is sent through the queue as is, still
+    holding a slot so that at most `num_slots` batches are in flight.
+    In the consuming process the slots are page-locked when CUDA is available, so that host to device
+    copies can be done directly from shared memory.
+
+    Args:
+        ray_bundle: Template ray bundle. Only its type, keys, shapes and dtypes are used.
+        batch: Template batch. Only its keys, shapes and dtypes are used.
+        num_slots: Number of slots in the ring.
+        queue_factory: Creates the multiprocessing queues used to pass slot indices.
+    """
+
+    def __init__(
+        self,
+        ray_bundle: TensorDataclass,
+        batch: Dict[str, Any],
+        num_slots: int,
+        queue_factory: Callable[[], Any],
+    ):
+        template = _flatten_batch(ray_bundle, batch)
+        if template is None:
+            raise ValueError("Only batches that contain tensors can be stored in shared memory slots")
+        self.ray_bundle_type = type(ray_bundle)
+        self.num_slots = num_slots
+        self.slots: List[Dict[str, SharedTensor]] = [
+            {key: SharedTensor(torch.empty_like(value, device="cpu")) for key, value in template.items()}
+            for _ in range(num_slots)
+        ]
+        self.free_queue = queue_factory()
+        self.ready_queue = queue_factory()
+        for slot in range(num_slots):
+            self.free_queue.put(slot)
+        self._pinned = False
+        self._registered_ptrs: List[int] = []
+
+    def _fits(self, flat: Dict[str, torch.Tensor]) -> bool:
+        slot = self.slots[0]
+        return flat.keys() == slot.keys() and all(
+            tuple(tensor.shape) == slot[key].shape and tensor.dtype == slot[key].dtype for key, tensor in flat.items()
+        )
+
+    def put(self, ray_bundle: TensorDataclass, batch: Dict[str, Any]) -> None:
+        """Copies a ray bundle and batch into the next free slot, blocking until one is available."""
+        flat = _flatten_batch(ray_bundle, batch)
+        slot = self.free_queue.get()
+        if flat is None or not self._fits(flat):
+            # The slot is left unused, but held until the batch is consumed, so that producers stay bounded.
+            self.ready_queue.put((slot, ray_bundle, batch))
+            return
+        for key, tensor in flat.items():
+            self.slots[slot][key].tensor.copy_(tensor)
+        self.ready_queue.put(slot)
+
+    def _pin_slots(self) -> None:
+        """Page-locks the slots in this process so that copies to the GPU don't go through a staging buffer."""
+        self._pinned = True
+        if not torch.cuda.is_available():
+            return
+        cudart = torch.cuda.cudart()
+        for slot in self.slots:
+            for shared in slot.values():
+                tensor = shared.tensor
+                if tensor.numel() > 0:
+                    cudart.cudaHostRegister(tensor.data_ptr(), tensor.numel() * tensor.element_size(), 0)
+                    self._registered_ptrs.append(tensor.data_ptr())
+
+    def _unpin_slots(self) -> None:
+        """Undoes :meth:`_pin_slots`. Must run while the slots are still mapped."""
+        if self._registered_ptrs:
+            cudart = torch.cuda.cudart()
+            for ptr in self._registered_ptrs:
+                cudart.cudaHostUnregister(ptr)
+        self._registered_ptrs = []
+        self._pinned = False
+
+    def get(self, device: Union[torch.device, str]) -> Tuple[TensorDataclass, Dict[str, Any], float]:
+        """Takes the next filled slot.
+
+        The ray bundle is copied to the device and the batch to new CPU tensors, after which the slot is released.
+
+        Returns:
+            The ray bundle, the batch, and the time in seconds spent waiting for a producer.
+        """
+        if not self._pinned:
+            self._pin_slots()
+        start = time.perf_counter()
+        item = self.ready_queue.get()
+        wait_time = time.perf_counter() - start
+        if isinstance(item, tuple):
+            slot, ray_bundle, batch = item
+            self.free_queue.put(slot)
+            return ray_bundle.to(device), batch, wait_time
+
+        fields: Dict[str, Any] = {}
+        batch = {}
+        for key, shared in self.slots[item].items():
+            group, name = key.split("/", 1)
+            if group == "batch":
+                batch[name] = shared.tensor.clone()
+            elif "/" in name:
+                field_name, metadata_key = name.split("/", 1)
+                fields.setdefault(field_name, {})[metadata_key] = shared.tensor.to(device, copy=True)
+            else:
+                fields[name] = shared.tensor.to(device, copy=True)
+        self.free_queue.put(item)
+        return self.ray_bundle_type(**fields), batch, wait_time
+
+    def occupancy(self) -> Optional[float]:
+        """Fraction of slots holding batches that wait to be consumed, if the platform can report it."""
+        try:
+            return self.ready_queue.qsize() / self.num_slots
+        except NotImplementedError:
+            return None
+
+    def close(self) -> None:
+        """Unpins and drops this process's views of the slots."""
+        self._unpin_slots()
+        for slot in self.slots:
+            for shared in slot.values():
+                shared.close()
+
+    def unlink(self) -> None:
+        """Unpins the slots and removes their shared files. Only valid in the owning process."""
+        self._unpin_slots()
+        for slot in self.slots:
+            for shared in slot.values():
+                shared.unlink()
@@ -0,0 +1,284 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Image undistortion through precomputed remapping grids, which are shared by every image of a camera.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from nerfstudio.cameras.camera_utils import fisheye624_project, fisheye624_unproject_helper
+from nerfstudio.cameras.cameras import Cameras, CameraType
+
+UNDISTORTION_MAP_VERSION = 1
+"""Bump when the computation of the stored maps changes."""
+
+
+@dataclass
+class UndistortionMap:
+    """Remapping grids that undistort the images of one camera, restricted to the valid region of interest."""
+
+    K: np.ndarray
+    """Intrinsics of the undistorted, cropped image."""
+    roi: Tuple[int, int, int, int]
+    """The (x, y, width, height) crop of the distorted image size that is kept."""
+    map1: Optional[np.ndarray] = None
+    """First map passed to cv2.remap, already cropped. None if the image is only cropped."""
+    map2: Optional[np.ndarray] = None
+    """Second map passed to cv2.remap, already cropped."""
+    mask: Optional[np.ndarray] = None
+    """Mask of valid pixels that applies to every image of the camera, if any."""
+
+    def remap(self, image: np.ndarray) -> np.ndarray:
+        """Undistorts and crops an image of the camera."""
+        if self.map1 is None:
+            x, y, w, h = self.roi
+            return image[y : y + h, x : x + w]
+        return cv2.remap(image, self.map1, self.map2, interpolation=cv2.INTER_LINEAR)  # type: ignore
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        arrays = {"K": self.K, "roi": np.array(self.roi)}
+        for name in ("map1", "map2", "mask"):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        return arrays
+
+    @classmethod
+    def from_dict(cls, arrays: Dict[str, np.ndarray]) -> UndistortionMap:
+        return cls(
+            K=arrays["K"],
+            roi=tuple(int(v) for v in arrays["roi"]),  # type: ignore
+            map1=arrays.get("map1"),
+            map2=arrays.get("map2"),
+            mask=arrays.get("mask"),
+        )
+
+
+def compute_undistortion_map(camera: Cameras, distortion_params: np.ndarray, K: np.ndarray) -> UndistortionMap:
+    """Computes the undistorted intrinsics and remapping grids of a camera.
+
+    Args:
+        camera: The distorted camera, without batch dimensions.
+        distortion_params: Distortion parameters of the camera.
+        K: The 3x3 intrinsics matrix of the camera.
+    """
+    K = K.copy()
+    width, height = int(camera.width.item()), int(camera.height.item())
+    if camera.camera_type.item() == CameraType.PERSPECTIVE.value:
+        assert distortion_params[3] == 0, (
+            "We doesn't support the 4th Brown parameter for image undistortion, "
+            "Only k1, k2, k3, p1, p2 can be non-zero."
+        )
+        distortion_params = np.array(
+            [
+                distortion_params[0],
+                distortion_params[1],
+                distortion_params[4],
+                distortion_params[5],
+                distortion_params[2],
+                distortion_params[3],
+                0,
+                0,
+            ]
+        )
+        # because OpenCV expects the pixel coord to be top-left, we need to shift the principal point by 0.5
+        # see https://github.com/nerfstudio-project/nerfstudio/issues/3048
+        K[0, 2] = K[0, 2] - 0.5
+        K[1, 2] = K[1, 2] - 0.5
+        map1 = map2 = None
+        if np.any(distortion_params):
+            newK, roi = cv2.getOptimalNewCameraMatrix(K, distortion_params, (width, height), 0)
+            # Same fixed-point maps as cv2.undistort, computed once and cropped to the region that is kept.
+            map1, map2 = cv2.initUndistortRectifyMap(K, distortion_params, None, newK, (width, height), cv2.CV_16SC2)
+            x, y, w, h = roi
+            map1, map2 = map1[y : y + h, x : x + w], map2[y : y + h, x : x + w]
+        else:
+            newK = K
+            roi = 0, 0, width, height
+        newK[0, 2] = newK[0, 2] + 0.5
+        newK[1, 2] = newK[1, 2] + 0.5
+        return UndistortionMap(K=newK, roi=tuple(roi), map1=map1, map2=map2)  # type: ignore
+
+    if camera.camera_type.item() == CameraType.FISHEYE.value:
+        K[0, 2] = K[0, 2] - 0.5
+        K[1, 2] = K[1, 2] - 0.5
+        distortion_params = np.array(
+            [distortion_params[0], distortion_params[1], distortion_params[2], distortion_params[3]]
+        )
+        newK = cv2.fisheye.estimateNewCameraMatrixForUndistortRectify(
+            K, distortion_params, (width, height), np.eye(3), balance=0
+        )
+        map1, map2 = cv2.fisheye.initUndistortRectifyMap(
+            K, distortion_params, np.eye(3), newK, (width, height), cv2.CV_32FC1
+        )
+        newK[0, 2] = newK[0, 2] + 0.5
+        newK[1, 2] = newK[1, 2] + 0.5
+        return UndistortionMap(K=newK, roi=(0, 0, width, height), map1=map1, map2=map2)
+
+    if camera.camera_type.item() == CameraType.FISHEYE624.value:
+        fisheye624_params = torch.cat(
+            [camera.fx, camera.fy, camera.cx, camera.cy, torch.from_numpy(distortion_params)], dim=0
+        )
+        assert fisheye624_params.shape == (16,)
+        assert (
+            camera.metadata is not None
+            and "fisheye_crop_radius" in camera.metadata
+            and isinstance(camera.metadata["fisheye_crop_radius"], float)
+        )
+        fisheye_crop_radius = camera.metadata["fisheye_crop_radius"]
+
+        # Approximate the FOV of the unmasked region of the camera.
+        upper, lower, left, right = fisheye624_unproject_helper(
+            torch.tensor(
+                [
+                    [camera.cx, camera.cy - fisheye_crop_radius],
+                    [camera.cx, camera.cy + fisheye_crop_radius],
+                    [camera.cx - fisheye_crop_radius, camera.cy],
+                    [camera.cx + fisheye_crop_radius, camera.cy],
+                ],
+                dtype=torch.float32,
+            )[None],
+            params=fisheye624_params[None],
+        ).squeeze(dim=0)
+        fov_radians = torch.max(
+            torch.acos(torch.sum(upper * lower / torch.linalg.norm(upper) / torch.linalg.norm(lower))),
+            torch.acos(torch.sum(left * right / torch.linalg.norm(left) / torch.linalg.norm(right))),
+        )
+
+        # Heuristics to determine parameters of an undistorted image.
+        undist_h = int(fisheye_crop_radius * 2)
+        undist_w = int(fisheye_crop_radius * 2)
+        undistort_focal = undist_h / (2 * torch.tan(fov_radians / 2.0))
+        undist_K = torch.eye(3)
+        undist_K[0, 0] = undistort_focal  # fx
+        undist_K[1, 1] = undistort_focal  # fy
+        undist_K[0, 2] = (undist_w - 1) / 2.0  # cx; for a 1x1 image, center should be at (0, 0).
+        undist_K[1, 2] = (undist_h - 1) / 2.0  # cy
+
+        # Undistorted 2D coordinates -> rays -> reproject to distorted UV coordinates.
+        undist_uv_homog = torch.stack(
+            [
+                *torch.meshgrid(
+                    torch.arange(undist_w, dtype=torch.float32),
+                    torch.arange(undist_h, dtype=torch.float32),
+                ),
+                torch.ones((undist_w, undist_h), dtype=torch.float32),
+            ],
+            dim=-1,
+        )
+        assert undist_uv_homog.shape == (undist_w, undist_h, 3)
+        dist_uv = (
+            fisheye624_project(
+                xyz=(
+                    torch.einsum(
+                        "ij,bj->bi",
+                        torch.linalg.inv(undist_K),
+                        undist_uv_homog.reshape((undist_w * undist_h, 3)),
+                    )[None]
+                ),
+                params=fisheye624_params[None, :],
+            )
+            .reshape((undist_w, undist_h, 2))
+            .numpy()
+        )
+        map1 = np.ascontiguousarray(dist_uv[..., 1])
+        map2 = np.ascontiguousarray(dist_uv[..., 0])
+
+        # Compute undistorted mask as well.
+        mask = np.mgrid[:height, :width]
+        mask[0, ...] -= height // 2
+        mask[1, ...] -= width // 2
+        mask = np.linalg.norm(mask, axis=0) < fisheye_crop_radius
+        mask = (
+            cv2.remap(
+                mask.astype(np.uint8) * 255,
+                map1,
+                map2,
+                interpolation=cv2.INTER_LINEAR,
+                borderMode=cv2.BORDER_CONSTANT,
+                borderValue=0,
+            )
+            > 0
+        )[..., None]
+        assert mask.shape == (undist_h, undist_w, 1)
+        return UndistortionMap(K=undist_K.numpy(), roi=(0, 0, width, height), map1=map1, map2=map2, mask=mask)
+
+    raise NotImplementedError("Only perspective and fisheye cameras are supported")
+
+
+def _camera_key(camera: Cameras, distortion_params: np.ndarray, K: np.ndarray) -> str:
+    crop_radius = camera.metadata.get("fisheye_crop_radius") if camera.metadata is not None else None
+    parts = [
+        UNDISTORTION_MAP_VERSION,
+        int(camera.camera_type.item()),
+        int(camera.width.item()),
+        int(camera.height.item()),
+        crop_radius,
+    ]
+    digest = hashlib.sha1(repr(parts).encode())
+    digest.update(np.ascontiguousarray(K, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(distortion_params, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class UndistortionMapCache:
+    """Computes undistortion maps once per unique camera and keeps them in memory and, optionally, on disk.
+
+    Cameras are identified by their model, image size, intrinsics and distortion parameters, so captures that
+    share one calibration only compute their maps once. Safe to use from multiple threads.
+
+    Args:
+        cache_dir: If set, maps are also stored in this directory and reused by later runs.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = cache_dir
+        self._maps: Dict[str, UndistortionMap] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+    def get(self, camera: Cameras, distortion_params: np.ndarray, K: np.ndarray) -> UndistortionMap:
+        """Returns the undistortion map of a camera, computing it on first use."""
+        key = _camera_key(camera, distortion_params, K)
+        undistortion_map = self._maps.get(key)
+        if undistortion_map is not None:
+            return undistortion_map
+        with self._lock:
+            if key in self._maps:
+                return self._maps[key]
+            path = Path(self.cache_dir) / f"undistort_{key}.npz" if self.cache_dir is not None else None
+            if path is not None and path.exists():
+                with np.load(path) as arrays:
+                    undistortion_map = UndistortionMap.from_dict(dict(arrays))
+            else:
+                undistortion_map = compute_undistortion_map(camera, distortion_params, K)
+                if path is not None:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = path.with_suffix(".tmp.npz")
+                    np.savez(tmp_path, **undistortion_map.to_dict())
+                    tmp_path.replace(path)
+            self._maps[key] = undistortion_map
+        return undistortion_map
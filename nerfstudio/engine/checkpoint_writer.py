@@ -0,0 +1,188 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Checkpoint writing, optionally on a background thread, with retention of old checkpoints.
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+from nerfstudio.utils.rich_utils import CONSOLE
+
+CHECKPOINT_PATTERN = re.compile(r"^step-(\d+)\.ckpt$")
+
+
+def checkpoint_path(checkpoint_dir: Path, step: int) -> Path:
+    """Returns the path of the checkpoint of a step."""
+    return checkpoint_dir / f"step-{step:09d}.ckpt"
+
+
+def latest_checkpoint_step(checkpoint_dir: Path) -> Optional[int]:
+    """Returns the step of the latest checkpoint in a directory, ignoring files that are not checkpoints, such as
+    checkpoints still being written. Returns None if there is no checkpoint."""
+    steps = [int(match.group(1)) for match in map(CHECKPOINT_PATTERN.match, os.listdir(checkpoint_dir)) if match]
+    return max(steps, default=None)
+
+
+def retained_steps(steps: List[int], keep_last: Optional[int], keep_every: Optional[int]) -> List[int]:
+    """Returns the checkpoint steps to keep under a retention policy.
+
+    Args:
+        steps: Steps of the existing checkpoints.
+        keep_last: Number of most recent checkpoints to keep. If None, keeps all of them.
+        keep_every: If set, also keeps the checkpoints whose step is a multiple of this.
+    """
+    steps = sorted(steps)
+    if keep_last is None:
+        return steps
+    keep = set(steps[-keep_last:]) if keep_last > 0 else set()
+    if keep_every is not None:
+        keep.update(step for step in steps if step % keep_every == 0)
+    return sorted(keep)
+
+
+def without_spare_storage(value: Any) -> Any:
+    """Clones the tensors of a nested state that view only part of their storage.
+
+    torch.save writes the whole storage of a tensor, so a view into a larger preallocated buffer, such as the
+    splatfacto gaussian parameters, would otherwise write the spare capacity too.
+    """
+    if isinstance(value, torch.Tensor):
+        if value.untyped_storage().nbytes() > value.numel() * value.element_size():
+            return value.detach().clone()
+        return value
+    if isinstance(value, dict):
+        return type(value)((k, without_spare_storage(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)) and not hasattr(value, "_fields"):
+        return type(value)(without_spare_storage(v) for v in value)
+    return value
+
+
+class CheckpointWriter:
+    """Writes training checkpoints, either synchronously or on a background thread.
+
+    In asynchronous mode, :meth:`save` copies every tensor of the state to CPU memory, pinned when CUDA is
+    available and reused between saves, and returns as soon as the copy is done. The file is written by a
+    background thread. At most one write is in flight; a new save first waits for the previous write.
+    Files are written to a temporary path and renamed, so a checkpoint is never observed half-written.
+
+    Args:
+        checkpoint_dir: Directory to write the checkpoints to.
+        async_save: Whether to write checkpoints on a background thread.
+        keep_last: Number of most recent checkpoints to keep. If None, keeps all of them.
+        keep_every: If set, also keeps the checkpoints whose step is a multiple of this.
+    """
+
+    def __init__(
+        self,
+        checkpoint_dir: Path,
+        async_save: bool = False,
+        keep_last: Optional[int] = None,
+        keep_every: Optional[int] = None,
+    ):
+        self.checkpoint_dir = checkpoint_dir
+        self.async_save = async_save
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint") if async_save else None
+        self._pending: Optional[Future] = None
+        self._buffers: Dict[Tuple, torch.Tensor] = {}
+        self._lock = threading.Lock()
+
+    def _snapshot(self, value: Any, key: Tuple = ()) -> Any:
+        """Copies a nested state to CPU, reusing the buffers of the previous snapshot where shapes match."""
+        if isinstance(value, torch.Tensor):
+            value = value.detach()
+            buffer = self._buffers.get(key)
+            if buffer is None or buffer.shape != value.shape or buffer.dtype != value.dtype:
+                buffer = torch.empty(value.shape, dtype=value.dtype, pin_memory=torch.cuda.is_available())
+                self._buffers[key] = buffer
+            buffer.copy_(value, non_blocking=True)
+            return buffer
+        if isinstance(value, dict):
+            return type(value)((k, self._snapshot(v, key + (k,))) for k, v in value.items())
+        if isinstance(value, (list, tuple)) and not hasattr(value, "_fields"):
+            return type(value)(self._snapshot(v, key + (i,)) for i, v in enumerate(value))
+        return copy.deepcopy(value)
+
+    def _write(self, step: int, state: Dict[str, Any]) -> Path:
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        path = checkpoint_path(self.checkpoint_dir, step)
+        # Hidden and not matching CHECKPOINT_PATTERN, so loaders never pick up a checkpoint being written.
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+        self._apply_retention(path)
+        return path
+
+    def _apply_retention(self, latest: Path) -> None:
+        steps = {}
+        for f in self.checkpoint_dir.iterdir():
+            match = CHECKPOINT_PATTERN.match(f.name)
+            if match is not None:
+                steps[int(match.group(1))] = f
+            elif f.name.endswith(".ckpt.tmp"):
+                # Left behind by an interrupted run; only one write is ever in flight.
+                f.unlink(missing_ok=True)
+        keep = set(retained_steps(list(steps), self.keep_last, self.keep_every))
+        for step, f in steps.items():
+            if step not in keep and f != latest:
+                f.unlink(missing_ok=True)
+
+    def save(self, step: int, state: Dict[str, Any]) -> None:
+        """Saves the checkpoint of a step.
+
+        Args:
+            step: Training step of the checkpoint.
+            state: The state to save. Must not be modified until this returns.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._write(step, without_spare_storage(state))
+                return
+            self.wait()
+            snapshot = self._snapshot(state)
+            if torch.cuda.is_available():
+                # The copies are asynchronous; finish them before training modifies the state again.
+                torch.cuda.synchronize()
+            self._pending = self._executor.submit(self._write, step, snapshot)
+
+    def wait(self) -> None:
+        """Blocks until the checkpoint being written, if any, is on disk."""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        try:
+            pending.result()
+        except Exception:
+            CONSOLE.print_exception()
+            CONSOLE.print("[bold red]Error: Writing a checkpoint failed.")
+
+    def close(self) -> None:
+        """Finishes the pending write and stops the background thread. Later saves are written synchronously."""
+        with self._lock:
+            self.wait()
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -20,7 +20,6 @@ from __future__ import annotations
 
 import dataclasses
 import functools
-import os
 import time
 from collections import defaultdict
 from dataclasses import dataclass, field
@@ -37,6 +36,7 @@ from torch.cuda.amp.grad_scaler import GradScaler
 
 from nerfstudio.configs.experiment_config import ExperimentConfig
 from nerfstudio.engine.callbacks import TrainingCallback, TrainingCallbackAttributes, TrainingCallbackLocation
+from nerfstudio.engine.checkpoint_writer import CheckpointWriter, latest_checkpoint_step
 from nerfstudio.engine.optimizers import Optimizers
 from nerfstudio.pipelines.base_pipeline import VanillaPipeline
 from nerfstudio.utils import profiler, writer
@@ -73,6 +73,12 @@ class TrainerConfig(ExperimentConfig):
     """Use gradient scaler even if the automatic mixed precision is disabled."""
     save_only_latest_checkpoint: bool = True
     """Whether to only save the latest checkpoint or all checkpoints."""
+    keep_last_checkpoints: Optional[int] = None
+    """Number of most recent checkpoints to keep. Overrides save_only_latest_checkpoint if set."""
+    keep_checkpoint_every: Optional[int] = None
+    """Also keep every checkpoint whose step is a multiple of this, when older checkpoints are deleted."""
+    async_checkpoint: bool = False
+    """Copy the state to CPU memory and write checkpoints on a background thread, so training is not blocked by disk."""
     # optional parameters if we want to resume training
     load_dir: Optional[Path] = None
     """Optionally specify a pre-trained model directory to load from."""
@@ -136,6 +142,15 @@ class Trainer:
         # directory to save checkpoints
         self.checkpoint_dir: Path = config.get_checkpoint_dir()
         CONSOLE.log(f"Saving checkpoints to: {self.checkpoint_dir}")
+        keep_last = self.config.keep_last_checkpoints
+        if keep_last is None and self.config.save_only_latest_checkpoint:
+            keep_last = 1
+        self.checkpoint_writer = CheckpointWriter(
+            self.checkpoint_dir,
+            async_save=self.config.async_checkpoint,
+            keep_last=keep_last,
+            keep_every=self.config.keep_checkpoint_every,
+        )
 
         self.viewer_state = None
 
@@ -248,24 +263,27 @@ class Trainer:
                         self._after_train()
                         return
                     time.sleep(0.01)
+                profiler.begin_trace_step(step)
                 with self.train_lock:
                     with TimeWriter(writer, EventName.ITER_TRAIN_TIME, step=step) as train_t:
                         self.pipeline.train()
 
                         # training callbacks before the training iteration
-                        for callback in self.callbacks:
-                            callback.run_callback_at_location(
-                                step, location=TrainingCallbackLocation.BEFORE_TRAIN_ITERATION
-                            )
+                        with profiler.trace_phase("callbacks"):
+                            for callback in self.callbacks:
+                                callback.run_callback_at_location(
+                                    step, location=TrainingCallbackLocation.BEFORE_TRAIN_ITERATION
+                                )
 
                         # time the forward pass
                         loss, loss_dict, metrics_dict = self.train_iteration(step)
 
                         # training callbacks after the training iteration
-                        for callback in self.callbacks:
-                            callback.run_callback_at_location(
-                                step, location=TrainingCallbackLocation.AFTER_TRAIN_ITERATION
-                            )
+                        with profiler.trace_phase("callbacks"):
+                            for callback in self.callbacks:
+                                callback.run_callback_at_location(
+                                    step, location=TrainingCallbackLocation.AFTER_TRAIN_ITERATION
+                                )
 
                 # Skip the first two steps to avoid skewed timings that break the viewer rendering speed estimate.
                 if step > 1:
@@ -296,12 +314,15 @@ class Trainer:
 
                 # Do not perform evaluation if there are no validation images
                 if self.pipeline.datamanager.eval_dataset:
-                    self.eval_iteration(step)
+                    with profiler.trace_phase("eval"):
+                        self.eval_iteration(step)
 
                 if step_check(step, self.config.steps_per_save):
-                    self.save_checkpoint(step)
+                    with profiler.trace_phase("checkpoint"):
+                        self.save_checkpoint(step)
 
                 writer.write_out_storage()
+                profiler.end_trace_step()
 
         # save checkpoint at the end of training, and write out any remaining events
         self._after_train()
@@ -321,6 +342,7 @@ class Trainer:
         self.training_state = "completed"  # used to update the webui state
         # save checkpoint at the end of training
         self.save_checkpoint(self.step)
+        self.checkpoint_writer.close()
         # write out any remaining events (e.g., total train time)
         writer.write_out_storage()
         table = Table(
@@ -420,8 +442,8 @@ class Trainer:
             load_step = self.config.load_step
             if load_step is None:
                 print("Loading latest Nerfstudio checkpoint from load_dir...")
-                # NOTE: this is specific to the checkpoint name format
-                load_step = sorted(int(x[x.find("-") + 1 : x.find(".")]) for x in os.listdir(load_dir))[-1]
+                load_step = latest_checkpoint_step(load_dir)
+                assert load_step is not None, f"No checkpoint found in {load_dir}"
             load_path: Path = load_dir / f"step-{load_step:09d}.ckpt"
             assert load_path.exists(), f"Checkpoint {load_path} does not exist"
             loaded_state = torch.load(load_path, map_location="cpu")
@@ -454,12 +476,8 @@ class Trainer:
         Args:
             step: number of steps in training for given checkpoint
         """
-        # possibly make the checkpoint directory
-        if not self.checkpoint_dir.exists():
-            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
-        # save the checkpoint
-        ckpt_path: Path = self.checkpoint_dir / f"step-{step:09d}.ckpt"
-        torch.save(
+        self.checkpoint_writer.save(
+            step,
             {
                 "step": step,
                 "pipeline": self.pipeline.module.state_dict()  # type: ignore
@@ -469,14 +487,7 @@ class Trainer:
                 "schedulers": {k: v.state_dict() for (k, v) in self.optimizers.schedulers.items()},
                 "scalers": self.grad_scaler.state_dict(),
             },
-            ckpt_path,
         )
-        # possibly delete old checkpoints
-        if self.config.save_only_latest_checkpoint:
-            # delete everything else in the checkpoint folder
-            for f in self.checkpoint_dir.glob("*"):
-                if f != ckpt_path:
-                    f.unlink()
 
     @profiler.time_function
     def train_iteration(self, step: int) -> TRAIN_INTERATION_OUTPUT:
@@ -493,16 +504,19 @@ class Trainer:
         cpu_or_cuda_str: str = self.device.split(":")[0]
         cpu_or_cuda_str = "cpu" if cpu_or_cuda_str == "mps" else cpu_or_cuda_str
 
-        with torch.autocast(device_type=cpu_or_cuda_str, enabled=self.mixed_precision):
-            _, loss_dict, metrics_dict = self.pipeline.get_train_loss_dict(step=step)
-            loss = functools.reduce(torch.add, loss_dict.values())
-        self.grad_scaler.scale(loss).backward()  # type: ignore
+        with profiler.trace_phase("forward"):
+            with torch.autocast(device_type=cpu_or_cuda_str, enabled=self.mixed_precision):
+                _, loss_dict, metrics_dict = self.pipeline.get_train_loss_dict(step=step)
+                loss = functools.reduce(torch.add, loss_dict.values())
+        with profiler.trace_phase("backward"):
+            self.grad_scaler.scale(loss).backward()  # type: ignore
         needs_step = [
             group
             for group in self.optimizers.parameters.keys()
             if step % self.gradient_accumulation_steps[group] == self.gradient_accumulation_steps[group] - 1
         ]
-        self.optimizers.optimizer_scaler_step_some(self.grad_scaler, needs_step)
+        with profiler.trace_phase("optimizer"):
+            self.optimizers.optimizer_scaler_step_some(self.grad_scaler, needs_step)
 
         if self.config.log_gradients:
             total_grad = 0
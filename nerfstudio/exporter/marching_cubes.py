@@ -22,7 +22,7 @@ from typing import Callable, List, Optional, Tuple, Union
 import numpy as np
 import torch
 import trimesh
-from jaxtyping import Bool, Float
+from jaxtyping import Bool, Float, Int
 from skimage import measure
 from torch import Tensor
 
@@ -252,3 +252,120 @@ def generate_mesh_with_multires_marching_cubes(
 
     combined_mesh: trimesh.Trimesh = trimesh.util.concatenate(meshes)  # type: ignore
     return combined_mesh
+
+
+def _grid_indices(size: int) -> Int[Tensor, "num_indices 3"]:
+    """Returns the integer coordinates of a size^3 grid, in x, y, z order."""
+    indices = torch.arange(size)
+    return torch.stack(torch.meshgrid([indices, indices, indices], indexing="ij"), dim=-1).view(-1, 3)
+
+
+@torch.no_grad()
+def generate_mesh_with_octree_marching_cubes(
+    geometry_callable_field: Callable,
+    resolution: int = 1024,
+    bounding_box_min: Tuple[float, float, float] = (-1.0, -1.0, -1.0),
+    bounding_box_max: Tuple[float, float, float] = (1.0, 1.0, 1.0),
+    isosurface_threshold: float = 0.0,
+    leaf_resolution: int = 32,
+    lipschitz_constant: float = 1.5,
+    points_per_batch: int = 1 << 20,
+    device: Optional[Union[torch.device, str]] = None,
+) -> trimesh.Trimesh:
+    """
+    Computes the isosurface of a signed distance function (SDF) by refining an octree of cells that may contain
+    the surface, then running marching cubes in the leaves that do.
+
+    A cell is only subdivided if the SDF value at its center is within the distance the SDF can change between
+    the center and a corner, which is the half diagonal of the cell times the Lipschitz constant of the SDF. The
+    SDF is evaluated in batches of cells and of leaves, so the number of evaluations and the memory grow with the
+    area of the surface rather than with the volume.
+
+    Args:
+        geometry_callable_field: A callable function that takes as input a tensor of size (N, 3) containing 3D
+            points, and returns a tensor of size (N,) containing the SDF evaluated at those points.
+        resolution: The effective resolution of the grid the surface is extracted at. Must be a multiple of
+            leaf_resolution.
+        bounding_box_min: The minimum coordinates of the bounding box in which the SDF will be evaluated.
+        bounding_box_max: The maximum coordinates of the bounding box in which the SDF will be evaluated.
+        isosurface_threshold: The isovalue at which to approximate the isosurface.
+        leaf_resolution: Number of grid cells along each side of the leaves that marching cubes runs on.
+        lipschitz_constant: Bound on how fast the SDF changes with distance. Use values above 1 for learned SDFs,
+            which are only approximately distance functions.
+        points_per_batch: Maximum number of points to evaluate the SDF at in one call.
+        device: Device to evaluate the SDF on. Defaults to CUDA if it is available.
+
+    Returns:
+        The extracted mesh.
+    """
+    assert resolution % leaf_resolution == 0, f"resolution must be a multiple of {leaf_resolution}, got {resolution}"
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    box_min = torch.tensor(bounding_box_min, dtype=torch.float64, device=device)
+    voxel_size = (torch.tensor(bounding_box_max, dtype=torch.float64, device=device) - box_min) / resolution
+
+    def evaluate(voxel_coords: Tensor) -> Tensor:
+        """Evaluates the SDF at points given in (possibly fractional) voxel units."""
+        points = (box_min + voxel_coords.double() * voxel_size).float()
+        values = [geometry_callable_field(chunk) for chunk in torch.split(points, points_per_batch)]
+        return torch.cat(values) - isosurface_threshold
+
+    # The root grid is as coarse as possible while halving evenly down to the leaves.
+    num_leaves = resolution // leaf_resolution
+    num_levels = 0
+    while num_leaves % (2 ** (num_levels + 1)) == 0 and num_leaves // 2 ** (num_levels + 1) >= 4:
+        num_levels += 1
+    cell_size = leaf_resolution * 2**num_levels
+    cells = _grid_indices(num_leaves // 2**num_levels).to(device)  # [num_cells, 3]
+    children = _grid_indices(2).to(device)
+    half_diagonal = torch.linalg.norm(voxel_size).item() / 2
+
+    # Refine the cells that the surface may cross...
+    for _ in range(num_levels + 1):
+        centers = (cells.double() + 0.5) * cell_size
+        keep = []
+        for start in range(0, cells.shape[0], points_per_batch):
+            values = evaluate(centers[start : start + points_per_batch])
+            keep.append(values.abs() <= lipschitz_constant * half_diagonal * cell_size)
+        cells = cells[torch.cat(keep)]
+        if cell_size == leaf_resolution:
+            break
+        cells = (cells[:, None] * 2 + children[None]).view(-1, 3)
+        cell_size //= 2
+
+    # Evaluate the leaves in batches and run marching cubes in each of them...
+    corners = _grid_indices(leaf_resolution + 1).to(device)
+    leaves_per_batch = max(1, points_per_batch // corners.shape[0])
+    vertices_list, faces_list = [], []
+    num_vertices = 0
+    for start in range(0, cells.shape[0], leaves_per_batch):
+        leaf_origins = cells[start : start + leaves_per_batch] * leaf_resolution
+        values = evaluate((leaf_origins[:, None] + corners[None]).view(-1, 3))
+        values = values.view(-1, *(leaf_resolution + 1,) * 3).cpu().numpy().astype(np.float32)
+        for leaf_origin, leaf_values in zip(leaf_origins.cpu().numpy(), values):
+            if leaf_values.min() > 0 or leaf_values.max() < 0:
+                continue
+            verts, faces, _, _ = measure.marching_cubes(leaf_values, level=0)  # type: ignore
+            vertices_list.append(verts.astype(np.float64) + leaf_origin)
+            faces_list.append(faces + num_vertices)
+            num_vertices += verts.shape[0]
+
+    if not faces_list:
+        return trimesh.Trimesh()
+    vertices = np.concatenate(vertices_list)
+    faces = np.concatenate(faces_list)
+
+    # Neighboring leaves both compute the vertices on their shared faces. Every vertex lies on a grid edge, so
+    # identify it by that edge, or by the grid point it is on, up to the float32 precision of leaf coordinates.
+    tolerance = 16 * np.finfo(np.float32).eps * leaf_resolution
+    nearest = np.round(vertices)
+    on_grid = np.abs(vertices - nearest) < tolerance
+    axis = np.where(on_grid.all(axis=1), 3, np.argmin(on_grid, axis=1))
+    keys = np.concatenate([np.where(on_grid, nearest, np.floor(vertices)), axis[:, None]], axis=1).astype(np.int64)
+    _, unique_indices, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    vertices = vertices[unique_indices]
+    faces = inverse.reshape(-1)[faces]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+
+    vertices = np.asarray(bounding_box_min) + vertices * voxel_size.cpu().numpy()
+    return trimesh.Trimesh(vertices, faces, process=False)
@@ -0,0 +1,270 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Vectorized reading and writing of binary PLY files with a single vertex element.
+
+All vertex properties are packed into one structured NumPy record array so that the
+payload is written (or read) with a single buffer operation instead of per-element loops.
+"""
+
+from __future__ import annotations
+
+import typing
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+PLY_TYPES: Dict[str, str] = {
+    "char": "i1",
+    "uchar": "u1",
+    "short": "<i2",
+    "ushort": "<u2",
+    "int": "<i4",
+    "uint": "<u4",
+    "float": "<f4",
+    "double": "<f8",
+    # Aliases allowed by the PLY specification.
+    "int8": "i1",
+    "uint8": "u1",
+    "int16": "<i2",
+    "uint16": "<u2",
+    "int32": "<i4",
+    "uint32": "<u4",
+    "float32": "<f4",
+    "float64": "<f8",
+}
+"""Mapping from PLY scalar type names to little-endian NumPy dtype strings."""
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+"""Number of vertices packed per write. Small chunks keep the column-to-record transposition in cache."""
+
+
+def _column_dtype(tensor: np.ndarray) -> np.dtype:
+    """Returns the on-disk dtype for a column. Floats are always stored as float32."""
+    return np.dtype("<f4") if tensor.dtype.kind == "f" else np.dtype("u1")
+
+
+def get_vertex_dtype(map_to_tensors: typing.OrderedDict[str, np.ndarray]) -> np.dtype:
+    """Builds the packed structured dtype used to serialize a set of vertex properties.
+
+    Args:
+        map_to_tensors: Ordered mapping of property names to float or uint8 columns.
+
+    Returns:
+        Structured dtype with one field per property, in order and without padding.
+    """
+    return np.dtype([(key, _column_dtype(tensor)) for key, tensor in map_to_tensors.items()])
+
+
+def validate_vertex_columns(count: int, map_to_tensors: typing.OrderedDict[str, np.ndarray]) -> None:
+    """Checks that all columns are non-empty float or uint8 arrays holding exactly ``count`` values.
+
+    Columns may be of shape ``(count,)`` or ``(count, 1)``.
+    """
+    if not all(len(tensor) == count and tensor.size == count for tensor in map_to_tensors.values()):
+        raise ValueError("Count does not match the length of all tensors")
+
+    if not all(
+        isinstance(tensor, np.ndarray) and (tensor.dtype.kind == "f" or tensor.dtype == np.uint8) and tensor.size > 0
+        for tensor in map_to_tensors.values()
+    ):
+        raise ValueError("All tensors must be numpy arrays of float or uint8 type and not empty")
+
+
+def write_ply_header(ply_file: BinaryIO, count: int, vertex_dtype: np.dtype) -> None:
+    """Writes a binary little-endian PLY header for a single vertex element."""
+    inverse_types = {"<f4": "float", "|u1": "uchar"}
+    lines = ["ply", "format binary_little_endian 1.0", f"element vertex {count}"]
+    for name in vertex_dtype.names or ():
+        lines.append(f"property {inverse_types[vertex_dtype.fields[name][0].str]} {name}")
+    lines.append("end_header")
+    ply_file.write(("\n".join(lines) + "\n").encode())
+
+
+def pack_vertices(
+    map_to_tensors: typing.OrderedDict[str, np.ndarray],
+    vertex_dtype: np.dtype,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> np.ndarray:
+    """Packs the rows ``[start, stop)`` of every column into a single record array."""
+    stop = len(next(iter(map_to_tensors.values()))) if stop is None else stop
+    records = np.empty(stop - start, dtype=vertex_dtype)
+    for key, tensor in map_to_tensors.items():
+        # Assignment into the record field performs the float32 conversion in C.
+        records[key] = tensor[start:stop].reshape(-1)
+    return records
+
+
+def write_ply(
+    filename: Union[str, Path],
+    count: int,
+    map_to_tensors: typing.OrderedDict[str, np.ndarray],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
+    """Writes a binary PLY file with the given vertex properties, in the order of the OrderedDict.
+
+    Note: All float values will be converted to float32 for writing.
+
+    Args:
+        filename: The name of the file to write.
+        count: The number of vertices to write.
+        map_to_tensors: An ordered dictionary mapping property names to numpy arrays of float or uint8
+            values. Each array should have ``count`` elements. Arrays should not be empty.
+        chunk_size: Pack and write at most this many vertices at a time. This bounds the extra memory to
+            one chunk, which also allows exporting memory-mapped columns larger than RAM.
+    """
+    validate_vertex_columns(count, map_to_tensors)
+    vertex_dtype = get_vertex_dtype(map_to_tensors)
+    step = max(int(chunk_size), 1)
+
+    with open(filename, "wb") as ply_file:
+        write_ply_header(ply_file, count, vertex_dtype)
+        for start in range(0, count, step):
+            pack_vertices(map_to_tensors, vertex_dtype, start, min(start + step, count)).tofile(ply_file)
+
+
+class PlyWriter:
+    """Streaming PLY writer for vertex data produced in chunks.
+
+    The header is written up front, so the total vertex count and the property layout must be known
+    in advance. Each call to :meth:`write` appends one chunk of rows.
+
+    Args:
+        filename: The name of the file to write.
+        count: Total number of vertices that will be written.
+        properties: Ordered mapping of property names to their source dtype (float or uint8).
+    """
+
+    def __init__(self, filename: Union[str, Path], count: int, properties: typing.OrderedDict[str, np.dtype]):
+        self.filename = filename
+        self.count = count
+        self.vertex_dtype = get_vertex_dtype(
+            OrderedDict((key, np.empty(0, dtype=dtype)) for key, dtype in properties.items())
+        )
+        self.num_written = 0
+        self._file: Optional[BinaryIO] = None
+
+    def __enter__(self) -> PlyWriter:
+        self._file = open(self.filename, "wb")
+        write_ply_header(self._file, self.count, self.vertex_dtype)
+        return self
+
+    def write(self, map_to_tensors: typing.OrderedDict[str, np.ndarray]) -> None:
+        """Appends a chunk of vertices. All columns must have the same length."""
+        assert self._file is not None, "PlyWriter must be used as a context manager"
+        if list(map_to_tensors.keys()) != list(self.vertex_dtype.names or ()):
+            raise ValueError("Chunk properties do not match the properties declared in the header")
+        n = len(next(iter(map_to_tensors.values())))
+        validate_vertex_columns(n, map_to_tensors)
+        if self.num_written + n > self.count:
+            raise ValueError(f"Writing {self.num_written + n} vertices but the header declares {self.count}")
+        pack_vertices(map_to_tensors, self.vertex_dtype).tofile(self._file)
+        self.num_written += n
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        assert self._file is not None
+        self._file.close()
+        self._file = None
+        if exc_type is None and self.num_written != self.count:
+            raise ValueError(f"Wrote {self.num_written} vertices but the header declares {self.count}")
+
+
+def read_ply_header(ply_file: BinaryIO) -> Tuple[int, np.dtype]:
+    """Parses a binary little-endian PLY header containing a single vertex element.
+
+    Returns:
+        The vertex count and the structured dtype describing one vertex record.
+    """
+    if ply_file.readline().strip() != b"ply":
+        raise ValueError("Not a PLY file")
+    count: Optional[int] = None
+    fields: List[Tuple[str, str]] = []
+    while True:
+        line = ply_file.readline()
+        if not line:
+            raise ValueError("Unexpected end of file while reading PLY header")
+        tokens = line.decode("ascii").split()
+        if not tokens or tokens[0] in ("comment", "obj_info"):
+            continue
+        if tokens[0] == "end_header":
+            break
+        if tokens[0] == "format":
+            if tokens[1] != "binary_little_endian":
+                raise ValueError(f"Unsupported PLY format: {tokens[1]}")
+        elif tokens[0] == "element":
+            if tokens[1] != "vertex" or count is not None:
+                raise ValueError("Only PLY files with a single vertex element are supported")
+            count = int(tokens[2])
+        elif tokens[0] == "property":
+            if tokens[1] == "list":
+                raise ValueError("List properties are not supported")
+            fields.append((tokens[2], PLY_TYPES[tokens[1]]))
+    if count is None:
+        raise ValueError("PLY header does not declare a vertex element")
+    return count, np.dtype(fields)
+
+
+def read_ply(filename: Union[str, Path], mmap: bool = False) -> typing.OrderedDict[str, np.ndarray]:
+    """Reads a binary PLY file written by :func:`write_ply` in a single buffer read.
+
+    Args:
+        filename: The name of the file to read.
+        mmap: If True, memory-map the vertex payload instead of reading it into memory. The returned
+            columns are then strided views into the file.
+
+    Returns:
+        Ordered mapping of property names to 1-dimensional columns, in file order.
+    """
+    with open(filename, "rb") as ply_file:
+        count, vertex_dtype = read_ply_header(ply_file)
+        offset = ply_file.tell()
+        if mmap:
+            records = np.memmap(filename, dtype=vertex_dtype, mode="r", offset=offset, shape=(count,))
+        else:
+            records = np.fromfile(ply_file, dtype=vertex_dtype, count=count)
+    if len(records) != count:
+        raise ValueError(f"PLY file is truncated: expected {count} vertices, found {len(records)}")
+    return OrderedDict((name, records[name]) for name in vertex_dtype.names or ())
+
+
+def splat_ply_to_gauss_params(map_to_tensors: typing.OrderedDict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Converts columns read from a Gaussian splat PLY back into splatfacto ``gauss_params`` arrays.
+
+    This is the inverse of the layout written by ``ExportGaussianSplat``. Only models exported with
+    spherical harmonics (``sh_degree > 0``) can be round-tripped.
+    """
+    keys = list(map_to_tensors.keys())
+    num_dc = len([k for k in keys if k.startswith("f_dc_")])
+    num_rest = len([k for k in keys if k.startswith("f_rest_")])
+    if num_dc == 0:
+        raise ValueError("PLY file does not contain spherical harmonics coefficients")
+
+    def stack(names: List[str]) -> np.ndarray:
+        return np.stack([np.asarray(map_to_tensors[name], dtype=np.float32) for name in names], axis=-1)
+
+    n = len(map_to_tensors["x"])
+    features_rest = stack([f"f_rest_{i}" for i in range(num_rest)]).reshape(n, num_dc, num_rest // num_dc)
+    return {
+        "means": stack(["x", "y", "z"]),
+        "scales": stack([f"scale_{i}" for i in range(3)]),
+        "quats": stack([f"rot_{i}" for i in range(4)]),
+        "features_dc": stack([f"f_dc_{i}" for i in range(num_dc)]),
+        # The exporter transposes the rest coefficients to match the Inria ordering.
+        "features_rest": np.ascontiguousarray(features_rest.transpose(0, 2, 1)),
+        "opacities": stack(["opacity"]),
+    }
@@ -18,6 +18,7 @@ TSDF utils.
 
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import List, Optional, Tuple, Union
@@ -25,8 +26,7 @@ from typing import List, Optional, Tuple, Union
 import numpy as np
 import pymeshlab
 import torch
-import torch.nn.functional as F
-from jaxtyping import Bool, Float
+from jaxtyping import Bool, Float, Int
 from skimage import measure
 from torch import Tensor
 
@@ -36,6 +36,91 @@ from nerfstudio.utils.rich_utils import CONSOLE
 
 TORCH_DEVICE = Union[torch.device, str]
 
+POINTS_PER_CHUNK = 1 << 20
+"""Number of voxels that are projected into a batch of images at once."""
+
+
+def observe_points(
+    points: Float[Tensor, "num_points 3"],
+    c2w: Float[Tensor, "batch 4 4"],
+    K: Float[Tensor, "batch 3 3"],
+    depth_images: Float[Tensor, "batch 1 height width"],
+    truncation: float,
+    color_images: Optional[Float[Tensor, "batch 3 height width"]] = None,
+    mask_images: Optional[Bool[Tensor, "batch 1 height width"]] = None,
+    weight_images: Optional[Float[Tensor, "batch 1 height width"]] = None,
+) -> Tuple[Float[Tensor, "num_points"], Float[Tensor, "num_points"], Optional[Float[Tensor, "num_points 3"]]]:
+    """Projects points into a batch of depth images and sums their weighted TSDF observations over the batch.
+
+    Args:
+        points: World coordinates of the points.
+        c2w: The camera extrinsics.
+        K: The camera intrinsics.
+        depth_images: The depth images, as distances along the rays.
+        truncation: The truncation distance.
+        color_images: The color images.
+        mask_images: Pixels that are False are not integrated.
+        weight_images: Weight of the observation of every pixel. Defaults to 1.
+
+    Returns:
+        The sum of the observation weights, the weighted sum of the TSDF values and the weighted sum of the colors.
+    """
+    batch_size = c2w.shape[0]
+    height, width = depth_images.shape[-2:]
+    w2c = torch.inverse(c2w)
+    cam_coords = torch.matmul(w2c[:, :3, :3], points.T) + w2c[:, :3, 3:]  # [batch, 3, N]
+    # flip the y and z axes
+    cam_coords = cam_coords * torch.tensor([1.0, -1.0, -1.0], device=points.device).view(1, 3, 1)
+    # we need the distance of the point to the camera, not the z coordinate
+    point_depth = torch.sqrt(torch.sum(cam_coords**2, dim=1))  # [batch, N]
+    z = cam_coords[:, 2]
+    in_front = z > 0
+    pixel_coords = torch.bmm(K, cam_coords / torch.where(in_front, z, torch.ones_like(z))[:, None])  # [batch, 3, N]
+
+    # Gather the pixel that each point falls into...
+    col = torch.floor(pixel_coords[:, 0]).long()
+    row = torch.floor(pixel_coords[:, 1]).long()
+    valid = in_front & (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    pixel_indices = row.clamp(0, height - 1) * width + col.clamp(0, width - 1)  # [batch, N]
+    sampled_depth = depth_images.reshape(batch_size, -1).gather(1, pixel_indices)
+    dist = sampled_depth - point_depth
+    valid &= (sampled_depth > 0) & (dist > -truncation)
+    if mask_images is not None:
+        valid &= mask_images.reshape(batch_size, -1).gather(1, pixel_indices)
+    weights = valid.float()
+    if weight_images is not None:
+        weights = weights * weight_images.reshape(batch_size, -1).gather(1, pixel_indices)
+
+    # Reduce over the batch...
+    tsdf_values = torch.clamp(dist / truncation, min=-1.0, max=1.0)
+    weight_sum = weights.sum(dim=0)
+    tsdf_sum = (tsdf_values * weights).sum(dim=0)
+    color_sum = None
+    if color_images is not None:
+        sampled_colors = color_images.reshape(batch_size, 3, -1).gather(
+            2, pixel_indices[:, None].expand(-1, 3, -1)
+        )  # [batch, 3, N]
+        color_sum = (sampled_colors * weights[:, None]).sum(dim=0).T
+    return weight_sum, tsdf_sum, color_sum
+
+
+def fuse_observations(
+    values: Float[Tensor, "num_points"],
+    weights: Float[Tensor, "num_points"],
+    colors: Float[Tensor, "num_points 3"],
+    observations: Tuple[Tensor, Tensor, Optional[Tensor]],
+    max_weight: float,
+) -> None:
+    """Updates the running weighted averages of voxels in place with the output of :func:`observe_points`."""
+    weight_sum, tsdf_sum, color_sum = observations
+    observed = weight_sum > 0
+    old_weights = weights[observed]
+    total_weights = old_weights + weight_sum[observed]
+    values[observed] = (values[observed] * old_weights + tsdf_sum[observed]) / total_weights
+    if color_sum is not None:
+        colors[observed] = (colors[observed] * old_weights[:, None] + color_sum[observed]) / total_weights[:, None]
+    weights[observed] = torch.clamp(total_weights, max=max_weight)
+
 
 @dataclass
 class TSDF:
@@ -57,6 +142,8 @@ class TSDF:
     """Origin of the TSDF [xmin, ymin, zmin]."""
     truncation_margin: float = 5.0
     """Margin for truncation."""
+    max_weight: float = 1.0
+    """Maximum accumulated weight of a voxel. Lower values favor more recent observations."""
 
     def to(self, device: TORCH_DEVICE):
         """Move the tensors to the specified device.
@@ -85,7 +172,7 @@ class TSDF:
         return truncation
 
     @staticmethod
-    def from_aabb(aabb: Float[Tensor, "2 3"], volume_dims: Float[Tensor, "3"]):
+    def from_aabb(aabb: Float[Tensor, "2 3"], volume_dims: Int[Tensor, "3"]):
         """Returns an instance of TSDF from an axis-aligned bounding box and volume dimensions.
 
         Args:
@@ -176,102 +263,327 @@ class TSDF:
         depth_images: Float[Tensor, "batch 1 height width"],
         color_images: Optional[Float[Tensor, "batch 3 height width"]] = None,
         mask_images: Optional[Bool[Tensor, "batch 1 height width"]] = None,
+        weight_images: Optional[Float[Tensor, "batch 1 height width"]] = None,
     ) -> None:
         """Integrates a batch of depth images into the TSDF.
 
+        The observations of the whole batch are averaged together, then fused with the current values.
+
         Args:
             c2w: The camera extrinsics.
             K: The camera intrinsics.
             depth_images: The depth images to integrate.
             color_images: The color images to integrate.
-            mask_images: The mask images to integrate.
+            mask_images: The mask images to integrate. Pixels that are False are ignored.
+            weight_images: Weight of the observation of every pixel. Defaults to 1.
         """
+        points = self.voxel_coords.view(3, -1).T
+        values, weights, colors = self.values.view(-1), self.weights.view(-1), self.colors.view(-1, 3)
+        for start in range(0, points.shape[0], POINTS_PER_CHUNK):
+            end = start + POINTS_PER_CHUNK
+            observations = observe_points(
+                points[start:end],
+                c2w,
+                K,
+                depth_images,
+                self.truncation,
+                color_images=color_images,
+                mask_images=mask_images,
+                weight_images=weight_images,
+            )
+            fuse_observations(values[start:end], weights[start:end], colors[start:end], observations, self.max_weight)
+
+
+@dataclass
+class SparseTSDF:
+    """
+    TSDF stored as a hash of dense voxel blocks, which are only allocated near observed surfaces.
+
+    Memory grows with the observed surface area instead of the volume, which makes resolutions well beyond 256^3
+    practical. Blocks are looked up by their linear index in a sorted key array, and stored in slots of tensors that
+    grow geometrically.
+    """
+
+    origin: Float[Tensor, "3"]
+    """Origin of the TSDF [xmin, ymin, zmin]."""
+    voxel_size: Float[Tensor, "3"]
+    """Size of each voxel in the TSDF. [x, y, z] size."""
+    volume_dims: Int[Tensor, "3"]
+    """Number of voxels of the volume along each axis."""
+    block_size: int = 8
+    """Number of voxels along each side of a block."""
+    truncation_margin: float = 5.0
+    """Margin for truncation."""
+    max_weight: float = 1.0
+    """Maximum accumulated weight of a voxel. Lower values favor more recent observations."""
+
+    def __post_init__(self) -> None:
+        self.grid_dims = torch.div(self.volume_dims + self.block_size - 1, self.block_size, rounding_mode="floor")
+        """Number of blocks along each axis."""
+        self.block_keys = torch.empty(0, dtype=torch.long, device=self.device)
+        """Sorted linear indices of the allocated blocks."""
+        self.block_slots = torch.empty(0, dtype=torch.long, device=self.device)
+        """Storage slot of each key in block_keys."""
+        self.slot_keys = torch.empty(0, dtype=torch.long, device=self.device)
+        self.values = torch.empty(0, self.block_size, self.block_size, self.block_size, device=self.device)
+        self.weights = torch.empty(0, self.block_size, self.block_size, self.block_size, device=self.device)
+        self.colors = torch.empty(0, self.block_size, self.block_size, self.block_size, 3, device=self.device)
+
+    @property
+    def device(self) -> TORCH_DEVICE:
+        """Returns the device that the TSDF is on."""
+        return self.origin.device
 
-        if mask_images is not None:
-            raise NotImplementedError("Mask images are not supported yet.")
+    @property
+    def truncation(self) -> float:
+        """Returns the truncation distance."""
+        return self.voxel_size[0].item() * self.truncation_margin
 
-        batch_size = c2w.shape[0]
-        shape = self.voxel_coords.shape[1:]
+    @property
+    def num_blocks(self) -> int:
+        """Returns the number of allocated blocks."""
+        return self.block_keys.shape[0]
 
-        # Project voxel_coords into image space...
+    def to(self, device: TORCH_DEVICE):
+        """Move the tensors to the specified device.
+
+        Args:
+            device: The device to move the tensors to. E.g., "cuda:0" or "cpu".
+        """
+        for name in ("origin", "voxel_size", "volume_dims", "grid_dims", "block_keys", "block_slots", "slot_keys"):
+            setattr(self, name, getattr(self, name).to(device))
+        self.values = self.values.to(device)
+        self.weights = self.weights.to(device)
+        self.colors = self.colors.to(device)
+        return self
 
-        image_size = torch.tensor(
-            [depth_images.shape[-1], depth_images.shape[-2]], device=self.device
-        )  # [width, height]
+    @staticmethod
+    def from_aabb(aabb: Float[Tensor, "2 3"], volume_dims: Int[Tensor, "3"], block_size: int = 8) -> SparseTSDF:
+        """Returns an empty sparse TSDF from an axis-aligned bounding box and volume dimensions.
 
-        # make voxel_coords homogeneous
-        voxel_world_coords = self.voxel_coords.view(3, -1)
-        voxel_world_coords = torch.cat(
-            [voxel_world_coords, torch.ones(1, voxel_world_coords.shape[1], device=self.device)], dim=0
+        Args:
+            aabb: The axis-aligned bounding box with shape [[xmin, ymin, zmin], [xmax, ymax, zmax]].
+            volume_dims: The volume dimensions with shape [xdim, ydim, zdim].
+            block_size: Number of voxels along each side of a block.
+        """
+        return SparseTSDF(
+            origin=aabb[0], voxel_size=(aabb[1] - aabb[0]) / volume_dims, volume_dims=volume_dims, block_size=block_size
+        )
+
+    def _keys_to_coords(self, keys: Int[Tensor, "num_blocks"]) -> Int[Tensor, "num_blocks 3"]:
+        ny, nz = self.grid_dims[1], self.grid_dims[2]
+        return torch.stack([keys // (ny * nz), (keys // nz) % ny, keys % nz], dim=-1)
+
+    def _coords_to_keys(self, coords: Int[Tensor, "num_blocks 3"]) -> Int[Tensor, "num_blocks"]:
+        return (coords[:, 0] * self.grid_dims[1] + coords[:, 1]) * self.grid_dims[2] + coords[:, 2]
+
+    def lookup(self, keys: Int[Tensor, "num_keys"]) -> Int[Tensor, "num_keys"]:
+        """Returns the storage slots of blocks, or -1 for blocks that are not allocated."""
+        if self.num_blocks == 0:
+            return torch.full_like(keys, -1)
+        positions = torch.searchsorted(self.block_keys, keys).clamp(max=self.num_blocks - 1)
+        found = self.block_keys[positions] == keys
+        return torch.where(found, self.block_slots[positions], torch.full_like(keys, -1))
+
+    def allocate(self, keys: Int[Tensor, "num_keys"]) -> Int[Tensor, "num_keys"]:
+        """Allocates the blocks that do not exist yet and returns the storage slots of all the blocks.
+
+        Args:
+            keys: Unique linear indices of the blocks.
+        """
+        slots = self.lookup(keys)
+        new_keys = keys[slots < 0]
+        if new_keys.shape[0] == 0:
+            return slots
+        num_blocks = self.num_blocks
+        capacity = self.values.shape[0]
+        if num_blocks + new_keys.shape[0] > capacity:
+            # grow geometrically, so that the storage is copied a logarithmic number of times
+            capacity = max(num_blocks + new_keys.shape[0], 2 * capacity)
+            extra = capacity - self.values.shape[0]
+            block_shape = (extra, self.block_size, self.block_size, self.block_size)
+            self.values = torch.cat([self.values, -torch.ones(block_shape, device=self.device)])
+            self.weights = torch.cat([self.weights, torch.zeros(block_shape, device=self.device)])
+            self.colors = torch.cat([self.colors, torch.zeros(block_shape + (3,), device=self.device)])
+            self.slot_keys = torch.cat([self.slot_keys, torch.full((extra,), -1, device=self.device)])
+        new_slots = torch.arange(num_blocks, num_blocks + new_keys.shape[0], device=self.device)
+        self.slot_keys[new_slots] = new_keys
+        self.block_keys, order = torch.sort(torch.cat([self.block_keys, new_keys]))
+        self.block_slots = torch.cat([self.block_slots, new_slots])[order]
+        slots[slots < 0] = new_slots
+        return slots
+
+    def surface_blocks(
+        self,
+        c2w: Float[Tensor, "batch 4 4"],
+        K: Float[Tensor, "batch 3 3"],
+        depth_images: Float[Tensor, "batch 1 height width"],
+        mask_images: Optional[Bool[Tensor, "batch 1 height width"]] = None,
+    ) -> Int[Tensor, "num_keys"]:
+        """Returns the unique keys of the blocks within the truncation distance of the observed surfaces.
+
+        Args:
+            c2w: The camera extrinsics.
+            K: The camera intrinsics.
+            depth_images: The depth images, as distances along the rays.
+            mask_images: Pixels that are False are ignored.
+        """
+        height, width = depth_images.shape[-2:]
+        block_extent = (self.voxel_size * self.block_size).min().item()
+        # sample the truncation band densely enough to touch every block that it crosses
+        num_offsets = math.ceil(2 * self.truncation / (0.5 * block_extent)) + 1
+        offsets = torch.linspace(-self.truncation, self.truncation, num_offsets, device=self.device)
+        rows, cols = torch.meshgrid(
+            torch.arange(height, device=self.device), torch.arange(width, device=self.device), indexing="ij"
+        )
+        pixels = torch.stack([cols + 0.5, rows + 0.5, torch.ones_like(rows)], dim=-1).view(-1, 3).float()
+        keys = []
+        for i in range(c2w.shape[0]):
+            depth = depth_images[i].view(-1)
+            valid = depth > 0
+            if mask_images is not None:
+                valid &= mask_images[i].view(-1)
+            directions = pixels[valid] @ torch.inverse(K[i]).T
+            # flip the y and z axes, and normalize since depths are distances along the rays
+            directions = directions * torch.tensor([1.0, -1.0, -1.0], device=self.device)
+            directions = directions / torch.linalg.norm(directions, dim=-1, keepdim=True)
+            distances = depth[valid][:, None] + offsets[None]  # [num_pixels, num_offsets]
+            points = c2w[i, :3, 3] + (directions @ c2w[i, :3, :3].T)[:, None] * distances[..., None]
+            coords = torch.floor((points.view(-1, 3) - self.origin) / (self.voxel_size * self.block_size)).long()
+            inside = ((coords >= 0) & (coords < self.grid_dims)).all(dim=-1)
+            keys.append(torch.unique(self._coords_to_keys(coords[inside])))
+        return torch.unique(torch.cat(keys))
+
+    def _voxel_points(self, slots: Int[Tensor, "num_blocks"]) -> Float[Tensor, "num_voxels 3"]:
+        """Returns the world coordinates of the voxels of blocks, in storage order."""
+        local = torch.arange(self.block_size, device=self.device)
+        local = torch.stack(torch.meshgrid([local, local, local], indexing="ij"), dim=-1).view(-1, 3)
+        voxels = self._keys_to_coords(self.slot_keys[slots])[:, None] * self.block_size + local[None]
+        return self.origin + voxels.view(-1, 3) * self.voxel_size
+
+    def integrate_tsdf(
+        self,
+        c2w: Float[Tensor, "batch 4 4"],
+        K: Float[Tensor, "batch 3 3"],
+        depth_images: Float[Tensor, "batch 1 height width"],
+        color_images: Optional[Float[Tensor, "batch 3 height width"]] = None,
+        mask_images: Optional[Bool[Tensor, "batch 1 height width"]] = None,
+        weight_images: Optional[Float[Tensor, "batch 1 height width"]] = None,
+    ) -> None:
+        """Integrates a batch of depth images into the blocks near the surfaces they observe.
+
+        The observations of the whole batch are averaged together, then fused with the current values.
+
+        Args:
+            c2w: The camera extrinsics.
+            K: The camera intrinsics.
+            depth_images: The depth images to integrate.
+            color_images: The color images to integrate.
+            mask_images: The mask images to integrate. Pixels that are False are ignored.
+            weight_images: Weight of the observation of every pixel. Defaults to 1.
+        """
+        slots = self.allocate(self.surface_blocks(c2w, K, depth_images, mask_images))
+        blocks_per_chunk = max(1, POINTS_PER_CHUNK // self.block_size**3)
+        for start in range(0, slots.shape[0], blocks_per_chunk):
+            chunk_slots = slots[start : start + blocks_per_chunk]
+            observations = observe_points(
+                self._voxel_points(chunk_slots),
+                c2w,
+                K,
+                depth_images,
+                self.truncation,
+                color_images=color_images,
+                mask_images=mask_images,
+                weight_images=weight_images,
+            )
+            values = self.values[chunk_slots].view(-1)
+            weights = self.weights[chunk_slots].view(-1)
+            colors = self.colors[chunk_slots].view(-1, 3)
+            fuse_observations(values, weights, colors, observations, self.max_weight)
+            block_shape = (-1, self.block_size, self.block_size, self.block_size)
+            self.values[chunk_slots] = values.view(block_shape)
+            self.weights[chunk_slots] = weights.view(block_shape)
+            self.colors[chunk_slots] = colors.view(block_shape + (3,))
+
+    def get_mesh(self, blocks_per_chunk: int = 8) -> Mesh:
+        """Extracts a mesh using marching cubes on dense chunks of blocks, skipping voxels that were not observed.
+
+        Args:
+            blocks_per_chunk: Number of blocks along each side of the chunks that marching cubes runs on.
+        """
+        device = self.device
+        size = self.block_size
+        chunk_voxels = blocks_per_chunk * size
+        block_coords = self._keys_to_coords(self.block_keys)
+        chunk_coords = torch.unique(torch.div(block_coords, blocks_per_chunk, rounding_mode="floor"), dim=0)
+        # every chunk also reads the first blocks of its neighbors, so that cells on its far faces are complete
+        offsets = torch.arange(blocks_per_chunk + 1, device=device)
+        offsets = torch.stack(torch.meshgrid([offsets, offsets, offsets], indexing="ij"), dim=-1).view(-1, 3)
+
+        all_vertices, all_faces, all_normals, all_colors = [], [], [], []
+        num_vertices = 0
+        for chunk_coord in chunk_coords:
+            coords = chunk_coord * blocks_per_chunk + offsets
+            inside = ((coords >= 0) & (coords < self.grid_dims)).all(dim=-1)
+            slots = torch.full((coords.shape[0],), -1, dtype=torch.long, device=device)
+            slots[inside] = self.lookup(self._coords_to_keys(coords[inside]))
+            present = slots >= 0
+
+            def gather(storage: Tensor, fill: float) -> np.ndarray:
+                blocks = torch.full((coords.shape[0], *storage.shape[1:]), fill, device=device)
+                blocks[present] = storage[slots[present]]
+                n = blocks_per_chunk + 1
+                blocks = blocks.view(n, n, n, size, size, size, *storage.shape[4:])
+                dense = blocks.permute(0, 3, 1, 4, 2, 5, *range(6, blocks.dim())).reshape(
+                    n * size, n * size, n * size, *storage.shape[4:]
+                )
+                return dense[: chunk_voxels + 1, : chunk_voxels + 1, : chunk_voxels + 1].cpu().numpy()
+
+            values = gather(self.values, -1.0).clip(-1, 1)
+            observed = gather(self.weights, 0.0) > 0
+            # a cell is only meshed if all of its eight corners were observed
+            cells = observed[:-1, :-1, :-1].copy()
+            for dx, dy, dz in [(0, 0, 1), (0, 1, 0), (0, 1, 1), (1, 0, 0), (1, 0, 1), (1, 1, 0), (1, 1, 1)]:
+                cells &= observed[dx : dx + chunk_voxels, dy : dy + chunk_voxels, dz : dz + chunk_voxels]
+            if not cells.any() or values[:-1, :-1, :-1][cells].min() > 0 or values[:-1, :-1, :-1][cells].max() < 0:
+                continue
+            vertices, faces, normals, _ = measure.marching_cubes(  # type: ignore
+                values, level=0, allow_degenerate=False
+            )
+            centroid_cells = np.floor(vertices[faces].mean(axis=1)).astype(int).clip(0, chunk_voxels - 1)
+            faces = faces[cells[centroid_cells[:, 0], centroid_cells[:, 1], centroid_cells[:, 2]]]
+            if faces.shape[0] == 0:
+                continue
+            vertex_indices = np.round(vertices).astype(int)
+            colors = gather(self.colors, 0.0)[vertex_indices[:, 0], vertex_indices[:, 1], vertex_indices[:, 2]]
+            all_vertices.append(vertices + chunk_coord.cpu().numpy() * chunk_voxels)
+            all_faces.append(faces + num_vertices)
+            all_normals.append(normals)
+            all_colors.append(colors)
+            num_vertices += vertices.shape[0]
+
+        if not all_faces:
+            raise ValueError("No surface was found in the TSDF.")
+        vertices = np.concatenate(all_vertices)
+        # merge the vertices that neighboring chunks both computed, and drop unused ones
+        faces = np.concatenate(all_faces)
+        used = np.unique(faces)
+        _, unique_indices, inverse = np.unique(
+            np.round(vertices[used] * 1024).astype(np.int64), axis=0, return_index=True, return_inverse=True
+        )
+        remap = np.zeros(vertices.shape[0], dtype=np.int64)
+        remap[used] = inverse.reshape(-1)
+        keep = used[unique_indices]
+        faces = remap[faces]
+
+        vertices = torch.from_numpy(vertices[keep]).float().to(device)
+        vertices = self.origin.view(1, 3) + vertices * self.voxel_size.view(1, 3)
+        return Mesh(
+            vertices=vertices,
+            faces=torch.from_numpy(faces).to(device),
+            normals=torch.from_numpy(np.concatenate(all_normals)[keep]).to(device),
+            colors=torch.from_numpy(np.concatenate(all_colors)[keep]).to(device),
         )
-        voxel_world_coords = voxel_world_coords.unsqueeze(0)  # [1, 4, N]
-        voxel_world_coords = voxel_world_coords.expand(batch_size, *voxel_world_coords.shape[1:])  # [batch, 4, N]
-
-        voxel_cam_coords = torch.bmm(torch.inverse(c2w), voxel_world_coords)  # [batch, 4, N]
-
-        # flip the z axis
-        voxel_cam_coords[:, 2, :] = -voxel_cam_coords[:, 2, :]
-        # flip the y axis
-        voxel_cam_coords[:, 1, :] = -voxel_cam_coords[:, 1, :]
-
-        # we need the distance of the point to the camera, not the z coordinate
-        voxel_depth = torch.sqrt(torch.sum(voxel_cam_coords[:, :3, :] ** 2, dim=-2, keepdim=True))  # [batch, 1, N]
-
-        voxel_cam_coords_z = voxel_cam_coords[:, 2:3, :]
-        voxel_cam_points = torch.bmm(K, voxel_cam_coords[:, 0:3, :] / voxel_cam_coords_z)  # [batch, 3, N]
-        voxel_pixel_coords = voxel_cam_points[:, :2, :]  # [batch, 2, N]
-
-        # Sample the depth images with grid sample...
-
-        grid = voxel_pixel_coords.permute(0, 2, 1)  # [batch, N, 2]
-        # normalize grid to [-1, 1]
-        grid = 2.0 * grid / image_size.view(1, 1, 2) - 1.0  # [batch, N, 2]
-        grid = grid[:, None]  # [batch, 1, N, 2]
-        # depth
-        sampled_depth = F.grid_sample(
-            input=depth_images, grid=grid, mode="nearest", padding_mode="zeros", align_corners=False
-        )  # [batch, N, 1]
-        sampled_depth = sampled_depth.squeeze(2)  # [batch, 1, N]
-        # colors
-        sampled_colors = None
-        if color_images is not None:
-            sampled_colors = F.grid_sample(
-                input=color_images, grid=grid, mode="nearest", padding_mode="zeros", align_corners=False
-            )  # [batch, N, 3]
-            sampled_colors = sampled_colors.squeeze(2)  # [batch, 3, N]
-
-        dist = sampled_depth - voxel_depth  # [batch, 1, N]
-        tsdf_values = torch.clamp(dist / self.truncation, min=-1.0, max=1.0)  # [batch, 1, N]
-        valid_points = (voxel_depth > 0) & (sampled_depth > 0) & (dist > -self.truncation)  # [batch, 1, N]
-
-        # Sequentially update the TSDF...
-
-        for i in range(batch_size):
-            valid_points_i = valid_points[i]
-            valid_points_i_shape = valid_points_i.view(*shape)  # [xdim, ydim, zdim]
-
-            # the old values
-            old_tsdf_values_i = self.values[valid_points_i_shape]
-            old_weights_i = self.weights[valid_points_i_shape]
-
-            # the new values
-            # TODO: let the new weight be configurable
-            new_tsdf_values_i = tsdf_values[i][valid_points_i]
-            new_weights_i = 1.0
-
-            total_weights = old_weights_i + new_weights_i
-
-            self.values[valid_points_i_shape] = (
-                old_tsdf_values_i * old_weights_i + new_tsdf_values_i * new_weights_i
-            ) / total_weights
-            self.weights[valid_points_i_shape] = torch.clamp(total_weights, max=1.0)
-
-            if sampled_colors is not None:
-                old_colors_i = self.colors[valid_points_i_shape]  # [M, 3]
-                new_colors_i = sampled_colors[i][:, valid_points_i.squeeze(0)].permute(1, 0)  # [M, 3]
-                self.colors[valid_points_i_shape] = (
-                    old_colors_i * old_weights_i[:, None] + new_colors_i * new_weights_i
-                ) / total_weights[:, None]
 
 
 def export_tsdf_mesh(
@@ -285,6 +597,8 @@ def export_tsdf_mesh(
     use_bounding_box: bool = True,
     bounding_box_min: Tuple[float, float, float] = (-1.0, -1.0, -1.0),
     bounding_box_max: Tuple[float, float, float] = (1.0, 1.0, 1.0),
+    sparse: bool = False,
+    block_size: int = 8,
 ) -> None:
     """Export a TSDF mesh from a pipeline.
 
@@ -299,6 +613,8 @@ def export_tsdf_mesh(
         use_bounding_box: Whether to use a bounding box for the TSDF volume.
         bounding_box_min: Minimum coordinates of the bounding box.
         bounding_box_max: Maximum coordinates of the bounding box.
+        sparse: Whether to only allocate voxel blocks near the observed surfaces, for high resolutions.
+        block_size: Number of voxels along each side of the blocks of the sparse volume.
     """
 
     device = pipeline.device
@@ -317,7 +633,11 @@ def export_tsdf_mesh(
         volume_dims = torch.tensor(resolution)
     else:
         raise ValueError("Resolution must be an int or a list.")
-    tsdf = TSDF.from_aabb(aabb, volume_dims=volume_dims)
+    tsdf = (
+        SparseTSDF.from_aabb(aabb, volume_dims=volume_dims, block_size=block_size)
+        if sparse
+        else TSDF.from_aabb(aabb, volume_dims=volume_dims)
+    )
     # move TSDF to device
     tsdf.to(device)
 
@@ -354,7 +674,10 @@ def export_tsdf_mesh(
             color_images=color_images[i : i + batch_size],
         )
 
+    if isinstance(tsdf, SparseTSDF):
+        CONSOLE.print(f"Allocated {tsdf.num_blocks} blocks of {block_size}^3 voxels")
+
     CONSOLE.print("Computing Mesh")
     mesh = tsdf.get_mesh()
     CONSOLE.print("Saving TSDF Mesh")
-    tsdf.export_mesh(mesh, filename=str(output_dir / "tsdf_mesh.ply"))
+    TSDF.export_mesh(mesh, filename=str(output_dir / "tsdf_mesh.ply"))
@@ -0,0 +1,129 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Preallocated storage for per-gaussian tensors that grow and shrink during densification.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Hashable, Tuple
+
+import torch
+from jaxtyping import Bool, Int
+from torch import Tensor
+
+
+def removal_moves(mask: Bool[Tensor, "N"]) -> Tuple[Int[Tensor, "M"], Int[Tensor, "M"]]:
+    """Computes the rows to move so that the rows not in `mask` end up first.
+
+    Every removed row before the number of kept rows is a hole, filled by a kept row after it. Only those rows move,
+    and the order of the kept rows is not preserved.
+
+    Args:
+        mask: Rows to remove.
+
+    Returns:
+        The holes, and the rows to move into them.
+    """
+    num_kept = len(mask) - int(mask.sum())
+    holes = torch.where(mask[:num_kept])[0]
+    movers = torch.where(~mask[num_kept:])[0] + num_kept
+    return holes, movers
+
+
+class GaussianStorage:
+    """Keeps per-gaussian tensors in preallocated buffers, as views of their first rows.
+
+    Appending rows writes into the spare capacity of the buffer, which grows by `growth_factor` when full. Removing
+    rows moves the last kept rows into the holes, so no row is copied twice and no buffer is reallocated, unless
+    less than `shrink_threshold` of the buffer remains in use. Tensors are identified by a key, and a tensor that is
+    not a view of the buffer of its key, such as a freshly created optimizer state, is copied into a new buffer.
+
+    Args:
+        growth_factor: Capacity of a new buffer relative to the rows in use.
+        shrink_threshold: Fraction of a buffer in use below which it is reallocated to release memory.
+    """
+
+    def __init__(self, growth_factor: float = 1.5, shrink_threshold: float = 0.5):
+        if growth_factor < 1:
+            raise ValueError(f"growth_factor must be at least 1, got {growth_factor}")
+        if not 0 <= shrink_threshold < 1 / growth_factor:
+            raise ValueError(f"shrink_threshold must be in [0, 1 / growth_factor), got {shrink_threshold}")
+        self.growth_factor = growth_factor
+        self.shrink_threshold = shrink_threshold
+        self._buffers: Dict[Hashable, Tensor] = {}
+
+    def _allocate(self, key: Hashable, tensor: Tensor, num_rows: int) -> Tensor:
+        """Moves the rows of `tensor` into a new buffer with room for `num_rows` rows and some to spare."""
+        capacity = max(math.ceil(num_rows * self.growth_factor), 1)
+        buffer = torch.empty((capacity,) + tensor.shape[1:], dtype=tensor.dtype, device=tensor.device)
+        buffer[: len(tensor)] = tensor.detach()
+        self._buffers[key] = buffer
+        return buffer
+
+    def _buffer(self, key: Hashable, tensor: Tensor) -> Tensor:
+        """Returns the buffer that `tensor` is a view of, allocating one if it is not a view of the buffer of `key`."""
+        buffer = self._buffers.get(key)
+        if (
+            buffer is None
+            or buffer.data_ptr() != tensor.data_ptr()
+            or buffer.shape[1:] != tensor.shape[1:]
+            or buffer.dtype != tensor.dtype
+            or len(tensor) > len(buffer)
+        ):
+            buffer = self._allocate(key, tensor, len(tensor))
+        return buffer
+
+    def capacity(self, key: Hashable) -> int:
+        """Returns the number of rows that the buffer of `key` can hold."""
+        return len(self._buffers[key])
+
+    def append(self, key: Hashable, tensor: Tensor, rows: Tensor) -> Tensor:
+        """Appends rows to a tensor.
+
+        Args:
+            key: Identifies the tensor.
+            tensor: Current rows of the tensor.
+            rows: Rows to append.
+
+        Returns:
+            A view of the buffer holding the rows of `tensor` followed by `rows`.
+        """
+        num_rows = len(tensor) + len(rows)
+        buffer = self._buffer(key, tensor)
+        if num_rows > len(buffer):
+            buffer = self._allocate(key, buffer[: len(tensor)], num_rows)
+        buffer[len(tensor) : num_rows] = rows
+        return buffer[:num_rows]
+
+    def remove(self, key: Hashable, tensor: Tensor, mask: Bool[Tensor, "N"]) -> Tensor:
+        """Removes rows from a tensor. Tensors with the same rows removed keep their rows in the same order.
+
+        Args:
+            key: Identifies the tensor.
+            tensor: Current rows of the tensor.
+            mask: Rows to remove.
+
+        Returns:
+            A view of the buffer holding the rows of `tensor` not in `mask`.
+        """
+        buffer = self._buffer(key, tensor)
+        holes, movers = removal_moves(mask)
+        buffer[holes] = buffer[movers]
+        num_rows = len(tensor) - int(mask.sum())
+        if num_rows < self.shrink_threshold * len(buffer):
+            buffer = self._allocate(key, buffer[:num_rows], num_rows)
+        return buffer[:num_rows]
@@ -0,0 +1,217 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+K-nearest neighbour search over point clouds.
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Literal, Tuple
+
+import numpy as np
+import torch
+from jaxtyping import Float, Int
+from torch import Tensor
+
+KNNBackend = Literal["auto", "grid", "tree"]
+
+_CELL_HASH_PRIMES = torch.tensor([73856093, 19349663, 83492791])
+
+
+def _cell_coords(points: Float[Tensor, "*bs 3"], origin: Float[Tensor, "3"], cell_size: float) -> Int[Tensor, "*bs 3"]:
+    return torch.floor((points - origin) / cell_size).long()
+
+
+def _estimate_cell_size(points: Float[Tensor, "N 3"], cell_points: float, num_iters: int = 4) -> float:
+    """Estimates the size of grid cells holding on average `cell_points` points around each point.
+
+    The first guess assumes a uniform volume, which overestimates the size for points on surfaces. It is refined by
+    measuring the occupancy of the grid.
+    """
+    origin = points.min(dim=0).values
+    extent = points.max(dim=0).values - origin
+    extent = extent.clamp_min(float(extent.max()) * 1e-3 + 1e-12)
+    cell_size = float((extent.prod() / len(points) * cell_points) ** (1 / 3))
+    for _ in range(num_iters):
+        # Hashing the cells is much faster than a unique over rows; the rare collisions only bias the estimate.
+        hashes = (_cell_coords(points, origin, cell_size) * _CELL_HASH_PRIMES.to(points.device)).sum(dim=-1)
+        _, counts = torch.unique(hashes, return_counts=True)
+        # Number of points sharing a cell, as seen from a point.
+        occupancy = float((counts.double() ** 2).sum() / len(points))
+        if cell_points / 2 <= occupancy <= cell_points * 2:
+            break
+        cell_size *= min(max((cell_points / occupancy) ** 0.5, 1 / 8), 8)
+    return cell_size
+
+
+def k_nearest_grid(
+    points: Float[Tensor, "N 3"],
+    k: int,
+    cell_points: float = 2.0,
+    chunk_size: int = 1 << 22,
+) -> Tuple[Float[Tensor, "N k"], Int[Tensor, "N k"]]:
+    """Finds the exact k nearest neighbours of every point, excluding the point itself, with a uniform grid.
+
+    Points are sorted by cell, and each point is compared to the points of its 27 neighbouring cells. The result is
+    exact for the points whose k-th neighbour is closer than the cell size. The others are searched again on a grid
+    twice as coarse, until none are left. Runs on the device of the points, `chunk_size` candidate pairs at a time.
+
+    Args:
+        points: Points to search.
+        k: Number of neighbours to find.
+        cell_points: Target number of points per cell.
+        chunk_size: Maximum number of candidate pairs compared at once, bounding memory use.
+
+    Returns:
+        Distances to the neighbours in increasing order, and their indices.
+    """
+    num_points = len(points)
+    if num_points <= k:
+        raise ValueError(f"Cannot find {k} neighbours among {num_points} points")
+    device = points.device
+    points = points.float()
+    origin = points.min(dim=0).values
+    cell_size = _estimate_cell_size(points, cell_points)
+    # The 3 cells along z next to each other are stored contiguously, so only 9 ranges are searched per query.
+    offsets = torch.tensor(list(itertools.product([-1, 0, 1], repeat=2)), device=device)
+
+    distances = torch.full((num_points, k), float("inf"), device=device)
+    indices = torch.full((num_points, k), -1, dtype=torch.long, device=device)
+    remaining = torch.arange(num_points, device=device)
+    while len(remaining) > 0:
+        coords = _cell_coords(points, origin, cell_size)
+        grid_shape = coords.max(dim=0).values + 1
+        if float(grid_shape.double().prod()) > 2**62:
+            cell_size *= 2
+            continue
+        # Every point is a neighbour of every cell once the grid is at most two cells wide.
+        exhaustive = bool((grid_shape <= 2).all())
+        strides = torch.stack([grid_shape[1] * grid_shape[2], grid_shape[2], torch.ones_like(grid_shape[2])])
+        keys, order = torch.sort((coords * strides).sum(dim=-1))
+        sorted_points = points[order]
+        sorted_coords = coords[order]
+        # Visit the queries in cell order so that neighbouring queries read the same points.
+        ranks = torch.empty_like(order)
+        ranks[order] = torch.arange(num_points, device=device)
+        remaining = torch.sort(ranks[remaining]).values
+
+        unresolved = []
+        for block in torch.split(remaining, max(1, chunk_size // (9 * 8))):
+            # Range of sorted points in each of the 9 candidate columns of each query.
+            block_coords = sorted_coords[block]
+            column_xy = block_coords[:, None, :2] + offsets
+            in_grid = ((column_xy >= 0) & (column_xy < grid_shape[:2])).all(dim=-1)
+            column_keys = (column_xy * strides[:2]).sum(dim=-1)
+            z = block_coords[:, 2:]
+            range_starts = torch.searchsorted(keys, column_keys + (z - 1).clamp_min(0))
+            range_ends = torch.searchsorted(keys, column_keys + (z + 1).clamp_max(grid_shape[2] - 1), right=True)
+            counts = torch.where(in_grid, range_ends - range_starts, 0)
+            num_candidates = counts.sum(dim=-1)
+
+            # Split the block so that each chunk compares at most chunk_size pairs, unless a single query needs more.
+            chunk_ids = torch.div(
+                torch.cumsum(num_candidates, dim=0) - num_candidates, chunk_size, rounding_mode="floor"
+            )
+            _, chunk_lengths = torch.unique_consecutive(chunk_ids, return_counts=True)
+            for query_slice in torch.split(torch.arange(len(block), device=device), chunk_lengths.tolist()):
+                queries = block[query_slice]
+                chunk_counts = counts[query_slice].view(-1)
+                chunk_starts = range_starts[query_slice].view(-1)
+                chunk_num_candidates = num_candidates[query_slice]
+                total = int(chunk_num_candidates.sum())
+
+                # Flatten the candidates of all queries: for each, its query row and its index in the sorted points.
+                pair_range = torch.repeat_interleave(torch.arange(len(chunk_counts), device=device), chunk_counts)
+                range_offsets = torch.cumsum(chunk_counts, dim=0) - chunk_counts
+                candidates = chunk_starts[pair_range] + torch.arange(total, device=device) - range_offsets[pair_range]
+                rows = torch.div(pair_range, 9, rounding_mode="floor")
+                sq_distances = ((sorted_points[candidates] - sorted_points[queries[rows]]) ** 2).sum(dim=-1)
+                sq_distances[candidates == queries[rows]] = float("inf")
+
+                # Pad the candidates of each query to a row and keep the k closest.
+                row_starts = torch.cumsum(chunk_num_candidates, dim=0) - chunk_num_candidates
+                columns = torch.arange(total, device=device) - row_starts[rows]
+                num_columns = max(int(chunk_num_candidates.max()), k)
+                padded = torch.full((len(queries), num_columns), float("inf"), device=device)
+                padded[rows, columns] = sq_distances
+                chunk_sq_distances, picks = torch.topk(padded, k, dim=-1, largest=False)
+                chunk_distances = chunk_sq_distances.sqrt()
+                # Candidates of a row are consecutive in the flattened pairs, so a pick is an offset from the row start.
+                picked = candidates[(row_starts[:, None] + picks).clamp_max(total - 1)]
+                chunk_indices = torch.where(chunk_distances.isfinite(), order[picked], torch.full_like(picks, -1))
+
+                # Any point closer than the boundary of the 27 cells around the query is one of its candidates.
+                local = (sorted_points[queries] - origin) / cell_size - sorted_coords[queries]
+                margin = torch.minimum(local, 1 - local).min(dim=-1).values.clamp_min(0)
+                resolved = exhaustive | (chunk_distances[:, -1] <= (1 + margin) * cell_size)
+                resolved_queries = order[queries[resolved]]
+                distances[resolved_queries] = chunk_distances[resolved]
+                indices[resolved_queries] = chunk_indices[resolved]
+                unresolved.append(order[queries[~resolved]])
+        remaining = torch.cat(unresolved)
+        cell_size *= 2
+    return distances, indices
+
+
+def k_nearest_tree(points: Float[Tensor, "N 3"], k: int) -> Tuple[Float[Tensor, "N k"], Int[Tensor, "N k"]]:
+    """Finds the k nearest neighbours of every point, excluding the point itself, with a KD-tree on all CPU cores.
+
+    Args:
+        points: Points to search.
+        k: Number of neighbours to find.
+
+    Returns:
+        Distances to the neighbours in increasing order, and their indices.
+    """
+    from scipy.spatial import cKDTree
+
+    num_points = len(points)
+    if num_points <= k:
+        raise ValueError(f"Cannot find {k} neighbours among {num_points} points")
+    points_np = points.detach().cpu().float().numpy()
+    distances, indices = cKDTree(points_np).query(points_np, k=k + 1, workers=-1)
+    # The query point is usually the first match, but not always among duplicates, so drop it by index.
+    not_self = indices != np.arange(num_points)[:, None]
+    not_self[not_self.all(axis=-1), -1] = False
+    distances = distances[not_self].reshape(num_points, k)
+    indices = indices[not_self].reshape(num_points, k)
+    return (
+        torch.from_numpy(distances).float().to(points.device),
+        torch.from_numpy(indices).long().to(points.device),
+    )
+
+
+def k_nearest(
+    points: Float[Tensor, "N 3"], k: int, backend: KNNBackend = "auto"
+) -> Tuple[Float[Tensor, "N k"], Int[Tensor, "N k"]]:
+    """Finds the k nearest neighbours of every point, excluding the point itself.
+
+    Args:
+        points: Points to search.
+        k: Number of neighbours to find.
+        backend: "grid" searches a uniform grid with torch on the device of the points. "tree" uses a KD-tree on the
+            CPU. "auto" picks "grid" for points on the GPU and "tree" otherwise.
+
+    Returns:
+        Distances to the neighbours in increasing order, and their indices.
+    """
+    if backend == "auto":
+        backend = "tree" if points.device.type == "cpu" else "grid"
+    if backend == "grid":
+        return k_nearest_grid(points, k)
+    if backend == "tree":
+        return k_nearest_tree(points, k)
+    raise ValueError(f"Unknown KNN backend {backend}")
@@ -0,0 +1,240 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compact, quantized storage of splatfacto gaussians for checkpoints and export.
+
+The gaussians are sorted along a Morton curve and split into chunks of neighbouring gaussians. Positions, log scales
+and base colors are quantized relative to the bounds of their chunk, rotations are packed into 32 bits with the
+smallest three encoding, opacities into 8 bits, and the higher order spherical harmonics are replaced by indices into
+a k-means codebook. A degree 3 gaussian takes about 20 bytes instead of 236.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Tuple
+
+import torch
+from jaxtyping import Float, Int
+from torch import Tensor
+
+from nerfstudio.model_components.splat_lod import morton_codes
+
+COMPRESSED_PREFIX = "compressed_gauss_params."
+"""Prefix of the compressed gaussians in a model state dict, in place of the gauss_params entries."""
+
+MORTON_BITS = 16
+POSITION_BITS = 16
+SCALE_BITS = 8
+COLOR_BITS = 8
+OPACITY_BITS = 8
+QUAT_BITS = 10
+
+
+def _to_uint16(values: Tensor) -> Tensor:
+    """Stores integers in [0, 65535] as int16, since older versions of torch have no uint16."""
+    return (values.long() - 32768).to(torch.int16)
+
+
+def _from_uint16(values: Tensor) -> Tensor:
+    return values.long() + 32768
+
+
+def _chunk_bounds(values: Float[Tensor, "N D"], chunk_size: int) -> Tuple[Float[Tensor, "C D"], Float[Tensor, "C D"]]:
+    """Returns the per chunk minimum and maximum of consecutive rows."""
+    num_chunks = math.ceil(len(values) / chunk_size)
+    padding = values[-1:].expand(num_chunks * chunk_size - len(values), -1)
+    chunks = torch.cat([values, padding]).view(num_chunks, chunk_size, -1)
+    return chunks.amin(dim=1), chunks.amax(dim=1)
+
+
+def _quantize(
+    values: Float[Tensor, "N D"], lower: Float[Tensor, "N D"], upper: Float[Tensor, "N D"], bits: int
+) -> Int[Tensor, "N D"]:
+    levels = 2**bits - 1
+    return ((values - lower) / (upper - lower).clamp_min(1e-12) * levels).round().clamp(0, levels).long()
+
+
+def _dequantize(
+    values: Int[Tensor, "N D"], lower: Float[Tensor, "N D"], upper: Float[Tensor, "N D"], bits: int
+) -> Float[Tensor, "N D"]:
+    return lower + values.float() / (2**bits - 1) * (upper - lower)
+
+
+def _encode_chunked(values: Float[Tensor, "N D"], chunk_size: int, bits: int) -> Dict[str, Tensor]:
+    lower, upper = _chunk_bounds(values, chunk_size)
+    quantized = _quantize(
+        values,
+        lower.repeat_interleave(chunk_size, dim=0)[: len(values)],
+        upper.repeat_interleave(chunk_size, dim=0)[: len(values)],
+        bits,
+    )
+    quantized = _to_uint16(quantized) if bits > 8 else quantized.to(torch.uint8)
+    return {"": quantized, "_lower": lower.float(), "_upper": upper.float()}
+
+
+def _decode_chunked(quantized: Tensor, lower: Tensor, upper: Tensor, chunk_size: int, bits: int) -> Tensor:
+    quantized = _from_uint16(quantized) if bits > 8 else quantized
+    return _dequantize(
+        quantized,
+        lower.repeat_interleave(chunk_size, dim=0)[: len(quantized)],
+        upper.repeat_interleave(chunk_size, dim=0)[: len(quantized)],
+        bits,
+    )
+
+
+def encode_quats(quats: Float[Tensor, "N 4"]) -> Int[Tensor, "N"]:
+    """Packs rotations into 32 bits each: the index of the largest component in 2 bits, and the other three in 10
+    bits each. The largest component is made positive, so it follows from the others."""
+    quats = torch.nn.functional.normalize(quats, dim=-1)
+    largest = quats.abs().argmax(dim=-1)
+    quats = quats * torch.where(quats.gather(-1, largest[:, None]) < 0, -1.0, 1.0)
+    others = quats[torch.arange(4, device=quats.device) != largest[:, None]].view(-1, 3)
+    # The other components are at most 1 / sqrt(2) in magnitude.
+    quantized = _quantize(others * math.sqrt(2), torch.tensor(-1.0), torch.tensor(1.0), QUAT_BITS)
+    packed = largest << 30
+    for i in range(3):
+        packed |= quantized[:, i] << (QUAT_BITS * (2 - i))
+    # Reinterpret as signed, since torch has no uint32.
+    return torch.where(packed >= 2**31, packed - 2**32, packed).to(torch.int32)
+
+
+def decode_quats(packed: Int[Tensor, "N"]) -> Float[Tensor, "N 4"]:
+    """Unpacks rotations packed by :func:`encode_quats`."""
+    packed = packed.long() & 0xFFFFFFFF
+    largest = packed >> 30
+    mask = 2**QUAT_BITS - 1
+    quantized = torch.stack([(packed >> (QUAT_BITS * (2 - i))) & mask for i in range(3)], dim=-1)
+    others = _dequantize(quantized, torch.tensor(-1.0), torch.tensor(1.0), QUAT_BITS) / math.sqrt(2)
+    quats = torch.empty((len(packed), 4), device=packed.device)
+    quats.scatter_(1, largest[:, None], torch.sqrt((1 - (others**2).sum(dim=-1, keepdim=True)).clamp_min(0)))
+    others_ids = torch.arange(3, device=packed.device)[None] + (
+        torch.arange(3, device=packed.device) >= largest[:, None]
+    )
+    quats.scatter_(1, others_ids, others)
+    return quats
+
+
+def _nearest_centers(
+    points: Float[Tensor, "N D"], centers: Float[Tensor, "K D"], max_elements: int
+) -> Int[Tensor, "N"]:
+    """Index of the nearest center of every point, computing at most `max_elements` distances at once."""
+    center_norms = (centers**2).sum(dim=-1)
+    rows = max(1, max_elements // len(centers))
+    return torch.cat([(center_norms - 2 * chunk @ centers.T).argmin(dim=-1) for chunk in torch.split(points, rows)])
+
+
+def kmeans(
+    points: Float[Tensor, "N D"], k: int, num_iters: int = 10, seed: int = 0, max_elements: int = 1 << 24
+) -> Tuple[Float[Tensor, "K D"], Int[Tensor, "N"]]:
+    """Clusters points with Lloyd's algorithm, starting from random points.
+
+    Args:
+        points: Points to cluster.
+        k: Number of clusters. If there are fewer points, every point is its own cluster.
+        num_iters: Number of iterations.
+        seed: Seed of the initial centers.
+        max_elements: Number of distances computed at once, bounding memory use.
+
+    Returns:
+        The centers, and the cluster of every point.
+    """
+    if len(points) <= k:
+        return points.clone(), torch.arange(len(points), device=points.device)
+    generator = torch.Generator().manual_seed(seed)
+    centers = points[torch.randperm(len(points), generator=generator)[:k].to(points.device)].clone()
+    for _ in range(num_iters):
+        labels = _nearest_centers(points, centers, max_elements)
+        sums = torch.zeros_like(centers).index_add_(0, labels, points)
+        counts = torch.bincount(labels, minlength=k)
+        # Empty clusters keep their center.
+        nonempty = counts > 0
+        centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return centers, _nearest_centers(points, centers, max_elements)
+
+
+@torch.no_grad()
+def compress_gaussians(
+    gauss_params: Dict[str, Tensor],
+    chunk_size: int = 256,
+    sh_codebook_size: int = 4096,
+    sh_codebook_iters: int = 10,
+) -> Dict[str, Tensor]:
+    """Compresses splatfacto gaussians.
+
+    Args:
+        gauss_params: Means, log scales, quats, logit opacities, features_dc and features_rest of the gaussians.
+        chunk_size: Number of gaussians sharing quantization bounds.
+        sh_codebook_size: Number of distinct higher order spherical harmonics, at most 65536.
+        sh_codebook_iters: Number of k-means iterations fitting the codebook.
+
+    Returns:
+        Quantized tensors, in Morton order of the means.
+    """
+    if not 0 < sh_codebook_size <= 1 << 16:
+        raise ValueError(f"sh_codebook_size must be in [1, 65536], got {sh_codebook_size}")
+    means = gauss_params["means"].float()
+    lower, upper = means.min(dim=0).values, means.max(dim=0).values
+    cells = ((means - lower) / (upper - lower).max().clamp_min(1e-12) * (2**MORTON_BITS - 1)).round().long()
+    order = torch.argsort(morton_codes(cells, MORTON_BITS))
+    params = {name: param.detach()[order].float() for name, param in gauss_params.items()}
+
+    compressed = {"chunk_size": torch.tensor(chunk_size)}
+    for name, bits in [("means", POSITION_BITS), ("scales", SCALE_BITS), ("features_dc", COLOR_BITS)]:
+        for suffix, value in _encode_chunked(params[name], chunk_size, bits).items():
+            compressed[name + suffix] = value
+    compressed["quats"] = encode_quats(params["quats"])
+    compressed["opacities"] = _quantize(
+        torch.sigmoid(params["opacities"]), torch.tensor(0.0), torch.tensor(1.0), OPACITY_BITS
+    ).to(torch.uint8)
+
+    features_rest = params["features_rest"]
+    if features_rest.shape[1] > 0:
+        codebook, labels = kmeans(features_rest.flatten(1), sh_codebook_size, sh_codebook_iters)
+    else:
+        codebook, labels = (
+            features_rest.new_zeros((0, 0)),
+            torch.zeros(len(means), dtype=torch.long, device=means.device),
+        )
+    compressed["features_rest_codebook"] = codebook.view(len(codebook), *features_rest.shape[1:]).half()
+    compressed["features_rest_labels"] = _to_uint16(labels)
+    return compressed
+
+
+def decompress_gaussians(compressed: Dict[str, Tensor]) -> Dict[str, Tensor]:
+    """Reverses :func:`compress_gaussians`, up to quantization error and the order of the gaussians.
+
+    Args:
+        compressed: Compressed gaussians.
+
+    Returns:
+        Parameters of the gaussians, with scales and opacities in log and logit space.
+    """
+    chunk_size = int(compressed["chunk_size"])
+    params = {}
+    for name, bits in [("means", POSITION_BITS), ("scales", SCALE_BITS), ("features_dc", COLOR_BITS)]:
+        params[name] = _decode_chunked(
+            compressed[name], compressed[name + "_lower"], compressed[name + "_upper"], chunk_size, bits
+        )
+    params["quats"] = decode_quats(compressed["quats"])
+    # Opacities of exactly 0 or 1 have no logit.
+    opacities = _dequantize(compressed["opacities"], torch.tensor(0.0), torch.tensor(1.0), OPACITY_BITS)
+    params["opacities"] = torch.logit(opacities.clamp(0.5 / 2**OPACITY_BITS, 1 - 0.5 / 2**OPACITY_BITS))
+    codebook = compressed["features_rest_codebook"].float()
+    if codebook.shape[1] > 0:
+        params["features_rest"] = codebook[_from_uint16(compressed["features_rest_labels"])]
+    else:
+        params["features_rest"] = codebook.new_zeros((len(params["means"]),) + codebook.shape[1:])
+    return params
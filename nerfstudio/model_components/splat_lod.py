@@ -0,0 +1,293 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Octree over gaussian splats for frustum culling and level of detail.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Tuple
+
+import torch
+from jaxtyping import Float, Int
+from torch import Tensor
+
+from nerfstudio.model_components.torch_rasterizer import quats_to_rotmats
+
+
+def rotmats_to_quats(rotmats: Float[Tensor, "*bs 3 3"]) -> Float[Tensor, "*bs 4"]:
+    """Converts rotation matrices to normalized quaternions, in wxyz order."""
+    m = rotmats
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    candidates = torch.stack(
+        [
+            torch.stack(
+                [1 + trace, m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1]], -1
+            ),
+            torch.stack(
+                [
+                    m[..., 2, 1] - m[..., 1, 2],
+                    1 + 2 * m[..., 0, 0] - trace,
+                    m[..., 0, 1] + m[..., 1, 0],
+                    m[..., 0, 2] + m[..., 2, 0],
+                ],
+                -1,
+            ),
+            torch.stack(
+                [
+                    m[..., 0, 2] - m[..., 2, 0],
+                    m[..., 0, 1] + m[..., 1, 0],
+                    1 + 2 * m[..., 1, 1] - trace,
+                    m[..., 1, 2] + m[..., 2, 1],
+                ],
+                -1,
+            ),
+            torch.stack(
+                [
+                    m[..., 1, 0] - m[..., 0, 1],
+                    m[..., 0, 2] + m[..., 2, 0],
+                    m[..., 1, 2] + m[..., 2, 1],
+                    1 + 2 * m[..., 2, 2] - trace,
+                ],
+                -1,
+            ),
+        ],
+        dim=-2,
+    )
+    # Each candidate is 4 q_i q, so the one with the largest q_i is the best conditioned.
+    best = torch.stack([trace, m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]], dim=-1).argmax(dim=-1)
+    quats = torch.gather(candidates, -2, best[..., None, None].expand(best.shape + (1, 4))).squeeze(-2)
+    return torch.nn.functional.normalize(quats, dim=-1)
+
+
+def morton_codes(cells: Int[Tensor, "N 3"], bits: int) -> Int[Tensor, "N"]:
+    """Interleaves the bits of integer cell coordinates."""
+    codes = torch.zeros(len(cells), dtype=torch.long, device=cells.device)
+    for bit in range(bits):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> bit) & 1) << (3 * bit + 2 - axis)
+    return codes
+
+
+class GaussianLOD:
+    """Octree over gaussians, holding a merged proxy gaussian for every node.
+
+    The gaussians are bucketed into the cells of an octree of depth `max_depth` over their bounding box. Every node
+    stores a bounding sphere of its gaussians and their 3 sigma extents, and a proxy gaussian matching their weighted
+    mean and covariance. Proxies keep only the base color, as they are only drawn a few pixels wide.
+
+    Args:
+        means: Centers of the gaussians.
+        scales: Scales of the gaussians, not in log space.
+        quats: Rotations of the gaussians.
+        opacities: Opacities of the gaussians, in [0, 1].
+        features_dc: Base colors of the gaussians, which proxies average.
+        max_depth: Depth of the octree.
+        chunk_size: Number of gaussians processed at once while building, bounding memory use.
+    """
+
+    def __init__(
+        self,
+        means: Float[Tensor, "N 3"],
+        scales: Float[Tensor, "N 3"],
+        quats: Float[Tensor, "N 4"],
+        opacities: Float[Tensor, "N"],
+        features_dc: Float[Tensor, "N 3"],
+        max_depth: int = 10,
+        chunk_size: int = 1 << 20,
+    ):
+        device = means.device
+        self.max_depth = max_depth
+        self.means = means.detach()
+        extents = 3 * scales.max(dim=-1).values
+        lower, upper = means.min(dim=0).values, means.max(dim=0).values
+        # Moments are accumulated in double precision around the center of the scene, so that the covariance of small
+        # gaussians far from the origin does not cancel out.
+        scene_center = (lower + upper).double() / 2
+        cells = ((means - lower) / (upper - lower).max().clamp_min(1e-12) * (2**max_depth - 1)).round().long()
+        codes, self.order = torch.sort(morton_codes(cells, max_depth))
+
+        # Leaf statistics, accumulated in chunks of gaussians: weight, weighted means, weighted second moments,
+        # opacity times area, weighted colors, and the bounding box of the 3 sigma extents.
+        leaf_codes, leaf_counts = torch.unique_consecutive(codes, return_counts=True)
+        leaf_ids = torch.repeat_interleave(torch.arange(len(leaf_codes), device=device), leaf_counts)
+        sums = torch.zeros((len(leaf_codes), 1 + 3 + 9 + 1 + 3), dtype=torch.float64, device=device)
+        box_min = torch.full((len(leaf_codes), 3), float("inf"), device=device)
+        box_max = torch.full((len(leaf_codes), 3), float("-inf"), device=device)
+        for chunk in torch.split(torch.arange(len(means), device=device), chunk_size):
+            ids = self.order[chunk]
+            s = scales[ids]
+            rotmats = quats_to_rotmats(torch.nn.functional.normalize(quats[ids], dim=-1))
+            covars = ((rotmats * s[:, None, :] ** 2) @ rotmats.transpose(-1, -2)).double()
+            m = means[ids].double() - scene_center
+            # Weigh the gaussians by their opacity and apparent area.
+            sorted_scales = s.sort(dim=-1, descending=True).values
+            area = math.pi * sorted_scales[:, 0] * sorted_scales[:, 1]
+            weights = (opacities[ids] * area).double() + 1e-20
+            second_moments = covars + m[:, :, None] * m[:, None, :]
+            stats = torch.cat(
+                [
+                    weights[:, None],
+                    weights[:, None] * m,
+                    weights[:, None] * second_moments.reshape(-1, 9),
+                    (opacities[ids] * area).double()[:, None],
+                    weights[:, None] * features_dc[ids].double(),
+                ],
+                dim=-1,
+            )
+            sums.index_add_(0, leaf_ids[chunk], stats)
+            box_min.index_reduce_(0, leaf_ids[chunk], means[ids] - extents[ids, None], "amin")
+            box_max.index_reduce_(0, leaf_ids[chunk], means[ids] + extents[ids, None], "amax")
+
+        # Levels from the root (0) to the leaves (max_depth). Nodes are sorted by code, so the children of a node and
+        # the gaussians of a leaf are contiguous.
+        level_codes, level_sums, level_min, level_max = [leaf_codes], [sums], [box_min], [box_max]
+        self.child_starts: List[Tensor] = []
+        for _ in range(max_depth):
+            parent_codes, child_counts = torch.unique_consecutive(level_codes[0] >> 3, return_counts=True)
+            parent_ids = torch.repeat_interleave(torch.arange(len(parent_codes), device=device), child_counts)
+            level_codes.insert(0, parent_codes)
+            level_sums.insert(
+                0, torch.zeros_like(level_sums[0][: len(parent_codes)]).index_add_(0, parent_ids, level_sums[0])
+            )
+            level_min.insert(
+                0,
+                torch.full((len(parent_codes), 3), float("inf"), device=device).index_reduce_(
+                    0, parent_ids, level_min[0], "amin"
+                ),
+            )
+            level_max.insert(
+                0,
+                torch.full((len(parent_codes), 3), float("-inf"), device=device).index_reduce_(
+                    0, parent_ids, level_max[0], "amax"
+                ),
+            )
+            self.child_starts.insert(0, torch.cumsum(child_counts, dim=0) - child_counts)
+            self.child_starts[0] = torch.cat([self.child_starts[0], child_counts.sum()[None]])
+        self.gaussian_starts = torch.cat([torch.cumsum(leaf_counts, dim=0) - leaf_counts, leaf_counts.sum()[None]])
+
+        self.centers = [(lo + hi) / 2 for lo, hi in zip(level_min, level_max)]
+        self.radii = [torch.linalg.norm(hi - lo, dim=-1) / 2 for lo, hi in zip(level_min, level_max)]
+        self.gaussian_radii = extents
+        self.level_offsets = torch.cumsum(torch.tensor([0] + [len(c) for c in level_codes]), dim=0).tolist()
+
+        # Proxies matching the weighted mean and covariance of the gaussians of each node.
+        all_sums = torch.cat(level_sums)
+        weight = all_sums[:, :1]
+        proxy_means = all_sums[:, 1:4] / weight
+        covars = (
+            all_sums[:, 4:13].reshape(-1, 3, 3) / weight[..., None] - proxy_means[:, :, None] * proxy_means[:, None, :]
+        )
+        eigenvalues, eigenvectors = torch.linalg.eigh((covars + covars.transpose(-1, -2)) / 2)
+        # eigh may return a reflection, which has no quaternion.
+        eigenvectors[..., 2] *= torch.linalg.det(eigenvectors)[:, None]
+        proxy_scales = eigenvalues.clamp_min(1e-24).sqrt()
+        sorted_scales = proxy_scales.sort(dim=-1, descending=True).values
+        proxy_area = math.pi * sorted_scales[:, 0] * sorted_scales[:, 1]
+        proxy_opacities = (all_sums[:, 13] / proxy_area.clamp_min(1e-40)).clamp(1e-6, 1 - 1e-6)
+        self.proxy_params: Dict[str, Tensor] = {
+            "means": (proxy_means + scene_center).float(),
+            "scales": proxy_scales.log().float(),
+            "quats": rotmats_to_quats(eigenvectors).float(),
+            "opacities": torch.logit(proxy_opacities).float()[:, None],
+            "features_dc": (all_sums[:, 14:17] / weight).float(),
+        }
+
+    def select(
+        self,
+        viewmat: Float[Tensor, "4 4"],
+        K: Float[Tensor, "3 3"],
+        width: int,
+        height: int,
+        pixel_size: float,
+        near_plane: float = 0.01,
+    ) -> Tuple[Int[Tensor, "G"], Int[Tensor, "P"]]:
+        """Selects the gaussians and proxies to draw for a camera.
+
+        Nodes whose bounding sphere is outside the view frustum are skipped. Nodes whose bounding sphere is narrower
+        than `pixel_size` pixels on screen are drawn as their proxy. The others are refined down to their gaussians.
+
+        Args:
+            viewmat: World to camera transform, with the camera looking down +z.
+            K: Camera intrinsics.
+            width: Width of the image.
+            height: Height of the image.
+            pixel_size: Size on screen in pixels below which nodes are drawn as their proxy. 0 only culls.
+            near_plane: Distance of the near plane.
+
+        Returns:
+            Indices of the gaussians to draw, and of the proxies to draw.
+        """
+        R, t = viewmat[:3, :3], viewmat[:3, 3]
+        fx, fy, cx, cy = K[0, 0], K[1, 1], K[0, 2], K[1, 2]
+        # Slopes of the four side planes of the frustum.
+        slopes = torch.stack([(width - cx) / fx, cx / fx, (height - cy) / fy, cy / fy])
+        plane_norms = torch.sqrt(1 + slopes**2)
+        focal = torch.maximum(fx, fy)
+
+        def visible(centers: Tensor, radii: Tensor) -> Tuple[Tensor, Tensor]:
+            p = centers @ R.T + t
+            x, y, z = p.unbind(-1)
+            outside = z < near_plane - radii
+            outside |= (x - slopes[0] * z) > radii * plane_norms[0]
+            outside |= (-x - slopes[1] * z) > radii * plane_norms[1]
+            outside |= (y - slopes[2] * z) > radii * plane_norms[2]
+            outside |= (-y - slopes[3] * z) > radii * plane_norms[3]
+            return ~outside, z
+
+        proxies = []
+        nodes = torch.arange(len(self.centers[0]), device=viewmat.device)
+        for level in range(self.max_depth + 1):
+            radii = self.radii[level][nodes]
+            inside, z = visible(self.centers[level][nodes], radii)
+            nodes, radii, z = nodes[inside], radii[inside], z[inside]
+            small = (z > radii) & (2 * radii * focal < pixel_size * z)
+            proxies.append(nodes[small] + self.level_offsets[level])
+            nodes = nodes[~small]
+            starts = self.child_starts[level] if level < self.max_depth else self.gaussian_starts
+            counts = starts[nodes + 1] - starts[nodes]
+            owners = torch.repeat_interleave(torch.arange(len(nodes), device=nodes.device), counts)
+            nodes = (
+                torch.arange(int(counts.sum()), device=nodes.device)
+                - (torch.cumsum(counts, 0) - counts)[owners]
+                + starts[nodes][owners]
+            )
+
+        gaussians = self.order[nodes]
+        inside, _ = visible(self.means[gaussians], self.gaussian_radii[gaussians])
+        return gaussians[inside], torch.cat(proxies)
+
+    def gather(
+        self, gauss_params: Dict[str, Tensor], gaussian_ids: Int[Tensor, "G"], proxy_ids: Int[Tensor, "P"]
+    ) -> Dict[str, Tensor]:
+        """Concatenates the parameters of selected gaussians and proxies.
+
+        Args:
+            gauss_params: Parameters of the gaussians, with scales and opacities in log and logit space.
+            gaussian_ids: Gaussians to draw.
+            proxy_ids: Proxies to draw.
+
+        Returns:
+            Parameters of the gaussians followed by the proxies. Parameters that proxies do not have are zero.
+        """
+        params = {}
+        for name, param in gauss_params.items():
+            if name in self.proxy_params:
+                proxy = self.proxy_params[name][proxy_ids].to(param.dtype)
+            else:
+                proxy = param.new_zeros((len(proxy_ids),) + param.shape[1:])
+            params[name] = torch.cat([param[gaussian_ids], proxy])
+        return params
@@ -0,0 +1,386 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Gaussian splat rasterization in pure PyTorch, for rendering without CUDA.
+
+It follows the conventions of `gsplat.rasterization`: the same projection, spherical harmonics, tiling and alpha
+compositing, so that images match the CUDA rasterizer up to floating point differences. It is forward only.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Literal, Optional, Tuple
+
+import torch
+from jaxtyping import Float, Int
+from torch import Tensor
+
+SH_C0 = 0.28209479177387814
+SH_C1 = 0.4886025119029199
+SH_C2 = (1.0925484305920792, -1.0925484305920792, 0.31539156525252005, -1.0925484305920792, 0.5462742152960396)
+SH_C3 = (
+    -0.5900435899266435,
+    2.890611442640554,
+    -0.4570457994644658,
+    0.3731763325901154,
+    -0.4570457994644658,
+    1.445305721320277,
+    -0.5900435899266435,
+)
+
+
+def spherical_harmonics(
+    degree: int, dirs: Float[Tensor, "*bs 3"], coeffs: Float[Tensor, "*bs K 3"]
+) -> Float[Tensor, "*bs 3"]:
+    """Evaluates real spherical harmonics of up to degree 3.
+
+    Args:
+        degree: Degree of the harmonics to use. Only the first (degree + 1) ** 2 coefficients are read.
+        dirs: Viewing directions, not necessarily normalized.
+        coeffs: Coefficients of the harmonics.
+
+    Returns:
+        Values of the harmonics.
+    """
+    if not 0 <= degree <= 3:
+        raise ValueError(f"Spherical harmonics of degree {degree} are not supported, only up to 3")
+    if coeffs.shape[-2] < (degree + 1) ** 2:
+        raise ValueError(f"Degree {degree} needs {(degree + 1) ** 2} coefficients, got {coeffs.shape[-2]}")
+    bases = [torch.full_like(dirs[..., 0], SH_C0)]
+    if degree > 0:
+        x, y, z = torch.nn.functional.normalize(dirs, dim=-1).unbind(-1)
+        bases += [-SH_C1 * y, SH_C1 * z, -SH_C1 * x]
+        if degree > 1:
+            xx, yy, zz = x * x, y * y, z * z
+            bases += [
+                SH_C2[0] * x * y,
+                SH_C2[1] * y * z,
+                SH_C2[2] * (2 * zz - xx - yy),
+                SH_C2[3] * x * z,
+                SH_C2[4] * (xx - yy),
+            ]
+            if degree > 2:
+                bases += [
+                    SH_C3[0] * y * (3 * xx - yy),
+                    SH_C3[1] * x * y * z,
+                    SH_C3[2] * y * (4 * zz - xx - yy),
+                    SH_C3[3] * z * (2 * zz - 3 * xx - 3 * yy),
+                    SH_C3[4] * x * (4 * zz - xx - yy),
+                    SH_C3[5] * z * (xx - yy),
+                    SH_C3[6] * x * (xx - 3 * yy),
+                ]
+    return (torch.stack(bases, dim=-1)[..., None] * coeffs[..., : len(bases), :]).sum(dim=-2)
+
+
+def quats_to_rotmats(quats: Float[Tensor, "*bs 4"]) -> Float[Tensor, "*bs 3 3"]:
+    """Converts normalized quaternions, in wxyz order, to rotation matrices."""
+    w, x, y, z = quats.unbind(-1)
+    rotmats = torch.stack(
+        [
+            1 - 2 * (y * y + z * z),
+            2 * (x * y - w * z),
+            2 * (x * z + w * y),
+            2 * (x * y + w * z),
+            1 - 2 * (x * x + z * z),
+            2 * (y * z - w * x),
+            2 * (x * z - w * y),
+            2 * (y * z + w * x),
+            1 - 2 * (x * x + y * y),
+        ],
+        dim=-1,
+    )
+    return rotmats.reshape(quats.shape[:-1] + (3, 3))
+
+
+def project_gaussians(
+    means: Float[Tensor, "N 3"],
+    covars: Float[Tensor, "N 3 3"],
+    viewmat: Float[Tensor, "4 4"],
+    K: Float[Tensor, "3 3"],
+    width: int,
+    height: int,
+    eps2d: float = 0.3,
+    near_plane: float = 0.01,
+    far_plane: float = 1e10,
+) -> Tuple[Float[Tensor, "N 2"], Float[Tensor, "N 3"], Float[Tensor, "N"], Int[Tensor, "N"], Float[Tensor, "N"]]:
+    """Projects 3D gaussians to the image plane of a pinhole camera.
+
+    Args:
+        means: Centers of the gaussians.
+        covars: Covariances of the gaussians.
+        viewmat: World to camera transform.
+        K: Camera intrinsics.
+        width: Width of the image.
+        height: Height of the image.
+        eps2d: Variance added to the projected covariances, to cover at least a pixel.
+        near_plane: Gaussians closer than this are culled.
+        far_plane: Gaussians farther than this are culled.
+
+    Returns:
+        Projected centers, inverse 2D covariances as (xx, xy, yy), depths, radii in pixels (0 for culled gaussians),
+        and the ratio of the determinants of the covariances before and after adding eps2d.
+    """
+    R, t = viewmat[:3, :3], viewmat[:3, 3]
+    means_c = means @ R.T + t
+    covars_c = R @ covars @ R.T
+    fx, fy, cx, cy = K[0, 0], K[1, 1], K[0, 2], K[1, 2]
+    tx, ty, tz = means_c.unbind(-1)
+
+    # Clamp the points far outside the image so that their Jacobian stays bounded.
+    tan_fovx, tan_fovy = 0.5 * width / fx, 0.5 * height / fy
+    clamped_x = tz * torch.clamp(tx / tz, min=-(cx / fx + 0.3 * tan_fovx), max=(width - cx) / fx + 0.3 * tan_fovx)
+    clamped_y = tz * torch.clamp(ty / tz, min=-(cy / fy + 0.3 * tan_fovy), max=(height - cy) / fy + 0.3 * tan_fovy)
+    zeros = torch.zeros_like(tz)
+    J = torch.stack([fx / tz, zeros, -fx * clamped_x / tz**2, zeros, fy / tz, -fy * clamped_y / tz**2], dim=-1).reshape(
+        -1, 2, 3
+    )
+    covars2d = J @ covars_c @ J.transpose(-1, -2)
+    means2d = torch.stack([fx * tx / tz + cx, fy * ty / tz + cy], dim=-1)
+
+    a, b, c = covars2d[:, 0, 0], covars2d[:, 0, 1], covars2d[:, 1, 1]
+    det_orig = a * c - b * b
+    a, c = a + eps2d, c + eps2d
+    det = a * c - b * b
+    compensations = torch.sqrt(torch.clamp(det_orig / det.clamp_min(1e-10), min=0))
+    conics = torch.stack([c, -b, a], dim=-1) / det.clamp_min(1e-10)[:, None]
+
+    # Three standard deviations along the major axis.
+    mid = 0.5 * (a + c)
+    radii = torch.ceil(3 * torch.sqrt(mid + torch.sqrt(torch.clamp(mid * mid - det, min=0.01)))).int()
+    valid = (det > 0) & (tz > near_plane) & (tz < far_plane)
+    valid &= (means2d[:, 0] + radii > 0) & (means2d[:, 0] - radii < width)
+    valid &= (means2d[:, 1] + radii > 0) & (means2d[:, 1] - radii < height)
+    radii = torch.where(valid, radii, 0)
+    return means2d, conics, tz, radii, compensations
+
+
+def _intersect_tiles(
+    means2d: Float[Tensor, "N 2"],
+    radii: Int[Tensor, "N"],
+    depths: Float[Tensor, "N"],
+    tile_size: int,
+    tiles_x: int,
+    tiles_y: int,
+) -> Tuple[Int[Tensor, "M"], Int[Tensor, "M"]]:
+    """Lists the tiles touched by the bounding square of every visible gaussian, sorted by tile then depth.
+
+    Returns:
+        Tile of every intersection, and its gaussian.
+    """
+    visible = torch.where(radii > 0)[0]
+    visible = visible[torch.argsort(depths[visible])]
+    centers = means2d[visible] / tile_size
+    tile_radii = (radii[visible] / tile_size)[:, None]
+    limits = torch.tensor([tiles_x, tiles_y], device=means2d.device)
+    tile_min = torch.minimum(torch.floor(centers - tile_radii).clamp_min(0).long(), limits)
+    tile_max = torch.minimum(torch.ceil(centers + tile_radii).clamp_min(0).long(), limits)
+    extents = tile_max - tile_min
+    counts = extents[:, 0] * extents[:, 1]
+
+    gaussian_ids = torch.repeat_interleave(visible, counts)
+    owner = torch.repeat_interleave(torch.arange(len(visible), device=means2d.device), counts)
+    local = torch.arange(len(owner), device=means2d.device) - (torch.cumsum(counts, dim=0) - counts)[owner]
+    tile_x = tile_min[owner, 0] + local % extents[owner, 0]
+    tile_y = tile_min[owner, 1] + torch.div(local, extents[owner, 0], rounding_mode="floor")
+    tile_ids = tile_y * tiles_x + tile_x
+    # The gaussians are already in depth order, so a stable sort by tile keeps them sorted within each tile.
+    tile_ids, order = torch.sort(tile_ids, stable=True)
+    return tile_ids, gaussian_ids[order]
+
+
+def rasterize_to_pixels(
+    means2d: Float[Tensor, "N 2"],
+    conics: Float[Tensor, "N 3"],
+    colors: Float[Tensor, "N D"],
+    opacities: Float[Tensor, "N"],
+    tile_ids: Int[Tensor, "M"],
+    gaussian_ids: Int[Tensor, "M"],
+    width: int,
+    height: int,
+    tile_size: int = 16,
+    chunk_size: int = 64,
+    max_elements: int = 1 << 22,
+) -> Tuple[Float[Tensor, "H W D"], Float[Tensor, "H W 1"]]:
+    """Alpha composites the gaussians intersecting each tile, front to back.
+
+    Tiles with similar numbers of gaussians are processed together, `chunk_size` gaussians of each tile at a time,
+    until all their pixels are opaque.
+
+    Args:
+        means2d: Projected centers of the gaussians.
+        conics: Inverse 2D covariances of the gaussians, as (xx, xy, yy).
+        colors: Values to composite.
+        opacities: Opacities of the gaussians.
+        tile_ids: Tile of every intersection, sorted.
+        gaussian_ids: Gaussian of every intersection, in depth order within a tile.
+        width: Width of the image.
+        height: Height of the image.
+        tile_size: Size of the tiles in pixels.
+        chunk_size: Number of gaussians of each tile evaluated at once.
+        max_elements: Maximum number of pixel-gaussian pairs evaluated at once, bounding memory use.
+
+    Returns:
+        Composited values, and the total opacity of every pixel.
+    """
+    device = means2d.device
+    tiles_x, tiles_y = -(-width // tile_size), -(-height // tile_size)
+    num_tiles = tiles_x * tiles_y
+    num_pixels = tile_size * tile_size
+    render = torch.zeros((num_tiles, num_pixels, colors.shape[-1]), device=device)
+    transmittance = torch.ones((num_tiles, num_pixels), device=device)
+
+    tile_counts = torch.bincount(tile_ids, minlength=num_tiles)
+    tile_starts = torch.cumsum(tile_counts, dim=0) - tile_counts
+    pixel_y, pixel_x = torch.meshgrid(
+        torch.arange(tile_size, device=device), torch.arange(tile_size, device=device), indexing="ij"
+    )
+    pixel_offsets = torch.stack([pixel_x, pixel_y], dim=-1).reshape(-1, 2) + 0.5
+    tile_origins = (
+        torch.stack(
+            [
+                torch.arange(num_tiles, device=device) % tiles_x,
+                torch.div(torch.arange(num_tiles, device=device), tiles_x, rounding_mode="floor"),
+            ],
+            dim=-1,
+        )
+        * tile_size
+    )
+
+    busy_tiles = torch.where(tile_counts > 0)[0]
+    busy_tiles = busy_tiles[torch.argsort(tile_counts[busy_tiles])]
+    half_conics = conics * torch.tensor([0.5, 1.0, 0.5], device=device)
+    batch_size = max(1, max_elements // (num_pixels * chunk_size))
+    for tiles in torch.split(busy_tiles, batch_size):
+        pixels = tile_origins[tiles][:, :, None, None] + pixel_offsets.T[None, :, :, None]  # [B, 2, P, 1]
+        counts, starts = tile_counts[tiles], tile_starts[tiles]
+        T = torch.ones((len(tiles), num_pixels), device=device)
+        done = torch.zeros((len(tiles), num_pixels), dtype=torch.bool, device=device)
+        accumulated = torch.zeros((len(tiles), num_pixels, colors.shape[-1]), device=device)
+        for offset in range(0, int(counts.max()), chunk_size):
+            slots = offset + torch.arange(chunk_size, device=device)
+            in_tile = slots < counts[:, None]  # [B, G]
+            ids = gaussian_ids[(starts[:, None] + slots).clamp_max(len(gaussian_ids) - 1)]
+            dx = means2d[ids, 0][:, None, :] - pixels[:, 0]  # [B, P, G]
+            dy = means2d[ids, 1][:, None, :] - pixels[:, 1]
+            conic = half_conics[ids][:, None]
+            sigma = (dx * dx).mul_(conic[..., 0]).addcmul_(dy * dy, conic[..., 2]).addcmul_(dx * dy, conic[..., 1])
+            alpha = torch.exp(-sigma).mul_(opacities[ids][:, None]).clamp_max_(0.999)
+            alpha.masked_fill_((sigma < 0) | (alpha < 1 / 255) | ~in_tile[:, None], 0)
+
+            # A pixel stops at the first gaussian that would bring its transmittance to 1e-4 or below. Transmittance
+            # only decreases, so the accepted gaussians of a pixel are a prefix of its list.
+            one_minus_alpha = 1 - alpha
+            T_after = torch.cumprod(one_minus_alpha, dim=-1).mul_(T[..., None])
+            weights = (T_after / one_minus_alpha).mul_(alpha)
+            weights.masked_fill_((T_after <= 1e-4) | done[..., None], 0)
+            accumulated += torch.einsum("bpg,bgd->bpd", weights, colors[ids])
+            # The weights are the decrements of the transmittance.
+            T = T - weights.sum(dim=-1)
+            done |= T_after[..., -1] <= 1e-4
+            if bool(done.all()):
+                break
+        render[tiles] = accumulated
+        transmittance[tiles] = T
+
+    def untile(values: Tensor) -> Tensor:
+        values = values.reshape(tiles_y, tiles_x, tile_size, tile_size, -1).permute(0, 2, 1, 3, 4)
+        return values.reshape(tiles_y * tile_size, tiles_x * tile_size, -1)[:height, :width]
+
+    return untile(render), untile(1 - transmittance)
+
+
+@torch.no_grad()
+def rasterization_torch(
+    means: Float[Tensor, "N 3"],
+    quats: Float[Tensor, "N 4"],
+    scales: Float[Tensor, "N 3"],
+    opacities: Float[Tensor, "N"],
+    colors: Tensor,
+    viewmats: Float[Tensor, "C 4 4"],
+    Ks: Float[Tensor, "C 3 3"],
+    width: int,
+    height: int,
+    near_plane: float = 0.01,
+    far_plane: float = 1e10,
+    eps2d: float = 0.3,
+    sh_degree: Optional[int] = None,
+    tile_size: int = 16,
+    render_mode: Literal["RGB", "D", "ED", "RGB+D", "RGB+ED"] = "RGB",
+    rasterize_mode: Literal["classic", "antialiased"] = "classic",
+    **kwargs,
+) -> Tuple[Float[Tensor, "C H W D"], Float[Tensor, "C H W 1"], Dict[str, Tensor]]:
+    """Renders gaussians like `gsplat.rasterization`, with PyTorch operations on any device.
+
+    Arguments and outputs follow `gsplat.rasterization`. Arguments that only affect gradients or speed, such as
+    `packed` or `absgrad`, are accepted and ignored.
+
+    Args:
+        means: Centers of the gaussians.
+        quats: Normalized rotations of the gaussians, in wxyz order.
+        scales: Scales of the gaussians.
+        opacities: Opacities of the gaussians.
+        colors: Colors [N, D], or spherical harmonics coefficients [N, K, 3] if `sh_degree` is set.
+        viewmats: World to camera transforms.
+        Ks: Camera intrinsics.
+        width: Width of the images.
+        height: Height of the images.
+        near_plane: Gaussians closer than this are culled.
+        far_plane: Gaussians farther than this are culled.
+        eps2d: Variance added to the projected covariances.
+        sh_degree: Degree of the spherical harmonics, or None if `colors` are plain values.
+        tile_size: Size of the tiles in pixels.
+        render_mode: Values to render. "D" is the accumulated depth and "ED" the expected depth.
+        rasterize_mode: "antialiased" scales the opacities to compensate for eps2d.
+
+    Returns:
+        Rendered images, their total opacities, and the projected centers and radii as "means2d" and "radii".
+    """
+    if render_mode not in ["RGB", "D", "ED", "RGB+D", "RGB+ED"]:
+        raise ValueError(f"Unknown render_mode {render_mode}")
+    if rasterize_mode not in ["classic", "antialiased"]:
+        raise ValueError(f"Unknown rasterize_mode {rasterize_mode}")
+    rotmats = quats_to_rotmats(quats)
+    M = rotmats * scales[:, None, :]
+    covars = M @ M.transpose(-1, -2)
+
+    renders, alphas, all_means2d, all_radii = [], [], [], []
+    for viewmat, K in zip(viewmats, Ks):
+        means2d, conics, depths, radii, compensations = project_gaussians(
+            means, covars, viewmat, K, width, height, eps2d, near_plane, far_plane
+        )
+        if sh_degree is None:
+            values = colors
+        else:
+            campos = torch.linalg.inv(viewmat)[:3, 3]
+            values = torch.clamp_min(spherical_harmonics(sh_degree, means - campos, colors) + 0.5, 0)
+        if render_mode in ["D", "ED"]:
+            values = depths[:, None]
+        elif render_mode in ["RGB+D", "RGB+ED"]:
+            values = torch.cat([values, depths[:, None]], dim=-1)
+        view_opacities = opacities * compensations if rasterize_mode == "antialiased" else opacities
+
+        tiles_x, tiles_y = -(-width // tile_size), -(-height // tile_size)
+        tile_ids, gaussian_ids = _intersect_tiles(means2d, radii, depths, tile_size, tiles_x, tiles_y)
+        render, alpha = rasterize_to_pixels(
+            means2d, conics, values.float(), view_opacities, tile_ids, gaussian_ids, width, height, tile_size
+        )
+        if render_mode in ["ED", "RGB+ED"]:
+            render = torch.cat([render[..., :-1], render[..., -1:] / alpha.clamp_min(1e-10)], dim=-1)
+        renders.append(render)
+        alphas.append(alpha)
+        all_means2d.append(means2d)
+        all_radii.append(radii)
+    info = {"means2d": torch.stack(all_means2d), "radii": torch.stack(all_radii)}
+    return torch.stack(renders), torch.stack(alphas), info
@@ -19,9 +19,8 @@ Base Model implementation which takes in RayBundles or Cameras
 from __future__ import annotations
 
 from abc import abstractmethod
-from collections import defaultdict
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
 
 import torch
 from torch import nn
@@ -36,6 +35,20 @@ from nerfstudio.engine.callbacks import TrainingCallback, TrainingCallbackAttrib
 from nerfstudio.model_components.scene_colliders import NearFarCollider
 
 
+def _cat_ray_bundles(ray_bundles: List[RayBundle]) -> RayBundle:
+    """Concatenates flattened ray bundles that have the same fields set."""
+    if len(ray_bundles) == 1:
+        return ray_bundles[0]
+    values = {}
+    for f in fields(RayBundle):
+        field_values = [getattr(ray_bundle, f.name) for ray_bundle in ray_bundles]
+        if isinstance(field_values[0], dict):
+            values[f.name] = {key: torch.cat([value[key] for value in field_values]) for key in field_values[0]}
+        elif field_values[0] is not None:
+            values[f.name] = torch.cat(field_values)
+    return RayBundle(**values)
+
+
 # Model related configs
 @dataclass
 class ModelConfig(InstantiateConfig):
@@ -51,6 +64,8 @@ class ModelConfig(InstantiateConfig):
     """parameters to instantiate density field with"""
     eval_num_rays_per_chunk: int = 4096
     """specifies number of rays per chunk during eval"""
+    eval_num_images_per_batch: int = 8
+    """number of images whose rays are packed into shared chunks when evaluating all images"""
     prompt: Optional[str] = None
     """A prompt to be used in text to NeRF models"""
 
@@ -174,6 +189,32 @@ class Model(nn.Module):
             camera.generate_rays(camera_indices=0, keep_shape=True, obb_box=obb_box)
         )
 
+    @torch.no_grad()
+    def get_outputs_for_cameras(
+        self, cameras: Sequence[Cameras], obb_box: Optional[OrientedBox] = None
+    ) -> List[Dict[str, torch.Tensor]]:
+        """Computes the outputs of the model for several cameras at once.
+
+        Ray-based models pack the rays of all the cameras into full chunks, which avoids half-empty chunks at the
+        end of every image. Models that override :meth:`get_outputs_for_camera` or
+        :meth:`get_outputs_for_camera_ray_bundle` render the cameras one at a time.
+
+        Args:
+            cameras: Cameras to render, each with a single camera as for :meth:`get_outputs_for_camera`.
+            obb_box: Optional oriented box to crop the renders to.
+
+        Returns:
+            The outputs of every camera, in order.
+        """
+        if (
+            type(self).get_outputs_for_camera is not Model.get_outputs_for_camera
+            or type(self).get_outputs_for_camera_ray_bundle is not Model.get_outputs_for_camera_ray_bundle
+        ):
+            return [self.get_outputs_for_camera(camera, obb_box=obb_box) for camera in cameras]
+        return self.get_outputs_for_camera_ray_bundles(
+            [camera.generate_rays(camera_indices=0, keep_shape=True, obb_box=obb_box) for camera in cameras]
+        )
+
     @torch.no_grad()
     def get_outputs_for_camera_ray_bundle(self, camera_ray_bundle: RayBundle) -> Dict[str, torch.Tensor]:
         """Takes in camera parameters and computes the output of the model.
@@ -181,28 +222,64 @@ class Model(nn.Module):
         Args:
             camera_ray_bundle: ray bundle to calculate outputs over
         """
-        input_device = camera_ray_bundle.directions.device
+        return self.get_outputs_for_camera_ray_bundles([camera_ray_bundle])[0]
+
+    @torch.no_grad()
+    def get_outputs_for_camera_ray_bundles(
+        self, camera_ray_bundles: Sequence[RayBundle]
+    ) -> List[Dict[str, torch.Tensor]]:
+        """Computes the outputs of the model for several ray bundles, packing their rays into shared chunks.
+
+        The outputs of a bundle are gathered on the model device and moved to the device of the bundle once it is
+        complete. Outputs that are not tensors are dropped.
+
+        Args:
+            camera_ray_bundles: ray bundles to calculate outputs over
+
+        Returns:
+            The outputs of every bundle, in order, shaped like the bundle with an extra channel dimension.
+        """
         num_rays_per_chunk = self.config.eval_num_rays_per_chunk
-        image_height, image_width = camera_ray_bundle.origins.shape[:2]
-        num_rays = len(camera_ray_bundle)
-        outputs_lists = defaultdict(list)
-        for i in range(0, num_rays, num_rays_per_chunk):
-            start_idx = i
-            end_idx = i + num_rays_per_chunk
-            ray_bundle = camera_ray_bundle.get_row_major_sliced_ray_bundle(start_idx, end_idx)
+        flat_bundles = [camera_ray_bundle.flatten() for camera_ray_bundle in camera_ray_bundles]
+        results: List[Dict[str, torch.Tensor]] = [{} for _ in camera_ray_bundles]
+        buffers: Dict[int, Dict[str, torch.Tensor]] = {}
+        bundle_idx, bundle_start = 0, 0
+        while bundle_idx < len(flat_bundles):
+            # Fill the chunk with the remaining rays of the current bundle and the first rays of the next ones.
+            pieces = []
+            num_chunk_rays = 0
+            while bundle_idx < len(flat_bundles) and num_chunk_rays < num_rays_per_chunk:
+                bundle_end = min(len(flat_bundles[bundle_idx]), bundle_start + num_rays_per_chunk - num_chunk_rays)
+                if bundle_end > bundle_start:
+                    pieces.append((bundle_idx, bundle_start, bundle_end))
+                num_chunk_rays += bundle_end - bundle_start
+                if bundle_end == len(flat_bundles[bundle_idx]):
+                    bundle_idx, bundle_start = bundle_idx + 1, 0
+                else:
+                    bundle_start = bundle_end
+            if num_chunk_rays == 0:
+                continue
             # move the chunk inputs to the model device
-            ray_bundle = ray_bundle.to(self.device)
-            outputs = self.forward(ray_bundle=ray_bundle)
-            for output_name, output in outputs.items():  # type: ignore
-                if not isinstance(output, torch.Tensor):
-                    # TODO: handle lists of tensors as well
-                    continue
-                # move the chunk outputs from the model device back to the device of the inputs.
-                outputs_lists[output_name].append(output.to(input_device))
-        outputs = {}
-        for output_name, outputs_list in outputs_lists.items():
-            outputs[output_name] = torch.cat(outputs_list).view(image_height, image_width, -1)  # type: ignore
-        return outputs
+            ray_bundle = _cat_ray_bundles([flat_bundles[idx][start:end] for idx, start, end in pieces])
+            outputs = self.forward(ray_bundle=ray_bundle.to(self.device))
+            offset = 0
+            for idx, start, end in pieces:
+                bundle_buffers = buffers.setdefault(idx, {})
+                for output_name, output in outputs.items():  # type: ignore
+                    if not isinstance(output, torch.Tensor):
+                        # TODO: handle lists of tensors as well
+                        continue
+                    if output_name not in bundle_buffers:
+                        bundle_buffers[output_name] = output.new_empty((len(flat_bundles[idx]), *output.shape[1:]))
+                    bundle_buffers[output_name][start:end] = output[offset : offset + end - start]
+                offset += end - start
+                if end == len(flat_bundles[idx]):
+                    # move the outputs of the completed bundle from the model device back to the device of the inputs.
+                    camera_ray_bundle = camera_ray_bundles[idx]
+                    input_device = camera_ray_bundle.directions.device
+                    for output_name, output in buffers.pop(idx).items():
+                        results[idx][output_name] = output.to(input_device).view(*camera_ray_bundle.shape, -1)
+        return results
 
     def get_rgba_image(self, outputs: Dict[str, torch.Tensor], output_name: str = "rgb") -> torch.Tensor:
         """Returns the RGBA image from the outputs of the model.
@@ -23,7 +23,6 @@ import math
 from dataclasses import dataclass, field
 from typing import Dict, List, Literal, Optional, Tuple, Type, Union
 
-import numpy as np
 import torch
 from gsplat.cuda_legacy._torch_impl import quat_to_rotmat
 
@@ -40,7 +39,12 @@ from nerfstudio.cameras.cameras import Cameras
 from nerfstudio.data.scene_box import OrientedBox
 from nerfstudio.engine.callbacks import TrainingCallback, TrainingCallbackAttributes, TrainingCallbackLocation
 from nerfstudio.engine.optimizers import Optimizers
+from nerfstudio.model_components.gaussian_storage import GaussianStorage
+from nerfstudio.model_components.knn import KNNBackend, k_nearest
 from nerfstudio.model_components.lib_bilagrid import BilateralGrid, color_correct, slice, total_variation_loss
+from nerfstudio.model_components.splat_compression import COMPRESSED_PREFIX, decompress_gaussians
+from nerfstudio.model_components.splat_lod import GaussianLOD
+from nerfstudio.model_components.torch_rasterizer import rasterization_torch
 from nerfstudio.models.base_model import Model, ModelConfig
 from nerfstudio.utils.colors import get_color
 from nerfstudio.utils.misc import torch_compile
@@ -159,6 +163,13 @@ class SplatfactoModelConfig(ModelConfig):
     """Number of gaussians to initialize if random init is used"""
     random_scale: float = 10.0
     "Size of the cube to initialize random gaussians within"
+    knn_backend: KNNBackend = "auto"
+    """Nearest neighbour search used to initialize the gaussian scales. "grid" runs on the GPU when available, "tree"
+    on all CPU cores, and "auto" picks "grid" when a GPU is available."""
+    storage_growth_factor: float = 1.5
+    """Capacity of the gaussian buffers relative to the number of gaussians when they are reallocated"""
+    storage_shrink_threshold: float = 0.5
+    """Fraction of the gaussian buffers in use below which they are reallocated to release memory"""
     ssim_lambda: float = 0.2
     """weight of ssim loss"""
     stop_split_at: int = 15000
@@ -183,6 +194,18 @@ class SplatfactoModelConfig(ModelConfig):
     However, PLY exported with antialiased rasterize mode is not compatible with classic mode. Thus many web viewers that
     were implemented for classic mode can not render antialiased mode PLY properly without modifications.
     """
+    rasterizer: Literal["auto", "gsplat", "torch"] = "auto"
+    """Rasterizer to render with. "gsplat" needs CUDA. "torch" runs on any device but only renders, it can not train.
+    "auto" uses gsplat when CUDA is available and torch otherwise."""
+    use_lod: bool = False
+    """Whether to render with an octree over the gaussians outside of training, skipping gaussians outside the view
+    frustum and drawing distant clusters of gaussians as a single merged gaussian. Speeds up rendering large scenes in
+    the viewer and ns-render, at the cost of detail in the distance. The octree is rebuilt whenever the training step
+    changes, so it pays off for trained scenes."""
+    lod_pixel_size: float = 2.0
+    """Size in pixels on screen below which a cluster of gaussians is drawn merged. 0 only culls to the frustum."""
+    lod_max_depth: int = 10
+    """Depth of the level of detail octree."""
     camera_optimizer: CameraOptimizerConfig = field(default_factory=lambda: CameraOptimizerConfig(mode="off"))
     """Config of the camera optimizer to use"""
     use_bilateral_grid: bool = False
@@ -218,8 +241,12 @@ class SplatfactoModel(Model):
             means = torch.nn.Parameter((torch.rand((self.config.num_random, 3)) - 0.5) * self.config.random_scale)
         self.xys_grad_norm = None
         self.max_2Dsize = None
-        distances, _ = self.k_nearest_sklearn(means.data, 3)
-        distances = torch.from_numpy(distances)
+        self.storage = GaussianStorage(self.config.storage_growth_factor, self.config.storage_shrink_threshold)
+        knn_points = means.data
+        if self.config.knn_backend != "tree" and torch.cuda.is_available():
+            knn_points = knn_points.cuda()
+        distances, _ = k_nearest(knn_points, 3, backend=self.config.knn_backend)
+        distances = distances.to(means.device)
         # find the average of the three nearest neighbors for each point and use that as the scale
         avg_dist = distances.mean(dim=-1, keepdim=True)
         scales = torch.nn.Parameter(torch.log(avg_dist.repeat(1, 3)))
@@ -233,7 +260,7 @@ class SplatfactoModel(Model):
             # We can have colors without points.
             and self.seed_points[1].shape[0] > 0
         ):
-            shs = torch.zeros((self.seed_points[1].shape[0], dim_sh, 3)).float().cuda()
+            shs = torch.zeros((self.seed_points[1].shape[0], dim_sh, 3)).float()
             if self.config.sh_degree > 0:
                 shs[:, 0, :3] = RGB2SH(self.seed_points[1] / 255)
                 shs[:, 1:, 3:] = 0.0
@@ -270,6 +297,8 @@ class SplatfactoModel(Model):
         self.ssim = SSIM(data_range=1.0, size_average=True, channel=3)
         self.lpips = LearnedPerceptualImagePatchSimilarity(normalize=True)
         self.step = 0
+        self._lod: Optional[GaussianLOD] = None
+        self._lod_key: Optional[Tuple[int, int]] = None
 
         self.crop_box: Optional[OrientedBox] = None
         if self.config.background_color == "random":
@@ -332,11 +361,20 @@ class SplatfactoModel(Model):
     def load_state_dict(self, dict, **kwargs):  # type: ignore
         # resize the parameters to match the new number of points
         self.step = 30000
+        self._lod = None
         if "means" in dict:
             # For backwards compatibility, we remap the names of parameters from
             # means->gauss_params.means since old checkpoints have that format
             for p in ["means", "scales", "quats", "features_dc", "features_rest", "opacities"]:
                 dict[f"gauss_params.{p}"] = dict[p]
+        if any(key.startswith(COMPRESSED_PREFIX) for key in dict):
+            # Checkpoints exported by ns-export compressed-gaussian-splat store quantized gaussians
+            compressed = {
+                key[len(COMPRESSED_PREFIX) :]: value for key, value in dict.items() if key.startswith(COMPRESSED_PREFIX)
+            }
+            dict = {key: value for key, value in dict.items() if not key.startswith(COMPRESSED_PREFIX)}
+            for name, value in decompress_gaussians(compressed).items():
+                dict[f"gauss_params.{name}"] = value
         newp = dict["gauss_params.means"].shape[0]
         for name, param in self.gauss_params.items():
             old_shape = param.shape
@@ -344,27 +382,7 @@ class SplatfactoModel(Model):
             self.gauss_params[name] = torch.nn.Parameter(torch.zeros(new_shape, device=self.device))
         super().load_state_dict(dict, **kwargs)
 
-    def k_nearest_sklearn(self, x: torch.Tensor, k: int):
-        """
-            Find k-nearest neighbors using sklearn's NearestNeighbors.
-        x: The data tensor of shape [num_samples, num_features]
-        k: The number of neighbors to retrieve
-        """
-        # Convert tensor to numpy array
-        x_np = x.cpu().numpy()
-
-        # Build the nearest neighbors model
-        from sklearn.neighbors import NearestNeighbors
-
-        nn_model = NearestNeighbors(n_neighbors=k + 1, algorithm="auto", metric="euclidean").fit(x_np)
-
-        # Find the k-nearest neighbors
-        distances, indices = nn_model.kneighbors(x_np)
-
-        # Exclude the point itself from the result and return
-        return distances[:, 1:].astype(np.float32), indices[:, 1:].astype(np.float32)
-
-    def remove_from_optim(self, optimizer, deleted_mask, new_params):
+    def remove_from_optim(self, optimizer, deleted_mask, new_params, name=None):
         """removes the deleted_mask from the optimizer provided"""
         assert len(new_params) == 1
         # assert isinstance(optimizer, torch.optim.Adam), "Only works with Adam"
@@ -373,10 +391,10 @@ class SplatfactoModel(Model):
         param_state = optimizer.state[param]
         del optimizer.state[param]
 
-        # Modify the state directly without deleting and reassigning.
+        # Modify the state in place, the same way as the parameters, so that its rows stay aligned with them.
         if "exp_avg" in param_state:
-            param_state["exp_avg"] = param_state["exp_avg"][~deleted_mask]
-            param_state["exp_avg_sq"] = param_state["exp_avg_sq"][~deleted_mask]
+            for key in ["exp_avg", "exp_avg_sq"]:
+                param_state[key] = self.storage.remove((name, key), param_state[key], deleted_mask)
 
         # Update the parameter in the optimizer's param group.
         del optimizer.param_groups[0]["params"][0]
@@ -387,29 +405,19 @@ class SplatfactoModel(Model):
     def remove_from_all_optim(self, optimizers, deleted_mask):
         param_groups = self.get_gaussian_param_groups()
         for group, param in param_groups.items():
-            self.remove_from_optim(optimizers.optimizers[group], deleted_mask, param)
+            self.remove_from_optim(optimizers.optimizers[group], deleted_mask, param, group)
         torch.cuda.empty_cache()
 
-    def dup_in_optim(self, optimizer, dup_mask, new_params, n=2):
+    def dup_in_optim(self, optimizer, dup_mask, new_params, n=2, name=None):
         """adds the parameters to the optimizer"""
         param = optimizer.param_groups[0]["params"][0]
         param_state = optimizer.state[param]
         if "exp_avg" in param_state:
-            repeat_dims = (n,) + tuple(1 for _ in range(param_state["exp_avg"].dim() - 1))
-            param_state["exp_avg"] = torch.cat(
-                [
-                    param_state["exp_avg"],
-                    torch.zeros_like(param_state["exp_avg"][dup_mask.squeeze()]).repeat(*repeat_dims),
-                ],
-                dim=0,
-            )
-            param_state["exp_avg_sq"] = torch.cat(
-                [
-                    param_state["exp_avg_sq"],
-                    torch.zeros_like(param_state["exp_avg_sq"][dup_mask.squeeze()]).repeat(*repeat_dims),
-                ],
-                dim=0,
-            )
+            num_dups = int(dup_mask.sum()) if dup_mask.dtype == torch.bool else dup_mask.numel()
+            for key in ["exp_avg", "exp_avg_sq"]:
+                state = param_state[key]
+                zeros = torch.zeros((n * num_dups,) + state.shape[1:], dtype=state.dtype, device=state.device)
+                param_state[key] = self.storage.append((name, key), state, zeros)
         del optimizer.state[param]
         optimizer.state[new_params[0]] = param_state
         optimizer.param_groups[0]["params"] = new_params
@@ -418,7 +426,7 @@ class SplatfactoModel(Model):
     def dup_in_all_optim(self, optimizers, dup_mask, n):
         param_groups = self.get_gaussian_param_groups()
         for group, param in param_groups.items():
-            self.dup_in_optim(optimizers.optimizers[group], dup_mask, param, n)
+            self.dup_in_optim(optimizers.optimizers[group], dup_mask, param, n, group)
 
     def after_train(self, step: int):
         assert step == self.step
@@ -445,6 +453,22 @@ class SplatfactoModel(Model):
                 newradii / float(max(self.last_size[0], self.last_size[1])),
             )
 
+    @torch.no_grad()
+    def _get_lod(self) -> GaussianLOD:
+        """Returns the level of detail octree, rebuilding it when the gaussians have changed since it was built."""
+        key = (self.step, self.num_points)
+        if self._lod is None or self._lod_key != key:
+            self._lod = GaussianLOD(
+                self.means,
+                torch.exp(self.scales),
+                self.quats / self.quats.norm(dim=-1, keepdim=True),
+                torch.sigmoid(self.opacities).squeeze(-1),
+                self.features_dc,
+                max_depth=self.config.lod_max_depth,
+            )
+            self._lod_key = key
+        return self._lod
+
     def set_crop(self, crop_box: Optional[OrientedBox]):
         self.crop_box = crop_box
 
@@ -482,9 +506,8 @@ class SplatfactoModel(Model):
                 dups &= high_grads
                 dup_params = self.dup_gaussians(dups)
                 for name, param in self.gauss_params.items():
-                    self.gauss_params[name] = torch.nn.Parameter(
-                        torch.cat([param.detach(), split_params[name], dup_params[name]], dim=0)
-                    )
+                    new_rows = torch.cat([split_params[name], dup_params[name]], dim=0)
+                    self.gauss_params[name] = torch.nn.Parameter(self.storage.append(name, param, new_rows))
                 # append zeros to the max_2Dsize tensor
                 self.max_2Dsize = torch.cat(
                     [
@@ -526,16 +549,13 @@ class SplatfactoModel(Model):
             if self.step < self.config.stop_split_at and self.step % reset_interval == self.config.refine_every:
                 # Reset value is set to be twice of the cull_alpha_thresh
                 reset_value = self.config.cull_alpha_thresh * 2.0
-                self.opacities.data = torch.clamp(
-                    self.opacities.data,
-                    max=torch.logit(torch.tensor(reset_value, device=self.device)).item(),
-                )
+                self.opacities.data.clamp_(max=torch.logit(torch.tensor(reset_value, device=self.device)).item())
                 # reset the exp of optimizer
                 optim = optimizers.optimizers["opacities"]
                 param = optim.param_groups[0]["params"][0]
                 param_state = optim.state[param]
-                param_state["exp_avg"] = torch.zeros_like(param_state["exp_avg"])
-                param_state["exp_avg_sq"] = torch.zeros_like(param_state["exp_avg_sq"])
+                param_state["exp_avg"].zero_()
+                param_state["exp_avg_sq"].zero_()
 
             self.xys_grad_norm = None
             self.vis_counts = None
@@ -563,7 +583,7 @@ class SplatfactoModel(Model):
             culls = culls | toobigs
             toobigs_count = torch.sum(toobigs).item()
         for name, param in self.gauss_params.items():
-            self.gauss_params[name] = torch.nn.Parameter(param[~culls])
+            self.gauss_params[name] = torch.nn.Parameter(self.storage.remove(name, param, culls))
 
         CONSOLE.log(
             f"Culled {n_bef - self.num_points} gaussians "
@@ -739,6 +759,15 @@ class SplatfactoModel(Model):
         else:
             optimized_camera_to_world = camera.camera_to_worlds
 
+        BLOCK_WIDTH = 16  # this controls the tile size of rasterization, 16 is a good default
+        camera_scale_fac = self._get_downscale_factor()
+        camera.rescale_output_resolution(1 / camera_scale_fac)
+        viewmat = get_viewmat(optimized_camera_to_world)
+        K = camera.get_intrinsics_matrices().to(self.device)
+        W, H = int(camera.width.item()), int(camera.height.item())
+        self.last_size = (H, W)
+        camera.rescale_output_resolution(camera_scale_fac)  # type: ignore
+
         # cropping
         if self.crop_box is not None and not self.training:
             crop_ids = self.crop_box.within(self.means).squeeze()
@@ -756,6 +785,20 @@ class SplatfactoModel(Model):
             features_rest_crop = self.features_rest[crop_ids]
             scales_crop = self.scales[crop_ids]
             quats_crop = self.quats[crop_ids]
+        elif self.config.use_lod and not self.training:
+            lod = self._get_lod()
+            gaussian_ids, proxy_ids = lod.select(viewmat[0], K[0], W, H, self.config.lod_pixel_size)
+            if len(gaussian_ids) + len(proxy_ids) == 0:
+                return self.get_empty_outputs(
+                    int(camera.width.item()), int(camera.height.item()), self.background_color
+                )
+            lod_params = lod.gather(self.gauss_params, gaussian_ids, proxy_ids)
+            opacities_crop = lod_params["opacities"]
+            means_crop = lod_params["means"]
+            features_dc_crop = lod_params["features_dc"]
+            features_rest_crop = lod_params["features_rest"]
+            scales_crop = lod_params["scales"]
+            quats_crop = lod_params["quats"]
         else:
             opacities_crop = self.opacities
             means_crop = self.means
@@ -766,15 +809,6 @@ class SplatfactoModel(Model):
 
         colors_crop = torch.cat((features_dc_crop[:, None, :], features_rest_crop), dim=1)
 
-        BLOCK_WIDTH = 16  # this controls the tile size of rasterization, 16 is a good default
-        camera_scale_fac = self._get_downscale_factor()
-        camera.rescale_output_resolution(1 / camera_scale_fac)
-        viewmat = get_viewmat(optimized_camera_to_world)
-        K = camera.get_intrinsics_matrices().cuda()
-        W, H = int(camera.width.item()), int(camera.height.item())
-        self.last_size = (H, W)
-        camera.rescale_output_resolution(camera_scale_fac)  # type: ignore
-
         # apply the compensation of screen space blurring to gaussians
         if self.config.rasterize_mode not in ["antialiased", "classic"]:
             raise ValueError("Unknown rasterize_mode: %s", self.config.rasterize_mode)
@@ -790,7 +824,13 @@ class SplatfactoModel(Model):
             colors_crop = torch.sigmoid(colors_crop).squeeze(1)  # [N, 1, 3] -> [N, 3]
             sh_degree_to_use = None
 
-        render, alpha, info = rasterization(
+        if self.config.rasterizer == "torch" or (self.config.rasterizer == "auto" and not torch.cuda.is_available()):
+            if self.training:
+                raise ValueError("The torch rasterizer can only render, set rasterizer to gsplat to train")
+            rasterize_fn = rasterization_torch
+        else:
+            rasterize_fn = rasterization
+        render, alpha, info = rasterize_fn(
             means=means_crop,
             quats=quats_crop / quats_crop.norm(dim=-1, keepdim=True),
             scales=torch.exp(scales_crop),
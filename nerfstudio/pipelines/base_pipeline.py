@@ -20,10 +20,13 @@ from __future__ import annotations
 
 import typing
 from abc import abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
 from time import time
-from typing import Any, Dict, List, Literal, Mapping, Optional, Tuple, Type, Union, cast
+from typing import Any, Deque, Dict, List, Literal, Mapping, Optional, Tuple, Type, Union, cast
 
 import torch
 import torch.distributed as dist
@@ -34,8 +37,10 @@ from torch.cuda.amp.grad_scaler import GradScaler
 from torch.nn import Parameter
 from torch.nn.parallel import DistributedDataParallel as DDP
 
+from nerfstudio.cameras.cameras import Cameras
 from nerfstudio.configs.base_config import InstantiateConfig
 from nerfstudio.data.datamanagers.base_datamanager import DataManager, DataManagerConfig
+from nerfstudio.data.pixel_samplers import ErrorMapPixelSampler
 from nerfstudio.engine.callbacks import TrainingCallback, TrainingCallbackAttributes
 from nerfstudio.models.base_model import Model, ModelConfig
 from nerfstudio.utils import profiler
@@ -136,7 +141,8 @@ class Pipeline(nn.Module):
         if self.world_size > 1 and step:
             assert self.datamanager.train_sampler is not None
             self.datamanager.train_sampler.set_epoch(step)
-        ray_bundle, batch = self.datamanager.next_train(step)
+        with profiler.trace_phase("data"):
+            ray_bundle, batch = self.datamanager.next_train(step)
         model_outputs = self.model(ray_bundle, batch)
         metrics_dict = self.model.get_metrics_dict(model_outputs, batch)
         loss_dict = self.model.get_loss_dict(model_outputs, batch, metrics_dict)
@@ -218,6 +224,8 @@ class VanillaPipelineConfig(InstantiateConfig):
     """specifies the datamanager config"""
     model: ModelConfig = field(default_factory=ModelConfig)
     """specifies the model config"""
+    eval_num_image_writers: int = 4
+    """Number of threads encoding and writing rendered images while evaluating all images."""
 
 
 class VanillaPipeline(Pipeline):
@@ -296,11 +304,18 @@ class VanillaPipeline(Pipeline):
         Args:
             step: current iteration step to update sampler if using DDP (distributed)
         """
-        ray_bundle, batch = self.datamanager.next_train(step)
+        with profiler.trace_phase("data"):
+            ray_bundle, batch = self.datamanager.next_train(step)
         model_outputs = self._model(ray_bundle)  # train distributed data parallel model if world_size > 1
         metrics_dict = self.model.get_metrics_dict(model_outputs, batch)
         loss_dict = self.model.get_loss_dict(model_outputs, batch, metrics_dict)
 
+        pixel_sampler = getattr(self.datamanager, "train_pixel_sampler", None)
+        if isinstance(pixel_sampler, ErrorMapPixelSampler) and "rgb" in model_outputs and "indices" in batch:
+            rgb = model_outputs["rgb"].detach()
+            errors = (rgb - batch["image"][..., :3].to(rgb)).abs().mean(dim=-1)
+            pixel_sampler.update_error_map(batch["indices"], errors)
+
         return model_outputs, loss_dict, metrics_dict
 
     def forward(self):
@@ -369,37 +384,77 @@ class VanillaPipeline(Pipeline):
         num_images = len(data_loader)
         if output_path is not None:
             output_path.mkdir(exist_ok=True, parents=True)
+        num_images_per_batch = self.model.config.eval_num_images_per_batch
+        data_iter = iter(data_loader)
+        image_writes: List[Future] = []
+
+        def load_batch() -> List[Tuple[Cameras, Dict]]:
+            return list(islice(data_iter, num_images_per_batch))
+
+        def compute_metrics(idx: int, batch: Dict, outputs: Dict[str, torch.Tensor]) -> Dict[str, float]:
+            # Grad mode is thread local.
+            with torch.no_grad():
+                metrics_dict, image_dict = self.model.get_image_metrics_and_images(outputs, batch)
+            if output_path is not None:
+                for key, image in image_dict.items():  # [H, W, C] order
+                    path = output_path / f"{image_prefix}_{key}_{idx:04d}.png"
+                    image_writes.append(image_writer.submit(vutils.save_image, image.permute(2, 0, 1).cpu(), path))
+            return metrics_dict
+
+        # Three stages run concurrently: the next images load while the current ones render, and the metrics and
+        # image files of the previous ones are computed and written in the background. Metrics run on a single
+        # thread as the metric modules are stateful.
+        loader = ThreadPoolExecutor(max_workers=1)
+        metrics_worker = ThreadPoolExecutor(max_workers=1)
+        image_writer = ThreadPoolExecutor(max_workers=self.config.eval_num_image_writers)
         with Progress(
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TimeElapsedColumn(),
             MofNCompleteColumn(),
             transient=True,
-        ) as progress:
+        ) as progress, loader, metrics_worker, image_writer:
             task = progress.add_task("[green]Evaluating all images...", total=num_images)
-            idx = 0
-            for camera, batch in data_loader:
-                # time this the following line
-                inner_start = time()
-                outputs = self.model.get_outputs_for_camera(camera=camera)
-                height, width = camera.height, camera.width
-                num_rays = height * width
-                metrics_dict, image_dict = self.model.get_image_metrics_and_images(outputs, batch)
-                if output_path is not None:
-                    for key in image_dict.keys():
-                        image = image_dict[key]  # [H, W, C] order
-                        vutils.save_image(
-                            image.permute(2, 0, 1).cpu(), output_path / f"{image_prefix}_{key}_{idx:04d}.png"
-                        )
+            pending: Deque[Tuple[Future, Cameras, float]] = deque()
 
+            def collect(future: Future, camera: Cameras, num_rays_per_sec: float) -> None:
+                metrics_dict = future.result()
                 assert "num_rays_per_sec" not in metrics_dict
-                metrics_dict["num_rays_per_sec"] = (num_rays / (time() - inner_start)).item()
+                metrics_dict["num_rays_per_sec"] = num_rays_per_sec
                 fps_str = "fps"
                 assert fps_str not in metrics_dict
-                metrics_dict[fps_str] = (metrics_dict["num_rays_per_sec"] / (height * width)).item()
+                metrics_dict[fps_str] = num_rays_per_sec / int(camera.height * camera.width)
                 metrics_dict_list.append(metrics_dict)
                 progress.advance(task)
-                idx = idx + 1
+
+            start = time()
+            idx = 0
+            next_items = loader.submit(load_batch)
+            while True:
+                items = next_items.result()
+                if not items:
+                    break
+                next_items = loader.submit(load_batch)
+                # time this the following line
+                inner_start = time()
+                outputs_list = self.model.get_outputs_for_cameras([camera for camera, _ in items])
+                if self.device.type == "cuda":
+                    torch.cuda.synchronize(self.device)
+                # the images of a batch are rendered together, so they share the throughput of the batch
+                num_rays = sum(int(camera.height * camera.width) for camera, _ in items)
+                num_rays_per_sec = num_rays / (time() - inner_start)
+                for (camera, batch), outputs in zip(items, outputs_list):
+                    future = metrics_worker.submit(compute_metrics, idx, batch, outputs)
+                    pending.append((future, camera, num_rays_per_sec))
+                    idx = idx + 1
+                # Bounds the rendered outputs held in memory.
+                while len(pending) > 2 * num_images_per_batch:
+                    collect(*pending.popleft())
+            while pending:
+                collect(*pending.popleft())
+            for write in image_writes:
+                write.result()
+            end_to_end_time = time() - start
 
         metrics_dict = {}
         for key in metrics_dict_list[0].keys():
@@ -414,6 +469,11 @@ class VanillaPipeline(Pipeline):
                     torch.mean(torch.tensor([metrics_dict[key] for metrics_dict in metrics_dict_list]))
                 )
 
+        # The render throughput above excludes loading, metrics and writing; these include everything.
+        num_rays = sum(metrics_dict["num_rays_per_sec"] / metrics_dict["fps"] for metrics_dict in metrics_dict_list)
+        metrics_dict["end_to_end_num_rays_per_sec"] = num_rays / end_to_end_time
+        metrics_dict["end_to_end_fps"] = len(metrics_dict_list) / end_to_end_time
+
         self.train()
         return metrics_dict
 
@@ -101,6 +101,8 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
     """If --use-sfm-depth and this flag is True, also export debug images showing Sf overlaid upon input images."""
     same_dimensions: bool = True
     """Whether to assume all images are same dimensions and so to use fast downscaling with no autorotation."""
+    max_workers: Optional[int] = None
+    """Number of threads used to copy and downscale images. If None, uses the ThreadPool default."""
     use_single_camera_mode: bool = True
     """Whether to assume all images taken with the same camera characteristics, set to False for multiple cameras in colmap (only works with hloc sfm_tool).
     """
@@ -177,6 +179,7 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
                     folder_name="depths",
                     nearest_neighbor=True,
                     verbose=self.verbose,
+                    max_workers=self.max_workers,
                 )
             )
             return image_id_to_depth_path, summary_log
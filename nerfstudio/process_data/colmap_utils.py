@@ -17,6 +17,7 @@ Tools supporting the execution of COLMAP and preparation of COLMAP-based dataset
 """
 
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Literal, Optional, Union
 
@@ -31,10 +32,12 @@ from rich.progress import track
 # TODO(1480) use pycolmap instead of colmap_parsing_utils
 # import pycolmap
 from nerfstudio.data.utils.colmap_parsing_utils import (
+    ColmapPoints3D,
     qvec2rotmat,
     read_cameras_binary,
     read_images_binary,
-    read_points3D_binary,
+    read_images_binary_arrays,
+    read_points3D_binary_arrays,
     read_points3D_text,
 )
 from nerfstudio.process_data.process_data_utils import CameraModel
@@ -505,6 +508,7 @@ def create_sfm_depth(
     min_n_visible: int = 2,
     include_depth_debug: bool = False,
     input_images_dir: Optional[Path] = None,
+    max_workers: Optional[int] = None,
 ) -> Dict[int, Path]:
     """Converts COLMAP's points3d.bin to sparse depth map images encoded as
     16-bit "millimeter depth" PNGs.
@@ -534,94 +538,64 @@ def create_sfm_depth(
           than this many frames.
         include_depth_debug: Also include debug images showing depth overlaid
           upon RGB.
+        input_images_dir: Directory of the input images, needed for the debug images.
+        max_workers: Number of threads writing the depth images. If None, uses the ThreadPool default.
     Returns:
         Depth file paths indexed by COLMAP image id
     """
 
     # TODO(1480) use pycolmap
     # recon = pycolmap.Reconstruction(recon_dir)
-    # ptid_to_info = recon.points3D
-    # cam_id_to_camera = recon.cameras
-    # im_id_to_image = recon.images
-    ptid_to_info = read_points3D_binary(recon_dir / "points3D.bin")
+    points = read_points3D_binary_arrays(recon_dir / "points3D.bin")
     cam_id_to_camera = read_cameras_binary(recon_dir / "cameras.bin")
-    im_id_to_image = read_images_binary(recon_dir / "images.bin")
-
-    # Only support first camera
-    CAMERA_ID = 1
-    W = cam_id_to_camera[CAMERA_ID].width
-    H = cam_id_to_camera[CAMERA_ID].height
-
-    if verbose:
-        iter_images = track(
-            im_id_to_image.items(), total=len(im_id_to_image.items()), description="Creating depth maps ..."
-        )
-    else:
-        iter_images = iter(im_id_to_image.items())
-
-    image_id_to_depth_path = {}
-    for im_id, im_data in iter_images:
-        # TODO(1480) BEGIN delete when abandoning colmap_parsing_utils
-        pids = [pid for pid in im_data.point3D_ids if pid != -1]
-        xyz_world = np.array([ptid_to_info[pid].xyz for pid in pids])
-        rotation = qvec2rotmat(im_data.qvec)
-        z = (rotation @ xyz_world.T)[-1] + im_data.tvec[-1]
-        errors = np.array([ptid_to_info[pid].error for pid in pids])
-        n_visible = np.array([len(ptid_to_info[pid].image_ids) for pid in pids])
-        uv = np.array([im_data.xys[i] for i in range(len(im_data.xys)) if im_data.point3D_ids[i] != -1])
-        # TODO(1480) END delete when abandoning colmap_parsing_utils
-
-        # TODO(1480) BEGIN use pycolmap API
-
-        # # Get only keypoints that have corresponding triangulated 3D points
-        # p2ds = im_data.get_valid_points2D()
-
-        # xyz_world = np.array([ptid_to_info[p2d.point3D_id].xyz for p2d in p2ds])
-
-        # # COLMAP OpenCV convention: z is always positive
-        # z = (im_data.rotation_matrix() @ xyz_world.T)[-1] + im_data.tvec[-1]
-
-        # # Mean reprojection error in image space
-        # errors = np.array([ptid_to_info[p2d.point3D_id].error for p2d in p2ds])
-
-        # # Number of frames in which each frame is visible
-        # n_visible = np.array([ptid_to_info[p2d.point3D_id].track.length() for p2d in p2ds])
-
-        # Note: these are *unrectified* pixel coordinates that should match the original input
-        # no matter the camera model
-        # uv = np.array([p2d.xy for p2d in p2ds])
-
-        # TODO(1480) END use pycolmap API
-
-        idx = np.where(
-            (z >= min_depth)
-            & (z <= max_depth)
-            & (errors <= max_repoj_err)
-            & (n_visible >= min_n_visible)
-            & (uv[:, 0] >= 0)
-            & (uv[:, 0] < W)
-            & (uv[:, 1] >= 0)
-            & (uv[:, 1] < H)
-        )
-        z = z[idx]
-        uv = uv[idx]
+    images = read_images_binary_arrays(recon_dir / "images.bin")
+
+    # Find the 3D point of every 2D point of every image at once.
+    image_idxs = np.repeat(np.arange(len(images)), np.diff(images.points2D_offsets))
+    sorter = np.argsort(points.ids)
+    positions = np.searchsorted(points.ids, images.point3D_ids, sorter=sorter)
+    valid = positions < len(points)
+    valid[valid] = points.ids[sorter[positions[valid]]] == images.point3D_ids[valid]
+    image_idxs, rows, uv = image_idxs[valid], sorter[positions[valid]], images.xys[valid]
+
+    # COLMAP OpenCV convention: z is always positive
+    rotations = np.moveaxis(qvec2rotmat(images.qvecs.T), -1, 0)
+    z = np.einsum("ij,ij->i", rotations[image_idxs, 2], points.xyz[rows]) + images.tvecs[image_idxs, 2]
+
+    # Note: these are *unrectified* pixel coordinates that should match the original input
+    # no matter the camera model
+    widths = np.array([cam_id_to_camera[camera_id].width for camera_id in images.camera_ids.tolist()])
+    heights = np.array([cam_id_to_camera[camera_id].height for camera_id in images.camera_ids.tolist()])
+    keep = (
+        (z >= min_depth)
+        & (z <= max_depth)
+        & (points.errors[rows] <= max_repoj_err)
+        & (points.track_lengths[rows] >= min_n_visible)
+        & (uv[:, 0] >= 0)
+        & (uv[:, 0] < widths[image_idxs])
+        & (uv[:, 1] >= 0)
+        & (uv[:, 1] < heights[image_idxs])
+    )
+    image_idxs, z, uv = image_idxs[keep], z[keep], uv[keep]
+    # The points stay grouped by image, so each image reads a contiguous slice.
+    offsets = np.searchsorted(image_idxs, np.arange(len(images) + 1))
 
-        uu, vv = uv[:, 0].astype(int), uv[:, 1].astype(int)
+    def write_depth(idx: int) -> Path:
+        W, H = int(widths[idx]), int(heights[idx])
+        uu, vv = uv[offsets[idx] : offsets[idx + 1]].astype(int).T
         depth = np.zeros((H, W), dtype=np.float32)
-        depth[vv, uu] = z
+        depth[vv, uu] = z[offsets[idx] : offsets[idx + 1]]
 
         # E.g. if `depth` is metric and in units of meters, and `depth_scale_to_integer_factor`
         # is 1000, then `depth_img` will be integer millimeters.
         depth_img = (depth_scale_to_integer_factor * depth).astype(np.uint16)
 
-        out_name = str(im_data.name)
+        out_name = str(images.names[idx])
         depth_path = output_dir / out_name
         if depth_path.suffix == ".jpg":
             depth_path = depth_path.with_suffix(".png")
         cv2.imwrite(str(depth_path), depth_img)  # type: ignore
 
-        image_id_to_depth_path[im_id] = depth_path
-
         if include_depth_debug:
             assert input_images_dir is not None, "Need explicit input_images_dir for debug images"
             assert input_images_dir.exists(), input_images_dir
@@ -629,7 +603,7 @@ def create_sfm_depth(
             depth_flat = depth.flatten()[:, None]
             overlay = 255.0 * colormaps.apply_depth_colormap(torch.from_numpy(depth_flat)).numpy()
             overlay = overlay.reshape([H, W, 3])
-            input_image_path = input_images_dir / im_data.name
+            input_image_path = input_images_dir / out_name
             input_image = cv2.imread(str(input_image_path))  # type: ignore
             debug = 0.3 * input_image + 0.7 + overlay
 
@@ -637,6 +611,14 @@ def create_sfm_depth(
             output_path = output_dir / "debug_depth" / out_name
             output_path.parent.mkdir(parents=True, exist_ok=True)
             cv2.imwrite(str(output_path), debug.astype(np.uint8))  # type: ignore
+        return depth_path
+
+    # Encoding the PNGs releases the GIL, so threads write the images in parallel.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        depth_paths = executor.map(write_depth, range(len(images)))
+        if verbose:
+            depth_paths = track(depth_paths, total=len(images), description="Creating depth maps ...")
+        image_id_to_depth_path = dict(zip(images.ids.tolist(), depth_paths))
 
     return image_id_to_depth_path
 
@@ -679,20 +661,20 @@ def create_ply_from_colmap(
         output_dir: Directory to output .ply
     """
     if (recon_dir / "points3D.bin").exists():
-        colmap_points = read_points3D_binary(recon_dir / "points3D.bin")
+        colmap_points = read_points3D_binary_arrays(recon_dir / "points3D.bin")
     elif (recon_dir / "points3D.txt").exists():
-        colmap_points = read_points3D_text(recon_dir / "points3D.txt")
+        colmap_points = ColmapPoints3D.from_dict(read_points3D_text(recon_dir / "points3D.txt"))
     else:
         raise ValueError(f"Could not find points3D.txt or points3D.bin in {recon_dir}")
 
     # Load point Positions
-    points3D = torch.from_numpy(np.array([p.xyz for p in colmap_points.values()], dtype=np.float32))
+    points3D = torch.from_numpy(colmap_points.xyz.astype(np.float32))
     if applied_transform is not None:
         assert applied_transform.shape == (3, 4)
         points3D = torch.einsum("ij,bj->bi", applied_transform[:3, :3], points3D) + applied_transform[:3, 3]
 
     # Load point colours
-    points3D_rgb = torch.from_numpy(np.array([p.rgb for p in colmap_points.values()], dtype=np.uint8))
+    points3D_rgb = torch.from_numpy(colmap_points.rgb)
 
     # write ply
     with open(output_dir / filename, "w") as f:
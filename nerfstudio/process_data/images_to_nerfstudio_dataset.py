@@ -72,6 +72,7 @@ class ImagesToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                 verbose=self.verbose,
                 num_downscales=self.num_downscales,
                 same_dimensions=self.same_dimensions,
+                max_workers=self.max_workers,
                 keep_image_dir=False,
             )
             if self.eval_data is not None:
@@ -83,6 +84,7 @@ class ImagesToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                     verbose=self.verbose,
                     num_downscales=self.num_downscales,
                     same_dimensions=self.same_dimensions,
+                    max_workers=self.max_workers,
                     keep_image_dir=True,
                 )
                 image_rename_map_paths.update(eval_image_rename_map_paths)
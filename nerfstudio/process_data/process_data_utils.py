@@ -14,16 +14,17 @@
 
 """Helper utils for processing data into the nerfstudio format."""
 
+import json
 import math
 import re
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
-from typing import List, Literal, Optional, OrderedDict, Tuple, Union
+from typing import Any, Dict, List, Literal, Optional, OrderedDict, Sequence, Tuple, Union
 
 import cv2
-import imageio
 
 try:
     import rawpy
@@ -221,6 +222,130 @@ def convert_video_to_images(
         return summary_log, num_final_frames
 
 
+def _processing_stamp(
+    crop_border_pixels: Optional[int] = None,
+    crop_factor: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0),
+    upscale_factor: Optional[int] = None,
+    nearest_neighbor: bool = False,
+    autorotate: bool = False,
+) -> Dict[str, Any]:
+    """Returns the parameters that the images of an output directory were processed with."""
+    return {
+        "crop_border_pixels": crop_border_pixels,
+        "crop_factor": list(crop_factor),
+        "upscale_factor": upscale_factor,
+        "nearest_neighbor": nearest_neighbor,
+        "autorotate": autorotate,
+    }
+
+
+def _processing_stamp_path(image_dir: Path) -> Path:
+    # Kept next to the directory, so that tools listing its images never see it.
+    return image_dir.parent / f".{image_dir.name}.processing.json"
+
+
+def _invalidate_stale_dirs(image_dirs: Sequence[Path], stamp: Dict[str, Any]) -> List[bool]:
+    """Returns whether each directory was processed with other parameters, removing the stamps of those that were.
+
+    Their stamps are removed before their images are rewritten, so that an interrupted run is not picked up as up to
+    date. Directories without a stamp count as processed with other parameters.
+    """
+    stale = []
+    for image_dir in image_dirs:
+        stamp_path = _processing_stamp_path(image_dir)
+        previous = json.loads(stamp_path.read_text(encoding="UTF-8")) if stamp_path.exists() else None
+        if previous is not None and previous != stamp:
+            CONSOLE.log(f"Processing parameters of {image_dir} changed, rewriting its images.")
+        stamp_path.unlink(missing_ok=True)
+        stale.append(previous != stamp)
+    return stale
+
+
+def _write_processing_stamps(image_dirs: Sequence[Path], stamp: Dict[str, Any]) -> None:
+    for image_dir in image_dirs:
+        _processing_stamp_path(image_dir).write_text(json.dumps(stamp), encoding="UTF-8")
+
+
+def write_image_pyramid(
+    image_path: Path,
+    output_paths: List[Optional[Path]],
+    crop_border_pixels: Optional[int] = None,
+    crop_factor: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0),
+    upscale_factor: Optional[int] = None,
+    nearest_neighbor: bool = False,
+    autorotate: bool = False,
+    force: Optional[Sequence[bool]] = None,
+) -> None:
+    """Decodes an image once and writes it at several resolutions, each half the size of the previous one.
+
+    Outputs that are newer than the image are left as they are, unless forced. When the full resolution output is the only one
+    that is out of date and the image needs no processing, the file is copied without being decoded.
+
+    Args:
+        image_path: Path of the image.
+        output_paths: Output path of each resolution, the i-th being downscaled by 2**i. None skips a resolution.
+        crop_border_pixels: If not None, crops each edge by the specified number of pixels.
+        crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
+        upscale_factor: If not None, upscales the image by this factor with nearest neighbor sampling.
+        nearest_neighbor: Use nearest neighbor sampling (useful for depth images and masks)
+        autorotate: Whether to apply the EXIF orientation of the image.
+        force: Per resolution, whether to rewrite the output even if it is newer than the image, for example because
+            it was processed with other parameters.
+    """
+    source_mtime = image_path.stat().st_mtime
+    if force is None:
+        force = [False] * len(output_paths)
+    outdated = [
+        path is not None and path != image_path and (forced or not path.exists() or path.stat().st_mtime < source_mtime)
+        for path, forced in zip(output_paths, force)
+    ]
+    if not any(outdated):
+        return
+
+    is_raw = image_path.suffix.lower() in ALLOWED_RAW_EXTS
+    needs_processing = (
+        is_raw
+        or autorotate
+        or upscale_factor is not None
+        or crop_border_pixels is not None
+        or crop_factor != (0.0, 0.0, 0.0, 0.0)
+    )
+    if not needs_processing and outdated[0]:
+        shutil.copy(image_path, output_paths[0])  # type: ignore
+        outdated[0] = False
+        if not any(outdated):
+            return
+
+    if is_raw:
+        with rawpy.imread(str(image_path)) as raw:
+            image = cv2.cvtColor(raw.postprocess(), cv2.COLOR_RGB2BGR)
+    else:
+        image = cv2.imread(str(image_path), cv2.IMREAD_COLOR if autorotate else cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise RuntimeError(f"Could not read image {image_path}")
+
+    if upscale_factor is not None:
+        image = cv2.resize(image, None, fx=upscale_factor, fy=upscale_factor, interpolation=cv2.INTER_NEAREST)
+    height, width = image.shape[:2]
+    if crop_border_pixels is not None:
+        image = image[crop_border_pixels : height - crop_border_pixels, crop_border_pixels : width - crop_border_pixels]
+    elif crop_factor != (0.0, 0.0, 0.0, 0.0):
+        top, left = int(height * crop_factor[0]), int(width * crop_factor[2])
+        crop_height = int(height * (1 - crop_factor[0] - crop_factor[1]))
+        crop_width = int(width * (1 - crop_factor[2] - crop_factor[3]))
+        image = image[top : top + crop_height, left : left + crop_width]
+
+    height, width = image.shape[:2]
+    interpolation = cv2.INTER_NEAREST if nearest_neighbor else cv2.INTER_AREA
+    last = max(i for i, write in enumerate(outdated) if write)
+    for i in range(last + 1):
+        if i > 0:
+            # Each resolution is downscaled from the previous one, which is cheaper than from the full image.
+            image = cv2.resize(image, (width // 2**i, height // 2**i), interpolation=interpolation)
+        if outdated[i]:
+            cv2.imwrite(str(output_paths[i]), image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+
+
 def copy_images_list(
     image_paths: List[Path],
     image_dir: Path,
@@ -233,6 +358,7 @@ def copy_images_list(
     upscale_factor: Optional[int] = None,
     nearest_neighbor: bool = False,
     same_dimensions: bool = True,
+    max_workers: Optional[int] = None,
 ) -> List[Path]:
     """Copy all images in a list of Paths. Useful for filtering from a directory.
     Args:
@@ -244,6 +370,10 @@ def copy_images_list(
         crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
         verbose: If True, print extra logging.
         keep_image_dir: If True, don't delete the output directory if it already exists.
+        upscale_factor: If not None, upscales the images by this factor with nearest neighbor sampling.
+        nearest_neighbor: Use nearest neighbor sampling (useful for depth images and masks)
+        same_dimensions: If False, applies the EXIF orientation of each image.
+        max_workers: Number of threads processing images. If None, uses the ThreadPool default.
     Returns:
         A list of the copied image Paths.
     """
@@ -258,82 +388,43 @@ def copy_images_list(
                 shutil.rmtree(dir_to_remove, ignore_errors=True)
     image_dir.mkdir(exist_ok=True, parents=True)
 
-    copied_image_paths = []
-
-    # Images should be 1-indexed for the rest of the pipeline.
-    for idx, image_path in enumerate(image_paths):
-        if verbose:
-            CONSOLE.log(f"Copying image {idx + 1} of {len(image_paths)}...")
-        copied_image_path = image_dir / f"{image_prefix}{idx + 1:05d}{image_path.suffix}"
-        try:
-            # if CR2 raw, we want to read raw and write RAW_CONVERTED_SUFFIX, and change the file suffix for downstream processing
-            if image_path.suffix.lower() in ALLOWED_RAW_EXTS:
-                copied_image_path = image_dir / f"{image_prefix}{idx + 1:05d}{RAW_CONVERTED_SUFFIX}"
-                with rawpy.imread(str(image_path)) as raw:
-                    rgb = raw.postprocess()
-                imageio.imsave(copied_image_path, rgb)
-                image_paths[idx] = copied_image_path
-            elif same_dimensions:
-                # Fast path; just copy the file
-                shutil.copy(image_path, copied_image_path)
-            else:
-                # Slow path; let ffmpeg perform autorotation (and clear metadata)
-                ffmpeg_cmd = f"ffmpeg -y -i {image_path} -metadata:s:v:0 rotate=0 {copied_image_path}"
-                if verbose:
-                    CONSOLE.log(f"... {ffmpeg_cmd}")
-                run_command(ffmpeg_cmd, verbose=verbose)
-        except shutil.SameFileError:
-            pass
-        copied_image_paths.append(copied_image_path)
-
-    nn_flag = "" if not nearest_neighbor else ":flags=neighbor"
-    downscale_chains = [f"[t{i}]scale=iw/{2**i}:ih/{2**i}{nn_flag}[out{i}]" for i in range(num_downscales + 1)]
     downscale_dirs = [Path(str(image_dir) + (f"_{2**i}" if i > 0 else "")) for i in range(num_downscales + 1)]
-
     for dir in downscale_dirs:
         dir.mkdir(parents=True, exist_ok=True)
 
-    downscale_chain = (
-        f"split={num_downscales + 1}"
-        + "".join([f"[t{i}]" for i in range(num_downscales + 1)])
-        + ";"
-        + ";".join(downscale_chains)
-    )
-
-    num_frames = len(image_paths)
-    # ffmpeg batch commands assume all images are the same dimensions.
-    # When this is not the case (e.g. mixed portrait and landscape images), we need to do individually.
-    # (Unfortunately, that is much slower.)
-    for framenum in range(1, (1 if same_dimensions else num_frames) + 1):
-        framename = f"{image_prefix}%05d" if same_dimensions else f"{image_prefix}{framenum:05d}"
-        ffmpeg_cmd = f'ffmpeg -y -noautorotate -i "{image_dir / f"{framename}{copied_image_paths[0].suffix}"}" '
+    stamp = _processing_stamp(crop_border_pixels, crop_factor, upscale_factor, nearest_neighbor, not same_dimensions)
+    force = _invalidate_stale_dirs(downscale_dirs, stamp)
 
-        crop_cmd = ""
-        if crop_border_pixels is not None:
-            crop_cmd = f"crop=iw-{crop_border_pixels*2}:ih-{crop_border_pixels*2}[cropped];[cropped]"
-        elif crop_factor != (0.0, 0.0, 0.0, 0.0):
-            height = 1 - crop_factor[0] - crop_factor[1]
-            width = 1 - crop_factor[2] - crop_factor[3]
-            start_x = crop_factor[2]
-            start_y = crop_factor[0]
-            crop_cmd = f"crop=w=iw*{width}:h=ih*{height}:x=iw*{start_x}:y=ih*{start_y}[cropped];[cropped]"
-
-        select_cmd = "[0:v]"
-        if upscale_factor is not None:
-            select_cmd = f"[0:v]scale=iw*{upscale_factor}:ih*{upscale_factor}:flags=neighbor[upscaled];[upscaled]"
+    # Images should be 1-indexed for the rest of the pipeline.
+    copied_image_paths = []
+    for idx, image_path in enumerate(image_paths):
+        suffix = RAW_CONVERTED_SUFFIX if image_path.suffix.lower() in ALLOWED_RAW_EXTS else image_path.suffix
+        copied_image_paths.append(image_dir / f"{image_prefix}{idx + 1:05d}{suffix}")
 
-        downscale_cmd = f' -filter_complex "{select_cmd}{crop_cmd}{downscale_chain}"' + "".join(
-            [
-                f' -map "[out{i}]" -q:v 2 "{downscale_dirs[i] / f"{framename}{copied_image_paths[0].suffix}"}"'
-                for i in range(num_downscales + 1)
-            ]
+    def process(idx: int) -> None:
+        if verbose:
+            CONSOLE.log(f"Copying image {idx + 1} of {len(image_paths)}...")
+        write_image_pyramid(
+            image_paths[idx],
+            [dir / copied_image_paths[idx].name for dir in downscale_dirs],
+            crop_border_pixels=crop_border_pixels,
+            crop_factor=crop_factor,
+            upscale_factor=upscale_factor,
+            nearest_neighbor=nearest_neighbor,
+            autorotate=not same_dimensions,
+            force=force,
         )
 
-        ffmpeg_cmd += downscale_cmd
-        if verbose:
-            CONSOLE.log(f"... {ffmpeg_cmd}")
-        run_command(ffmpeg_cmd, verbose=verbose)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(process, range(len(image_paths))))
+    _write_processing_stamps(downscale_dirs, stamp)
+
+    # Raw images are converted, so downstream processing uses the copies.
+    for idx, image_path in enumerate(image_paths):
+        if image_path.suffix.lower() in ALLOWED_RAW_EXTS:
+            image_paths[idx] = copied_image_paths[idx]
 
+    num_frames = len(image_paths)
     if num_frames == 0:
         CONSOLE.log("[bold red]:skull: No usable images in the data folder.")
     else:
@@ -395,6 +486,7 @@ def copy_images(
     crop_factor: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0),
     num_downscales: int = 0,
     same_dimensions: bool = True,
+    max_workers: Optional[int] = None,
 ) -> OrderedDict[Path, Path]:
     """Copy images from a directory to a new directory.
 
@@ -405,6 +497,9 @@ def copy_images(
         verbose: If True, print extra logging.
         crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
         keep_image_dir: If True, don't delete the output directory if it already exists.
+        num_downscales: Number of times to downscale the images. Downscales by 2 each time.
+        same_dimensions: If False, applies the EXIF orientation of each image.
+        max_workers: Number of threads processing images. If None, uses the ThreadPool default.
     Returns:
         The mapping from the original filenames to the new ones.
     """
@@ -424,6 +519,7 @@ def copy_images(
             keep_image_dir=keep_image_dir,
             num_downscales=num_downscales,
             same_dimensions=same_dimensions,
+            max_workers=max_workers,
         )
         return OrderedDict((original_path, new_path) for original_path, new_path in zip(image_paths, copied_images))
 
@@ -434,9 +530,10 @@ def downscale_images(
     folder_name: str = "images",
     nearest_neighbor: bool = False,
     verbose: bool = False,
+    max_workers: Optional[int] = None,
 ) -> str:
     """(Now deprecated; much faster integrated into copy_images.)
-    Downscales the images in the directory. Uses FFMPEG.
+    Downscales the images in the directory. Images that are already downscaled are skipped.
 
     Args:
         image_dir: Path to the directory containing the images.
@@ -444,6 +541,7 @@ def downscale_images(
         folder_name: Name of the output folder
         nearest_neighbor: Use nearest neighbor sampling (useful for depth images)
         verbose: If True, logs the output of the command.
+        max_workers: Number of threads processing images. If None, uses the ThreadPool default.
 
     Returns:
         Summary of downscaling.
@@ -457,26 +555,26 @@ def downscale_images(
         spinner="growVertical",
         verbose=verbose,
     ):
-        downscale_factors = [2**i for i in range(num_downscales + 1)[1:]]
-        for downscale_factor in downscale_factors:
-            assert downscale_factor > 1
-            assert isinstance(downscale_factor, int)
-            downscale_dir = image_dir.parent / f"{folder_name}_{downscale_factor}"
+        downscale_dirs = [image_dir.parent / f"{folder_name}_{2**i}" for i in range(1, num_downscales + 1)]
+        for downscale_dir in downscale_dirs:
             downscale_dir.mkdir(parents=True, exist_ok=True)
-            # Using %05d ffmpeg commands appears to be unreliable (skips images).
-            for f in list_images(image_dir):
-                filename = f.name
-                nn_flag = "" if not nearest_neighbor else ":flags=neighbor"
-                ffmpeg_cmd = [
-                    f'ffmpeg -y -noautorotate -i "{image_dir / filename}" ',
-                    f"-q:v 2 -vf scale=iw/{downscale_factor}:ih/{downscale_factor}{nn_flag} ",
-                    f'"{downscale_dir / filename}"',
-                ]
-                ffmpeg_cmd = " ".join(ffmpeg_cmd)
-                run_command(ffmpeg_cmd, verbose=verbose)
+        stamp = _processing_stamp(nearest_neighbor=nearest_neighbor)
+        force = _invalidate_stale_dirs(downscale_dirs, stamp)
+
+        def process(image_path: Path) -> None:
+            write_image_pyramid(
+                image_path,
+                [None] + [downscale_dir / image_path.name for downscale_dir in downscale_dirs],
+                nearest_neighbor=nearest_neighbor,
+                force=[False] + force,
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(process, list_images(image_dir)))
+        _write_processing_stamps(downscale_dirs, stamp)
 
     CONSOLE.log("[bold green]:tada: Done downscaling images.")
-    downscale_text = [f"[bold blue]{2**(i+1)}x[/bold blue]" for i in range(num_downscales)]
+    downscale_text = [f"[bold blue]{2 ** (i + 1)}x[/bold blue]" for i in range(num_downscales)]
     downscale_text = ", ".join(downscale_text[:-1]) + " and " + downscale_text[-1]
     return f"We downsampled the images by {downscale_text}"
 
@@ -116,7 +116,9 @@ class VideoToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
 
             # # Downscale images
             summary_log.append(
-                process_data_utils.downscale_images(self.image_dir, self.num_downscales, verbose=self.verbose)
+                process_data_utils.downscale_images(
+                    self.image_dir, self.num_downscales, verbose=self.verbose, max_workers=self.max_workers
+                )
             )
 
         # Create mask
@@ -0,0 +1,104 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark the time and peak memory of splatfacto refinement steps, reallocating every tensor versus GaussianStorage.
+
+Usage: python nerfstudio/scripts/benchmarking/benchmark_gaussian_storage.py --num-gaussians 3000000 --device cuda
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+import torch
+import tyro
+
+from nerfstudio.model_components.gaussian_storage import GaussianStorage
+from nerfstudio.utils.rich_utils import CONSOLE
+
+# Trailing shapes of the splatfacto parameters with spherical harmonics of degree 3.
+PARAM_SHAPES = {
+    "means": (3,),
+    "scales": (3,),
+    "quats": (4,),
+    "features_dc": (3,),
+    "features_rest": (15, 3),
+    "opacities": (1,),
+}
+
+
+@dataclass
+class BenchmarkGaussianStorage:
+    """Measure refinement steps that grow and cull the gaussians along with two Adam moments per parameter."""
+
+    num_gaussians: int = 1_000_000
+    """Number of gaussians before the first refinement."""
+    num_refinements: int = 20
+    """Number of refinement steps to time."""
+    grow_fraction: float = 0.08
+    """Fraction of the gaussians added by each refinement."""
+    cull_fraction: float = 0.05
+    """Fraction of the gaussians removed by each refinement."""
+    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    """Device of the gaussians."""
+
+    def _tensors(self) -> Dict[str, torch.Tensor]:
+        tensors = {}
+        for name, shape in PARAM_SHAPES.items():
+            for key in ["param", "exp_avg", "exp_avg_sq"]:
+                tensors[f"{name}.{key}"] = torch.randn((self.num_gaussians,) + shape, device=self.device)
+        return tensors
+
+    def _time(self, name: str, use_storage: bool) -> None:
+        tensors = self._tensors()
+        storage = GaussianStorage()
+        generator = torch.Generator(device=self.device).manual_seed(0)
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+        start = time.perf_counter()
+        for _ in range(self.num_refinements):
+            num = len(tensors["means.param"])
+            sources = torch.randint(num, (int(num * self.grow_fraction),), device=self.device, generator=generator)
+            culls = torch.rand((num + len(sources),), device=self.device, generator=generator) < self.cull_fraction
+            for key, tensor in tensors.items():
+                if use_storage:
+                    tensor = storage.append(key, tensor, tensor[sources])
+                    tensors[key] = storage.remove(key, tensor, culls)
+                else:
+                    tensors[key] = torch.cat([tensor, tensor[sources]])[~culls]
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        duration = time.perf_counter() - start
+        peak = f"{torch.cuda.max_memory_allocated() / 2**30:>8.2f} GiB peak" if self.device.startswith("cuda") else ""
+        CONSOLE.print(f"{name:<24} {duration / self.num_refinements * 1000:>10.1f} ms/refinement {peak}")
+
+    def main(self) -> None:
+        """Main function."""
+        CONSOLE.print(f"{self.num_gaussians:,} gaussians on {self.device}")
+        self._time("reallocate (cat/mask)", use_storage=False)
+        self._time("GaussianStorage", use_storage=True)
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkGaussianStorage).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
@@ -0,0 +1,78 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark the k-nearest neighbour backends used to initialize splatfacto on synthetic point clouds of growing size.
+
+Usage: python nerfstudio/scripts/benchmarking/benchmark_knn.py --num-points 100000 1000000 --backends grid tree
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+import torch
+import tyro
+
+from nerfstudio.model_components.knn import KNNBackend, k_nearest
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+@dataclass
+class BenchmarkKNN:
+    """Measure the time to find the 3 nearest neighbours of every point with each backend."""
+
+    num_points: List[int] = field(default_factory=lambda: [100_000, 1_000_000, 5_000_000])
+    """Sizes of the point clouds."""
+    backends: List[KNNBackend] = field(default_factory=lambda: ["grid", "tree"])
+    """Backends to time."""
+    surface: bool = True
+    """Sample the points on a sphere, like SfM or lidar points, instead of inside a cube."""
+    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    """Device the points of the grid backend live on."""
+
+    def _points(self, num_points: int) -> torch.Tensor:
+        points = torch.randn((num_points, 3))
+        if self.surface:
+            points = points / torch.linalg.norm(points, dim=-1, keepdim=True)
+        return points
+
+    def main(self) -> None:
+        """Main function."""
+        for num_points in self.num_points:
+            points = self._points(num_points)
+            for backend in self.backends:
+                backend_points = points.to(self.device) if backend == "grid" else points
+                k_nearest(backend_points[:1000], 3, backend=backend)  # warm up
+                if backend_points.is_cuda:
+                    torch.cuda.synchronize()
+                start = time.perf_counter()
+                k_nearest(backend_points, 3, backend=backend)
+                if backend_points.is_cuda:
+                    torch.cuda.synchronize()
+                duration = time.perf_counter() - start
+                device = backend_points.device.type
+                CONSOLE.print(f"{num_points:>12,} points  {backend:<5} ({device:<4}) {duration:>8.2f} s")
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkKNN).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
@@ -0,0 +1,107 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark the rays per second of the pixel samplers on synthetic image batches, with and without masks.
+
+Usage: python nerfstudio/scripts/benchmarking/benchmark_pixel_sampler.py --num-images 100 --device cuda
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+import torch
+import tyro
+
+from nerfstudio.data.pixel_samplers import (
+    ErrorMapPixelSampler,
+    ErrorMapPixelSamplerConfig,
+    PixelSampler,
+    PixelSamplerConfig,
+)
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def sample_nonzero_per_batch(mask: torch.Tensor, batch_size: int) -> torch.Tensor:
+    """The previous non-rejection masked sampling, which searches the mask on every batch."""
+    nonzero_indices = torch.nonzero(mask[..., 0], as_tuple=False)
+    chosen_indices = random.sample(range(len(nonzero_indices)), k=batch_size)
+    return nonzero_indices[chosen_indices]
+
+
+@dataclass
+class BenchmarkPixelSampler:
+    """Measure the rays per second of masked, unmasked and error map pixel sampling."""
+
+    num_images: int = 50
+    """Number of images in the image batch."""
+    image_height: int = 800
+    """Height of the synthetic images."""
+    image_width: int = 800
+    """Width of the synthetic images."""
+    mask_fraction: float = 0.5
+    """Fraction of every image that is inside the mask."""
+    num_rays_per_batch: int = 4096
+    """Number of rays to sample per batch."""
+    num_batches: int = 50
+    """Number of batches to time for every sampler."""
+    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    """Device to sample on."""
+
+    def _time(self, name: str, sample_fn: Callable[[], object]) -> None:
+        sample_fn()  # warm up and build cached indices
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        for _ in range(self.num_batches):
+            sample_fn()
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        rays_per_sec = self.num_batches * self.num_rays_per_batch / (time.perf_counter() - start)
+        CONSOLE.print(f"{name:<32} {rays_per_sec:>16,.0f} rays/s")
+
+    def main(self) -> None:
+        """Main function."""
+        shape = (self.num_images, self.image_height, self.image_width)
+        mask = torch.rand(shape + (1,), device=self.device) < self.mask_fraction
+        batch: Dict[str, torch.Tensor] = {
+            "image": torch.rand(shape + (3,), device=self.device),
+            "image_idx": torch.arange(self.num_images),
+        }
+        masked_batch = dict(batch, mask=mask)
+
+        config = PixelSamplerConfig(num_rays_per_batch=self.num_rays_per_batch)
+        sampler = PixelSampler(config)
+        error_map_sampler = ErrorMapPixelSampler(ErrorMapPixelSamplerConfig(num_rays_per_batch=self.num_rays_per_batch))
+
+        CONSOLE.print(f"{self.num_images} images of {self.image_width}x{self.image_height} on {self.device}")
+        self._time("unmasked", lambda: sampler.sample(batch))
+        self._time("masked, previous (per batch)", lambda: sample_nonzero_per_batch(mask, self.num_rays_per_batch))
+        self._time("masked, cached valid pixels", lambda: sampler.sample(masked_batch))
+        self._time("error map, unmasked", lambda: error_map_sampler.sample(batch))
+        self._time("error map, masked", lambda: error_map_sampler.sample(masked_batch))
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkPixelSampler).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
@@ -0,0 +1,114 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark the per-element and vectorized Gaussian splat PLY writers on synthetic data.
+
+Usage: python nerfstudio/scripts/benchmarking/benchmark_ply_export.py --counts 1000000 5000000
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+import typing
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import tyro
+
+from nerfstudio.exporter import ply_utils
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def synthetic_splat_columns(count: int, sh_degree: int = 3) -> typing.OrderedDict[str, np.ndarray]:
+    """Creates columns with the same layout as the ``ExportGaussianSplat`` output."""
+    rng = np.random.default_rng(0)
+    map_to_tensors: typing.OrderedDict[str, np.ndarray] = OrderedDict()
+    names = ["x", "y", "z", "nx", "ny", "nz"] + [f"f_dc_{i}" for i in range(3)]
+    names += [f"f_rest_{i}" for i in range(3 * ((sh_degree + 1) ** 2 - 1))]
+    names += ["opacity"] + [f"scale_{i}" for i in range(3)] + [f"rot_{i}" for i in range(4)]
+    for name in names:
+        map_to_tensors[name] = rng.standard_normal(count, dtype=np.float32)
+    return map_to_tensors
+
+
+def write_ply_per_element(filename: str, count: int, map_to_tensors: typing.OrderedDict[str, np.ndarray]) -> None:
+    """The previous writer, which serializes one value at a time."""
+    with open(filename, "wb") as ply_file:
+        ply_utils.write_ply_header(ply_file, count, ply_utils.get_vertex_dtype(map_to_tensors))
+        for i in range(count):
+            for tensor in map_to_tensors.values():
+                value = tensor[i]
+                if tensor.dtype.kind == "f":
+                    ply_file.write(np.float32(value).tobytes())
+                elif tensor.dtype == np.uint8:
+                    ply_file.write(value.tobytes())
+
+
+@dataclass
+class BenchmarkPlyExport:
+    """Compare the per-element and vectorized splat PLY writers."""
+
+    counts: List[int] = field(default_factory=lambda: [1_000_000, 5_000_000])
+    """Number of synthetic Gaussians to export."""
+    sh_degree: int = 3
+    """Spherical harmonics degree of the synthetic model."""
+    chunk_size: int = ply_utils.DEFAULT_CHUNK_SIZE
+    """Chunk size for the vectorized writer."""
+    per_element_max_count: int = 100_000
+    """The per-element writer is timed on at most this many Gaussians and extrapolated linearly."""
+    output_dir: Optional[Path] = None
+    """Where to write the temporary files. Defaults to the system temp directory."""
+
+    def main(self) -> None:
+        """Main function."""
+        with tempfile.TemporaryDirectory(dir=self.output_dir) as tmp_dir:
+            for count in self.counts:
+                map_to_tensors = synthetic_splat_columns(count, self.sh_degree)
+                filename = str(Path(tmp_dir) / "splat.ply")
+
+                start = time.perf_counter()
+                ply_utils.write_ply(filename, count, map_to_tensors, chunk_size=self.chunk_size)
+                vectorized = time.perf_counter() - start
+                size_mb = Path(filename).stat().st_size / 1e6
+
+                start = time.perf_counter()
+                ply_utils.read_ply(filename)
+                read = time.perf_counter() - start
+
+                sub_count = min(count, self.per_element_max_count)
+                sub_tensors = OrderedDict((k, v[:sub_count]) for k, v in map_to_tensors.items())
+                start = time.perf_counter()
+                write_ply_per_element(filename, sub_count, sub_tensors)
+                per_element = (time.perf_counter() - start) * count / sub_count
+
+                CONSOLE.print(
+                    f"{count:>10,d} gaussians ({size_mb:,.0f} MB): per-element {per_element:8.2f}s"
+                    f"{' (extrapolated)' if sub_count < count else ''}, vectorized write {vectorized:6.2f}s,"
+                    f" read {read:6.2f}s, speedup {per_element / vectorized:,.0f}x"
+                )
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkPlyExport).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
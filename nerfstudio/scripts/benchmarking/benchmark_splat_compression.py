@@ -0,0 +1,86 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark the size and eval PSNR of a trained splatfacto model at several spherical harmonics codebook sizes.
+
+Usage: python nerfstudio/scripts/benchmarking/benchmark_splat_compression.py --load-config outputs/.../config.yml
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import torch
+import tyro
+
+from nerfstudio.model_components.splat_compression import COMPRESSED_PREFIX, compress_gaussians
+from nerfstudio.models.splatfacto import SplatfactoModel
+from nerfstudio.utils.eval_utils import eval_setup
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def _num_bytes(state: Dict[str, torch.Tensor]) -> int:
+    buffer = io.BytesIO()
+    torch.save(state, buffer)
+    return buffer.tell()
+
+
+@dataclass
+class BenchmarkSplatCompression:
+    """Compare the eval metrics of the full precision gaussians with compressed ones, as ns-eval reports them."""
+
+    load_config: Path
+    """Path to the config YAML file of a trained splatfacto model."""
+    sh_codebook_sizes: List[int] = field(default_factory=lambda: [1024, 4096, 16384, 65536])
+    """Spherical harmonics codebook sizes to compare."""
+    chunk_size: int = 256
+    """Number of neighbouring gaussians sharing quantization bounds."""
+
+    def main(self) -> None:
+        """Main function."""
+        _, pipeline, _, _ = eval_setup(self.load_config)
+        model = pipeline.model
+        assert isinstance(model, SplatfactoModel)
+        state = {key: value.detach().clone() for key, value in model.state_dict().items()}
+        gauss_params = {name: state.pop(f"gauss_params.{name}") for name in model.gauss_params}
+
+        rows = []
+        metrics = pipeline.get_average_eval_image_metrics()
+        rows.append(("float32", _num_bytes(gauss_params), metrics))
+        for sh_codebook_size in self.sh_codebook_sizes:
+            compressed = compress_gaussians(gauss_params, self.chunk_size, sh_codebook_size)
+            model.load_state_dict({**state, **{COMPRESSED_PREFIX + key: value for key, value in compressed.items()}})
+            metrics = pipeline.get_average_eval_image_metrics()
+            rows.append((f"codebook {sh_codebook_size}", _num_bytes(compressed), metrics))
+
+        CONSOLE.print(f"{model.num_points:,} gaussians")
+        for name, num_bytes, metrics in rows:
+            CONSOLE.print(
+                f"{name:<16} {num_bytes / 2**20:>10.1f} MiB {metrics['psnr']:>8.2f} PSNR {metrics['ssim']:>8.4f} SSIM"
+                f" {metrics['lpips']:>8.4f} LPIPS"
+            )
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkSplatCompression).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
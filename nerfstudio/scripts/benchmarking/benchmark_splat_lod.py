@@ -0,0 +1,131 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark frustum culling and level of detail with GaussianLOD on a large synthetic scene.
+
+Usage: python nerfstudio/scripts/benchmarking/benchmark_splat_lod.py --num-gaussians 3000000 --device cuda
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+import torch
+import tyro
+
+from nerfstudio.model_components.splat_lod import GaussianLOD
+from nerfstudio.model_components.torch_rasterizer import rasterization_torch
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+@dataclass
+class BenchmarkSplatLOD:
+    """Measure the gaussians drawn and the frames per second of a camera looking across a wide scene."""
+
+    num_gaussians: int = 1_000_000
+    """Number of gaussians in the scene."""
+    scene_size: float = 1000.0
+    """Width of the square slab of gaussians the camera stands in."""
+    thickness: float = 0.5
+    """Thickness of the slab of gaussians, thin like the surfaces of a captured scene."""
+    pixel_sizes: List[float] = field(default_factory=lambda: [0.0, 1.0, 2.0, 4.0])
+    """Screen sizes below which nodes are drawn as proxies. 0 only culls to the frustum."""
+    width: int = 640
+    """Width of the images."""
+    height: int = 480
+    """Height of the images."""
+    num_frames: int = 3
+    """Number of frames to time."""
+    render: bool = True
+    """Whether to time rendering, with gsplat on CUDA and the PyTorch rasterizer otherwise."""
+    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    """Device to render on."""
+
+    def _synchronize(self) -> None:
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+
+    def main(self) -> None:
+        """Main function."""
+        generator = torch.Generator().manual_seed(0)
+        n = self.num_gaussians
+        means = (torch.rand((n, 3), generator=generator) - 0.5) * torch.tensor(
+            [self.scene_size, self.thickness, self.scene_size]
+        )
+        quats = torch.nn.functional.normalize(torch.randn((n, 4), generator=generator), dim=-1)
+        scales = torch.rand((n, 3), generator=generator) * 0.1 + 0.02
+        opacities = torch.rand(n, generator=generator)
+        colors = torch.rand((n, 3), generator=generator)
+        means, quats, scales, opacities, colors = (t.to(self.device) for t in (means, quats, scales, opacities, colors))
+        focal = 0.8 * self.width
+        K = torch.tensor([[focal, 0.0, self.width / 2], [0.0, focal, self.height / 2], [0.0, 0.0, 1.0]])
+        K = K.to(self.device)
+        viewmat = torch.eye(4, device=self.device)
+        CONSOLE.print(f"{n:,} gaussians at {self.width}x{self.height} on {self.device}")
+
+        self._synchronize()
+        start = time.perf_counter()
+        lod = GaussianLOD(means, scales, quats, opacities, colors)
+        self._synchronize()
+        CONSOLE.print(f"built octree in {time.perf_counter() - start:.2f} s")
+
+        if self.device.startswith("cuda"):
+            from gsplat.rendering import rasterization as rasterize_fn
+        else:
+            rasterize_fn = rasterization_torch
+        params = {"means": means, "quats": quats, "scales": scales.log(), "opacities": torch.logit(opacities)[:, None]}
+        params["features_dc"] = colors
+        for pixel_size in self.pixel_sizes:
+            self._synchronize()
+            start = time.perf_counter()
+            for _ in range(self.num_frames):
+                gaussian_ids, proxy_ids = lod.select(viewmat, K, self.width, self.height, pixel_size)
+            self._synchronize()
+            select_ms = (time.perf_counter() - start) / self.num_frames * 1000
+            line = f"pixel size {pixel_size:>4}: {len(gaussian_ids):>10,} gaussians {len(proxy_ids):>10,} proxies"
+            line += f" {select_ms:>8.1f} ms select"
+            if self.render:
+                selected = lod.gather(params, gaussian_ids, proxy_ids)
+                args = (
+                    selected["means"],
+                    selected["quats"],
+                    selected["scales"].exp(),
+                    torch.sigmoid(selected["opacities"][:, 0]),
+                    selected["features_dc"],
+                    viewmat[None],
+                    K[None],
+                    self.width,
+                    self.height,
+                )
+                rasterize_fn(*args)  # warm up
+                self._synchronize()
+                start = time.perf_counter()
+                for _ in range(self.num_frames):
+                    rasterize_fn(*args)
+                self._synchronize()
+                line += f" {self.num_frames / (time.perf_counter() - start):>8.2f} frames/s"
+            CONSOLE.print(line)
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkSplatLOD).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
@@ -0,0 +1,94 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark the frames per second of the PyTorch gaussian rasterizer on synthetic scenes, and of gsplat when available.
+
+Usage: python nerfstudio/scripts/benchmarking/benchmark_torch_rasterizer.py --num-gaussians 100000 --device cpu
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import torch
+import tyro
+
+from nerfstudio.model_components.torch_rasterizer import rasterization_torch
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+@dataclass
+class BenchmarkTorchRasterizer:
+    """Measure the frames per second of rendering a cloud of gaussians in front of the camera."""
+
+    num_gaussians: int = 100_000
+    """Number of gaussians in the scene."""
+    width: int = 640
+    """Width of the images."""
+    height: int = 480
+    """Height of the images."""
+    sh_degree: int = 3
+    """Degree of the spherical harmonics."""
+    num_frames: int = 5
+    """Number of frames to time."""
+    device: str = "cpu"
+    """Device to render on."""
+
+    def _time(self, name: str, render_fn: Callable[[], object]) -> None:
+        render_fn()  # warm up
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        for _ in range(self.num_frames):
+            render_fn()
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        fps = self.num_frames / (time.perf_counter() - start)
+        CONSOLE.print(f"{name:<8} {fps:>10.2f} frames/s {fps * self.width * self.height / 1e6:>10.2f} Mpixels/s")
+
+    def main(self) -> None:
+        """Main function."""
+        generator = torch.Generator().manual_seed(0)
+        n = self.num_gaussians
+        means = torch.rand((n, 3), generator=generator) * torch.tensor([8.0, 6.0, 6.0]) + torch.tensor(
+            [-4.0, -3.0, 2.0]
+        )
+        quats = torch.nn.functional.normalize(torch.randn((n, 4), generator=generator), dim=-1)
+        scales = torch.rand((n, 3), generator=generator) * 0.05 + 0.005
+        opacities = torch.rand(n, generator=generator)
+        colors = torch.randn((n, (self.sh_degree + 1) ** 2, 3), generator=generator) * 0.3
+        focal = 0.8 * self.width
+        K = torch.tensor([[focal, 0.0, self.width / 2], [0.0, focal, self.height / 2], [0.0, 0.0, 1.0]])
+        args = [t.to(self.device) for t in (means, quats, scales, opacities, colors, torch.eye(4)[None], K[None])]
+        kwargs = dict(width=self.width, height=self.height, sh_degree=self.sh_degree, render_mode="RGB+ED")
+
+        CONSOLE.print(f"{n:,} gaussians at {self.width}x{self.height} on {self.device}")
+        self._time("torch", lambda: rasterization_torch(*args, **kwargs))
+        if self.device.startswith("cuda"):
+            from gsplat.rendering import rasterization
+
+            self._time("gsplat", lambda: rasterization(*args, **kwargs))
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkTorchRasterizer).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
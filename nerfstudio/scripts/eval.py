@@ -40,10 +40,12 @@ class ComputePSNR:
     output_path: Path = Path("output.json")
     # Optional path to save rendered outputs to.
     render_output_path: Optional[Path] = None
+    # Optional path to a checkpoint file to evaluate instead of the latest one, such as a compressed splat.
+    load_checkpoint: Optional[Path] = None
 
     def main(self) -> None:
         """Main function."""
-        config, pipeline, checkpoint_path, _ = eval_setup(self.load_config)
+        config, pipeline, checkpoint_path, _ = eval_setup(self.load_config, load_checkpoint=self.load_checkpoint)
         assert self.output_path.suffix == ".json"
         if self.render_output_path is not None:
             self.render_output_path.mkdir(parents=True, exist_ok=True)
@@ -54,6 +56,7 @@ class ComputePSNR:
             "experiment_name": config.experiment_name,
             "method_name": config.method_name,
             "checkpoint": str(checkpoint_path),
+            "checkpoint_bytes": checkpoint_path.stat().st_size,
             "results": metrics_dict,
         }
         # Save output to output file
@@ -39,10 +39,14 @@ from nerfstudio.data.datamanagers.full_images_datamanager import FullImageDatama
 from nerfstudio.data.datamanagers.parallel_datamanager import ParallelDataManager
 from nerfstudio.data.datamanagers.random_cameras_datamanager import RandomCamerasDataManager
 from nerfstudio.data.scene_box import OrientedBox
-from nerfstudio.exporter import texture_utils, tsdf_utils
+from nerfstudio.exporter import ply_utils, texture_utils, tsdf_utils
 from nerfstudio.exporter.exporter_utils import collect_camera_poses, generate_point_cloud, get_mesh_from_filename
-from nerfstudio.exporter.marching_cubes import generate_mesh_with_multires_marching_cubes
+from nerfstudio.exporter.marching_cubes import (
+    generate_mesh_with_multires_marching_cubes,
+    generate_mesh_with_octree_marching_cubes,
+)
 from nerfstudio.fields.sdf_field import SDFField  # noqa
+from nerfstudio.model_components.splat_compression import COMPRESSED_PREFIX, compress_gaussians
 from nerfstudio.models.splatfacto import SplatfactoModel
 from nerfstudio.pipelines.base_pipeline import Pipeline, VanillaPipeline
 from nerfstudio.utils.eval_utils import eval_setup
@@ -203,6 +207,10 @@ class ExportTSDFMesh(Exporter):
     """Minimum of the bounding box, used if use_bounding_box is True."""
     bounding_box_max: Tuple[float, float, float] = (1, 1, 1)
     """Minimum of the bounding box, used if use_bounding_box is True."""
+    sparse: bool = False
+    """Only allocate voxel blocks near the observed surfaces. Needed for resolutions well above 256."""
+    block_size: int = 8
+    """Number of voxels along each side of the blocks of the sparse volume."""
     texture_method: Literal["tsdf", "nerf"] = "nerf"
     """Method to texture the mesh with. Either 'tsdf' or 'nerf'."""
     px_per_uv_triangle: int = 4
@@ -233,6 +241,8 @@ class ExportTSDFMesh(Exporter):
             use_bounding_box=self.use_bounding_box,
             bounding_box_min=self.bounding_box_min,
             bounding_box_max=self.bounding_box_max,
+            sparse=self.sparse,
+            block_size=self.block_size,
         )
 
         # possibly
@@ -387,6 +397,16 @@ class ExportMarchingCubesMesh(Exporter):
     """The isosurface threshold for extraction. For SDF based methods the surface is the zero level set."""
     resolution: int = 1024
     """Marching cube resolution."""
+    use_octree: bool = False
+    """Only evaluate the SDF in octree cells that may contain the surface, which is much faster at high resolution.
+    Assumes the SDF changes no faster than lipschitz_constant with distance, and may drop parts of the surface of
+    SDFs that are not metric. Otherwise, evaluate a dense pyramid, which requires the resolution to be divisible by
+    512."""
+    octree_leaf_resolution: int = 32
+    """Number of grid cells along each side of the octree leaves that marching cubes runs on."""
+    lipschitz_constant: float = 1.5
+    """Bound on how fast the SDF changes with distance, used to prune octree cells. Increase it if parts of the
+    surface are missing."""
     simplify_mesh: bool = False
     """Whether to simplify the mesh."""
     bounding_box_min: Tuple[float, float, float] = (-1.0, -1.0, -1.0)
@@ -414,21 +434,34 @@ class ExportMarchingCubesMesh(Exporter):
 
         CONSOLE.print("Extracting mesh with marching cubes... which may take a while")
 
-        assert self.resolution % 512 == 0, f"""resolution must be divisible by 512, got {self.resolution}.
-        This is important because the algorithm uses a multi-resolution approach
-        to evaluate the SDF where the minimum resolution is 512."""
-
-        # Extract mesh using marching cubes for sdf at a multi-scale resolution.
-        multi_res_mesh = generate_mesh_with_multires_marching_cubes(
-            geometry_callable_field=lambda x: cast(SDFField, pipeline.model.field)
-            .forward_geonetwork(x)[:, 0]
-            .contiguous(),
-            resolution=self.resolution,
-            bounding_box_min=self.bounding_box_min,
-            bounding_box_max=self.bounding_box_max,
-            isosurface_threshold=self.isosurface_threshold,
-            coarse_mask=None,
-        )
+        def geometry_callable_field(x: torch.Tensor) -> torch.Tensor:
+            return cast(SDFField, pipeline.model.field).forward_geonetwork(x)[:, 0].contiguous()
+
+        if self.use_octree:
+            multi_res_mesh = generate_mesh_with_octree_marching_cubes(
+                geometry_callable_field,
+                resolution=self.resolution,
+                bounding_box_min=self.bounding_box_min,
+                bounding_box_max=self.bounding_box_max,
+                isosurface_threshold=self.isosurface_threshold,
+                leaf_resolution=self.octree_leaf_resolution,
+                lipschitz_constant=self.lipschitz_constant,
+                device=pipeline.device,
+            )
+        else:
+            assert self.resolution % 512 == 0, f"""resolution must be divisible by 512, got {self.resolution}.
+            This is important because the algorithm uses a multi-resolution approach
+            to evaluate the SDF where the minimum resolution is 512."""
+
+            # Extract mesh using marching cubes for sdf at a multi-scale resolution.
+            multi_res_mesh = generate_mesh_with_multires_marching_cubes(
+                geometry_callable_field=geometry_callable_field,
+                resolution=self.resolution,
+                bounding_box_min=self.bounding_box_min,
+                bounding_box_max=self.bounding_box_max,
+                isosurface_threshold=self.isosurface_threshold,
+                coarse_mask=None,
+            )
         filename = self.output_dir / "sdf_marching_cubes_mesh.ply"
         multi_res_mesh.export(filename)
 
@@ -486,11 +519,15 @@ class ExportGaussianSplat(Exporter):
     obb_scale: Optional[Tuple[float, float, float]] = None
     """Scale of the oriented bounding box along each axis."""
 
+    ply_chunk_size: int = ply_utils.DEFAULT_CHUNK_SIZE
+    """Number of Gaussians packed per write. Bounds the extra memory used while writing."""
+
     @staticmethod
     def write_ply(
         filename: str,
         count: int,
         map_to_tensors: typing.OrderedDict[str, np.ndarray],
+        chunk_size: int = ply_utils.DEFAULT_CHUNK_SIZE,
     ):
         """
         Writes a PLY file with given vertex properties and a tensor of float or uint8 values in the order specified by the OrderedDict.
@@ -501,44 +538,9 @@ class ExportGaussianSplat(Exporter):
         count (int): The number of vertices to write.
         map_to_tensors (OrderedDict[str, np.ndarray]): An ordered dictionary mapping property names to numpy arrays of float or uint8 values.
             Each array should be 1-dimensional and of equal length matching 'count'. Arrays should not be empty.
+        chunk_size (int): Number of vertices packed and written at a time.
         """
-
-        # Ensure count matches the length of all tensors
-        if not all(len(tensor) == count for tensor in map_to_tensors.values()):
-            raise ValueError("Count does not match the length of all tensors")
-
-        # Type check for numpy arrays of type float or uint8 and non-empty
-        if not all(
-            isinstance(tensor, np.ndarray)
-            and (tensor.dtype.kind == "f" or tensor.dtype == np.uint8)
-            and tensor.size > 0
-            for tensor in map_to_tensors.values()
-        ):
-            raise ValueError("All tensors must be numpy arrays of float or uint8 type and not empty")
-
-        with open(filename, "wb") as ply_file:
-            # Write PLY header
-            ply_file.write(b"ply\n")
-            ply_file.write(b"format binary_little_endian 1.0\n")
-
-            ply_file.write(f"element vertex {count}\n".encode())
-
-            # Write properties, in order due to OrderedDict
-            for key, tensor in map_to_tensors.items():
-                data_type = "float" if tensor.dtype.kind == "f" else "uchar"
-                ply_file.write(f"property {data_type} {key}\n".encode())
-
-            ply_file.write(b"end_header\n")
-
-            # Write binary data
-            # Note: If this is a performance bottleneck consider using numpy.hstack for efficiency improvement
-            for i in range(count):
-                for tensor in map_to_tensors.values():
-                    value = tensor[i]
-                    if tensor.dtype.kind == "f":
-                        ply_file.write(np.float32(value).tobytes())
-                    elif tensor.dtype == np.uint8:
-                        ply_file.write(value.tobytes())
+        ply_utils.write_ply(filename, count, map_to_tensors, chunk_size=chunk_size)
 
     def main(self) -> None:
         if not self.output_dir.exists():
@@ -578,7 +580,9 @@ class ExportGaussianSplat(Exporter):
                     map_to_tensors[f"f_rest_{i}"] = shs_rest[:, i, None]
             else:
                 colors = torch.clamp(model.colors.clone(), 0.0, 1.0).data.cpu().numpy()
-                map_to_tensors["colors"] = (colors * 255).astype(np.uint8)
+                colors = (colors * 255).astype(np.uint8)
+                for i, channel in enumerate(("red", "green", "blue")):
+                    map_to_tensors[channel] = colors[:, i, None]
 
             map_to_tensors["opacity"] = model.opacities.data.cpu().numpy()
 
@@ -616,7 +620,68 @@ class ExportGaussianSplat(Exporter):
                 map_to_tensors[k] = map_to_tensors[k][select]
             count = np.sum(select)
 
-        ExportGaussianSplat.write_ply(str(filename), count, map_to_tensors)
+        ExportGaussianSplat.write_ply(str(filename), count, map_to_tensors, chunk_size=self.ply_chunk_size)
+
+
+@dataclass
+class ExportCompressedGaussianSplat(Exporter):
+    """
+    Export 3D Gaussian Splatting model to a compressed checkpoint, which ns-viewer and ns-eval load with
+    --load-checkpoint.
+    """
+
+    obb_center: Optional[Tuple[float, float, float]] = None
+    """Center of the oriented bounding box."""
+    obb_rotation: Optional[Tuple[float, float, float]] = None
+    """Rotation of the oriented bounding box. Expressed as RPY Euler angles in radians"""
+    obb_scale: Optional[Tuple[float, float, float]] = None
+    """Scale of the oriented bounding box along each axis."""
+    chunk_size: int = 256
+    """Number of neighbouring Gaussians sharing quantization bounds."""
+    sh_codebook_size: int = 4096
+    """Number of distinct higher order spherical harmonics, at most 65536."""
+    sh_codebook_iters: int = 10
+    """Number of k-means iterations fitting the spherical harmonics codebook."""
+
+    def main(self) -> None:
+        if not self.output_dir.exists():
+            self.output_dir.mkdir(parents=True)
+
+        _, pipeline, _, step = eval_setup(self.load_config)
+
+        assert isinstance(pipeline.model, SplatfactoModel)
+
+        model: SplatfactoModel = pipeline.model
+
+        filename = self.output_dir / "splat.ckpt"
+
+        with torch.no_grad():
+            # post optimization, it is possible have NaN/Inf values in some attributes
+            select = torch.ones(model.num_points, dtype=torch.bool, device=model.device)
+            for name, param in model.gauss_params.items():
+                select &= torch.isfinite(param).flatten(1).all(dim=-1)
+            if not select.all():
+                CONSOLE.print(f"values have NaN/Inf in gauss_params, only export {int(select.sum())}/{len(select)}")
+            if self.obb_center is not None and self.obb_rotation is not None and self.obb_scale is not None:
+                crop_obb = OrientedBox.from_params(self.obb_center, self.obb_rotation, self.obb_scale)
+                assert crop_obb is not None
+                select &= crop_obb.within(model.means.cpu()).to(model.device)
+
+            state = pipeline.state_dict()
+            for name in model.gauss_params:
+                del state[f"_model.gauss_params.{name}"]
+            gauss_params = {name: param[select] for name, param in model.gauss_params.items()}
+            compressed = compress_gaussians(
+                gauss_params,
+                chunk_size=self.chunk_size,
+                sh_codebook_size=self.sh_codebook_size,
+                sh_codebook_iters=self.sh_codebook_iters,
+            )
+            for key, value in compressed.items():
+                state[f"_model.{COMPRESSED_PREFIX}{key}"] = value.cpu()
+
+        torch.save({"step": step, "pipeline": state}, filename)
+        CONSOLE.print(f"Saved {int(select.sum())} Gaussians in {filename.stat().st_size / 2**20:.1f} MiB to {filename}")
 
 
 Commands = tyro.conf.FlagConversionOff[
@@ -627,6 +692,7 @@ Commands = tyro.conf.FlagConversionOff[
         Annotated[ExportMarchingCubesMesh, tyro.conf.subcommand(name="marching-cubes")],
         Annotated[ExportCameraPoses, tyro.conf.subcommand(name="cameras")],
         Annotated[ExportGaussianSplat, tyro.conf.subcommand(name="gaussian-splat")],
+        Annotated[ExportCompressedGaussianSplat, tyro.conf.subcommand(name="compressed-gaussian-splat")],
     ]
 ]
 
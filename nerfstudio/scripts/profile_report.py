@@ -0,0 +1,167 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Summarize the step traces written with --logging.step-trace, and compare two runs.
+
+Usage:
+    ns-profile-report --trace outputs/poster/nerfacto/2024-01-01_000000
+    ns-profile-report --trace outputs/.../new_run --baseline outputs/.../old_run
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import tyro
+from rich.table import Table
+
+from nerfstudio.utils.profiler import TRACE_PHASES, read_step_trace
+from nerfstudio.utils.rich_utils import CONSOLE
+
+COLUMNS = ("total",) + TRACE_PHASES + ("other",)
+
+
+def find_step_trace(path: Path) -> Path:
+    """Returns the trace file at a path, or the most recent trace file in a directory."""
+    if path.is_file():
+        return path
+    traces = sorted(path.rglob("step_trace.nstrace"), key=lambda p: p.stat().st_mtime)
+    if not traces:
+        raise FileNotFoundError(f"No step_trace.nstrace found in {path}")
+    return traces[-1]
+
+
+def summarize(trace: Dict[str, np.ndarray], percentiles: Tuple[float, ...]) -> Dict[str, Dict[str, float]]:
+    """Computes the mean, percentiles and maximum duration of every phase, in seconds."""
+    summary = {}
+    for column in COLUMNS:
+        values = trace[column].astype(np.float64)
+        stats = {"mean": float(values.mean())}
+        for q, value in zip(percentiles, np.percentile(values, percentiles)):
+            stats[f"p{q:g}"] = float(value)
+        stats["max"] = float(values.max())
+        summary[column] = stats
+    return summary
+
+
+@dataclass
+class ProfileReport:
+    """Summarize per-step timings of a training run and find regressions against a baseline run."""
+
+    trace: Path
+    """Step trace file, or a run directory containing one."""
+    baseline: Optional[Path] = None
+    """Step trace file or run directory to compare against."""
+    skip_steps: int = 10
+    """Number of steps at the start of each trace to ignore as warm up."""
+    percentiles: Tuple[float, ...] = (50, 90, 99)
+    """Percentiles of the step and phase durations to report."""
+    regression_threshold: float = 0.1
+    """Relative increase of a phase's median or highest percentile duration that is reported as a regression."""
+    num_slowest_steps: int = 5
+    """Number of slowest steps to list, to help find stalls."""
+    fail_on_regression: bool = False
+    """Exit with a non-zero status if a regression is found."""
+
+    def _load(self, path: Path) -> Dict[str, np.ndarray]:
+        trace_path = find_step_trace(path)
+        trace = read_step_trace(trace_path)
+        num_steps = len(trace["step"])
+        if num_steps <= self.skip_steps:
+            raise ValueError(f"{trace_path} has {num_steps} steps, not more than skip_steps={self.skip_steps}")
+        CONSOLE.print(f"{trace_path}: {num_steps} steps, skipping the first {self.skip_steps}")
+        return {name: values[self.skip_steps :] for name, values in trace.items()}
+
+    def _print_summary(self, trace: Dict[str, np.ndarray], summary: Dict[str, Dict[str, float]]) -> None:
+        table = Table(title="Step time (ms)")
+        table.add_column("phase")
+        table.add_column("share", justify="right")
+        for stat in ["mean"] + [f"p{q:g}" for q in self.percentiles] + ["max"]:
+            table.add_column(stat, justify="right")
+        total_time = float(trace["total"].sum())
+        for column in COLUMNS:
+            share = float(trace[column].sum()) / total_time if total_time > 0 else 0.0
+            table.add_row(column, f"{share:.1%}", *[f"{value * 1e3:.2f}" for value in summary[column].values()])
+        CONSOLE.print(table)
+
+        slowest = np.argsort(trace["total"])[::-1][: self.num_slowest_steps]
+        table = Table(title="Slowest steps (ms)")
+        table.add_column("step", justify="right")
+        table.add_column("total", justify="right")
+        table.add_column("largest phase")
+        for idx in slowest:
+            phase = max(TRACE_PHASES + ("other",), key=lambda name: trace[name][idx])
+            table.add_row(
+                str(trace["step"][idx]),
+                f"{trace['total'][idx] * 1e3:.2f}",
+                f"{phase} ({trace[phase][idx] * 1e3:.2f})",
+            )
+        CONSOLE.print(table)
+
+    def _compare(self, summary: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> List[str]:
+        stats = ("mean", f"p{self.percentiles[0]:g}", f"p{self.percentiles[-1]:g}")
+        table = Table(title="Change against baseline")
+        table.add_column("phase")
+        for stat in stats:
+            table.add_column(f"{stat} (ms)", justify="right")
+        regressions = []
+        for column in COLUMNS:
+            cells = []
+            for stat in stats:
+                new, old = summary[column][stat], baseline[column][stat]
+                change = (new - old) / old if old > 0 else 0.0
+                # Ignore sub-millisecond changes, e.g. of phases that barely run.
+                regressed = change > self.regression_threshold and new - old > 1e-3 and stat != "mean"
+                if regressed:
+                    regressions.append(f"{column} {stat}: {old * 1e3:.2f}ms -> {new * 1e3:.2f}ms ({change:+.0%})")
+                style = "red" if regressed else ("green" if change < -self.regression_threshold else "")
+                text = f"{old * 1e3:.2f} -> {new * 1e3:.2f} ({change:+.0%})"
+                cells.append(f"[{style}]{text}[/{style}]" if style else text)
+            table.add_row(column, *cells)
+        CONSOLE.print(table)
+        return regressions
+
+    def main(self) -> None:
+        """Main function."""
+        trace = self._load(self.trace)
+        summary = summarize(trace, self.percentiles)
+        self._print_summary(trace, summary)
+        if self.baseline is None:
+            return
+
+        baseline_trace = self._load(self.baseline)
+        regressions = self._compare(summary, summarize(baseline_trace, self.percentiles))
+        if not regressions:
+            CONSOLE.print("[bold green]No regressions found")
+            return
+        CONSOLE.print("[bold red]Regressions:")
+        for regression in regressions:
+            CONSOLE.print(f"  {regression}")
+        if self.fail_on_regression:
+            sys.exit(1)
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(ProfileReport).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
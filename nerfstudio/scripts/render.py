@@ -19,22 +19,27 @@ render.py
 
 from __future__ import annotations
 
+import dataclasses
 import gzip
 import json
+import multiprocessing as mp
 import os
 import shutil
 import struct
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Union
+from typing import Any, Deque, Dict, List, Literal, Optional, Union
 
 import mediapy as media
 import numpy as np
 import torch
 import tyro
-import viser.transforms as tf
 from jaxtyping import Float
 from rich import box, style
 from rich.panel import Panel
@@ -61,6 +66,170 @@ from nerfstudio.utils.rich_utils import CONSOLE, ItersPerSecColumn
 from nerfstudio.utils.scripts import run_command
 
 
+def _find_nearest_train_camera(
+    pipeline: Pipeline,
+    camera_to_world: Float[Tensor, "3 4"],
+    train_positions: Float[Tensor, "num_train_cameras 3"],
+    train_rotations: Float[Tensor, "num_train_cameras 3 3"],
+    check_occlusions: bool = False,
+    num_candidates: int = 64,
+) -> int:
+    """Returns the index of the training camera closest in pose to a camera.
+
+    Args:
+        pipeline: Pipeline whose model is used to check occlusions.
+        camera_to_world: Pose of the camera.
+        train_positions: Positions of the training cameras.
+        train_rotations: Rotations of the training cameras.
+        check_occlusions: If true, returns the closest training camera whose line of sight to the camera is not
+            blocked, among the closest `num_candidates`. Falls back to the closest one if all of them are blocked.
+        num_candidates: Number of closest training cameras to check for occlusions.
+    """
+    position = camera_to_world[:, 3]
+    # For the quaternions q, q' of two rotations R, R', 1 - <q, q'>^2 = (3 - trace(R^T R')) / 4.
+    rot_dist = (3 - (train_rotations * camera_to_world[:, :3]).sum(dim=(-2, -1))) / 4
+    pos_dist = torch.norm(train_positions - position, dim=-1)
+    dist = 0.3 * rot_dist + 0.7 * pos_dist
+    if not check_occlusions:
+        return int(torch.argmin(dist))
+
+    # Candidates are sorted by distance; a single ray towards each of them is rendered in one bundle.
+    candidates = torch.topk(dist, min(num_candidates, len(dist)), largest=False).indices
+    offsets = train_positions[candidates] - position
+    distances = torch.norm(offsets, dim=-1, keepdim=True)
+    num_rays = len(candidates)
+    bundle = RayBundle(
+        origins=position.expand(num_rays, 3),
+        directions=offsets / distances.clamp_min(1e-8),
+        pixel_area=torch.ones((num_rays, 1), device=position.device),
+        nears=torch.full((num_rays, 1), 0.05, device=position.device),
+        fars=torch.full((num_rays, 1), 100.0, device=position.device),
+        camera_indices=torch.zeros((num_rays, 1), dtype=torch.int64, device=position.device),
+        metadata={},
+    )
+    with torch.no_grad():
+        depth = pipeline.model.get_outputs(bundle)["depth"]
+    visible = torch.nonzero(depth.view(-1) >= distances.view(-1))
+    if len(visible) == 0:
+        return int(candidates[0])
+    return int(candidates[visible[0, 0]])
+
+
+class _FrameWriter:
+    """Encodes and writes rendered frames on background threads while the next frames render.
+
+    Images are written by a pool of threads. Video frames are fed to the video writer by a single thread, in the order
+    they were submitted. At most `max_inflight_frames` frames wait to be written, after which :meth:`submit` blocks.
+
+    Args:
+        output_format: How to save output data.
+        output_filename: Name of the output video.
+        output_image_dir: Directory of the output images.
+        image_format: Format of the output images.
+        jpeg_quality: Quality of the output jpeg images.
+        fps: Frame rate of the output video.
+        max_inflight_frames: Maximum number of frames waiting to be written.
+        num_workers: Number of threads writing images. If None, uses the ThreadPool default.
+    """
+
+    def __init__(
+        self,
+        output_format: Literal["images", "video"],
+        output_filename: Path,
+        output_image_dir: Path,
+        image_format: Literal["jpeg", "png"] = "jpeg",
+        jpeg_quality: int = 100,
+        fps: float = 30.0,
+        max_inflight_frames: int = 16,
+        num_workers: Optional[int] = None,
+    ):
+        self.output_format = output_format
+        self.output_filename = output_filename
+        self.output_image_dir = output_image_dir
+        self.image_format = image_format
+        self.jpeg_quality = jpeg_quality
+        self.fps = fps
+        self.num_frames = 0
+        """Number of frames written."""
+        self.encode_time = 0.0
+        """Total time spent writing frames, summed over the threads."""
+        self._executor = ThreadPoolExecutor(max_workers=1 if output_format == "video" else num_workers)
+        self._slots = threading.Semaphore(max_inflight_frames)
+        self._pending: Deque[Future] = deque()
+        self._lock = threading.Lock()
+        self._video_writer: Optional[media.VideoWriter] = None
+
+    def submit(self, frame_idx: int, render_image: List[np.ndarray]) -> None:
+        """Queues a frame to be written.
+
+        Args:
+            frame_idx: Index of the frame.
+            render_image: Parts of the frame, concatenated horizontally.
+        """
+        # Raises the errors of frames that were already written.
+        while self._pending and self._pending[0].done():
+            self._pending.popleft().result()
+        self._slots.acquire()
+        future = self._executor.submit(self._write, frame_idx, render_image)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._pending.append(future)
+
+    def get_frame_path(self, frame_idx: int) -> Path:
+        """Returns the path of a frame written as an image."""
+        return self.output_image_dir / f"{frame_idx:05d}.{'png' if self.image_format == 'png' else 'jpg'}"
+
+    def _write(self, frame_idx: int, render_image: List[np.ndarray]) -> None:
+        start = time.perf_counter()
+        image = np.concatenate(render_image, axis=1)
+        if self.output_format == "images":
+            # Written under a temporary name first, so that an interrupted render never leaves a truncated frame.
+            frame_path = self.get_frame_path(frame_idx)
+            tmp_path = frame_path.with_name(f".{frame_path.name}.tmp")
+            if self.image_format == "png":
+                media.write_image(tmp_path, image, fmt="png")
+            if self.image_format == "jpeg":
+                media.write_image(tmp_path, image, fmt="jpeg", quality=self.jpeg_quality)
+            os.replace(tmp_path, frame_path)
+        if self.output_format == "video":
+            if self._video_writer is None:
+                self._video_writer = media.VideoWriter(
+                    path=self.output_filename, shape=(int(image.shape[0]), int(image.shape[1])), fps=self.fps
+                )
+                self._video_writer.__enter__()
+            self._video_writer.add_image(image)
+        with self._lock:
+            self.num_frames += 1
+            self.encode_time += time.perf_counter() - start
+
+    def close(self) -> None:
+        """Waits for all frames to be written and closes the video."""
+        try:
+            while self._pending:
+                self._pending.popleft().result()
+        finally:
+            self._executor.shutdown(wait=True)
+            if self._video_writer is not None:
+                self._video_writer.__exit__(None, None, None)
+                self._video_writer = None
+
+
+def _get_shard_range(num_frames: int, shard_index: int, num_shards: int) -> range:
+    """Returns the contiguous range of frames rendered by a shard."""
+    return range(num_frames * shard_index // num_shards, num_frames * (shard_index + 1) // num_shards)
+
+
+def _get_frames_dir(output_filename: Path, output_format: Literal["images", "video"]) -> Path:
+    """Returns the directory the frames of a sharded render are written to."""
+    if output_format == "video":
+        return output_filename.parent / f"{output_filename.stem}_frames"
+    return output_filename.parent / output_filename.stem
+
+
+def _get_shard_marker(shard_dir: Path, shard_index: int, num_shards: int) -> Path:
+    """Returns the path of the file marking a shard as complete."""
+    return shard_dir / f".shard_{shard_index:03d}_of_{num_shards:03d}.json"
+
+
 def _render_trajectory_video(
     pipeline: Pipeline,
     cameras: Cameras,
@@ -77,6 +246,9 @@ def _render_trajectory_video(
     colormap_options: colormaps.ColormapOptions = colormaps.ColormapOptions(),
     render_nearest_camera=False,
     check_occlusions: bool = False,
+    max_inflight_frames: int = 16,
+    shard_index: int = 0,
+    num_shards: int = 1,
 ) -> None:
     """Helper function to create a video of the spiral trajectory.
 
@@ -94,11 +266,16 @@ def _render_trajectory_video(
         colormap_options: Options for colormap.
         render_nearest_camera: Whether to render the nearest training camera to the rendered camera.
         check_occlusions: If true, checks line-of-sight occlusions when computing camera distance and rejects cameras not visible to each other
+        max_inflight_frames: Maximum number of rendered frames waiting to be encoded before rendering blocks.
+        shard_index: Index of the range of frames to render, if rendering is sharded.
+        num_shards: Number of ranges the frames are split into. If greater than one, the frames of the shard are written
+            as images, frames that already exist are skipped, and the output is assembled by `_assemble_shards`.
     """
     CONSOLE.print("[bold green]Creating trajectory " + output_format)
     cameras.rescale_output_resolution(rendered_resolution_scaling_factor)
     cameras = cameras.to(pipeline.device)
     fps = len(cameras) / seconds
+    is_equirectangular = bool(cameras.camera_type[0] == CameraType.EQUIRECTANGULAR.value)
 
     progress = Progress(
         TextColumn(":movie_camera: Rendering :movie_camera:"),
@@ -112,6 +289,13 @@ def _render_trajectory_video(
         TimeElapsedColumn(),
     )
     output_image_dir = output_filename.parent / output_filename.stem
+    frame_indices = range(cameras.size)
+    if num_shards > 1:
+        # Video frames are kept lossless until they are assembled.
+        output_image_dir = _get_frames_dir(output_filename, output_format)
+        image_format = "png" if output_format == "video" else image_format
+        output_format = "images"
+        frame_indices = _get_shard_range(cameras.size, shard_index, num_shards)
     if output_format == "images":
         output_image_dir.mkdir(parents=True, exist_ok=True)
     if output_format == "video":
@@ -125,65 +309,49 @@ def _render_trajectory_video(
         # but we don't know how big the video file will be, so it's not certain!)
 
     with ExitStack() as stack:
-        writer = None
+        frame_writer = _FrameWriter(
+            output_format=output_format,
+            output_filename=output_filename,
+            output_image_dir=output_image_dir,
+            image_format=image_format,
+            jpeg_quality=jpeg_quality,
+            fps=fps,
+            max_inflight_frames=max_inflight_frames,
+        )
+        stack.callback(frame_writer.close)
+        render_time = 0.0
+        if num_shards > 1:
+            frame_indices = [i for i in frame_indices if not frame_writer.get_frame_path(i).exists()]
 
         if render_nearest_camera:
             assert pipeline.datamanager.train_dataset is not None
             train_dataset = pipeline.datamanager.train_dataset
             train_cameras = train_dataset.cameras.to(pipeline.device)
+            train_positions = train_cameras.camera_to_worlds[:, :, 3]
+            train_rotations = train_cameras.camera_to_worlds[:, :, :3]
         else:
             train_dataset = None
             train_cameras = None
+            train_positions = None
+            train_rotations = None
 
         with progress:
-            for camera_idx in progress.track(range(cameras.size), description=""):
+            for camera_idx in progress.track(frame_indices, description=""):
+                frame_start = time.perf_counter()
                 obb_box = None
                 if crop_data is not None:
                     obb_box = crop_data.obb
 
-                max_dist, max_idx = -1, -1
-                true_max_dist, true_max_idx = -1, -1
-
+                max_idx = -1
                 if render_nearest_camera:
-                    assert pipeline.datamanager.train_dataset is not None
-                    assert train_dataset is not None
-                    assert train_cameras is not None
-                    cam_pos = cameras[camera_idx].camera_to_worlds[:, 3].cpu()
-                    cam_quat = tf.SO3.from_matrix(cameras[camera_idx].camera_to_worlds[:3, :3].numpy(force=True)).wxyz
-
-                    for i in range(len(train_cameras)):
-                        train_cam_pos = train_cameras[i].camera_to_worlds[:, 3].cpu()
-                        # Make sure the line of sight from rendered cam to training cam is not blocked by any object
-                        bundle = RayBundle(
-                            origins=cam_pos.view(1, 3),
-                            directions=((cam_pos - train_cam_pos) / (cam_pos - train_cam_pos).norm()).view(1, 3),
-                            pixel_area=torch.tensor(1).view(1, 1),
-                            nears=torch.tensor(0.05).view(1, 1),
-                            fars=torch.tensor(100).view(1, 1),
-                            camera_indices=torch.tensor(0).view(1, 1),
-                            metadata={},
-                        ).to(pipeline.device)
-                        outputs = pipeline.model.get_outputs(bundle)
-
-                        q = tf.SO3.from_matrix(train_cameras[i].camera_to_worlds[:3, :3].numpy(force=True)).wxyz
-                        # calculate distance between two quaternions
-                        rot_dist = 1 - np.dot(q, cam_quat) ** 2
-                        pos_dist = torch.norm(train_cam_pos - cam_pos)
-                        dist = 0.3 * rot_dist + 0.7 * pos_dist
-
-                        if true_max_dist == -1 or dist < true_max_dist:
-                            true_max_dist = dist
-                            true_max_idx = i
-
-                        if outputs["depth"][0] < torch.norm(cam_pos - train_cam_pos).item():
-                            continue
-
-                        if check_occlusions and (max_dist == -1 or dist < max_dist):
-                            max_dist = dist
-                            max_idx = i
-
-                    if max_idx == -1:
-                        max_idx = true_max_idx
+                    assert train_positions is not None and train_rotations is not None
+                    max_idx = _find_nearest_train_camera(
+                        pipeline,
+                        cameras.camera_to_worlds[camera_idx],
+                        train_positions,
+                        train_rotations,
+                        check_occlusions=check_occlusions,
+                    )
 
                 if crop_data is not None:
                     with renderers.background_color_override_context(
@@ -253,26 +421,14 @@ def _render_trajectory_video(
                     )
                     render_image.append(resized_image)
 
-                render_image = np.concatenate(render_image, axis=1)
-                if output_format == "images":
-                    if image_format == "png":
-                        media.write_image(output_image_dir / f"{camera_idx:05d}.png", render_image, fmt="png")
-                    if image_format == "jpeg":
-                        media.write_image(
-                            output_image_dir / f"{camera_idx:05d}.jpg", render_image, fmt="jpeg", quality=jpeg_quality
-                        )
-                if output_format == "video":
-                    if writer is None:
-                        render_width = int(render_image.shape[1])
-                        render_height = int(render_image.shape[0])
-                        writer = stack.enter_context(
-                            media.VideoWriter(
-                                path=output_filename,
-                                shape=(render_height, render_width),
-                                fps=fps,
-                            )
-                        )
-                    writer.add_image(render_image)
+                render_time += time.perf_counter() - frame_start
+                frame_writer.submit(camera_idx, render_image)
+
+    if num_shards > 1:
+        shard_info = {"num_frames": cameras.size, "fps": fps, "image_format": image_format}
+        shard_info["equirectangular"] = is_equirectangular
+        with open(_get_shard_marker(output_image_dir, shard_index, num_shards), "w", encoding="utf-8") as f:
+            json.dump(shard_info, f)
 
     table = Table(
         title=None,
@@ -281,15 +437,75 @@ def _render_trajectory_video(
         title_style=style.Style(bold=True),
     )
     if output_format == "video":
-        if cameras.camera_type[0] == CameraType.EQUIRECTANGULAR.value:
+        if is_equirectangular:
             CONSOLE.print("Adding spherical camera data")
             insert_spherical_metadata_into_file(output_filename)
         table.add_row("Video", str(output_filename))
     else:
         table.add_row("Images", str(output_image_dir))
+    if num_shards > 1:
+        table.add_row("Shard", f"{shard_index + 1}/{num_shards}")
+    if render_time > 0:
+        table.add_row("Render fps", f"{len(frame_indices) / render_time:.2f}")
+    if frame_writer.encode_time > 0:
+        table.add_row("Encode fps", f"{frame_writer.num_frames / frame_writer.encode_time:.2f} per thread")
     CONSOLE.print(Panel(table, title="[bold][green]:tada: Render Complete :tada:[/bold]", expand=False))
 
 
+def _assemble_shards(
+    output_filename: Path,
+    output_format: Literal["images", "video"],
+    num_shards: int,
+    max_inflight_frames: int = 16,
+) -> None:
+    """Assembles the output of a sharded render once all of its shards are complete.
+
+    Video frames are encoded in order and their directory is removed. Images are already in place.
+
+    Args:
+        output_filename: Name of the output file.
+        output_format: How to save output data.
+        num_shards: Number of shards the frames were split into.
+        max_inflight_frames: Maximum number of frames decoded ahead of the video writer.
+    """
+    frames_dir = _get_frames_dir(output_filename, output_format)
+    markers = [_get_shard_marker(frames_dir, i, num_shards) for i in range(num_shards)]
+    missing = [i for i, marker in enumerate(markers) if not marker.exists()]
+    if missing:
+        CONSOLE.print(f"[bold red]Shards {missing} of {num_shards} have not been rendered to {frames_dir}.")
+        sys.exit(1)
+    with open(markers[0], "r", encoding="utf-8") as f:
+        shard_info = json.load(f)
+
+    if output_format == "video":
+        CONSOLE.print(f"[bold green]Assembling {shard_info['num_frames']} frames from {num_shards} shards")
+        suffix = "png" if shard_info["image_format"] == "png" else "jpg"
+        frame_paths = [frames_dir / f"{i:05d}.{suffix}" for i in range(shard_info["num_frames"])]
+        shape = media.read_image(frame_paths[0]).shape[:2]
+        with ThreadPoolExecutor() as executor, media.VideoWriter(
+            path=output_filename, shape=shape, fps=shard_info["fps"]
+        ) as writer:
+            # Frames are decoded in batches to bound memory while keeping them in order.
+            for start in range(0, len(frame_paths), max_inflight_frames):
+                for image in executor.map(media.read_image, frame_paths[start : start + max_inflight_frames]):
+                    writer.add_image(image)
+        if shard_info["equirectangular"]:
+            CONSOLE.print("Adding spherical camera data")
+            insert_spherical_metadata_into_file(output_filename)
+        shutil.rmtree(frames_dir)
+    else:
+        for marker in markers:
+            marker.unlink()
+    CONSOLE.print(f"[bold green]:tada: Assembled {output_filename if output_format == 'video' else frames_dir}")
+
+
+def _render_shard(render: BaseRender, device: Optional[str]) -> None:
+    """Renders a single shard in a process launched by `BaseRender._launch_shards`."""
+    if device is not None:
+        os.environ["CUDA_VISIBLE_DEVICES"] = device
+    render.main()
+
+
 def insert_spherical_metadata_into_file(
     output_filename: Path,
 ) -> None:
@@ -432,6 +648,56 @@ class BaseRender:
     """If true, checks line-of-sight occlusions when computing camera distance and rejects cameras not visible to each other"""
     camera_idx: Optional[int] = None
     """Index of the training camera to render."""
+    max_inflight_frames: int = 16
+    """Maximum number of rendered frames waiting to be encoded. Rendering blocks when encoding falls this far behind."""
+    num_shards: int = 1
+    """Number of disjoint frame ranges to render separately. Frames are kept on disk and skipped when rendering again,
+    so that an interrupted render resumes where it stopped."""
+    shard_index: Optional[int] = None
+    """Index of the frame range to render. If None, renders the unfinished shards in one local process each (spread over
+    the visible GPUs) and assembles the output. Set it to render shards on nodes sharing a filesystem, then run again
+    without it to assemble the output."""
+
+    def _launch_shards(self, shard_dir: Path) -> bool:
+        """Renders the unfinished shards in local processes, if rendering is sharded and no shard index is set.
+
+        Args:
+            shard_dir: Directory the shards write their frames and completion markers to.
+
+        Returns:
+            Whether the shards were launched, in which case the output is left to be assembled.
+        """
+        if self.num_shards <= 1 or self.shard_index is not None:
+            return False
+        shard_indices = [
+            i for i in range(self.num_shards) if not _get_shard_marker(shard_dir, i, self.num_shards).exists()
+        ]
+        devices: List[Optional[str]] = [None]
+        if torch.cuda.is_available():
+            visible_devices = os.environ.get("CUDA_VISIBLE_DEVICES")
+            if visible_devices is not None:
+                devices = list(visible_devices.split(","))
+            else:
+                devices = [str(i) for i in range(torch.cuda.device_count())]
+        CONSOLE.print(f"[bold green]Rendering {len(shard_indices)} of {self.num_shards} shards")
+
+        # Processes are spawned rather than forked, so that each of them initializes CUDA on its own device.
+        context = mp.get_context("spawn")
+        processes = []
+        for i in shard_indices:
+            render = dataclasses.replace(self, shard_index=i)
+            process = context.Process(target=_render_shard, args=(render, devices[i % len(devices)]))
+            process.start()
+            processes.append((i, process))
+        failed = []
+        for i, process in processes:
+            process.join()
+            if process.exitcode != 0:
+                failed.append(i)
+        if failed:
+            CONSOLE.print(f"[bold red]Shards {failed} failed. Run again to resume rendering the missing frames.")
+            sys.exit(1)
+        return True
 
 
 @dataclass
@@ -445,12 +711,6 @@ class RenderCameraPath(BaseRender):
 
     def main(self) -> None:
         """Main function."""
-        _, pipeline, _, _ = eval_setup(
-            self.load_config,
-            eval_num_rays_per_chunk=self.eval_num_rays_per_chunk,
-            test_mode="inference",
-        )
-
         install_checks.check_ffmpeg_installed()
 
         with open(self.camera_path_filename, "r", encoding="utf-8") as f:
@@ -459,6 +719,26 @@ class RenderCameraPath(BaseRender):
         crop_data = get_crop_from_json(camera_path)
         camera_path = get_path_from_json(camera_path)
 
+        # add mp4 suffix to video output if none is specified
+        if self.output_format == "video" and str(self.output_path.suffix) == "":
+            self.output_path = self.output_path.with_suffix(".mp4")
+
+        if self.num_shards > 1 and camera_path.camera_type[0] in (
+            CameraType.OMNIDIRECTIONALSTEREO_L.value,
+            CameraType.VR180_L.value,
+        ):
+            CONSOLE.print("[bold red]Sharded rendering of stereo camera paths is not supported.")
+            sys.exit(1)
+        if self._launch_shards(_get_frames_dir(self.output_path, self.output_format)):
+            _assemble_shards(self.output_path, self.output_format, self.num_shards, self.max_inflight_frames)
+            return
+
+        _, pipeline, _, _ = eval_setup(
+            self.load_config,
+            eval_num_rays_per_chunk=self.eval_num_rays_per_chunk,
+            test_mode="inference",
+        )
+
         if (
             camera_path.camera_type[0] == CameraType.OMNIDIRECTIONALSTEREO_L.value
             or camera_path.camera_type[0] == CameraType.VR180_L.value
@@ -478,10 +758,6 @@ class RenderCameraPath(BaseRender):
 
             CONSOLE.print("Rendering left eye view")
 
-        # add mp4 suffix to video output if none is specified
-        if self.output_format == "video" and str(self.output_path.suffix) == "":
-            self.output_path = self.output_path.with_suffix(".mp4")
-
         if self.camera_idx is not None:
             camera_path.metadata = {"cam_idx": self.camera_idx}
 
@@ -501,6 +777,9 @@ class RenderCameraPath(BaseRender):
             colormap_options=self.colormap_options,
             render_nearest_camera=self.render_nearest_camera,
             check_occlusions=self.check_occlusions,
+            max_inflight_frames=self.max_inflight_frames,
+            shard_index=self.shard_index or 0,
+            num_shards=self.num_shards,
         )
 
         if (
@@ -536,6 +815,9 @@ class RenderCameraPath(BaseRender):
                 colormap_options=self.colormap_options,
                 render_nearest_camera=self.render_nearest_camera,
                 check_occlusions=self.check_occlusions,
+                max_inflight_frames=self.max_inflight_frames,
+                shard_index=self.shard_index or 0,
+                num_shards=self.num_shards,
             )
 
             self.output_path = Path(str(left_eye_path.parent)[:-5] + ".mp4")
@@ -600,6 +882,10 @@ class RenderInterpolated(BaseRender):
 
     def main(self) -> None:
         """Main function."""
+        if self._launch_shards(_get_frames_dir(self.output_path, self.output_format)):
+            _assemble_shards(self.output_path, self.output_format, self.num_shards, self.max_inflight_frames)
+            return
+
         _, pipeline, _, _ = eval_setup(
             self.load_config,
             eval_num_rays_per_chunk=self.eval_num_rays_per_chunk,
@@ -639,6 +925,9 @@ class RenderInterpolated(BaseRender):
             colormap_options=self.colormap_options,
             render_nearest_camera=self.render_nearest_camera,
             check_occlusions=self.check_occlusions,
+            max_inflight_frames=self.max_inflight_frames,
+            shard_index=self.shard_index or 0,
+            num_shards=self.num_shards,
         )
 
 
@@ -657,6 +946,10 @@ class SpiralRender(BaseRender):
 
     def main(self) -> None:
         """Main function."""
+        if self._launch_shards(_get_frames_dir(self.output_path, self.output_format)):
+            _assemble_shards(self.output_path, self.output_format, self.num_shards, self.max_inflight_frames)
+            return
+
         _, pipeline, _, _ = eval_setup(
             self.load_config,
             eval_num_rays_per_chunk=self.eval_num_rays_per_chunk,
@@ -694,6 +987,9 @@ class SpiralRender(BaseRender):
             colormap_options=self.colormap_options,
             render_nearest_camera=self.render_nearest_camera,
             check_occlusions=self.check_occlusions,
+            max_inflight_frames=self.max_inflight_frames,
+            shard_index=self.shard_index or 0,
+            num_shards=self.num_shards,
         )
 
 
@@ -729,6 +1025,12 @@ class DatasetRender(BaseRender):
     def main(self):
         config: TrainerConfig
 
+        if self._launch_shards(self.output_path):
+            for shard_index in range(self.num_shards):
+                _get_shard_marker(self.output_path, shard_index, self.num_shards).unlink()
+            CONSOLE.print(f"[bold green]:tada: Rendered {self.num_shards} shards to {self.output_path}")
+            return
+
         def update_config(config: TrainerConfig) -> TrainerConfig:
             data_manager_config = config.pipeline.datamanager
             assert isinstance(data_manager_config, (VanillaDataManagerConfig, FullImageDatamanagerConfig))
@@ -770,12 +1072,26 @@ class DatasetRender(BaseRender):
                 dataparser_outputs = getattr(dataset, "_dataparser_outputs", None)
                 if dataparser_outputs is None:
                     dataparser_outputs = datamanager.dataparser.get_dataparser_outputs(split=datamanager.test_split)
+            image_indices = None
+            if self.num_shards > 1:
+                image_indices = tuple(_get_shard_range(len(dataset), self.shard_index or 0, self.num_shards))
             dataloader = FixedIndicesEvalDataloader(
                 input_dataset=dataset,
+                image_indices=image_indices,
                 device=datamanager.device,
                 num_workers=datamanager.world_size * 4,
             )
             images_root = Path(os.path.commonpath(dataparser_outputs.image_filenames))
+            rendered_output_names = self.rendered_output_names
+
+            def get_output_path(rendered_output_name: str, camera_idx: int) -> Path:
+                # Try to get the original filename
+                image_name = dataparser_outputs.image_filenames[camera_idx].relative_to(images_root)
+                output_path = self.output_path / split / rendered_output_name / image_name
+                if rendered_output_name.startswith("raw-"):
+                    return output_path.with_suffix(".npy.gz")
+                return output_path.with_suffix(".png" if self.image_format == "png" else ".jpg")
+
             with Progress(
                 TextColumn(f":movie_camera: Rendering split {split} :movie_camera:"),
                 BarColumn(),
@@ -787,7 +1103,17 @@ class DatasetRender(BaseRender):
                 TimeRemainingColumn(elapsed_when_finished=False, compact=False),
                 TimeElapsedColumn(),
             ) as progress:
-                for camera_idx, (camera, batch) in enumerate(progress.track(dataloader, total=len(dataset))):
+                image_indices = dataloader.image_indices
+                for camera_idx, (camera, batch) in zip(
+                    image_indices, progress.track(dataloader, total=len(image_indices))
+                ):
+                    # Sharded renders resume by skipping the images whose outputs were all written by a previous run.
+                    if (
+                        self.num_shards > 1
+                        and rendered_output_names is not None
+                        and all(get_output_path(name, camera_idx).exists() for name in rendered_output_names)
+                    ):
+                        continue
                     with torch.no_grad():
                         outputs = pipeline.model.get_outputs_for_camera(camera)
 
@@ -799,7 +1125,6 @@ class DatasetRender(BaseRender):
                         + [f"gt-{x}" for x in gt_batch.keys()]
                         + [f"raw-gt-{x}" for x in gt_batch.keys()]
                     )
-                    rendered_output_names = self.rendered_output_names
                     if rendered_output_names is None:
                         rendered_output_names = ["gt-rgb"] + list(outputs.keys())
                     for rendered_output_name in rendered_output_names:
@@ -815,12 +1140,7 @@ class DatasetRender(BaseRender):
 
                         is_raw = False
                         is_depth = rendered_output_name.find("depth") != -1
-                        image_name = f"{camera_idx:05d}"
-
-                        # Try to get the original filename
-                        image_name = dataparser_outputs.image_filenames[camera_idx].relative_to(images_root)
-
-                        output_path = self.output_path / split / rendered_output_name / image_name
+                        output_path = get_output_path(rendered_output_name, camera_idx)
                         output_path.parent.mkdir(exist_ok=True, parents=True)
 
                         output_name = rendered_output_name
@@ -868,18 +1188,25 @@ class DatasetRender(BaseRender):
                                 .numpy()
                             )
 
-                        # Save to file
+                        # Save to file, under a temporary name first so that interrupted renders leave no truncated file
+                        tmp_path = output_path.with_name(f".{output_path.name}.tmp")
                         if is_raw:
-                            with gzip.open(output_path.with_suffix(".npy.gz"), "wb") as f:
+                            with gzip.open(tmp_path, "wb") as f:
                                 np.save(f, output_image)
                         elif self.image_format == "png":
-                            media.write_image(output_path.with_suffix(".png"), output_image, fmt="png")
+                            media.write_image(tmp_path, output_image, fmt="png")
                         elif self.image_format == "jpeg":
-                            media.write_image(
-                                output_path.with_suffix(".jpg"), output_image, fmt="jpeg", quality=self.jpeg_quality
-                            )
+                            media.write_image(tmp_path, output_image, fmt="jpeg", quality=self.jpeg_quality)
                         else:
                             raise ValueError(f"Unknown image format {self.image_format}")
+                        os.replace(tmp_path, output_path)
+
+        if self.num_shards > 1:
+            self.output_path.mkdir(parents=True, exist_ok=True)
+            with open(
+                _get_shard_marker(self.output_path, self.shard_index or 0, self.num_shards), "w", encoding="utf-8"
+            ) as f:
+                json.dump({"split": self.split}, f)
 
         table = Table(
             title=None,
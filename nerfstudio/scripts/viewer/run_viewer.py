@@ -23,7 +23,7 @@ import time
 from dataclasses import dataclass, field, fields
 from pathlib import Path
 from threading import Lock
-from typing import Literal
+from typing import Literal, Optional
 
 import tyro
 
@@ -53,6 +53,8 @@ class RunViewer:
 
     load_config: Path
     """Path to config YAML file."""
+    load_checkpoint: Optional[Path] = None
+    """Path to a checkpoint file to view instead of the latest one, such as a compressed splat from ns-export."""
     viewer: ViewerConfigWithoutNumRays = field(default_factory=ViewerConfigWithoutNumRays)
     """Viewer configuration"""
     vis: Literal["viewer", "viewer_legacy"] = "viewer"
@@ -64,6 +66,7 @@ class RunViewer:
             self.load_config,
             eval_num_rays_per_chunk=None,
             test_mode="test",
+            load_checkpoint=self.load_checkpoint,
         )
         num_rays_per_chunk = config.viewer.num_rays_per_chunk
         assert self.viewer.num_rays_per_chunk == -1
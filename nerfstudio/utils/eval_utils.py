@@ -27,6 +27,7 @@ import torch
 import yaml
 
 from nerfstudio.configs.method_configs import all_methods
+from nerfstudio.engine.checkpoint_writer import latest_checkpoint_step
 from nerfstudio.engine.trainer import TrainerConfig
 from nerfstudio.pipelines.base_pipeline import Pipeline
 from nerfstudio.utils.rich_utils import CONSOLE
@@ -42,10 +43,16 @@ def eval_load_checkpoint(config: TrainerConfig, pipeline: Pipeline) -> Tuple[Pat
     Returns:
         A tuple of the path to the loaded checkpoint and the step at which it was saved.
     """
+    if config.load_checkpoint is not None:
+        load_path = config.load_checkpoint
+        assert load_path.exists(), f"Checkpoint {load_path} does not exist"
+        loaded_state = torch.load(load_path, map_location="cpu")
+        pipeline.load_pipeline(loaded_state["pipeline"], loaded_state["step"])
+        CONSOLE.print(f":white_check_mark: Done loading checkpoint from {load_path}")
+        return load_path, loaded_state["step"]
     assert config.load_dir is not None
     if config.load_step is None:
         CONSOLE.print("Loading latest checkpoint from load_dir")
-        # NOTE: this is specific to the checkpoint name format
         if not os.path.exists(config.load_dir):
             CONSOLE.rule("Error", style="red")
             CONSOLE.print(f"No checkpoint directory found at {config.load_dir}, ", justify="center")
@@ -54,7 +61,8 @@ def eval_load_checkpoint(config: TrainerConfig, pipeline: Pipeline) -> Tuple[Pat
                 justify="center",
             )
             sys.exit(1)
-        load_step = sorted(int(x[x.find("-") + 1 : x.find(".")]) for x in os.listdir(config.load_dir))[-1]
+        load_step = latest_checkpoint_step(config.load_dir)
+        assert load_step is not None, f"No checkpoint found in {config.load_dir}"
     else:
         load_step = config.load_step
     load_path = config.load_dir / f"step-{load_step:09d}.ckpt"
@@ -70,6 +78,7 @@ def eval_setup(
     eval_num_rays_per_chunk: Optional[int] = None,
     test_mode: Literal["test", "val", "inference"] = "test",
     update_config_callback: Optional[Callable[[TrainerConfig], TrainerConfig]] = None,
+    load_checkpoint: Optional[Path] = None,
 ) -> Tuple[TrainerConfig, Pipeline, Path, int]:
     """Shared setup for loading a saved pipeline for evaluation.
 
@@ -81,6 +90,7 @@ def eval_setup(
             'test': loads train/test dataset into memory
             'inference': does not load any dataset into memory
         update_config_callback: Callback to update the config before loading the pipeline
+        load_checkpoint: Path to a checkpoint file to load instead of the latest one in the checkpoint directory
 
 
     Returns:
@@ -97,9 +107,9 @@ def eval_setup(
     if update_config_callback is not None:
         config = update_config_callback(config)
 
-    # load checkpoints from wherever they were saved
-    # TODO: expose the ability to choose an arbitrary checkpoint
+    # load checkpoints from wherever they were saved, unless a checkpoint file is given
     config.load_dir = config.get_checkpoint_dir()
+    config.load_checkpoint = load_checkpoint
 
     # setup pipeline (which includes the DataManager)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -19,7 +19,9 @@ Profiler base class and functionality
 from __future__ import annotations
 
 import functools
+import json
 import os
+import struct
 import time
 import typing
 from collections import deque
@@ -27,6 +29,8 @@ from contextlib import ContextDecorator, contextmanager
 from pathlib import Path
 from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple, TypeVar, Union, overload
 
+import numpy as np
+import torch
 from torch.profiler import ProfilerActivity, profile, record_function
 
 from nerfstudio.configs import base_config as cfg
@@ -36,6 +40,11 @@ from nerfstudio.utils.rich_utils import CONSOLE
 
 PROFILER = []
 PYTORCH_PROFILER = None
+STEP_TRACER: List[StepTracer] = []
+
+TRACE_PHASES = ("data", "forward", "backward", "optimizer", "callbacks", "eval", "checkpoint")
+"""Phases of a training step recorded by the step tracer. Time outside of all phases is recorded as "other"."""
+TRACE_MAGIC = b"NSTRACE1"
 
 
 CallableT = TypeVar("CallableT", bound=Callable)
@@ -115,10 +124,40 @@ class _TimeFunction(ContextDecorator):
         return inner
 
 
+def begin_trace_step(step: int) -> None:
+    """Starts recording a training step, if the step tracer is enabled."""
+    if STEP_TRACER:
+        STEP_TRACER[0].begin_step(step)
+
+
+def end_trace_step() -> None:
+    """Finishes recording the current training step, if the step tracer is enabled."""
+    if STEP_TRACER:
+        STEP_TRACER[0].end_step()
+
+
+def trace_phase(name: str) -> ContextManager[Any]:
+    """Records the time spent in a phase of the current training step, if the step tracer is enabled.
+
+    Args:
+        name: One of TRACE_PHASES.
+    """
+    if STEP_TRACER:
+        return STEP_TRACER[0].phase(name)
+    return _null_context()
+
+
+@contextmanager
+def _null_context():
+    yield None
+
+
 def flush_profiler(config: cfg.LoggingConfig):
     """Method that checks if profiler is enabled before flushing"""
     if config.profiler != "none" and PROFILER:
         PROFILER[0].print_profile()
+    if STEP_TRACER:
+        STEP_TRACER[0].close()
 
 
 def setup_profiler(config: cfg.LoggingConfig, log_dir: Path):
@@ -128,6 +167,127 @@ def setup_profiler(config: cfg.LoggingConfig, log_dir: Path):
         PROFILER.append(Profiler(config))
         if config.profiler == "pytorch":
             PYTORCH_PROFILER = PytorchProfiler(log_dir)
+        if config.step_trace:
+            STEP_TRACER.append(StepTracer(log_dir / "step_trace.nstrace", cuda_sync=config.step_trace_cuda_sync))
+
+
+def step_trace_dtype() -> np.dtype:
+    """Record layout of a step trace: the step, its start as a unix time, and the seconds spent in each phase."""
+    columns = [("step", "<i8"), ("start_time", "<f8"), ("total", "<f4")]
+    columns += [(phase, "<f4") for phase in TRACE_PHASES + ("other",)]
+    return np.dtype(columns)
+
+
+def read_step_trace(path: Path) -> Dict[str, np.ndarray]:
+    """Reads a step trace written by StepTracer.
+
+    Returns:
+        A dictionary from column name to an array with one value per recorded step.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a step trace")
+        (header_size,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_size))
+        dtype = np.dtype([tuple(column) for column in header["columns"]])
+        data = f.read()
+    # Drop a partially written last record, e.g. if the job was killed during a flush.
+    num_records = len(data) // dtype.itemsize
+    records = np.frombuffer(data, dtype=dtype, count=num_records)
+    return {name: records[name] for name in dtype.names or ()}
+
+
+class StepTracer:
+    """Writes the wall time of every training step, split into phases, to a compact binary file.
+
+    The file holds a small JSON header describing the columns, followed by one fixed-size record per step.
+    Records are appended every ``flush_every`` steps, so the trace of a stalled or killed job can still be read.
+    Phases may be nested; every phase only records the time that is not spent in its nested phases.
+
+    Args:
+        path: Where to write the trace.
+        cuda_sync: Whether to synchronize CUDA at phase boundaries, so that asynchronously launched kernels are
+            attributed to the phase that launched them instead of the next phase that waits for them.
+        flush_every: Number of steps to buffer before appending them to the file.
+    """
+
+    def __init__(self, path: Path, cuda_sync: bool = True, flush_every: int = 100):
+        self.path = path
+        self.cuda_sync = cuda_sync and torch.cuda.is_available()
+        self.flush_every = flush_every
+        self.dtype = step_trace_dtype()
+        self._records = np.zeros(flush_every, dtype=self.dtype)
+        self._num_records = 0
+        self._current: Optional[Dict[str, float]] = None
+        self._step = 0
+        self._step_start_time = 0.0
+        self._step_start = 0.0
+        self._phase_stack: List[List[Any]] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = json.dumps({"columns": [(name, self.dtype[name].str) for name in self.dtype.names or ()]}).encode()
+        with open(self.path, "wb") as f:
+            f.write(TRACE_MAGIC + struct.pack("<I", len(header)) + header)
+
+    def _now(self) -> float:
+        if self.cuda_sync:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def begin_step(self, step: int) -> None:
+        """Starts recording a training step."""
+        self._step = step
+        self._step_start_time = time.time()
+        self._current = dict.fromkeys(TRACE_PHASES, 0.0)
+        self._step_start = self._now()
+
+    def end_step(self) -> None:
+        """Finishes recording the current training step."""
+        if self._current is None:
+            return
+        total = self._now() - self._step_start
+        record = self._records[self._num_records]
+        record["step"] = self._step
+        record["start_time"] = self._step_start_time
+        record["total"] = total
+        for phase, duration in self._current.items():
+            record[phase] = duration
+        record["other"] = max(0.0, total - sum(self._current.values()))
+        self._current = None
+        self._num_records += 1
+        if self._num_records == self.flush_every:
+            self.flush()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Records time spent in a phase of the current step. Does nothing outside of a step."""
+        if self._current is None:
+            yield None
+            return
+        assert name in TRACE_PHASES, f"Unknown phase {name}, expected one of {TRACE_PHASES}"
+        # Each entry holds the phase name and the time spent in its nested phases.
+        self._phase_stack.append([name, 0.0])
+        start = self._now()
+        try:
+            yield None
+        finally:
+            duration = self._now() - start
+            _, nested = self._phase_stack.pop()
+            if self._current is not None:
+                self._current[name] += duration - nested
+            if self._phase_stack:
+                self._phase_stack[-1][1] += duration
+
+    def flush(self) -> None:
+        """Appends the buffered steps to the file."""
+        if self._num_records == 0:
+            return
+        with open(self.path, "ab") as f:
+            f.write(self._records[: self._num_records].tobytes())
+        self._num_records = 0
+
+    def close(self) -> None:
+        """Writes the remaining steps."""
+        self.flush()
 
 
 class PytorchProfiler:
@@ -0,0 +1,109 @@
+"""
+Test the columnar COLMAP binary readers
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from nerfstudio.data.utils.colmap_parsing_utils import (
+    ColmapPoints3D,
+    Image,
+    Point3D,
+    read_images_binary,
+    read_images_binary_arrays,
+    read_points3D_binary,
+    read_points3D_binary_arrays,
+    write_images_binary,
+    write_points3D_binary,
+)
+
+
+def _random_model(rng: np.random.Generator):
+    images = {}
+    for image_id in [3, 1, 7]:
+        # Includes an image without any 2D points.
+        num_points2D = 0 if image_id == 1 else int(rng.integers(1, 20))
+        images[image_id] = Image(
+            id=image_id,
+            qvec=rng.normal(size=4),
+            tvec=rng.normal(size=3),
+            camera_id=image_id % 2 + 1,
+            name=f"frame_{image_id:05d}.jpg",
+            xys=rng.normal(size=(num_points2D, 2)),
+            point3D_ids=rng.integers(-1, 50, size=num_points2D),
+        )
+    points3D = {}
+    for point3D_id in range(0, 100, 2):
+        track_length = int(rng.integers(0, 4))
+        points3D[point3D_id] = Point3D(
+            id=point3D_id,
+            xyz=rng.normal(size=3),
+            rgb=rng.integers(0, 256, size=3),
+            error=np.array(rng.random()),
+            image_ids=rng.integers(1, 8, size=track_length),
+            point2D_idxs=rng.integers(0, 20, size=track_length),
+        )
+    return images, points3D
+
+
+def test_binary_arrays_match_records(tmp_path: Path):
+    """The columnar readers and their dict adapters match the written records."""
+    images, points3D = _random_model(np.random.default_rng(0))
+    write_images_binary(images, tmp_path / "images.bin")
+    write_points3D_binary(points3D, tmp_path / "points3D.bin")
+
+    image_arrays = read_images_binary_arrays(tmp_path / "images.bin")
+    assert image_arrays.ids.tolist() == list(images.keys())
+    assert image_arrays.names.tolist() == [image.name for image in images.values()]
+    assert np.diff(image_arrays.points2D_offsets).tolist() == [len(image.xys) for image in images.values()]
+    read_images = read_images_binary(tmp_path / "images.bin")
+    assert list(read_images.keys()) == list(images.keys())
+    for image_id, image in images.items():
+        read_image = read_images[image_id]
+        assert read_image.name == image.name
+        assert read_image.camera_id == image.camera_id
+        np.testing.assert_array_equal(read_image.qvec, image.qvec)
+        np.testing.assert_array_equal(read_image.tvec, image.tvec)
+        np.testing.assert_array_equal(read_image.xys, image.xys)
+        np.testing.assert_array_equal(read_image.point3D_ids, image.point3D_ids)
+
+    point_arrays = read_points3D_binary_arrays(tmp_path / "points3D.bin")
+    assert point_arrays.rgb.dtype == np.uint8
+    assert point_arrays.track_lengths.tolist() == [len(p.image_ids) for p in points3D.values()]
+    read_points3D = read_points3D_binary(tmp_path / "points3D.bin")
+    assert list(read_points3D.keys()) == list(points3D.keys())
+    for point3D_id, point in points3D.items():
+        read_point = read_points3D[point3D_id]
+        np.testing.assert_array_equal(read_point.xyz, point.xyz)
+        np.testing.assert_array_equal(read_point.rgb, point.rgb)
+        np.testing.assert_array_equal(read_point.error, point.error)
+        np.testing.assert_array_equal(read_point.image_ids, point.image_ids)
+        np.testing.assert_array_equal(read_point.point2D_idxs, point.point2D_idxs)
+
+    from_dict = ColmapPoints3D.from_dict(points3D)
+    for name in ColmapPoints3D.__dataclass_fields__:
+        np.testing.assert_array_equal(getattr(from_dict, name), getattr(point_arrays, name))
+
+
+def test_binary_arrays_cache(tmp_path: Path):
+    """The cache is reused while the file is unchanged and refreshed when it changes."""
+    images, points3D = _random_model(np.random.default_rng(0))
+    write_points3D_binary(points3D, tmp_path / "points3D.bin")
+    cache_dir = tmp_path / "cache"
+
+    parsed = read_points3D_binary_arrays(tmp_path / "points3D.bin", cache_dir=cache_dir)
+    assert (cache_dir / "points3D.bin.npz").exists()
+    cached = read_points3D_binary_arrays(tmp_path / "points3D.bin", cache_dir=cache_dir)
+    for name in ColmapPoints3D.__dataclass_fields__:
+        np.testing.assert_array_equal(getattr(cached, name), getattr(parsed, name))
+
+    del points3D[0]
+    write_points3D_binary(points3D, tmp_path / "points3D.bin")
+    refreshed = read_points3D_binary_arrays(tmp_path / "points3D.bin", cache_dir=cache_dir)
+    assert len(refreshed) == len(points3D)
+
+    write_images_binary(images, tmp_path / "images.bin")
+    image_arrays = read_images_binary_arrays(tmp_path / "images.bin", cache_dir=cache_dir)
+    cached_images = read_images_binary_arrays(tmp_path / "images.bin", cache_dir=cache_dir)
+    assert cached_images.names.tolist() == image_arrays.names.tolist()
@@ -0,0 +1,166 @@
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import torch
+from PIL import Image
+
+from nerfstudio.cameras.cameras import Cameras
+from nerfstudio.data.dataparsers.base_dataparser import DataparserOutputs
+from nerfstudio.data.datasets.base_dataset import InputDataset
+from nerfstudio.data.utils.image_cache import DecodedImageCache, PrefetchingLRUCache
+
+
+def _write_images(directory: Path, num_images: int, mode: str) -> List[Path]:
+    filenames = []
+    for i in range(num_images):
+        shape = (8, 12, 3) if mode == "RGB" else (8, 12)
+        array = np.random.randint(0, 255, size=shape, dtype=np.uint8)
+        if mode == "L":
+            array = (array > 127).astype(np.uint8) * 255
+        filename = directory / f"{mode}_{i}.png"
+        Image.fromarray(array, mode=mode).save(filename)
+        filenames.append(filename)
+    return filenames
+
+
+def _make_dataset(tmp_path: Path, num_images: int = 3) -> InputDataset:
+    image_filenames = _write_images(tmp_path, num_images, "RGB")
+    mask_filenames = _write_images(tmp_path, num_images, "L")
+    cameras = Cameras(
+        camera_to_worlds=torch.eye(4)[None, :3, :].repeat(num_images, 1, 1),
+        fx=10.0,
+        fy=10.0,
+        cx=6.0,
+        cy=4.0,
+        width=12,
+        height=8,
+    )
+    outputs = DataparserOutputs(image_filenames=image_filenames, cameras=cameras, mask_filenames=mask_filenames)
+    return InputDataset(outputs, scale_factor=0.5)
+
+
+def test_image_cache_matches_decoding(tmp_path: Path):
+    dataset = _make_dataset(tmp_path)
+    expected = [dataset.get_data(i) for i in range(len(dataset))]
+
+    dataset.setup_image_cache(tmp_path / "cache")
+    for i in range(len(dataset)):
+        data = dataset.get_data(i)
+        assert torch.equal(data["image"], expected[i]["image"])
+        assert data["mask"].dtype == torch.bool
+        assert torch.equal(data["mask"], expected[i]["mask"])
+
+    # The cache must survive pickling to worker processes without copying the data.
+    restored = pickle.loads(pickle.dumps(dataset))
+    assert restored._image_cache is not None and restored._image_cache._data is None
+    assert np.array_equal(restored.get_numpy_image(1), dataset.get_numpy_image(1))
+
+
+def test_image_cache_only_decodes_stale_files(tmp_path: Path):
+    filenames = _write_images(tmp_path, 3, "RGB")
+    decoded = []
+
+    def decode(idx: int) -> np.ndarray:
+        decoded.append(idx)
+        return np.array(Image.open(filenames[idx]), dtype=np.uint8)
+
+    DecodedImageCache(tmp_path / "cache", filenames, 1.0).build(decode)
+    assert sorted(decoded) == [0, 1, 2]
+
+    decoded.clear()
+    DecodedImageCache(tmp_path / "cache", filenames, 1.0).build(decode)
+    assert decoded == []
+
+    Image.fromarray(np.zeros((4, 4, 3), dtype=np.uint8)).save(filenames[1])
+    stat = os.stat(filenames[1])
+    os.utime(filenames[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache = DecodedImageCache(tmp_path / "cache", filenames, 1.0)
+    cache.build(decode)
+    assert decoded == [1]
+    assert cache[1].shape == (4, 4, 3)
+    assert np.array_equal(cache[2], np.array(Image.open(filenames[2])))
+
+    # A different scale factor uses a separate cache file.
+    decoded.clear()
+    DecodedImageCache(tmp_path / "cache", filenames, 0.5).build(decode)
+    assert sorted(decoded) == [0, 1, 2]
+
+
+def test_image_cache_reclaims_replaced_frames(tmp_path: Path):
+    filenames = _write_images(tmp_path, 4, "RGB")
+
+    def decode(idx: int) -> np.ndarray:
+        return np.array(Image.open(filenames[idx]), dtype=np.uint8)
+
+    def modify(idx: int, shape) -> None:
+        Image.fromarray(np.random.randint(0, 255, size=shape, dtype=np.uint8)).save(filenames[idx])
+        stat = os.stat(filenames[idx])
+        os.utime(filenames[idx], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    cache = DecodedImageCache(tmp_path / "cache", filenames, 1.0)
+    cache.build(decode)
+    size = cache.data_path.stat().st_size
+
+    # A frame of the same size is rewritten in place.
+    modify(0, (8, 12, 3))
+    cache = DecodedImageCache(tmp_path / "cache", filenames, 1.0)
+    cache.build(decode)
+    assert cache.data_path.stat().st_size == size
+    assert np.array_equal(cache[0], decode(0))
+
+    # Frames that change size are appended, until the replaced frames take half of the file.
+    for step in range(10):
+        modify(step % 4, (8 + step % 2, 12, 3))
+        cache = DecodedImageCache(tmp_path / "cache", filenames, 1.0)
+        cache.build(decode)
+        assert cache.data_path.stat().st_size <= 2 * sum(decode(i).nbytes for i in range(4))
+        for i in range(4):
+            assert np.array_equal(cache[i], decode(i))
+
+
+def test_prefetching_lru_cache_evicts_least_recently_used():
+    loaded = []
+
+    def load(idx: int):
+        loaded.append(idx)
+        return {"image": torch.full((10,), idx, dtype=torch.uint8), "image_idx": idx}
+
+    cache = PrefetchingLRUCache(load, max_bytes=30, num_workers=2)
+    try:
+        cache.prefetch([0, 1, 2])
+        assert [cache[i]["image_idx"] for i in (0, 1, 2)] == [0, 1, 2]
+        assert sorted(loaded) == [0, 1, 2]
+
+        # Frame 0 was used most recently, so frame 1 is evicted.
+        cache[0]
+        cache[3]
+        assert 0 in cache and 1 not in cache and cache.num_bytes == 30
+        loaded.clear()
+        assert torch.equal(cache[1]["image"], torch.full((10,), 1, dtype=torch.uint8))
+        assert loaded == [1]
+    finally:
+        cache.shutdown()
+
+
+def test_prefetching_lru_cache_shutdown_cancels_pending_loads():
+    started = threading.Event()
+    release = threading.Event()
+    loaded = []
+
+    def load(idx: int):
+        started.set()
+        release.wait()
+        loaded.append(idx)
+        return {"image": torch.zeros(1), "image_idx": idx}
+
+    cache = PrefetchingLRUCache(load, max_bytes=30, num_workers=1)
+    cache.prefetch([0, 1, 2])
+    started.wait()
+    cache.shutdown()
+    release.set()
+    cache._executor.shutdown(wait=True)
+    assert loaded == [0]
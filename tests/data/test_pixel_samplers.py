@@ -0,0 +1,62 @@
+import torch
+
+from nerfstudio.data.pixel_samplers import (
+    ErrorMapPixelSampler,
+    ErrorMapPixelSamplerConfig,
+    PatchPixelSampler,
+    PatchPixelSamplerConfig,
+    PixelSampler,
+    PixelSamplerConfig,
+)
+
+
+def _make_batch(num_images: int = 3, height: int = 20, width: int = 30):
+    mask = torch.zeros((num_images, height, width, 1), dtype=torch.bool)
+    mask[:, 5:10, 10:20] = True
+    return {
+        "image": torch.rand((num_images, height, width, 3)),
+        "mask": mask,
+        "image_idx": torch.tensor([7, 3, 5]),
+    }
+
+
+def test_masked_sampling_uses_cached_valid_pixels():
+    batch = _make_batch()
+    sampler = PixelSampler(PixelSamplerConfig(num_rays_per_batch=512))
+    for _ in range(3):
+        pixel_batch = sampler.sample(batch)
+        c, y, x = pixel_batch["indices"].unbind(-1)
+        assert torch.all((y >= 5) & (y < 10) & (x >= 10) & (x < 20))
+        assert set(c.tolist()) <= {7, 3, 5}
+    assert len(sampler._valid_pixel_indices) == 1
+
+    # Modifying the mask in place invalidates the index, and unused indices are dropped.
+    batch["mask"][:, 5:10, 10:20] = False
+    batch["mask"][0, 0, 0] = True
+    pixel_batch = sampler.sample(batch)
+    assert torch.all(pixel_batch["indices"] == torch.tensor([7, 0, 0]))
+    sampler.sample(batch)
+    assert len(sampler._valid_pixel_indices) == 1
+
+
+def test_patch_sampling_stays_inside_mask():
+    batch = _make_batch()
+    sampler = PatchPixelSampler(PatchPixelSamplerConfig(num_rays_per_batch=4 * 9, patch_size=3))
+    y, x = sampler.sample(batch)["indices"][:, 1:].unbind(-1)
+    assert torch.all((y >= 5) & (y < 10) & (x >= 10) & (x < 20))
+
+
+def test_error_map_sampling_prefers_high_error_pixels():
+    batch = _make_batch()
+    del batch["mask"]
+    sampler = ErrorMapPixelSampler(ErrorMapPixelSamplerConfig(num_rays_per_batch=1000, uniform_fraction=0.2))
+    pixel_batch = sampler.sample(batch)
+    assert sampler.error_map is not None and sampler.error_map.shape == (3, 20, 30)
+
+    # Only pixel (2, 3) of camera 5 keeps a high error.
+    sampler.error_map.fill_(0.0)
+    sampler.update_error_map(torch.tensor([[5, 2, 3], [42, 0, 0]]), torch.tensor([1.0, 1.0]))
+    sampler._cdf = None
+    pixel_batch = sampler.sample(batch)
+    is_high_error = torch.all(pixel_batch["indices"][200:] == torch.tensor([5, 2, 3]), dim=-1)
+    assert is_high_error.float().mean() > 0.9
@@ -0,0 +1,106 @@
+import pickle
+
+import torch
+from pathos.helpers import mp
+
+from nerfstudio.cameras.rays import RayBundle
+from nerfstudio.data.utils.shared_memory import (
+    SharedBatchRing,
+    SharedTensorDict,
+    shared_memory_free_bytes,
+    tensor_dict_nbytes,
+)
+
+
+def _sum_images(img_data: SharedTensorDict, out_queue) -> None:
+    data = img_data.as_dict()
+    out_queue.put((data["image"].sum().item(), [m.sum().item() for m in data["mask"]], data["name"]))
+    img_data.close()
+
+
+def _make_batch(value: float, num_rays: int = 8):
+    ray_bundle = RayBundle(
+        origins=torch.full((num_rays, 3), value),
+        directions=torch.ones(num_rays, 3),
+        pixel_area=torch.ones(num_rays, 1),
+        camera_indices=torch.full((num_rays, 1), int(value)),
+        metadata={"directions_norm": torch.full((num_rays, 1), value)},
+    )
+    batch = {"image": torch.full((num_rays, 3), value), "indices": torch.zeros(num_rays, 3, dtype=torch.long)}
+    return ray_bundle, batch
+
+
+def _produce_batches(ring: SharedBatchRing, num_batches: int) -> None:
+    for i in range(num_batches):
+        ring.put(*_make_batch(float(i)))
+
+
+def test_shared_tensor_dict_round_trip():
+    images = torch.rand(2, 4, 5, 3)
+    masks = [torch.ones(4, 5, 1, dtype=torch.bool), torch.zeros(3, 2, 1, dtype=torch.bool)]
+    shared = SharedTensorDict({"image": images, "mask": masks, "name": "train"})
+    try:
+        assert shared.nbytes == images.numel() * 4 + 20 + 6
+        assert tensor_dict_nbytes({"image": images, "mask": masks, "name": "train"}) == shared.nbytes
+        assert shared_memory_free_bytes() > 0
+        attached = pickle.loads(pickle.dumps(shared)).as_dict()
+        assert torch.equal(attached["image"], images)
+        assert [m.dtype for m in attached["mask"]] == [torch.bool, torch.bool]
+        assert attached["name"] == "train"
+
+        # Views share memory with the owner instead of holding a copy.
+        shared.as_dict()["image"][0, 0, 0, 0] = 2.0
+        assert attached["image"][0, 0, 0, 0] == 2.0
+    finally:
+        shared.unlink()
+
+
+def test_shared_tensor_dict_in_spawned_process():
+    images = torch.arange(24, dtype=torch.float32).view(2, 2, 2, 3)
+    shared = SharedTensorDict({"image": images, "mask": [torch.ones(2, 2, 1, dtype=torch.bool)], "name": "train"})
+    try:
+        ctx = mp.get_context("spawn")  # type: ignore
+        out_queue = ctx.Queue()
+        proc = ctx.Process(target=_sum_images, args=(shared, out_queue))
+        proc.start()
+        image_sum, mask_sums, name = out_queue.get(timeout=60)
+        proc.join()
+        assert image_sum == images.sum().item()
+        assert mask_sums == [4]
+        assert name == "train"
+    finally:
+        shared.unlink()
+
+
+def test_shared_batch_ring():
+    ctx = mp.get_context("spawn")  # type: ignore
+    ring = SharedBatchRing(*_make_batch(0.0), num_slots=2, queue_factory=ctx.Queue)
+    try:
+        num_batches = 5
+        proc = ctx.Process(target=_produce_batches, args=(ring, num_batches))
+        proc.start()
+        for i in range(num_batches):
+            ray_bundle, batch, wait_time = ring.get("cpu")
+            assert isinstance(ray_bundle, RayBundle)
+            assert torch.equal(ray_bundle.origins, torch.full((8, 3), float(i)))
+            assert ray_bundle.camera_indices is not None and ray_bundle.camera_indices.dtype == torch.long
+            assert torch.equal(ray_bundle.metadata["directions_norm"], torch.full((8, 1), float(i)))
+            assert ray_bundle.nears is None
+            assert torch.equal(batch["image"], torch.full((8, 3), float(i)))
+            assert wait_time >= 0
+        proc.join()
+
+        # Batches that don't fit the slots are passed through the queue unchanged.
+        ring.put(*_make_batch(7.0, num_rays=3))
+        ray_bundle, batch, _ = ring.get("cpu")
+        assert ray_bundle.origins.shape == (3, 3)
+
+        # They still hold a slot until they are consumed, bounding how far producers run ahead.
+        for _ in range(2):
+            ring.put(*_make_batch(7.0, num_rays=3))
+        assert ring.free_queue.empty()
+        for _ in range(2):
+            ring.get("cpu")
+        assert ring.occupancy() in (None, 0.0)
+    finally:
+        ring.unlink()
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+from nerfstudio.cameras.cameras import Cameras
+from nerfstudio.data.datamanagers.full_images_datamanager import _undistort_image
+from nerfstudio.data.utils.undistortion import UndistortionMapCache
+
+
+def _make_cameras() -> Cameras:
+    distortion_params = torch.tensor([[0.05, -0.02, 0.01, 0.0, 0.001, 0.002]]).repeat(3, 1)
+    distortion_params[2, 0] = 0.1
+    return Cameras(
+        camera_to_worlds=torch.eye(4)[None, :3, :].repeat(3, 1, 1),
+        fx=60.0,
+        fy=62.0,
+        cx=32.3,
+        cy=24.7,
+        width=64,
+        height=48,
+        distortion_params=distortion_params,
+    )
+
+
+def test_undistortion_maps_are_shared_and_match_opencv(tmp_path: Path):
+    cameras = _make_cameras()
+    cache = UndistortionMapCache(tmp_path)
+    image = np.random.randint(0, 255, size=(48, 64, 3), dtype=np.uint8)
+    for i in range(len(cameras)):
+        camera = cameras[i]
+        K = camera.get_intrinsics_matrices().numpy()
+        distortion_params = camera.distortion_params.numpy()
+        new_K, undistorted, _ = _undistort_image(camera, distortion_params, {}, image, K, cache)
+
+        d = distortion_params
+        opencv_params = np.array([d[0], d[1], d[4], d[5], d[2], d[3], 0, 0])
+        K[:2, 2] -= 0.5
+        expected_K, (x, y, w, h) = cv2.getOptimalNewCameraMatrix(K, opencv_params, (64, 48), 0)
+        expected = cv2.undistort(image, K, opencv_params, None, expected_K)[y : y + h, x : x + w]
+        assert np.array_equal(undistorted, expected)
+        assert np.allclose(new_K[:2, 2], expected_K[:2, 2] + 0.5)
+
+    # The first two cameras share a calibration.
+    assert len(cache) == 2
+    assert len(list(tmp_path.glob("undistort_*.npz"))) == 2
+
+    K = camera.get_intrinsics_matrices().numpy()
+    reloaded = UndistortionMapCache(tmp_path).get(camera, distortion_params, K)
+    assert np.array_equal(reloaded.map1, cache.get(camera, distortion_params, K).map1)
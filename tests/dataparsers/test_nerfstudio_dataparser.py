@@ -7,6 +7,7 @@ from pathlib import Path
 
 import numpy as np
 import pytest
+import torch
 from PIL import Image
 from pytest import fixture
 
@@ -93,3 +94,51 @@ def test_nerfstudio_dataparser_split_filelist(mocked_dataset):
         mocked_dataset / "images_4/img_4.png",
         mocked_dataset / "images_4/img_5.png",
     ]
+
+
+def test_nerfstudio_dataparser_cache(mocked_dataset, monkeypatch):
+    """Outputs are reused while the dataset and config are unchanged"""
+    from nerfstudio.data.dataparsers.nerfstudio_dataparser import Nerfstudio, NerfstudioDataParserConfig
+
+    config = NerfstudioDataParserConfig(
+        data=mocked_dataset,
+        downscale_factor=4,
+        orientation_method="none",
+        center_method="none",
+        auto_scale_poses=False,
+        cache_outputs=True,
+    )
+    outputs = config.setup().get_dataparser_outputs("train")
+    assert len(list((mocked_dataset / ".dataparser_cache").glob("transforms_train-*.pt"))) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Dataparser outputs were not loaded from the cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(Nerfstudio, "_generate_dataparser_outputs", fail)
+        parser = config.setup()
+        cached = parser.get_dataparser_outputs("train")
+        assert parser.downscale_factor == 4
+        assert cached.image_filenames == outputs.image_filenames
+        assert torch.equal(cached.cameras.camera_to_worlds, outputs.cameras.camera_to_worlds)
+        assert torch.equal(cached.dataparser_transform, outputs.dataparser_transform)
+
+    # A cache that fails to load is regenerated.
+    for cache_file in (mocked_dataset / ".dataparser_cache").glob("transforms_train-*.pt"):
+        cache_file.write_bytes(b"not a pickle")
+    assert config.setup().get_dataparser_outputs("train").image_filenames == outputs.image_filenames
+
+    # Changing the transforms regenerates the outputs.
+    with open(mocked_dataset / "transforms.json", "r+") as f:
+        data = json.load(f)
+        data["fl_x"] = 7
+        f.seek(0)
+        f.truncate(0)
+        json.dump(data, f)
+    assert config.setup().get_dataparser_outputs("train").cameras.fx[0, 0] == 7 / 4
+
+    # As does changing the config.
+    config.train_split_fraction = 0.5
+    assert len(config.setup().get_dataparser_outputs("train").image_filenames) == 5
+    # Only the outputs of the latest key are kept.
+    assert len(list((mocked_dataset / ".dataparser_cache").glob("transforms_train-*.pt"))) == 1
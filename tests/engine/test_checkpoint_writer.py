@@ -0,0 +1,62 @@
+"""
+Test the checkpoint writer
+"""
+
+import torch
+
+from nerfstudio.engine.checkpoint_writer import CheckpointWriter, latest_checkpoint_step, retained_steps
+
+
+def test_retained_steps():
+    """Test the keep-last and keep-every retention policies."""
+    steps = [100, 200, 300, 400, 500]
+    assert retained_steps(steps, keep_last=None, keep_every=None) == steps
+    assert retained_steps(steps, keep_last=1, keep_every=None) == [500]
+    assert retained_steps(steps, keep_last=2, keep_every=200) == [200, 400, 500]
+    assert retained_steps(steps, keep_last=0, keep_every=300) == [300]
+
+
+def test_async_checkpoint_writer(tmp_path):
+    """Test that async saves snapshot the state and apply the retention policy."""
+    writer = CheckpointWriter(tmp_path, async_save=True, keep_last=2, keep_every=2)
+    weight = torch.zeros(4)
+    for step in range(1, 6):
+        weight.fill_(step)
+        writer.save(step, {"step": step, "pipeline": {"weight": weight}, "optimizers": {"adam": [weight]}})
+        # Modifying the state right after saving must not change the checkpoint being written.
+        weight.fill_(-1)
+    writer.close()
+
+    names = sorted(f.name for f in tmp_path.iterdir())
+    assert names == ["step-000000002.ckpt", "step-000000004.ckpt", "step-000000005.ckpt"]
+    loaded = torch.load(tmp_path / "step-000000005.ckpt")
+    assert loaded["step"] == 5
+    assert torch.equal(loaded["pipeline"]["weight"], torch.full((4,), 5.0))
+    assert torch.equal(loaded["optimizers"]["adam"][0], torch.full((4,), 5.0))
+
+    # Saves after closing are written synchronously.
+    writer.save(7, {"step": 7})
+    names = sorted(f.name for f in tmp_path.iterdir())
+    assert names == ["step-000000002.ckpt", "step-000000004.ckpt", "step-000000005.ckpt", "step-000000007.ckpt"]
+
+
+def test_sync_checkpoint_writer_drops_spare_storage(tmp_path):
+    """Test that a view into a larger buffer is saved without the rest of the buffer."""
+    buffer = torch.zeros(1000)
+    writer = CheckpointWriter(tmp_path)
+    writer.save(1, {"pipeline": {"weight": buffer[:10]}})
+    loaded = torch.load(tmp_path / "step-000000001.ckpt")
+    assert loaded["pipeline"]["weight"].untyped_storage().nbytes() == 10 * buffer.element_size()
+
+
+def test_latest_checkpoint_step_ignores_files_being_written(tmp_path):
+    """Test that loaders never pick the temporary file of a checkpoint being written or left by a crash."""
+    writer = CheckpointWriter(tmp_path)
+    writer.save(3, {"step": 3})
+    (tmp_path / ".step-000000009.ckpt.tmp").write_bytes(b"")
+    assert latest_checkpoint_step(tmp_path) == 3
+
+    # The next write removes the leftover temporary file.
+    writer.save(4, {"step": 4})
+    assert sorted(f.name for f in tmp_path.iterdir()) == ["step-000000003.ckpt", "step-000000004.ckpt"]
+    assert latest_checkpoint_step(tmp_path) == 4
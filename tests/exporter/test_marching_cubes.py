@@ -0,0 +1,26 @@
+"""
+Test marching cubes
+"""
+
+import numpy as np
+import torch
+
+from nerfstudio.exporter.marching_cubes import generate_mesh_with_octree_marching_cubes
+
+
+def test_octree_marching_cubes_sphere():
+    """Test that the octree only evaluates the SDF near the surface and returns a closed mesh"""
+    num_evaluations = 0
+
+    def sdf(points: torch.Tensor) -> torch.Tensor:
+        nonlocal num_evaluations
+        num_evaluations += points.shape[0]
+        return torch.linalg.norm(points - 0.1, dim=-1) - 0.5
+
+    resolution = 256
+    mesh = generate_mesh_with_octree_marching_cubes(sdf, resolution=resolution, leaf_resolution=16, device="cpu")
+
+    assert num_evaluations < 0.2 * (resolution + 1) ** 3
+    radii = np.linalg.norm(mesh.vertices - 0.1, axis=-1)
+    np.testing.assert_allclose(radii, 0.5, atol=2 / resolution)
+    assert mesh.is_watertight
@@ -0,0 +1,79 @@
+"""
+Test TSDF integration
+"""
+
+import math
+
+import torch
+
+from nerfstudio.exporter.tsdf_utils import TSDF, SparseTSDF
+
+
+def _look_at_origin(eye: torch.Tensor) -> torch.Tensor:
+    forward = -eye / eye.norm()
+    right = torch.linalg.cross(forward, torch.tensor([0.0, 0.0, 1.0]))
+    right = right / right.norm()
+    c2w = torch.eye(4)
+    c2w[:3, 0] = right
+    c2w[:3, 1] = torch.linalg.cross(right, forward)
+    c2w[:3, 2] = -forward
+    c2w[:3, 3] = eye
+    return c2w
+
+
+def _sphere_views(radius: float = 0.5, size: int = 48):
+    """Returns cameras around a sphere at the origin, and the distances along their rays to it."""
+    K = torch.tensor([[40.0, 0.0, size / 2], [0.0, 40.0, size / 2], [0.0, 0.0, 1.0]])
+    eyes = [
+        torch.tensor([2 * math.cos(a) * math.cos(e), 2 * math.sin(a) * math.cos(e), 2 * math.sin(e)])
+        for a in torch.linspace(0, 2 * math.pi, 9)[:-1].tolist()
+        for e in (-0.6, 0.0, 0.6)
+    ]
+    c2w = torch.stack([_look_at_origin(eye) for eye in eyes])
+    rows, cols = torch.meshgrid(torch.arange(size) + 0.5, torch.arange(size) + 0.5, indexing="ij")
+    directions = torch.stack([(cols - K[0, 2]) / K[0, 0], -(rows - K[1, 2]) / K[1, 1], -torch.ones_like(cols)], -1)
+    directions = directions / directions.norm(dim=-1, keepdim=True)
+    depths = []
+    for pose in c2w:
+        world_directions = directions @ pose[:3, :3].T
+        b = (world_directions * pose[:3, 3]).sum(-1)
+        disc = b**2 - (pose[:3, 3].norm() ** 2 - radius**2)
+        depths.append(torch.where(disc > 0, -b - disc.clamp(min=0).sqrt(), torch.zeros_like(b))[None])
+    return c2w, K.expand(len(eyes), 3, 3), torch.stack(depths)
+
+
+def test_sparse_tsdf_sphere():
+    """Test that the sparse TSDF only allocates blocks near the surface and recovers it"""
+    c2w, K, depth_images = _sphere_views()
+    color_images = torch.full((c2w.shape[0], 3, *depth_images.shape[-2:]), 0.25)
+    aabb = torch.tensor([[-1.0, -1.0, -1.0], [1.0, 1.0, 1.0]])
+    tsdf = SparseTSDF.from_aabb(aabb, volume_dims=torch.tensor([64, 64, 64]), block_size=4)
+    for i in range(0, c2w.shape[0], 10):
+        tsdf.integrate_tsdf(c2w[i : i + 10], K[i : i + 10], depth_images[i : i + 10], color_images[i : i + 10])
+
+    assert 0 < tsdf.num_blocks < 0.5 * 16**3
+    mesh = tsdf.get_mesh()
+    radii = mesh.vertices.norm(dim=-1)
+    assert torch.allclose(radii, torch.full_like(radii, 0.5), atol=2 * tsdf.voxel_size[0].item())
+    assert torch.allclose(mesh.colors, torch.full_like(mesh.colors, 0.25))
+    # every vertex is shared by the faces of neighboring chunks instead of being duplicated
+    assert mesh.faces.unique().shape[0] == mesh.vertices.shape[0]
+
+
+def test_tsdf_masks_and_weights():
+    """Test that masked pixels are ignored and that observations are weighted"""
+    c2w, K, depth_images = _sphere_views()
+    aabb = torch.tensor([[-1.0, -1.0, -1.0], [1.0, 1.0, 1.0]])
+    mask_images = torch.zeros_like(depth_images, dtype=torch.bool)
+    tsdf = TSDF.from_aabb(aabb, volume_dims=torch.tensor([16, 16, 16]))
+    tsdf.integrate_tsdf(c2w, K, depth_images, mask_images=mask_images)
+    assert (tsdf.weights == 0).all()
+
+    tsdf.max_weight = 100.0
+    tsdf.integrate_tsdf(c2w, K, depth_images, weight_images=torch.full_like(depth_images, 0.5))
+    observed = tsdf.weights > 0
+    assert observed.any()
+    # weights accumulate the per-observation weights of the whole batch
+    num_observations = tsdf.weights[observed] * 2
+    assert torch.equal(num_observations, num_observations.round())
+    assert num_observations.max() > 1
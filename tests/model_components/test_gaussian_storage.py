@@ -0,0 +1,42 @@
+"""
+Test the preallocated gaussian storage
+"""
+
+import torch
+
+from nerfstudio.model_components.gaussian_storage import GaussianStorage
+
+
+def test_append_reuses_capacity():
+    """Test that appends write into the spare capacity and grow the buffer only when it is full"""
+    storage = GaussianStorage(growth_factor=2.0, shrink_threshold=0.25)
+    values = storage.append("means", torch.arange(4.0)[:, None], torch.tensor([[4.0]]))
+    assert storage.capacity("means") == 8
+    data_ptr = values.data_ptr()
+    values = storage.append("means", values, torch.tensor([[5.0], [6.0], [7.0]]))
+    assert values.data_ptr() == data_ptr
+    assert torch.equal(values, torch.arange(8.0)[:, None])
+    values = storage.append("means", values, torch.tensor([[8.0]]))
+    assert values.data_ptr() != data_ptr
+    assert storage.capacity("means") == 18
+    assert torch.equal(values, torch.arange(9.0)[:, None])
+
+
+def test_remove_keeps_tensors_aligned():
+    """Test that removing the same rows from several tensors keeps their rows together, in place"""
+    storage = GaussianStorage(growth_factor=2.0, shrink_threshold=0.25)
+    means = storage.append("means", torch.arange(10.0)[:, None], torch.zeros((0, 1)))
+    opacities = storage.append("opacities", -torch.arange(10.0), torch.zeros(0))
+    data_ptr = means.data_ptr()
+    mask = torch.zeros(10, dtype=torch.bool)
+    mask[[1, 2, 8]] = True
+    means = storage.remove("means", means, mask)
+    opacities = storage.remove("opacities", opacities, mask)
+    assert means.data_ptr() == data_ptr
+    assert sorted(means[:, 0].tolist()) == [0, 3, 4, 5, 6, 7, 9]
+    assert torch.equal(means[:, 0], -opacities)
+
+    # Below the shrink threshold, the buffer is reallocated.
+    means = storage.remove("means", means, torch.arange(7) > 0)
+    assert storage.capacity("means") == 2
+    assert torch.equal(means, torch.zeros((1, 1)))
@@ -0,0 +1,42 @@
+"""
+Test k-nearest neighbour search
+"""
+
+import pytest
+import torch
+
+from nerfstudio.model_components.knn import k_nearest_grid, k_nearest_tree
+
+
+def brute_force_k_nearest(points: torch.Tensor, k: int) -> torch.Tensor:
+    """Distances to the k nearest neighbours of every point, excluding itself"""
+    distances = torch.linalg.norm(points[:, None] - points[None], dim=-1)
+    distances.fill_diagonal_(float("inf"))
+    return torch.topk(distances, k, dim=-1, largest=False).values
+
+
+@pytest.mark.parametrize(
+    "points",
+    [
+        torch.rand(3000, 3),
+        # Points on a plane, much denser than the volume estimate of the grid.
+        torch.cat([torch.rand(3000, 2), torch.zeros(3000, 1)], dim=-1),
+        # A dense cluster with far away outliers, which need coarser grids.
+        torch.cat([torch.randn(2000, 3) * 0.01, torch.randn(20, 3) * 100]),
+        # Duplicated points.
+        torch.rand(100, 3).repeat(10, 1),
+    ],
+)
+def test_k_nearest_matches_brute_force(points):
+    """Test that the grid and tree searches find the exact neighbours and never return the point itself"""
+    expected = brute_force_k_nearest(points, 3)
+    for distances, indices in [k_nearest_grid(points, 3, chunk_size=1 << 12), k_nearest_tree(points, 3)]:
+        torch.testing.assert_close(distances, expected)
+        assert not (indices == torch.arange(len(points))[:, None]).any()
+        torch.testing.assert_close(torch.linalg.norm(points[indices] - points[:, None], dim=-1), distances)
+
+
+def test_k_nearest_too_few_points():
+    """Test that asking for more neighbours than there are other points fails"""
+    with pytest.raises(ValueError):
+        k_nearest_grid(torch.rand(3, 3), 3)
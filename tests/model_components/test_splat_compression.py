@@ -0,0 +1,87 @@
+"""
+Test the compressed storage of splatfacto gaussians
+"""
+
+import pytest
+import torch
+
+from nerfstudio.model_components.splat_compression import (
+    compress_gaussians,
+    decode_quats,
+    decompress_gaussians,
+    encode_quats,
+    kmeans,
+)
+
+
+def random_gauss_params(num_gaussians, sh_degree, generator):
+    """Gaussians as stored by splatfacto, with log scales and logit opacities"""
+    return {
+        "means": (torch.rand((num_gaussians, 3), generator=generator) - 0.5) * 10,
+        "scales": torch.rand((num_gaussians, 3), generator=generator) * 4 - 6,
+        "quats": torch.randn((num_gaussians, 4), generator=generator),
+        "opacities": torch.randn((num_gaussians, 1), generator=generator) * 2,
+        "features_dc": torch.randn((num_gaussians, 3), generator=generator),
+        "features_rest": torch.randn((num_gaussians, (sh_degree + 1) ** 2 - 1, 3), generator=generator) * 0.1,
+    }
+
+
+def test_quats_round_trip():
+    """Test that packed rotations decode to the same rotation, up to sign"""
+    quats = torch.nn.functional.normalize(torch.randn((10000, 4), generator=torch.Generator().manual_seed(0)), dim=-1)
+    packed = encode_quats(quats)
+    assert packed.dtype == torch.int32
+    decoded = decode_quats(packed)
+    torch.testing.assert_close(decoded.norm(dim=-1), torch.ones(len(quats)), atol=1e-3, rtol=0)
+    assert (decoded * quats).sum(dim=-1).abs().min() > 1 - 1e-5
+
+
+def test_kmeans():
+    """Test that k-means finds well separated clusters"""
+    generator = torch.Generator().manual_seed(0)
+    centers = torch.randn((4, 8), generator=generator) * 10
+    labels = torch.arange(400) % 4
+    points = centers[labels] + torch.randn((400, 8), generator=generator) * 0.01
+    found, found_labels = kmeans(points, 4, seed=1)
+    for cluster in range(4):
+        assert len(torch.unique(found_labels[labels == cluster])) == 1
+    torch.testing.assert_close(found[found_labels], points, atol=0.05, rtol=0)
+
+
+@pytest.mark.parametrize("sh_degree", [0, 3])
+def test_compress_gaussians(sh_degree):
+    """Test that decompressed gaussians are the original ones reordered, within the quantization error"""
+    num_gaussians, chunk_size = 1000, 64
+    gauss_params = random_gauss_params(num_gaussians, sh_degree, torch.Generator().manual_seed(0))
+    compressed = compress_gaussians(gauss_params, chunk_size=chunk_size, sh_codebook_size=num_gaussians)
+    params = decompress_gaussians(compressed)
+    assert params.keys() == gauss_params.keys()
+    for name, param in params.items():
+        assert param.shape == gauss_params[name].shape
+        assert param.dtype == torch.float32
+
+    # Match every decompressed gaussian to the original one at the same position.
+    order = torch.cdist(params["means"], gauss_params["means"]).argmin(dim=-1)
+    assert len(torch.unique(order)) == num_gaussians
+    original = {name: param[order] for name, param in gauss_params.items()}
+    for name in ["means", "scales", "features_dc"]:
+        lower = compressed[f"{name}_lower"].repeat_interleave(chunk_size, dim=0)[:num_gaussians]
+        upper = compressed[f"{name}_upper"].repeat_interleave(chunk_size, dim=0)[:num_gaussians]
+        bits = 16 if name == "means" else 8
+        assert ((params[name] - original[name]).abs() <= (upper - lower) / (2**bits - 1) / 2 + 1e-5).all()
+    assert ((torch.sigmoid(params["opacities"]) - torch.sigmoid(original["opacities"])).abs() <= 1 / 255).all()
+    quats = torch.nn.functional.normalize(original["quats"], dim=-1)
+    assert (params["quats"] * quats).sum(dim=-1).abs().min() > 1 - 1e-5
+    # A codebook as large as the number of gaussians only rounds to half precision.
+    torch.testing.assert_close(params["features_rest"], original["features_rest"], atol=1e-3, rtol=1e-3)
+
+
+def test_compressed_size():
+    """Test that a degree 3 gaussian takes about 20 bytes"""
+    num_gaussians = 4096
+    gauss_params = random_gauss_params(num_gaussians, 3, torch.Generator().manual_seed(0))
+    compressed = compress_gaussians(gauss_params, sh_codebook_size=256, sh_codebook_iters=2)
+    nbytes = sum(value.numel() * value.element_size() for value in compressed.values())
+    original_nbytes = sum(value.numel() * value.element_size() for value in gauss_params.values())
+    assert nbytes < 20.5 * num_gaussians + 256 * 45 * 2 + 64
+    assert original_nbytes == 236 * num_gaussians
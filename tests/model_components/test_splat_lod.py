@@ -0,0 +1,95 @@
+"""
+Test the gaussian octree used for frustum culling and level of detail
+"""
+
+import torch
+
+from nerfstudio.model_components.splat_lod import GaussianLOD, rotmats_to_quats
+from nerfstudio.model_components.torch_rasterizer import quats_to_rotmats, rasterization_torch
+
+
+def random_gaussians(num_gaussians, generator):
+    """Small gaussians in a 20m cube around the origin, with activated scales and opacities"""
+    means = (torch.rand((num_gaussians, 3), generator=generator) - 0.5) * 20
+    scales = torch.rand((num_gaussians, 3), generator=generator) * 0.05 + 0.01
+    quats = torch.nn.functional.normalize(torch.randn((num_gaussians, 4), generator=generator), dim=-1)
+    opacities = torch.rand(num_gaussians, generator=generator)
+    colors = torch.rand((num_gaussians, 3), generator=generator)
+    return means, scales, quats, opacities, colors
+
+
+def test_rotmats_to_quats():
+    """Test that converting rotations to quaternions and back is the identity"""
+    quats = torch.nn.functional.normalize(torch.randn((1000, 4), generator=torch.Generator().manual_seed(0)), dim=-1)
+    rotmats = quats_to_rotmats(quats)
+    torch.testing.assert_close(quats_to_rotmats(rotmats_to_quats(rotmats)), rotmats, atol=1e-5, rtol=0)
+
+
+def test_select_culls_to_frustum():
+    """Test that without level of detail, exactly the gaussians whose bounds touch the frustum are selected"""
+    means, scales, quats, opacities, colors = random_gaussians(5000, torch.Generator().manual_seed(0))
+    lod = GaussianLOD(means, scales, quats, opacities, colors, max_depth=6)
+    viewmat = torch.eye(4)
+    K = torch.tensor([[50.0, 0.0, 32.0], [0.0, 50.0, 24.0], [0.0, 0.0, 1.0]])
+    gaussian_ids, proxy_ids = lod.select(viewmat, K, 64, 48, pixel_size=0)
+    assert len(proxy_ids) == 0
+
+    x, y, z = means.unbind(-1)
+    radii = 3 * scales.max(dim=-1).values
+    margin = radii * torch.sqrt(torch.tensor(1 + (32 / 50) ** 2))
+    inside = (
+        (z > 0.01 - radii)
+        & (x.abs() - 32 / 50 * z <= margin)
+        & (y.abs() - 24 / 50 * z <= radii * (1 + (24 / 50) ** 2) ** 0.5)
+    )
+    assert set(gaussian_ids.tolist()) == set(torch.where(inside)[0].tolist())
+
+
+def test_proxies_match_single_gaussians():
+    """Test that the proxy of a node holding a single gaussian is that gaussian"""
+    means, scales, quats, opacities, colors = random_gaussians(50, torch.Generator().manual_seed(0))
+    means = means + 1000
+    lod = GaussianLOD(means, scales, quats, opacities, colors, max_depth=8)
+    leaves = slice(lod.level_offsets[-2], lod.level_offsets[-1])
+    single = (lod.gaussian_starts[1:] - lod.gaussian_starts[:-1]) == 1
+    ids = lod.order[lod.gaussian_starts[:-1][single]]
+    proxy_rotmats = quats_to_rotmats(lod.proxy_params["quats"][leaves][single])
+    proxy_scales = lod.proxy_params["scales"][leaves][single].exp()
+    proxy_covars = (proxy_rotmats * proxy_scales[:, None, :] ** 2) @ proxy_rotmats.transpose(-1, -2)
+    rotmats = quats_to_rotmats(quats[ids])
+    covars = (rotmats * scales[ids][:, None, :] ** 2) @ rotmats.transpose(-1, -2)
+    torch.testing.assert_close(lod.proxy_params["means"][leaves][single], means[ids])
+    torch.testing.assert_close(proxy_covars, covars, atol=1e-6, rtol=1e-3)
+    torch.testing.assert_close(
+        torch.sigmoid(lod.proxy_params["opacities"][leaves][single, 0]), opacities[ids], atol=1e-4, rtol=1e-3
+    )
+
+
+def test_level_of_detail_render():
+    """Test that rendering with proxies for distant nodes draws fewer gaussians and looks about the same"""
+    means, scales, quats, opacities, colors = random_gaussians(20000, torch.Generator().manual_seed(0))
+    means[:, 2] += 40
+    lod = GaussianLOD(means, scales, quats, opacities, colors, max_depth=8)
+    viewmat = torch.eye(4)
+    K = torch.tensor([[40.0, 0.0, 32.0], [0.0, 40.0, 24.0], [0.0, 0.0, 1.0]])
+    all_ids, _ = lod.select(viewmat, K, 64, 48, pixel_size=0)
+    gaussian_ids, proxy_ids = lod.select(viewmat, K, 64, 48, pixel_size=2)
+    assert len(gaussian_ids) + len(proxy_ids) < len(all_ids) / 2
+
+    def render(means, quats, log_scales, logit_opacities, colors):
+        return rasterization_torch(
+            means, quats, log_scales.exp(), torch.sigmoid(logit_opacities), colors, viewmat[None], K[None], 64, 48
+        )[0]
+
+    params = {"means": means, "quats": quats, "scales": scales.log(), "opacities": torch.logit(opacities)[:, None]}
+    params["features_dc"] = colors
+    full = render(
+        *(params[name][all_ids] for name in ["means", "quats", "scales"]),
+        params["opacities"][all_ids, 0],
+        colors[all_ids],
+    )
+    selected = lod.gather(params, gaussian_ids, proxy_ids)
+    approx = render(
+        selected["means"], selected["quats"], selected["scales"], selected["opacities"][:, 0], selected["features_dc"]
+    )
+    assert (full - approx).abs().mean() < 0.05
@@ -0,0 +1,109 @@
+"""
+Test the PyTorch gaussian rasterizer
+"""
+
+import math
+
+import pytest
+import torch
+
+from nerfstudio.model_components.torch_rasterizer import project_gaussians, quats_to_rotmats, rasterization_torch
+
+
+def composite_per_pixel(means, quats, scales, opacities, colors, viewmat, K, width, height, tile_size):
+    """Reference compositing that visits every pixel and the gaussians whose bounding square touches its tile"""
+    M = quats_to_rotmats(quats) * scales[:, None, :]
+    means2d, conics, depths, radii, _ = project_gaussians(means, M @ M.transpose(-1, -2), viewmat, K, width, height)
+    render = torch.zeros((height, width, colors.shape[-1]))
+    alphas = torch.zeros((height, width, 1))
+    order = [i for i in torch.argsort(depths).tolist() if radii[i] > 0]
+    for y in range(height):
+        for x in range(width):
+            T = 1.0
+            for i in order:
+                center, tile_radius = means2d[i] / tile_size, radii[i].item() / tile_size
+                tile_min = torch.floor(center - tile_radius).clamp_min(0)
+                tile_max = torch.ceil(center + tile_radius)
+                tile = torch.tensor([x // tile_size, y // tile_size])
+                if (tile < tile_min).any() or (tile >= tile_max).any():
+                    continue
+                dx, dy = (means2d[i] - torch.tensor([x + 0.5, y + 0.5])).tolist()
+                a, b, c = conics[i].tolist()
+                sigma = 0.5 * (a * dx * dx + c * dy * dy) + b * dx * dy
+                alpha = min(0.999, opacities[i].item() * math.exp(-sigma))
+                if sigma < 0 or alpha < 1 / 255:
+                    continue
+                if T * (1 - alpha) <= 1e-4:
+                    break
+                render[y, x] += alpha * T * colors[i]
+                T *= 1 - alpha
+            alphas[y, x] = 1 - T
+    return render, alphas
+
+
+def random_scene(num_gaussians, max_opacity, max_scale):
+    """Gaussians in front of a camera at the origin looking down +z"""
+    generator = torch.Generator().manual_seed(0)
+    means = torch.rand((num_gaussians, 3), generator=generator) * torch.tensor([4.0, 3.0, 2.0]) + torch.tensor(
+        [-2.0, -1.5, 3.0]
+    )
+    quats = torch.nn.functional.normalize(torch.randn((num_gaussians, 4), generator=generator), dim=-1)
+    scales = torch.rand((num_gaussians, 3), generator=generator) * max_scale + 0.02
+    opacities = torch.rand(num_gaussians, generator=generator) * max_opacity
+    colors = torch.rand((num_gaussians, 3), generator=generator)
+    viewmat = torch.eye(4)
+    K = torch.tensor([[20.0, 0.0, 14.0], [0.0, 20.0, 10.0], [0.0, 0.0, 1.0]])
+    return means, quats, scales, opacities, colors, viewmat, K
+
+
+@pytest.mark.parametrize("num_gaussians, max_opacity, max_scale", [(40, 0.3, 0.3), (120, 1.0, 1.0)])
+def test_rasterization_matches_per_pixel_reference(num_gaussians, max_opacity, max_scale):
+    """Test the tiled, batched compositing against a per-pixel loop, including the early termination of opaque pixels"""
+    means, quats, scales, opacities, colors, viewmat, K = random_scene(num_gaussians, max_opacity, max_scale)
+    width, height, tile_size = 28, 20, 8
+    render, alpha, info = rasterization_torch(
+        means, quats, scales, opacities, colors, viewmat[None], K[None], width, height, tile_size=tile_size
+    )
+    assert render.shape == (1, height, width, 3)
+    assert alpha.shape == (1, height, width, 1)
+    assert info["radii"].shape == (1, num_gaussians)
+    expected_render, expected_alpha = composite_per_pixel(
+        means, quats, scales, opacities, colors, viewmat, K, width, height, tile_size
+    )
+    torch.testing.assert_close(render[0], expected_render, atol=1e-5, rtol=1e-4)
+    torch.testing.assert_close(alpha[0], expected_alpha, atol=1e-5, rtol=1e-4)
+    if max_opacity == 1.0:
+        assert (alpha[0] > 0.999).any()
+
+
+def test_rasterization_depth_and_sh():
+    """Test that the expected depth of a single gaussian is its depth, and that degree 0 harmonics give flat colors"""
+    means, quats, scales, opacities, _, viewmat, K = random_scene(1, 0.5, 0.3)
+    sh = torch.zeros((1, 16, 3))
+    sh[:, 0] = 1.0
+    render, alpha, _ = rasterization_torch(
+        means, quats, scales, opacities, sh, viewmat[None], K[None], 28, 20, sh_degree=3, render_mode="RGB+ED"
+    )
+    covered = alpha[0, ..., 0] > 0
+    assert covered.any()
+    torch.testing.assert_close(render[0][covered][:, 3], means[0, 2].expand(int(covered.sum())), rtol=1e-4, atol=0)
+    torch.testing.assert_close(
+        render[0][covered][:, :3] / alpha[0][covered], torch.full((int(covered.sum()), 3), 0.5 + 0.28209479177387814)
+    )
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="gsplat needs CUDA")
+@pytest.mark.parametrize("rasterize_mode", ["classic", "antialiased"])
+def test_rasterization_matches_gsplat(rasterize_mode):
+    """Test that the images match gsplat"""
+    from gsplat.rendering import rasterization
+
+    means, quats, scales, opacities, _, viewmat, K = random_scene(2000, 1.0, 0.3)
+    sh = torch.randn((len(means), 16, 3), generator=torch.Generator().manual_seed(0)) * 0.3
+    args = [t.cuda() for t in (means, quats, scales, opacities, sh, viewmat[None], K[None])]
+    kwargs = dict(sh_degree=3, render_mode="RGB+ED", rasterize_mode=rasterize_mode)
+    render, alpha, info = rasterization_torch(*args, 28, 20, **kwargs)
+    expected_render, expected_alpha, expected_info = rasterization(*args, 28, 20, **kwargs)
+    torch.testing.assert_close(info["radii"], expected_info["radii"].to(info["radii"].dtype))
+    torch.testing.assert_close(render, expected_render, atol=1e-3, rtol=1e-3)
+    torch.testing.assert_close(alpha, expected_alpha, atol=1e-3, rtol=1e-3)
@@ -0,0 +1,42 @@
+"""
+Test the base model
+"""
+
+import torch
+
+from nerfstudio.cameras.cameras import Cameras
+from nerfstudio.data.scene_box import SceneBox
+from nerfstudio.models.base_model import Model, ModelConfig
+
+
+class DirectionModel(Model):
+    """Model that outputs the ray directions and counts its forward calls"""
+
+    num_calls = 0
+
+    def get_outputs(self, ray_bundle):
+        self.num_calls += 1
+        return {"rgb": ray_bundle.directions, "depth": ray_bundle.origins[..., :1], "list": [ray_bundle.origins]}
+
+
+def test_get_outputs_for_cameras_packs_rays():
+    """Test that batched rendering matches rendering one camera at a time, with fewer chunks"""
+    config = ModelConfig(_target=DirectionModel, enable_collider=False, eval_num_rays_per_chunk=100)
+    model = DirectionModel(config, scene_box=SceneBox(aabb=torch.ones(2, 3)), num_train_data=1)
+    cameras = [
+        Cameras(camera_to_worlds=torch.eye(4)[None, :3], fx=5.0, fy=5.0, cx=4.0, cy=3.0, width=w, height=h)
+        for w, h in [(8, 6), (7, 5), (9, 9)]
+    ]
+
+    expected = [model.get_outputs_for_camera(camera) for camera in cameras]
+    assert model.num_calls == 1 + 1 + 1
+    model.num_calls = 0
+    outputs = model.get_outputs_for_cameras(cameras)
+    assert model.num_calls == 2
+
+    for camera, output, expected_output in zip(cameras, outputs, expected):
+        assert set(output) == {"rgb", "depth"}
+        assert output["rgb"].shape == (camera.height.item(), camera.width.item(), 3)
+        assert output["depth"].shape == (camera.height.item(), camera.width.item(), 1)
+        for name in output:
+            assert torch.equal(output[name], expected_output[name])
@@ -88,3 +88,39 @@ def test_load_state_dict():
     pipeline.load_pipeline(ddp_state_dict, 0)
     assert was_called
     assert getattr(pipeline.model, "param")[0].item() == 4
+
+
+def test_get_average_image_metrics(tmp_path: Path):
+    """Test metrics of all images are averaged in order and their images are written"""
+
+    class MockedModel(Model):
+        """Mocked model"""
+
+        def get_outputs_for_cameras(self, cameras, obb_box=None):
+            return [{"rgb": torch.full((2, 3, 3), float(camera.fx)) / 10} for camera in cameras]
+
+        def get_image_metrics_and_images(self, outputs, batch):
+            assert not torch.is_grad_enabled()
+            value = float(outputs["rgb"][0, 0, 0])
+            return {"psnr": value, "index": float(batch["image_idx"])}, {"img": outputs["rgb"]}
+
+    config = VanillaPipelineConfig(
+        datamanager=VanillaDataManagerConfig(_target=MockedDataManager),
+        model=ModelConfig(_target=MockedModel, eval_num_images_per_batch=2),
+    )
+    pipeline = VanillaPipeline(config, "cpu")
+    data_loader = [
+        (
+            Cameras(camera_to_worlds=torch.eye(4)[:3], fx=float(i), fy=1.0, cx=1.0, cy=1.0, width=3, height=2),
+            {"image_idx": i},
+        )
+        for i in range(5)
+    ]
+
+    metrics_dict = pipeline.get_average_image_metrics(data_loader, "eval", output_path=tmp_path)
+    assert abs(metrics_dict["psnr"] - 0.2) < 1e-6
+    assert metrics_dict["index"] == 2.0
+    for key in ["num_rays_per_sec", "fps", "end_to_end_num_rays_per_sec", "end_to_end_fps"]:
+        assert metrics_dict[key] > 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"eval_img_{i:04d}.png" for i in range(5)]
+    assert pipeline.training
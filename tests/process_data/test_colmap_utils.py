@@ -0,0 +1,98 @@
+"""
+Test COLMAP processing utils
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from nerfstudio.data.utils.colmap_parsing_utils import (
+    Camera,
+    Image,
+    Point3D,
+    qvec2rotmat,
+    write_cameras_binary,
+    write_images_binary,
+    write_points3D_binary,
+)
+from nerfstudio.process_data.colmap_utils import create_sfm_depth
+
+
+def test_create_sfm_depth(tmp_path: Path):
+    """Depth maps hold the depth of the filtered SfM points, for every camera."""
+    rng = np.random.default_rng(0)
+    cameras = {
+        1: Camera(id=1, model="PINHOLE", width=40, height=30, params=np.array([30.0, 30.0, 20.0, 15.0])),
+        2: Camera(id=2, model="PINHOLE", width=24, height=32, params=np.array([20.0, 20.0, 12.0, 16.0])),
+    }
+    num_points = 200
+    xyz = rng.uniform(-1, 1, size=(num_points, 3)) + np.array([0.0, 0.0, 5.0])
+    point_ids = rng.permutation(1000)[:num_points] + 1
+    errors = rng.uniform(0, 4, size=num_points)
+    track_lengths = rng.integers(1, 4, size=num_points)
+
+    images = {}
+    expected = {}
+    for image_id, camera_id in [(4, 1), (2, 2), (9, 1), (5, 2)]:
+        camera = cameras[camera_id]
+        qvec = np.array([1.0, 0.0, 0.0, 0.0]) + rng.normal(scale=0.05, size=4)
+        qvec /= np.linalg.norm(qvec)
+        tvec = rng.normal(scale=0.1, size=3)
+        cam_points = xyz @ qvec2rotmat(qvec).T + tvec
+        fx, fy, cx, cy = camera.params
+        uv = cam_points[:, :2] / cam_points[:, 2:] * np.array([fx, fy]) + np.array([cx, cy])
+        point3D_ids = point_ids.copy()
+        point3D_ids[rng.random(num_points) < 0.2] = -1
+        if image_id == 5:
+            # An image without any triangulated point.
+            point3D_ids[:] = -1
+        images[image_id] = Image(
+            id=image_id,
+            qvec=qvec,
+            tvec=tvec,
+            camera_id=camera_id,
+            name=f"frame_{image_id:05d}.jpg",
+            xys=uv,
+            point3D_ids=point3D_ids,
+        )
+
+        depth = np.zeros((camera.height, camera.width), dtype=np.float32)
+        for i in range(num_points):
+            u, v = uv[i]
+            if (
+                point3D_ids[i] != -1
+                and errors[i] <= 2.5
+                and track_lengths[i] >= 2
+                and 0 <= u < camera.width
+                and 0 <= v < camera.height
+            ):
+                depth[int(v), int(u)] = cam_points[i, 2]
+        expected[image_id] = (1000.0 * depth).astype(np.uint16)
+
+    points3D = {
+        int(point_ids[i]): Point3D(
+            id=int(point_ids[i]),
+            xyz=xyz[i],
+            rgb=np.array([0, 0, 0]),
+            error=np.array(errors[i]),
+            image_ids=np.ones(track_lengths[i], dtype=np.int64),
+            point2D_idxs=np.zeros(track_lengths[i], dtype=np.int64),
+        )
+        for i in range(num_points)
+    }
+    write_cameras_binary(cameras, tmp_path / "cameras.bin")
+    write_images_binary(images, tmp_path / "images.bin")
+    write_points3D_binary(points3D, tmp_path / "points3D.bin")
+
+    output_dir = tmp_path / "depth"
+    output_dir.mkdir()
+    image_id_to_depth_path = create_sfm_depth(tmp_path, output_dir, verbose=False, max_workers=2)
+
+    assert list(image_id_to_depth_path.keys()) == list(images.keys())
+    for image_id, depth_path in image_id_to_depth_path.items():
+        assert depth_path == output_dir / f"frame_{image_id:05d}.png"
+        depth = cv2.imread(str(depth_path), cv2.IMREAD_UNCHANGED)
+        np.testing.assert_array_equal(depth, expected[image_id])
+    assert not expected[5].any()
+    assert expected[4].any()
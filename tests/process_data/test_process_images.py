@@ -5,6 +5,7 @@ Process images test
 import os
 from pathlib import Path
 
+import cv2
 import numpy as np
 import torch
 from PIL import Image
@@ -20,6 +21,7 @@ from nerfstudio.data.utils.colmap_parsing_utils import (
     write_points3D_binary,
 )
 from nerfstudio.process_data.images_to_nerfstudio_dataset import ImagesToNerfstudioDataset
+from nerfstudio.process_data.process_data_utils import copy_images_list, write_image_pyramid
 
 
 def random_quaternion(num_poses: int):
@@ -209,3 +211,45 @@ def test_process_images_recursively_skip_colmap(tmp_path: Path):
     )
     dataparser_poses = np.linalg.inv(dataparser_poses)
     np.testing.assert_allclose(original_poses, dataparser_poses, rtol=0, atol=1e-5)
+
+
+def test_copy_images_list_pyramid(tmp_path: Path):
+    """Every resolution is written from one decode, and up to date outputs are skipped."""
+    (tmp_path / "input").mkdir()
+    rng = np.random.default_rng(0)
+    image_paths = []
+    for i in range(3):
+        image_paths.append(tmp_path / "input" / f"{i}.png")
+        Image.fromarray(rng.integers(0, 256, size=(41, 66, 3), dtype=np.uint8)).save(image_paths[-1])
+
+    copied = copy_images_list(
+        list(image_paths), tmp_path / "images", num_downscales=2, crop_factor=(0.0, 0.5, 0.0, 0.0), max_workers=2
+    )
+    assert [path.name for path in copied] == ["frame_00001.png", "frame_00002.png", "frame_00003.png"]
+    for path in copied:
+        for i, size in enumerate([(66, 20), (33, 10), (16, 5)]):
+            level_dir = tmp_path / ("images" if i == 0 else f"images_{2**i}")
+            assert Image.open(level_dir / path.name).size == size
+    np.testing.assert_array_equal(np.array(Image.open(copied[0])), np.array(Image.open(image_paths[0]))[:20])
+
+    # Depth maps keep their values with nearest neighbor sampling.
+    depth = rng.integers(0, 2**16, size=(8, 8), dtype=np.uint16)
+    cv2.imwrite(str(tmp_path / "input" / "depth.png"), depth)
+    write_image_pyramid(
+        tmp_path / "input" / "depth.png", [None, tmp_path / "depth_2.png"], upscale_factor=2, nearest_neighbor=True
+    )
+    np.testing.assert_array_equal(cv2.imread(str(tmp_path / "depth_2.png"), cv2.IMREAD_UNCHANGED), depth)
+
+    # Outputs newer than their source are not rewritten.
+    mtime = (tmp_path / "images_4" / copied[0].name).stat().st_mtime_ns
+    copy_images_list(
+        list(image_paths), tmp_path / "images", num_downscales=2, crop_factor=(0.0, 0.5, 0.0, 0.0), keep_image_dir=True
+    )
+    assert (tmp_path / "images_4" / copied[0].name).stat().st_mtime_ns == mtime
+
+    # Unless they were processed with other parameters.
+    copy_images_list(list(image_paths), tmp_path / "images", num_downscales=2, keep_image_dir=True)
+    for i, size in enumerate([(66, 41), (33, 20), (16, 10)]):
+        level_dir = tmp_path / ("images" if i == 0 else f"images_{2**i}")
+        assert Image.open(level_dir / copied[0].name).size == size
+        assert sorted(path.name for path in level_dir.iterdir()) == [path.name for path in copied]
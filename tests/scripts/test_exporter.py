@@ -14,11 +14,17 @@
 
 from collections import OrderedDict
 from pathlib import Path
+from types import SimpleNamespace
 
 import numpy as np
 import open3d as o3d
 import pytest
+import torch
 
+from nerfstudio.data.scene_box import SceneBox
+from nerfstudio.exporter import ply_utils
+from nerfstudio.models.splatfacto import SplatfactoModelConfig
+from nerfstudio.scripts import exporter
 from nerfstudio.scripts.exporter import ExportGaussianSplat
 
 
@@ -76,6 +82,85 @@ def test_export_gaussian_splat_write_ply_mismatched_count(tmp_path: Path):
         ExportGaussianSplat.write_ply(filename, count, map_to_tensors)
 
 
+def test_write_read_ply_round_trip(tmp_path: Path):
+    count = 1000
+    map_to_tensors: OrderedDict[str, np.ndarray] = OrderedDict(
+        [
+            ("x", np.random.rand(count).astype(np.float64)),
+            ("f_dc_0", np.random.rand(count, 1).astype(np.float32)),
+            ("colors", np.random.randint(0, 255, size=(count,), dtype=np.uint8)),
+            ("opacity", np.random.rand(count, 1).astype(np.float32)),
+        ]
+    )
+    filename = tmp_path / "round_trip.ply"
+    chunked_filename = tmp_path / "round_trip_chunked.ply"
+    ply_utils.write_ply(filename, count, map_to_tensors)
+    ply_utils.write_ply(chunked_filename, count, map_to_tensors, chunk_size=333)
+    assert filename.read_bytes() == chunked_filename.read_bytes()
+
+    for mmap in (False, True):
+        columns = ply_utils.read_ply(filename, mmap=mmap)
+        assert list(columns.keys()) == list(map_to_tensors.keys())
+        assert columns["colors"].dtype == np.uint8
+        for key, tensor in map_to_tensors.items():
+            np.testing.assert_array_equal(columns[key], tensor.reshape(-1).astype(columns[key].dtype))
+
+
+def test_ply_writer_streaming(tmp_path: Path):
+    count = 10
+    x = np.random.rand(count).astype(np.float32)
+    filename = tmp_path / "streaming.ply"
+    with ply_utils.PlyWriter(filename, count, OrderedDict([("x", x.dtype)])) as writer:
+        writer.write(OrderedDict([("x", x[:4])]))
+        writer.write(OrderedDict([("x", x[4:])]))
+    np.testing.assert_array_equal(ply_utils.read_ply(filename)["x"], x)
+
+    with pytest.raises(ValueError):
+        with ply_utils.PlyWriter(filename, count, OrderedDict([("x", x.dtype)])) as writer:
+            writer.write(OrderedDict([("x", x[:4])]))
+
+
+def test_splat_ply_to_gauss_params():
+    n, num_rest = 5, 15
+    shs_rest = np.random.rand(n, num_rest, 3).astype(np.float32)
+    map_to_tensors: OrderedDict[str, np.ndarray] = OrderedDict()
+    for i, name in enumerate(["x", "y", "z"]):
+        map_to_tensors[name] = np.full(n, i, dtype=np.float32)
+    for i in range(3):
+        map_to_tensors[f"f_dc_{i}"] = np.full(n, i, dtype=np.float32)
+    flat_rest = shs_rest.transpose(0, 2, 1).reshape(n, -1)
+    for i in range(flat_rest.shape[-1]):
+        map_to_tensors[f"f_rest_{i}"] = flat_rest[:, i]
+    map_to_tensors["opacity"] = np.zeros(n, dtype=np.float32)
+    for i in range(3):
+        map_to_tensors[f"scale_{i}"] = np.zeros(n, dtype=np.float32)
+    for i in range(4):
+        map_to_tensors[f"rot_{i}"] = np.zeros(n, dtype=np.float32)
+
+    params = ply_utils.splat_ply_to_gauss_params(map_to_tensors)
+    np.testing.assert_array_equal(params["features_rest"], shs_rest)
+    assert params["means"].shape == (n, 3)
+    assert params["quats"].shape == (n, 4)
+    assert params["opacities"].shape == (n, 1)
+
+
+def test_export_gaussian_splat_sh_degree_0(tmp_path: Path, monkeypatch):
+    """Models without spherical harmonics export their colors as red, green and blue columns."""
+    model = SplatfactoModelConfig(sh_degree=0, num_random=10).setup(
+        scene_box=SceneBox(aabb=torch.tensor([[-1.0, -1.0, -1.0], [1.0, 1.0, 1.0]])), num_train_data=1
+    )
+    pipeline = SimpleNamespace(model=model)
+    monkeypatch.setattr(exporter, "eval_setup", lambda *args, **kwargs: (None, pipeline, None, None))
+    ExportGaussianSplat(load_config=tmp_path / "config.yml", output_dir=tmp_path).main()
+
+    columns = ply_utils.read_ply(tmp_path / "splat.ply")
+    assert len(columns["x"]) == 10
+    colors = (torch.clamp(model.colors, 0.0, 1.0).detach().numpy() * 255).astype(np.uint8)
+    for i, channel in enumerate(("red", "green", "blue")):
+        np.testing.assert_array_equal(columns[channel], colors[:, i])
+    assert not any(key.startswith("f_dc_") for key in columns)
+
+
 if __name__ == "__main__":
     # Run the test
     test_export_gaussian_splat_write_ply(Path("."))
@@ -0,0 +1,136 @@
+"""
+Test rendering helpers
+"""
+
+from pathlib import Path
+
+import mediapy as media
+import numpy as np
+import torch
+
+from nerfstudio.cameras.cameras import Cameras
+from nerfstudio.data.scene_box import SceneBox
+from nerfstudio.models.base_model import Model, ModelConfig
+from nerfstudio.pipelines.base_pipeline import Pipeline
+from nerfstudio.scripts.render import (
+    _assemble_shards,
+    _find_nearest_train_camera,
+    _FrameWriter,
+    _get_shard_range,
+    _render_trajectory_video,
+)
+
+
+class MockedModel(Model):
+    """Mocked model with a wall at x = 0.5"""
+
+    def __init__(self):
+        super().__init__(config=ModelConfig(), scene_box=SceneBox(aabb=torch.ones(2, 3)), num_train_data=0)
+        self.num_calls = 0
+
+    def populate_modules(self):
+        pass
+
+    def get_outputs(self, ray_bundle):
+        self.num_calls += 1
+        directions = ray_bundle.directions
+        depth = (0.5 - ray_bundle.origins[:, :1]) / directions[:, :1]
+        depth = torch.where(depth > 0, depth, torch.full_like(depth, 100.0))
+        return {"depth": depth}
+
+
+class MockedPipeline(Pipeline):
+    """Mocked pipeline"""
+
+    def __init__(self, model: Model):
+        super().__init__()
+        self._model = model
+
+
+def test_find_nearest_train_camera():
+    """The nearest camera is found by pose, and occluded cameras are skipped with one model call"""
+    model = MockedModel()
+    pipeline = MockedPipeline(model)
+    train_positions = torch.tensor([[0.6, 0.0, 0.0], [0.0, 0.0, 0.0], [0.35, 0.0, 0.0], [0.45, 2.0, 0.0]])
+    train_rotations = torch.eye(3).repeat(4, 1, 1)
+    # The closest camera in position has a different orientation.
+    train_rotations[2] = torch.tensor([[0.0, -1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    camera_to_world = torch.cat([torch.eye(3), torch.tensor([[0.4], [0.0], [0.0]])], dim=1)
+
+    assert _find_nearest_train_camera(pipeline, camera_to_world, train_positions, train_rotations) == 0
+    assert model.num_calls == 0
+
+    # The closest camera is behind the wall.
+    nearest = _find_nearest_train_camera(
+        pipeline, camera_to_world, train_positions, train_rotations, check_occlusions=True
+    )
+    assert nearest == 2
+    assert model.num_calls == 1
+
+
+def test_frame_writer_writes_images(tmp_path: Path):
+    """Test frames queued on the frame writer are concatenated and written"""
+    frame_writer = _FrameWriter(
+        output_format="images",
+        output_filename=tmp_path / "video.mp4",
+        output_image_dir=tmp_path,
+        image_format="png",
+        max_inflight_frames=2,
+    )
+    for i in range(5):
+        frame_writer.submit(i, [np.full((4, 3, 3), i / 10, dtype=np.float32), np.zeros((4, 2, 3), dtype=np.float32)])
+    frame_writer.close()
+
+    assert frame_writer.num_frames == 5
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"{i:05d}.png" for i in range(5)]
+    image = media.read_image(tmp_path / "00003.png")
+    assert image.shape == (4, 5, 3)
+    assert abs(int(image[0, 0, 0]) - 0.3 * 255) <= 1
+    assert image[0, 4, 0] == 0
+
+
+class MockedRenderModel(MockedModel):
+    """Mocked model rendering the x coordinate of the camera"""
+
+    def get_outputs_for_camera(self, camera, obb_box=None):
+        self.num_calls += 1
+        return {"rgb": camera.camera_to_worlds[0, 0, 3].expand(int(camera.height), int(camera.width), 3)}
+
+
+def test_sharded_render_resumes(tmp_path: Path):
+    """Test shards render disjoint frames, skip frames that exist, and are assembled"""
+    assert [list(_get_shard_range(10, i, 3)) for i in range(3)] == [[0, 1, 2], [3, 4, 5], [6, 7, 8, 9]]
+
+    model = MockedRenderModel()
+    pipeline = MockedPipeline(model)
+    camera_to_worlds = torch.eye(4)[:3].repeat(5, 1, 1)
+    camera_to_worlds[:, 0, 3] = torch.arange(5) / 10
+    cameras = Cameras(camera_to_worlds=camera_to_worlds, fx=1.0, fy=1.0, cx=1.0, cy=1.0, width=3, height=2)
+    output_filename = tmp_path / "render.mp4"
+
+    def render_shard(shard_index: int):
+        _render_trajectory_video(
+            pipeline,
+            cameras,
+            output_filename=output_filename,
+            rendered_output_names=["rgb"],
+            output_format="images",
+            image_format="png",
+            shard_index=shard_index,
+            num_shards=2,
+        )
+
+    render_shard(1)
+    assert model.num_calls == 3
+    (tmp_path / "render" / "00004.png").unlink()
+    (tmp_path / "render" / ".shard_001_of_002.json").unlink()
+    render_shard(1)
+    assert model.num_calls == 4
+    render_shard(0)
+    assert model.num_calls == 6
+
+    _assemble_shards(output_filename, "images", num_shards=2)
+    assert sorted(path.name for path in (tmp_path / "render").iterdir()) == [f"{i:05d}.png" for i in range(5)]
+    for i in range(5):
+        image = media.read_image(tmp_path / "render" / f"{i:05d}.png")
+        assert abs(int(image[0, 0, 0]) - i / 10 * 255) <= 1
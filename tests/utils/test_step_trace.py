@@ -0,0 +1,47 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from nerfstudio.scripts.profile_report import ProfileReport
+from nerfstudio.utils.profiler import StepTracer, read_step_trace
+
+
+def _write_trace(path: Path, num_steps: int, data_time: float) -> None:
+    tracer = StepTracer(path, cuda_sync=False, flush_every=4)
+    for step in range(num_steps):
+        tracer.begin_step(step)
+        with tracer.phase("forward"):
+            with tracer.phase("data"):
+                time.sleep(data_time)
+        tracer.end_step()
+    tracer.close()
+
+
+def test_step_trace_round_trip(tmp_path: Path):
+    path = tmp_path / "step_trace.nstrace"
+    _write_trace(path, num_steps=10, data_time=0.002)
+    # A partially written record is ignored.
+    with open(path, "ab") as f:
+        f.write(b"\0" * 5)
+
+    trace = read_step_trace(path)
+    assert np.array_equal(trace["step"], np.arange(10))
+    assert np.all(trace["data"] >= 0.002)
+    # Nested phases are only counted once.
+    assert np.all(trace["forward"] < trace["data"])
+    phases = [name for name in trace if name not in ("step", "start_time", "total")]
+    assert np.allclose(trace["total"], sum(trace[name] for name in phases))
+
+
+def test_profile_report_finds_regressions(tmp_path: Path):
+    _write_trace(tmp_path / "baseline" / "step_trace.nstrace", num_steps=12, data_time=0.001)
+    _write_trace(tmp_path / "new" / "step_trace.nstrace", num_steps=12, data_time=0.01)
+
+    report = ProfileReport(trace=tmp_path / "new", skip_steps=2)
+    report.main()
+    report.baseline = tmp_path / "baseline"
+    report.fail_on_regression = True
+    with pytest.raises(SystemExit):
+        report.main()